@@ -3,10 +3,11 @@
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import date, datetime
 import uuid
 
 from ..services.reporting_database_service import ReportingDatabaseService
+from ..services.dashboard_data_service import dashboard_data_service
 from ..core.logger_simple import get_logger
 from .supabase.auth import get_current_user
 
@@ -78,6 +79,14 @@ class DashboardShareResponse(BaseModel):
     shared_with_email: Optional[str] = None
 
 
+class DashboardDataRequest(BaseModel):
+    """Model for fetching the data of a dashboard's widgets in one request"""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    filters: Optional[Dict[str, Any]] = None
+    widget_ids: Optional[List[str]] = Field(None, description='Only these widgets (default: all)')
+
+
 # ========== Initialize Service ==========
 
 db_service = ReportingDatabaseService()
@@ -259,6 +268,83 @@ async def get_dashboard(
         )
 
 
+def _widget_data_config(widget: Dict[str, Any]) -> Dict[str, Any]:
+    """DashboardDataService widget config for a dashboard_widgets row"""
+    widget_type = widget.get('widget_type') or ''
+    config = widget.get('config') or {}
+    return {
+        'widget_id': widget.get('widget_id') or widget.get('id'),
+        'widget_type': widget_type,
+        'chart_type': config.get('chart_type') or widget_type.replace('_chart', ''),
+        'data_source': widget.get('data_source') or {}
+    }
+
+
+@router.post('/{dashboard_id}/data')
+async def get_dashboard_data(
+    dashboard_id: str,
+    data_request: DashboardDataRequest,
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Get the data of every widget on a dashboard in one response.
+    
+    Widgets reading the same aggregate series share one fetch instead of
+    each widget querying it separately.
+    """
+    try:
+        user_id = current_user.get('id')
+        
+        # Check access permissions
+        can_access, _ = db_service.user_can_access_dashboard(user_id, dashboard_id)
+        
+        if not can_access:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail='You do not have access to this dashboard'
+            )
+        
+        dashboard = db_service.get_dashboard_with_widgets(dashboard_id)
+        
+        if not dashboard:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Dashboard not found'
+            )
+        
+        widgets = dashboard.get('dashboard_widgets') or []
+        if data_request.widget_ids:
+            wanted = set(data_request.widget_ids)
+            widgets = [w for w in widgets if w.get('widget_id') in wanted or w.get('id') in wanted]
+        
+        date_range = None
+        if data_request.start_date and data_request.end_date:
+            date_range = (data_request.start_date, data_request.end_date)
+        
+        configs = [_widget_data_config(widget) for widget in widgets]
+        widget_data = await dashboard_data_service.get_dashboard_widget_data(
+            configs, date_range, data_request.filters
+        )
+        
+        return {
+            'dashboard_id': dashboard_id,
+            'widgets': {
+                config['widget_id']: {'widget_type': config['widget_type'], 'data': data}
+                for config, data in zip(configs, widget_data)
+            },
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'Error fetching data for dashboard {dashboard_id}: {e}')
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f'Failed to fetch dashboard data: {str(e)}'
+        )
+
+
 @router.put('/{dashboard_id}', response_model=DashboardResponse)
 async def update_dashboard(
     dashboard_id: str,
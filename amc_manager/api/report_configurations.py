@@ -3,6 +3,7 @@ Report Configuration API endpoints for enabling/disabling reports on workflows a
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query, status, BackgroundTasks
+from fastapi.responses import FileResponse
 from typing import Optional, List, Dict, Any
 from uuid import UUID
 import asyncio
@@ -27,6 +28,7 @@ from ..services.report_configuration_service import ReportConfigurationService
 from ..services.dashboard_view_service import DashboardViewService
 from ..services.dashboard_insight_service import DashboardInsightService
 from ..services.report_export_service import ReportExportService
+from ..services.export_engine import export_parameters_hash, get_export_storage
 from ..core.logger_simple import get_logger
 from .supabase.auth import get_current_user
 from ..core.rate_limiter import RateLimiter
@@ -506,13 +508,9 @@ async def export_dashboard_async(
         # Create export record
         export_data = {
             "report_configuration_id": str(config_id),
-            "export_type": request.format,
-            "requested_by": current_user["id"],
-            "status": "pending",
-            "metadata": {
-                "include_insights": request.include_insights,
-                "date_range": request.date_range
-            }
+            "export_format": request.format,
+            "user_id": current_user["id"],
+            "parameters_hash": export_parameters_hash(str(config_id), request.format, request.date_range)
         }
 
         export_record = report_export_service.create_export(export_data)
@@ -524,7 +522,8 @@ async def export_dashboard_async(
             config_id=str(config_id),
             format=request.format,
             include_insights=request.include_insights,
-            date_range=request.date_range
+            date_range=request.date_range,
+            user_id=current_user["id"]
         )
 
         return ExportResponse(
@@ -537,4 +536,32 @@ async def export_dashboard_async(
         raise
     except Exception as e:
         logger.error(f"Error starting export for config {config_id}: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/exports/{export_id}/download")
+async def download_export(
+    export_id: UUID,
+    current_user: dict = Depends(get_current_user)
+) -> FileResponse:
+    """
+    Download a completed export stored on local disk.
+    """
+    export = report_export_service.get_export(str(export_id), current_user["id"])
+    if not export or export.get("status") != "completed":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export not found")
+
+    # Reused exports point at the file of the export that originally built it
+    file_url = export.get("file_url") or ""
+    source_export_id = file_url.split("/")[-2] if file_url.startswith("/api/reports/exports/") else str(export_id)
+
+    path = get_export_storage().local_path(source_export_id)
+    if not path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export file not found")
+
+    export_format = export.get("export_format", "csv")
+    return FileResponse(
+        str(path),
+        media_type=report_export_service.get_mime_type(export_format),
+        filename=f"export-{export_id}{report_export_service.get_file_extension(export_format)}"
+    )
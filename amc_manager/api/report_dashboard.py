@@ -19,8 +19,8 @@ report_dashboard_service = ReportDashboardService()
 
 class PeriodComparisonRequest(BaseModel):
     """Request model for period comparison"""
-    period_1: Dict[str, Any] = Field(..., description="First period data")
-    period_2: Dict[str, Any] = Field(..., description="Second period data")
+    period_1: Dict[str, Any] = Field(..., description="First period: {'weeks': [...]} or {'start_date', 'end_date'}")
+    period_2: Dict[str, Any] = Field(..., description="Second period: {'weeks': [...]} or {'start_date', 'end_date'}")
     metrics: List[str] = Field(..., description="Metrics to compare")
 
 
@@ -109,7 +109,7 @@ async def compare_periods(
         
         # Verify user has access to collection
         collection = report_dashboard_service._client.table('report_data_collections')\
-            .select('user_id')\
+            .select('user_id, workflow_id, instance_id')\
             .eq('collection_id', collection_id)\
             .execute()
         
@@ -119,6 +119,18 @@ async def compare_periods(
         if collection.data[0]['user_id'] != user_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
+        # Date ranges are answered from the rollup cube
+        period_1, period_2 = comparison_request.period_1, comparison_request.period_2
+        if all(p.get('start_date') and p.get('end_date') for p in (period_1, period_2)):
+            result = report_dashboard_service.calculate_range_comparison(
+                workflow_id=collection.data[0]['workflow_id'],
+                instance_id=collection.data[0]['instance_id'],
+                period1=(date.fromisoformat(period_1['start_date']), date.fromisoformat(period_1['end_date'])),
+                period2=(date.fromisoformat(period_2['start_date']), date.fromisoformat(period_2['end_date'])),
+                metrics=comparison_request.metrics
+            )
+            return {"comparison": result}
+        
         # Get data for both periods
         period1_data = comparison_request.period_1.get('weeks', [])
         period2_data = comparison_request.period_2.get('weeks', [])
@@ -132,6 +144,8 @@ async def compare_periods(
         
         return {"comparison": result}
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -146,12 +160,15 @@ async def get_chart_data(
     metrics: str = Query(..., description="Comma-separated list of metrics"),
     start_date: Optional[date] = Query(None, description="Start date filter"),
     end_date: Optional[date] = Query(None, description="End date filter"),
+    bucket: Optional[str] = Query(None, description="Roll line/area series up to: week, month"),
+    max_points: Optional[int] = Query(None, ge=3, description="Most points per series (e.g. chart width in pixels)"),
     current_user: dict = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
     Get data formatted for Chart.js
     
-    Transforms collection data into Chart.js compatible format.
+    Transforms collection data into Chart.js compatible format. Line and area
+    series are LTTB-downsampled to max_points.
     """
     try:
         user_id = current_user.get('id')
@@ -176,7 +193,9 @@ async def get_chart_data(
         chart_data = report_dashboard_service.transform_for_chart(
             data=dashboard_data.get('data', []),
             chart_type=chart_type,
-            metrics=metrics_list
+            metrics=metrics_list,
+            bucket=bucket,
+            max_points=max_points
         )
         
         return chart_data
@@ -7,7 +7,6 @@ from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 import uuid
 
-from ..services.snowflake_service import SnowflakeService
 from ..core.logger_simple import get_logger
 from .supabase.auth import get_current_user
 
@@ -18,6 +17,12 @@ router = APIRouter(prefix="/api/snowflake", tags=["Snowflake Configuration"])
 # snowflake_service = SnowflakeService()  # Comment out to avoid initialization at import time
 
 
+def _snowflake_service():
+    """New SnowflakeService; its module (and pyarrow) is imported on first use"""
+    from ..services.snowflake_service import SnowflakeService
+    return SnowflakeService()
+
+
 # Pydantic models
 class SnowflakeConfigCreate(BaseModel):
     """Model for creating Snowflake configuration"""
@@ -114,7 +119,7 @@ async def create_snowflake_config(
         config_dict = config_data.dict(exclude_unset=True)
         
         # Create the configuration
-        snowflake_service = SnowflakeService()  # Lazy initialization
+        snowflake_service = _snowflake_service()  # Lazy initialization
         result = snowflake_service.create_snowflake_config(
             config_data=config_dict,
             user_id=current_user["id"]
@@ -149,7 +154,7 @@ async def check_snowflake_config(
 ) -> bool:
     """Check if user has active Snowflake configuration"""
     try:
-        snowflake_service = SnowflakeService()
+        snowflake_service = _snowflake_service()
         config = snowflake_service.get_user_snowflake_config(current_user["id"])
         return config is not None
     except Exception as e:
@@ -163,7 +168,7 @@ async def get_snowflake_config(
 ) -> Optional[SnowflakeConfigResponse]:
     """Get active Snowflake configuration for current user"""
     try:
-        snowflake_service = SnowflakeService()  # Lazy initialization
+        snowflake_service = _snowflake_service()  # Lazy initialization
         config = snowflake_service.get_user_snowflake_config(current_user["id"])
 
         if not config:
@@ -196,7 +201,7 @@ async def update_snowflake_config(
     """Update Snowflake configuration"""
     try:
         # Get existing configuration
-        snowflake_service = SnowflakeService()  # Lazy initialization
+        snowflake_service = _snowflake_service()  # Lazy initialization
         existing_config = snowflake_service.get_user_snowflake_config(current_user["id"])
         if not existing_config:
             raise HTTPException(
@@ -242,7 +247,7 @@ async def delete_snowflake_config(
     """Delete Snowflake configuration"""
     try:
         # Get existing configuration
-        snowflake_service = SnowflakeService()  # Lazy initialization
+        snowflake_service = _snowflake_service()  # Lazy initialization
         existing_config = snowflake_service.get_user_snowflake_config(current_user["id"])
         if not existing_config:
             raise HTTPException(
@@ -288,7 +293,7 @@ async def test_snowflake_connection(
         config_dict = test_data.dict(exclude_unset=True)
         
         # Test connection
-        snowflake_service = SnowflakeService()  # Lazy initialization
+        snowflake_service = _snowflake_service()  # Lazy initialization
         result = snowflake_service.test_connection(config_dict)
         
         return SnowflakeTestResponse(
@@ -314,7 +319,7 @@ async def list_snowflake_tables(
 ) -> List[SnowflakeTableResponse]:
     """List tables in Snowflake database/schema"""
     try:
-        snowflake_service = SnowflakeService()  # Lazy initialization
+        snowflake_service = _snowflake_service()  # Lazy initialization
         tables = snowflake_service.list_user_tables(
             user_id=current_user["id"],
             database=database,
@@ -3,7 +3,8 @@
 Note: The AMC API /workflows endpoint returns workflow executions (historical runs),
 not workflow definitions. Each execution represents a past run of a workflow."""
 
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 import logging
@@ -14,6 +15,11 @@ from ...services.db_service import db_service
 from ...services.token_service import token_service
 from ...services.data_analysis_service import data_analysis_service
 from ...services.enhanced_schedule_service import EnhancedScheduleService
+from ...services.execution_events import execution_event_hub
+from ...services.status_refresh import status_refresh
+from ...services.execution_results_service import (
+    ResultQuery, apply_result_query, execution_results_service, rows_as_records
+)
 from ...core.supabase_client import SupabaseManager
 from .auth import get_current_user
 
@@ -310,6 +316,28 @@ async def list_stored_executions(
         logger.error(f"Error listing stored executions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/events")
+async def stream_execution_events(
+    instance_id: Optional[str] = Query(None, description="AMC instance ID or instance UUID"),
+    execution_id: Optional[str] = Query(None, description="Only this execution"),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Server-sent events of the user's execution status transitions
+    
+    Each `status` event carries execution_id, status, progress, row_count,
+    error_message and timestamps. Statuses are polled from AMC in the
+    background once per execution, however many clients are subscribed.
+    """
+    await execution_event_hub.start()
+    return StreamingResponse(
+        # Subscribes once the body is sent, so an early disconnect leaves nothing behind
+        execution_event_hub.events(current_user['id'], instance_id, execution_id),
+        media_type="text/event-stream",
+        # An explicit encoding keeps GZipMiddleware from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
+
 @router.get("/{instance_id}")
 async def list_amc_executions(
     instance_id: str,
@@ -534,10 +562,8 @@ async def refresh_execution_status(
         Updated execution status
     """
     try:
-        from ...services.amc_execution_service import amc_execution_service
-        
-        # Poll and update the execution status
-        status = await amc_execution_service.poll_and_update_execution(execution_id, current_user['id'])
+        # Poll and update the execution status (shared with concurrent refreshes)
+        status = await status_refresh.refresh(execution_id, current_user['id'])
         
         if not status:
             raise HTTPException(status_code=404, detail="Execution not found")
@@ -571,7 +597,6 @@ async def refresh_all_executions(
         Summary of refreshed executions
     """
     try:
-        from ...services.amc_execution_service import amc_execution_service
         client = SupabaseManager.get_client(use_service_role=True)
         
         # Build the query for pending/running executions
@@ -604,31 +629,33 @@ async def refresh_all_executions(
         
         logger.info(f"Refreshing {len(response.data)} pending/running executions")
         
+        # Poll all executions concurrently under their instance limits; recently
+        # polled and in-flight ones are shared with other refreshes and the poller
+        results = await status_refresh.refresh_many(
+            [(e['execution_id'], e['workflows']['amc_instances']['instance_id']) for e in response.data],
+            current_user['id']
+        )
+        
         for execution in response.data:
             execution_id = execution['execution_id']
             old_status = execution['status']
+            result = results.get(execution_id)
             
-            try:
-                # Poll and update the execution
-                result = await amc_execution_service.poll_and_update_execution(
-                    execution_id=execution_id,
-                    user_id=current_user['id']
-                )
-                
-                refreshed += 1
-                
-                if result and result.get('status') != old_status:
-                    updated += 1
-                    updates.append({
-                        "execution_id": execution_id,
-                        "old_status": old_status,
-                        "new_status": result.get('status')
-                    })
-                    logger.info(f"Updated {execution_id}: {old_status} -> {result.get('status')}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to refresh execution {execution_id}: {e}")
+            if isinstance(result, Exception):
+                logger.error(f"Failed to refresh execution {execution_id}: {result}")
                 failed += 1
+                continue
+            
+            refreshed += 1
+            
+            if result and result.get('status') != old_status:
+                updated += 1
+                updates.append({
+                    "execution_id": execution_id,
+                    "old_status": old_status,
+                    "new_status": result.get('status')
+                })
+                logger.info(f"Updated {execution_id}: {old_status} -> {result.get('status')}")
         
         return {
             "success": True,
@@ -647,6 +674,12 @@ async def refresh_all_executions(
 async def get_amc_execution_details(
     instance_id: str,
     execution_id: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    columns: Optional[str] = None,
+    sort: Optional[str] = None,
+    filter: Optional[List[str]] = Query(None),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
@@ -655,6 +688,8 @@ async def get_amc_execution_details(
     Args:
         instance_id: The AMC instance ID
         execution_id: The AMC execution ID or internal execution ID (exec_*)
+        offset, limit, cursor: Page of resultData to return (all rows when limit is omitted)
+        columns, sort, filter: Projection, sort keys and column:operator:value filters
         current_user: The authenticated user
         
     Returns:
@@ -784,7 +819,32 @@ async def get_amc_execution_details(
             status_response.get('amcStatus') == 'COMPLETED'
         )
         
+        result_page = None
         if is_completed:
+            # Serve stored results when we have them instead of re-downloading the CSV
+            try:
+                result_query = ResultQuery.from_params(
+                    offset=offset, limit=limit, cursor=cursor,
+                    columns=columns, sort=sort, filters=filter
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            id_column = 'execution_id' if execution_id.startswith('exec_') else 'amc_execution_id'
+            metadata = execution_results_service.get_result_metadata(execution_id, id_column=id_column)
+            if metadata and metadata.get('status') == 'completed' and metadata.get('result_columns'):
+                try:
+                    # Instance access was checked above
+                    result_page = execution_results_service.get_results_page(
+                        execution_id, None, result_query, metadata=metadata
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                if result_page:
+                    result_data = rows_as_records(result_page)
+                    logger.info(f"Serving {len(result_data)} stored rows for execution {amc_execution_id}")
+
+        if is_completed and result_page is None:
             logger.info(f"Execution {amc_execution_id} is completed, fetching download URLs")
             download_response = api_client.get_download_urls(
                 execution_id=amc_execution_id,  # Use the AMC execution ID
@@ -798,10 +858,15 @@ async def get_amc_execution_details(
                 urls = download_response.get('downloadUrls', [])
                 logger.info(f"Got {len(urls)} download URLs for execution {amc_execution_id}")
                 if urls:
-                    # Download and parse the first CSV file
-                    csv_response = api_client.download_and_parse_csv(urls[0])
+                    # Download and parse every part of the CSV result
+                    csv_response = api_client.download_and_parse_csv(urls)
                     if csv_response.get('success'):
-                        result_data = csv_response.get('data')
+                        result_page = apply_result_query(
+                            csv_response.get('columns') or [],
+                            csv_response.get('rows') or [],
+                            result_query
+                        )
+                        result_data = rows_as_records(result_page)
                         logger.info(f"Successfully fetched {len(result_data) if result_data else 0} rows for execution {amc_execution_id}")
                     else:
                         logger.warning(f"Failed to parse CSV for execution {amc_execution_id}: {csv_response.get('error')}")
@@ -855,6 +920,10 @@ async def get_amc_execution_details(
         execution_detail = {
             **status_response,
             "resultData": result_data,
+            "resultPage": {
+                key: result_page[key]
+                for key in ('columns', 'offset', 'limit', 'total_rows', 'has_more', 'next_cursor')
+            } if result_page else None,
             "instanceInfo": {
                 "instanceId": instance.get('instance_id'),
                 "instanceName": instance.get('instance_name'),
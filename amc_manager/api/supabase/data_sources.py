@@ -3,7 +3,7 @@ AMC Data Sources API Endpoints
 Provides access to AMC schema documentation and field definitions
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Dict, List, Any, Optional
 import logging
 
@@ -14,8 +14,27 @@ logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Data Sources"])
 
 
+def _check_etag(service: DataSourceService, request: Request, response: Response) -> Optional[Response]:
+    """
+    Tag the response with the catalog ETag and short-circuit unchanged requests
+    
+    The catalog is served from an in-memory snapshot keyed by its version stamp,
+    so the ETag only changes when the schema importer bumps the version.
+    """
+    etag = service.get_catalog_etag()
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
 @router.get("", response_model=List[Dict[str, Any]])
 async def list_data_sources(
+    request: Request,
+    response: Response,
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search term"),
     tags: Optional[List[str]] = Query(None, description="Filter by tags"),
@@ -34,6 +53,9 @@ async def list_data_sources(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.list_data_sources(
             category=category,
             search=search,
@@ -48,11 +70,16 @@ async def list_data_sources(
 
 @router.get("/categories", response_model=List[str])
 async def get_categories(
+    request: Request,
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> List[str]:
     """Get all unique data source categories"""
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.get_categories()
     except Exception as e:
         logger.error(f"Error getting categories: {str(e)}")
@@ -61,12 +88,17 @@ async def get_categories(
 
 @router.get("/tags", response_model=List[Dict[str, Any]])
 async def get_popular_tags(
+    request: Request,
+    response: Response,
     limit: int = Query(20, ge=1, le=100, description="Maximum tags to return"),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> List[Dict[str, Any]]:
     """Get most commonly used tags with usage counts"""
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.get_popular_tags(limit=limit)
     except Exception as e:
         logger.error(f"Error getting tags: {str(e)}")
@@ -75,6 +107,8 @@ async def get_popular_tags(
 
 @router.get("/search-fields", response_model=List[Dict[str, Any]])
 async def search_fields(
+    request: Request,
+    response: Response,
     q: str = Query(..., min_length=2, description="Search term"),
     limit: int = Query(50, ge=1, le=200, description="Maximum results"),
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -87,6 +121,9 @@ async def search_fields(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.search_fields(search_term=q, limit=limit)
     except Exception as e:
         logger.error(f"Error searching fields: {str(e)}")
@@ -95,6 +132,8 @@ async def search_fields(
 
 @router.get("/export-ai", response_model=Dict[str, Any])
 async def export_for_ai(
+    request: Request,
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
@@ -105,6 +144,9 @@ async def export_for_ai(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.export_for_ai()
     except Exception as e:
         logger.error(f"Error exporting for AI: {str(e)}")
@@ -113,6 +155,8 @@ async def export_for_ai(
 
 @router.get("/{schema_id}", response_model=Dict[str, Any])
 async def get_data_source(
+    request: Request,
+    response: Response,
     schema_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
@@ -123,6 +167,9 @@ async def get_data_source(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         result = service.get_data_source(schema_id)
         
         if not result:
@@ -138,6 +185,8 @@ async def get_data_source(
 
 @router.get("/{schema_id}/fields", response_model=List[Dict[str, Any]])
 async def get_schema_fields(
+    request: Request,
+    response: Response,
     schema_id: str,
     dimension_or_metric: Optional[str] = Query(None, description="Filter by Dimension or Metric"),
     aggregation_threshold: Optional[str] = Query(None, description="Filter by aggregation threshold"),
@@ -151,6 +200,9 @@ async def get_schema_fields(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.get_schema_fields(
             schema_id=schema_id,
             dimension_or_metric=dimension_or_metric,
@@ -163,6 +215,8 @@ async def get_schema_fields(
 
 @router.get("/{schema_id}/examples", response_model=List[Dict[str, Any]])
 async def get_query_examples(
+    request: Request,
+    response: Response,
     schema_id: str,
     category: Optional[str] = Query(None, description="Filter by example category"),
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -175,6 +229,9 @@ async def get_query_examples(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.get_query_examples(
             schema_id=schema_id,
             category=category
@@ -186,6 +243,8 @@ async def get_query_examples(
 
 @router.get("/{schema_id}/sections", response_model=List[Dict[str, Any]])
 async def get_schema_sections(
+    request: Request,
+    response: Response,
     schema_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> List[Dict[str, Any]]:
@@ -197,6 +256,9 @@ async def get_schema_sections(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.get_schema_sections(schema_id)
     except Exception as e:
         logger.error(f"Error getting sections for {schema_id}: {str(e)}")
@@ -205,6 +267,8 @@ async def get_schema_sections(
 
 @router.get("/{schema_id}/relationships", response_model=Dict[str, List[Dict[str, Any]]])
 async def get_schema_relationships(
+    request: Request,
+    response: Response,
     schema_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, List[Dict[str, Any]]]:
@@ -216,6 +280,9 @@ async def get_schema_relationships(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         return service.get_schema_relationships(schema_id)
     except Exception as e:
         logger.error(f"Error getting relationships for {schema_id}: {str(e)}")
@@ -224,6 +291,8 @@ async def get_schema_relationships(
 
 @router.get("/{schema_id}/complete", response_model=Dict[str, Any])
 async def get_complete_schema(
+    request: Request,
+    response: Response,
     schema_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
@@ -241,6 +310,9 @@ async def get_complete_schema(
     """
     try:
         service = DataSourceService()
+        not_modified = _check_etag(service, request, response)
+        if not_modified:
+            return not_modified
         result = service.get_complete_schema(schema_id)
         
         if not result:
@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 from ...core.logger_simple import get_logger
 from ...services.enhanced_schedule_service import EnhancedScheduleService
 from ...services.schedule_executor_service import get_schedule_executor
+from ...services.schedule_history_service import schedule_history_service
 from .auth import get_current_user
 
 logger = get_logger(__name__)
@@ -123,15 +124,23 @@ class ScheduleRunResponse(BaseModel):
 
 class ScheduleMetricsResponse(BaseModel):
     """Model for schedule metrics response"""
+    schedule_id: Optional[str] = None
+    period_days: Optional[int] = None
     total_runs: int
     successful_runs: int
     failed_runs: int
+    pending_runs: int = 0
+    running_runs: int = 0
     success_rate: float
     avg_runtime_seconds: Optional[float]
+    p50_runtime_seconds: Optional[float] = None
+    p95_runtime_seconds: Optional[float] = None
     total_rows_processed: int
     total_cost: float
     next_run: Optional[datetime]
     last_run: Optional[datetime]
+    first_run_in_period: Optional[datetime] = None
+    last_run_in_period: Optional[datetime] = None
 
 
 @router.post("/test-schedule-validation")
@@ -253,6 +262,8 @@ async def list_all_schedules(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    include_metrics: bool = Query(False, description="Attach each schedule's performance metrics"),
+    period_days: int = Query(30, ge=1, le=365, description="Period in days for metrics"),
     current_user: dict = Depends(get_current_user)
 ):
     """List all schedules for the current user"""
@@ -264,6 +275,14 @@ async def list_all_schedules(
             offset=offset
         )
         
+        if include_metrics and schedules:
+            # One counter read for the whole page instead of a metrics call per schedule
+            metrics = schedule_history_service.get_metrics_for_schedules(
+                {schedule['id']: schedule for schedule in schedules}, period_days
+            )
+            for schedule in schedules:
+                schedule['metrics'] = metrics.get(schedule['id'])
+        
         # Return raw schedules with workflows data included
         return schedules
         
@@ -745,52 +764,12 @@ async def get_schedule_metrics(
         if schedule.get('user_id') != current_user['id']:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        # Calculate metrics
-        from ...core.supabase_client import SupabaseManager
-        from datetime import timedelta
-        
-        db = SupabaseManager.get_client()
-        
-        # Get runs within period
-        cutoff_date = datetime.utcnow() - timedelta(days=period_days)
+        # Metrics come from the daily run counters; the schedule is already loaded
+        metrics = schedule_history_service.get_metrics_for_schedules(
+            {schedule['id']: schedule}, period_days
+        )[schedule['id']]
         
-        result = db.table('schedule_runs').select('*').eq(
-            'schedule_id', schedule['id']
-        ).gte('scheduled_at', cutoff_date.isoformat()).execute()
-        
-        runs = result.data or []
-        
-        # Calculate metrics
-        total_runs = len(runs)
-        successful_runs = sum(1 for r in runs if r['status'] == 'completed')
-        failed_runs = sum(1 for r in runs if r['status'] == 'failed')
-        success_rate = (successful_runs / total_runs * 100) if total_runs > 0 else 0
-        
-        # Calculate average runtime
-        runtimes = []
-        for run in runs:
-            if run['status'] == 'completed' and run['started_at'] and run['completed_at']:
-                start = datetime.fromisoformat(run['started_at'].replace('Z', '+00:00'))
-                end = datetime.fromisoformat(run['completed_at'].replace('Z', '+00:00'))
-                runtimes.append((end - start).total_seconds())
-        
-        avg_runtime = sum(runtimes) / len(runtimes) if runtimes else None
-        
-        # Sum totals
-        total_rows = sum(r.get('total_rows', 0) for r in runs)
-        total_cost = sum(r.get('total_cost', 0) for r in runs)
-        
-        return ScheduleMetricsResponse(
-            total_runs=total_runs,
-            successful_runs=successful_runs,
-            failed_runs=failed_runs,
-            success_rate=success_rate,
-            avg_runtime_seconds=avg_runtime,
-            total_rows_processed=total_rows,
-            total_cost=total_cost,
-            next_run=schedule.get('next_run_at'),
-            last_run=schedule.get('last_run_at')
-        )
+        return ScheduleMetricsResponse(**metrics)
         
     except HTTPException:
         raise
@@ -1,9 +1,10 @@
 """Dashboard stats API endpoint for fast dashboard loading"""
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 
+from ...core.loop_monitor import loop_lag_monitor
 from ...core.supabase_client import SupabaseManager
 from ...core.logger_simple import get_logger
 from .auth import get_current_user
@@ -213,3 +214,81 @@ async def get_dashboard_stats(
             },
             "recentActivity": [],
         }
+
+
+@router.get("/stats/concurrency")
+async def get_concurrency_stats(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Adaptive AMC submission concurrency per instance, as seen by this process:
+    current limit, in-flight submissions, successes and throttle counts
+    (admin only)
+    """
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    from ...services.adaptive_concurrency import get_concurrency_state
+
+    return {"instances": get_concurrency_state()}
+
+
+@router.get("/stats/workers")
+async def get_worker_stats(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Background worker pool: this process's coordinator state and every
+    leader/member lease in worker_leases (admin only)
+    """
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    from ...services.worker_coordinator import worker_coordinator
+
+    try:
+        leases = worker_coordinator.leases.list_leases()
+    except Exception as e:
+        logger.error(f"Error listing worker leases: {e}")
+        leases = []
+    return {"process": worker_coordinator.get_state(), "leases": leases}
+
+
+@router.get("/stats/jobs")
+async def get_job_queue_stats(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Background job queue: this process's runner state and job counts per
+    queue and status, dead meaning dead-lettered after max_attempts (admin only)
+    """
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    from ...services.job_queue import job_runner
+
+    try:
+        summary = job_runner.backend.stats()
+    except Exception as e:
+        logger.error(f"Error reading background job summary: {e}")
+        summary = []
+    return {"process": job_runner.get_state(), "queues": summary}
+
+
+@router.get("/stats/stalls")
+async def get_event_loop_stalls(
+    reset: bool = False,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Event-loop stalls in this process, aggregated per blocking function with
+    the library call it was blocked in and a sample stack (admin only).
+    Pass reset=true to start a fresh aggregation window.
+    """
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    reports = loop_lag_monitor.get_stall_reports()
+    if reset:
+        loop_lag_monitor.reset_stalls()
+    return {"loop": loop_lag_monitor.get_state(), "stalls": reports}
@@ -1,6 +1,7 @@
 """Workflows API endpoints using Supabase"""
 
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timezone, timedelta
@@ -10,6 +11,7 @@ from ...services.db_service import db_service
 from ...services.token_service import token_service
 from ...services.batch_execution_service import BatchExecutionService
 from ...services.parameter_detection_service import ParameterDetectionService
+from ...config import settings
 from ...core.logger_simple import get_logger
 from ...core.supabase_client import SupabaseManager
 from .auth import get_current_user
@@ -467,7 +469,7 @@ async def create_workflow(
             entity_id=entity_id,
             marketplace_id=marketplace_id,
             input_parameters=input_parameters if input_parameters else None,
-            output_format=workflow.parameters.get('output_format', 'CSV') if workflow.parameters else 'CSV'
+            output_format=(workflow.parameters or {}).get('output_format', settings.amc_output_format)
         )
         
         if not amc_response.get('success'):
@@ -847,14 +849,24 @@ def list_workflow_executions(
 @router.get("/executions/{execution_id}/status")
 async def get_execution_status(
     execution_id: str,
+    refresh: bool = Query(False, description="Poll AMC now instead of reading the stored status"),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """Get execution status"""
+    """
+    Get execution status
+    
+    The stored status is kept current by the background poller, which also
+    pushes transitions to /amc-executions/events; refresh=true polls AMC.
+    """
     try:
         from ...services.amc_execution_service import amc_execution_service
         
-        # Poll AMC for latest status and update database
-        status = await amc_execution_service.poll_and_update_execution(execution_id, current_user['id'])
+        if refresh:
+            # Poll AMC for latest status and update database
+            from ...services.status_refresh import status_refresh
+            status = await status_refresh.refresh(execution_id, current_user['id'])
+        else:
+            status = amc_execution_service.get_execution_status(execution_id, current_user['id'])
         if not status:
             raise HTTPException(status_code=404, detail="Execution not found")
         
@@ -916,16 +928,41 @@ def get_execution_detail(
 @router.get("/executions/{execution_id}/results")
 def get_execution_results(
     execution_id: str,
+    offset: int = Query(0, ge=0, description="Row offset"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Page size; omit for all rows"),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    sort: Optional[str] = Query(None, description="Comma-separated sort keys, '-' prefix for descending"),
+    filter: Optional[List[str]] = Query(None, description="Filters as column:operator:value"),
+    format: str = Query("json", pattern="^(json|ndjson|arrow)$", description="Response encoding"),
     current_user: Dict[str, Any] = Depends(get_current_user)
-) -> Dict[str, Any]:
-    """Get execution results"""
+):
+    """Get execution results, optionally paged, projected, sorted and filtered"""
     try:
-        from ...services.amc_execution_service import amc_execution_service
-        
-        results = amc_execution_service.get_execution_results(execution_id, current_user['id'])
+        from ...services.execution_results_service import (
+            ResultQuery, execution_results_service, iter_ndjson, to_arrow_ipc
+        )
+
+        try:
+            query = ResultQuery.from_params(
+                offset=offset, limit=limit, cursor=cursor,
+                columns=columns, sort=sort, filters=filter
+            )
+            results = execution_results_service.get_results_page(execution_id, current_user['id'], query)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         if not results:
             raise HTTPException(status_code=404, detail="Results not found or execution not completed")
-        
+
+        if format == "ndjson":
+            return StreamingResponse(iter_ndjson(results), media_type="application/x-ndjson")
+        if format == "arrow":
+            return Response(
+                content=to_arrow_ipc(results),
+                media_type="application/vnd.apache.arrow.stream",
+                headers={"X-Total-Rows": str(results['total_rows'])}
+            )
         return results
     except HTTPException:
         raise
@@ -1144,8 +1181,8 @@ def sync_workflow_to_amc(
         from ...services.amc_api_client import AMCAPIClient
         api_client = AMCAPIClient()
         
-        # Get output format from workflow parameters or default to CSV
-        output_format = workflow.get('parameters', {}).get('output_format', 'CSV')
+        # Get output format from workflow parameters or default to AMC_OUTPUT_FORMAT
+        output_format = workflow.get('parameters', {}).get('output_format', settings.amc_output_format)
         
         response = api_client.create_workflow(
             instance_id=instance['instance_id'],
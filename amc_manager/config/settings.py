@@ -41,19 +41,74 @@ class Settings(BaseSettings):
     api_host: str = Field('0.0.0.0', env='API_HOST')
     api_port: int = Field(8000, env='API_PORT')
     api_workers: int = Field(4, env='API_WORKERS')
+    # 'api' serves HTTP only, 'worker' runs background engines only, 'all' does both
+    process_role: str = Field('all', env='PROCESS_ROLE')
+    worker_lease_ttl_seconds: int = Field(30, env='WORKER_LEASE_TTL_SECONDS')
     frontend_url: Optional[str] = Field('http://localhost:5173', env='FRONTEND_URL')
     
+    # Report exports
+    export_storage_dir: str = Field('exports', env='EXPORT_STORAGE_DIR')
+    export_max_workers: int = Field(4, env='EXPORT_MAX_WORKERS')
+    export_per_user_limit: int = Field(2, env='EXPORT_PER_USER_LIMIT')
+    export_chunk_rows: int = Field(5000, env='EXPORT_CHUNK_ROWS')
+    
+    # Adaptive AMC submission concurrency (per instance)
+    amc_concurrency_initial: int = Field(5, env='AMC_CONCURRENCY_INITIAL')
+    amc_concurrency_min: int = Field(1, env='AMC_CONCURRENCY_MIN')
+    amc_concurrency_max: int = Field(20, env='AMC_CONCURRENCY_MAX')
+    amc_submit_spacing_seconds: float = Field(2.0, env='AMC_SUBMIT_SPACING_SECONDS')  # between submissions
+    
+    # Background job queue (LISTEN wakeups need DATABASE_URL and asyncpg; otherwise poll)
+    job_queue_poll_seconds: float = Field(5.0, env='JOB_QUEUE_POLL_SECONDS')
+    job_queue_sweep_seconds: int = Field(300, env='JOB_QUEUE_SWEEP_SECONDS')
+    job_queue_succeeded_retention_days: int = Field(7, env='JOB_QUEUE_SUCCEEDED_RETENTION_DAYS')
+    job_queue_dead_retention_days: int = Field(30, env='JOB_QUEUE_DEAD_RETENTION_DAYS')
+    
+    # Execution status push (SSE); cross-process delivery also uses DATABASE_URL and asyncpg
+    execution_events_heartbeat_seconds: float = Field(15.0, env='EXECUTION_EVENTS_HEARTBEAT_SECONDS')
+    execution_events_queue_size: int = Field(100, env='EXECUTION_EVENTS_QUEUE_SIZE')  # per client
+    status_refresh_cache_seconds: float = Field(10.0, env='STATUS_REFRESH_CACHE_SECONDS')  # AMC polls reused this long
+    
+    # Execution reconciliation: AMC executions created since a per-instance watermark
+    reconcile_interval_minutes: int = Field(5, env='RECONCILE_INTERVAL_MINUTES')
+    reconcile_initial_lookback_hours: int = Field(24, env='RECONCILE_INITIAL_LOOKBACK_HOURS')  # first pass
+    reconcile_max_pages: int = Field(20, env='RECONCILE_MAX_PAGES')  # of 100 executions per instance and pass
+    reconcile_max_hold_hours: int = Field(24, env='RECONCILE_MAX_HOLD_HOURS')  # unfinished longer stops holding the watermark
+    
+    # Rollup cube: result columns also rolled up per value (comma-separated)
+    rollup_dimensions: str = Field('campaign_id', env='ROLLUP_DIMENSIONS')
+    
+    # Anomaly engine: weekly series scored in bulk and stored in report_anomalies
+    anomaly_scan_interval_minutes: int = Field(360, env='ANOMALY_SCAN_INTERVAL_MINUTES')
+    anomaly_lookback_weeks: int = Field(104, env='ANOMALY_LOOKBACK_WEEKS')  # two seasons of history
+    anomaly_threshold: float = Field(3.5, env='ANOMALY_THRESHOLD')  # robust z-score
+    
+    # AI insights: answers cached per (type, question, data version); per-process LRU stores
+    insight_cache_ttl_seconds: int = Field(3600, env='INSIGHT_CACHE_TTL_SECONDS')
+    insight_cache_max_entries: int = Field(1000, env='INSIGHT_CACHE_MAX_ENTRIES')
+    insight_context_max_users: int = Field(1000, env='INSIGHT_CONTEXT_MAX_USERS')
+    
     # Celery
     celery_broker_url: Optional[str] = Field(None, env='CELERY_BROKER_URL')
     celery_result_backend: Optional[str] = Field(None, env='CELERY_RESULT_BACKEND')
     
     # Monitoring
     sentry_dsn: Optional[str] = Field(None, env='SENTRY_DSN')
+    metrics_enabled: bool = Field(True, env='METRICS_ENABLED')
+    metrics_port: Optional[int] = Field(None, env='METRICS_PORT')  # /metrics served here instead of the API port
+    metrics_token: Optional[str] = Field(None, env='METRICS_TOKEN')  # bearer token for /metrics on the API port
+    tracing_enabled: bool = Field(False, env='TRACING_ENABLED')  # OpenTelemetry spans (needs opentelemetry-api)
+    loop_lag_interval_seconds: float = Field(0.5, env='LOOP_LAG_INTERVAL_SECONDS')
+    loop_stall_threshold_seconds: float = Field(0.25, env='LOOP_STALL_THRESHOLD_SECONDS')  # 0 disables stall sampling
+    profile_imports: bool = Field(False, env='PROFILE_IMPORTS')  # log the slowest startup imports
     
     # AMC
     amc_api_version: str = Field('v1', env='AMC_API_VERSION')
     amc_api_base_url: str = Field('https://advertising-api.amazon.com', env='AMC_API_BASE_URL')
     amc_use_real_api: bool = Field(True, env='AMC_USE_REAL_API')
+    amc_output_format: str = Field('PARQUET', env='AMC_OUTPUT_FORMAT')  # PARQUET, or CSV/JSON
+    amc_download_concurrency: int = Field(4, env='AMC_DOWNLOAD_CONCURRENCY')  # result parts fetched in parallel
+    amc_download_retries: int = Field(3, env='AMC_DOWNLOAD_RETRIES')  # Range resumes per result part
     
     # Rate limiting
     rate_limit_calls: int = 10
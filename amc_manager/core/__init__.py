@@ -1,9 +1,15 @@
 """Core module exports"""
 
-# Import and re-export commonly used classes and functions
-from .api_client import AMCAPIClient, AMCAPIEndpoints
-from .logger import get_logger
-from .supabase_client import SupabaseManager, CampaignMappingService
+# Commonly used classes and functions, re-exported at package level. They are
+# imported on first access so that importing a light submodule (logger_simple,
+# metrics, startup_profile) does not pull in supabase and the AMC client.
+_EXPORTS = {
+    'AMCAPIClient': '.api_client',
+    'AMCAPIEndpoints': '.api_client',
+    'get_logger': '.logger',
+    'SupabaseManager': '.supabase_client',
+    'CampaignMappingService': '.supabase_client',
+}
 
 # Make exports available at package level
 __all__ = [
@@ -13,3 +19,12 @@ __all__ = [
     'SupabaseManager',
     'CampaignMappingService'
 ]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
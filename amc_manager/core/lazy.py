@@ -0,0 +1,59 @@
+"""
+Lazy Singletons
+Module-level services that are constructed on first use
+
+`service = Service()` at the bottom of a module runs the constructor as soon
+as anything imports the module, and every router imports several of them.
+Constructors that create Supabase clients, Fernet instances or nested
+services then run at startup in every process, whether or not it ever
+serves that feature. `service = LazyService(Service)` keeps the same
+module-level name but defers the constructor to the first attribute access.
+"""
+
+import threading
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar('T')
+
+
+class LazyService(Generic[T]):
+    """Proxy that builds its service on first use and forwards to it
+
+    Attribute reads, writes and deletes all go to the instance, so callers
+    (and unittest.mock.patch.object) see the real service.
+    """
+
+    __slots__ = ('_factory', '_instance', '_lock')
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    @property
+    def _initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __repr__(self) -> str:
+        name = getattr(self._factory, '__name__', repr(self._factory))
+        state = 'initialized' if self._initialized else 'not initialized'
+        return f"<LazyService {name} ({state})>"
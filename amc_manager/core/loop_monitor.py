@@ -0,0 +1,259 @@
+"""
+Event Loop Lag Monitor
+Lag measurement and stall attribution for the main event loop
+
+A task asks the event loop to wake it every `interval` seconds and records
+how late each wakeup is. Lateness means something ran on the loop without
+yielding (a synchronous Supabase or requests call, time.sleep, pandas work,
+Fernet) and every other coroutine waited for it.
+
+A watchdog thread notices when that wakeup is overdue by more than
+`stall_threshold` and samples the loop thread's stack until the loop runs
+again. Each stall is attributed to the innermost application frame on the
+sampled stacks (e.g. AMCExecutionService.poll_and_update_execution), with
+the library call it was blocked in (e.g. ssl.SSLSocket.read), and stalls are
+aggregated per culprit for /api/stats/stalls.
+
+Strict mode (strict=True, or the no_blocking_calls() context manager in
+tests) turns any recorded stall into a BlockingCallError.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .logger_simple import get_logger
+from .metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS, EVENT_LOOP_STALL_SECONDS
+
+logger = get_logger(__name__)
+
+# Frames under these directories are "ours" for attribution
+_APP_ROOTS = (
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),  # amc_manager/
+)
+_APP_SCRIPTS = ('main_supabase.py', 'worker_supabase.py')
+_STACK_LIMIT = 25
+
+
+class BlockingCallError(AssertionError):
+    """Raised in strict mode when the event loop was blocked beyond the threshold"""
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+
+def _is_app_frame(filename: str) -> bool:
+    return filename.startswith(_APP_ROOTS) or filename.endswith(_APP_SCRIPTS)
+
+
+def _attribute(frame) -> Tuple[str, str, List[str]]:
+    """(culprit, blocked_in, formatted stack) for the loop thread's current frame"""
+    blocked_in = f"{_frame_name(frame)} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+    culprit = None
+    walk = frame
+    while walk is not None:
+        if _is_app_frame(walk.f_code.co_filename) and walk.f_code.co_filename != __file__:
+            culprit = f"{_frame_name(walk)} ({os.path.basename(walk.f_code.co_filename)}:{walk.f_lineno})"
+            break
+        walk = walk.f_back
+    stack = [
+        f"{entry.filename}:{entry.lineno} in {entry.name}"
+        for entry in traceback.extract_stack(frame, limit=_STACK_LIMIT)
+    ]
+    return culprit or blocked_in, blocked_in, stack
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag of the loop it is started on and attributes stalls"""
+
+    def __init__(self, interval: float = 0.5, stall_threshold: Optional[float] = 0.25, strict: bool = False):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.strict = strict
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+        # Stall detection (watchdog thread)
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._watchdog: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+        self._lock = threading.Lock()
+        self._current: Optional[Dict[str, Any]] = None
+        self._reports: Dict[str, Dict[str, Any]] = {}
+        self.stalls = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        if self.stall_threshold:
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name='loop-stall-watchdog', daemon=True)
+            self._watchdog.start()
+        logger.info(
+            f"Event loop lag monitor started (interval {self.interval}s, "
+            f"stall threshold {self.stall_threshold or 'off'})"
+        )
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._watchdog is not None:
+            self._watchdog_stop.set()
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+        if self._current is not None:
+            # The loop is running again (we are on it); close the last stall
+            resumed = self._last_beat if self._last_beat != self._current['beat'] else time.monotonic()
+            self._finish_stall(resumed)
+        if self.strict:
+            self.raise_for_stalls()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - due)
+
+    def record(self, lag: float) -> None:
+        lag = max(lag, 0.0)
+        self.samples += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+    # ========== Stall detection ==========
+
+    def _watch(self) -> None:
+        check_every = max(min(self.stall_threshold, self.interval) / 2, 0.005)
+        while not self._watchdog_stop.wait(check_every):
+            beat = self._last_beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue > self.stall_threshold:
+                self._sample(beat)
+            elif self._current is not None and self._current['beat'] != beat:
+                self._finish_stall(beat)
+
+    def _sample(self, beat: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        culprit, blocked_in, stack = _attribute(frame)
+        if self._current is None or self._current['beat'] != beat:
+            if self._current is not None:
+                self._finish_stall(beat)
+            self._current = {'beat': beat, 'culprits': Counter(), 'stacks': {}, 'blocked_in': {}}
+        self._current['culprits'][culprit] += 1
+        self._current['stacks'][culprit] = stack
+        self._current['blocked_in'][culprit] = blocked_in
+
+    def _finish_stall(self, resumed_beat: float) -> None:
+        stall = self._current
+        self._current = None
+        if stall is None or not stall['culprits']:
+            return
+        duration = max(resumed_beat - stall['beat'] - self.interval, 0.0)
+        culprit = stall['culprits'].most_common(1)[0][0]
+        with self._lock:
+            self.stalls += 1
+            report = self._reports.setdefault(culprit, {
+                'culprit': culprit,
+                'count': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+            })
+            report['count'] += 1
+            report['total_seconds'] += duration
+            report['max_seconds'] = max(report['max_seconds'], duration)
+            report['blocked_in'] = stall['blocked_in'][culprit]
+            report['last_seen_at'] = time.time()
+            report['stack'] = stall['stacks'][culprit]
+        EVENT_LOOP_STALLS.labels(culprit.split(' (')[0]).inc()
+        EVENT_LOOP_STALL_SECONDS.observe(duration)
+        logger.warning(
+            f"Event loop blocked for {duration:.2f}s in {culprit} "
+            f"(blocked in {stall['blocked_in'][culprit]})"
+        )
+
+    def get_stall_reports(self) -> List[Dict[str, Any]]:
+        """Stalls aggregated per culprit, worst total first"""
+        with self._lock:
+            reports = [dict(report) for report in self._reports.values()]
+        for report in reports:
+            report['total_seconds'] = round(report['total_seconds'], 3)
+            report['max_seconds'] = round(report['max_seconds'], 3)
+        return sorted(reports, key=lambda r: r['total_seconds'], reverse=True)
+
+    def reset_stalls(self) -> None:
+        with self._lock:
+            self._reports.clear()
+            self.stalls = 0
+
+    def raise_for_stalls(self) -> None:
+        """Strict mode: fail if any stall was recorded"""
+        reports = self.get_stall_reports()
+        if reports:
+            details = '; '.join(
+                f"{r['culprit']} blocked {r['count']}x, max {r['max_seconds']}s (in {r['blocked_in']})"
+                for r in reports
+            )
+            raise BlockingCallError(f"Event loop blocked beyond {self.stall_threshold}s: {details}")
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'interval_seconds': self.interval,
+            'stall_threshold_seconds': self.stall_threshold,
+            'samples': self.samples,
+            'last_lag_seconds': round(self.last_lag, 4),
+            'max_lag_seconds': round(self.max_lag, 4),
+            'stalls': self.stalls,
+            'stalled_now': self._current is not None,
+        }
+
+
+@asynccontextmanager
+async def no_blocking_calls(threshold: float = 0.1, interval: float = 0.02) -> AsyncIterator[LoopLagMonitor]:
+    """
+    Strict mode for tests: raise BlockingCallError if the loop is blocked
+    for more than `threshold` seconds anywhere inside the block
+    """
+    monitor = LoopLagMonitor(interval=interval, stall_threshold=threshold, strict=True)
+    await monitor.start()
+    try:
+        yield monitor
+    finally:
+        await monitor.stop()
+
+
+# Process-wide monitor for the main event loop
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.loop_lag_interval_seconds,
+    stall_threshold=settings.loop_stall_threshold_seconds or None
+)
@@ -0,0 +1,318 @@
+"""
+Metrics and Tracing
+
+Prometheus metrics for the hot paths: AMC API calls, Supabase queries, API
+requests, background poll cycles, queue depths, concurrency limiters,
+Snowflake uploads and event-loop lag. They are exported on METRICS_PORT when
+it is set; otherwise the API serves /metrics only to scrapers presenting
+METRICS_TOKEN.
+
+Recording a sample is an in-process counter update, so the instrumentation is
+cheap enough to stay on in production. Values that already live in memory
+(limiter slots, job runner in-flight counts) are read at scrape time by
+registered callbacks instead of being updated on every change.
+
+prometheus-client is optional: without it (or with METRICS_ENABLED=false)
+every metric is a no-op. OpenTelemetry spans along submit -> poll ->
+download -> store -> sync are recorded only with TRACING_ENABLED=true and the
+opentelemetry API installed; the exporter is configured the usual
+OpenTelemetry way (e.g. opentelemetry-instrument and OTEL_* variables).
+"""
+
+import functools
+import inspect
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from ..config import settings
+from .logger_simple import get_logger
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    REGISTRY = None
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+logger = get_logger(__name__)
+
+METRICS_AVAILABLE = REGISTRY is not None and settings.metrics_enabled
+
+# Latency buckets (seconds) for network calls and for slow, minute-scale lags
+_CALL_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+_LOOP_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _NoopMetric:
+    """Stands in for every metric when prometheus-client is unavailable"""
+
+    def labels(self, *args, **kwargs) -> '_NoopMetric':
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def time(self):
+        return nullcontext()
+
+
+_NOOP = _NoopMetric()
+
+
+def _histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets=_CALL_BUCKETS):
+    if not METRICS_AVAILABLE:
+        return _NOOP
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _counter(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    if not METRICS_AVAILABLE:
+        return _NOOP
+    return Counter(name, documentation, labelnames)
+
+
+def _gauge(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    if not METRICS_AVAILABLE:
+        return _NOOP
+    return Gauge(name, documentation, labelnames)
+
+
+HTTP_REQUEST_SECONDS = _histogram(
+    'http_request_seconds', 'API request latency', ['method', 'route', 'status']
+)
+AMC_REQUEST_SECONDS = _histogram(
+    'amc_api_request_seconds', 'AMC API call latency', ['method', 'endpoint', 'status']
+)
+SUPABASE_QUERY_SECONDS = _histogram(
+    'supabase_query_seconds', 'Supabase (PostgREST) query latency', ['table', 'method', 'status']
+)
+POLL_CYCLE_SECONDS = _histogram(
+    'background_poll_cycle_seconds', 'Duration of one background engine cycle', ['engine']
+)
+QUEUE_DEPTH = _gauge(
+    'background_queue_depth', 'Work items found by the last cycle of each executor', ['executor']
+)
+DETECTION_LAG_SECONDS = _histogram(
+    'amc_execution_detection_lag_seconds',
+    'Time between AMC finishing an execution and this app detecting it',
+    ['status'], buckets=_LAG_BUCKETS
+)
+JOB_SECONDS = _histogram(
+    'background_job_seconds', 'Background job handler duration', ['queue', 'outcome']
+)
+SNOWFLAKE_UPLOAD_SECONDS = _histogram(
+    'snowflake_upload_seconds', 'Snowflake upload duration', ['status']
+)
+SNOWFLAKE_UPLOAD_ROWS = _counter('snowflake_upload_rows_total', 'Rows uploaded to Snowflake')
+SNOWFLAKE_UPLOAD_BYTES = _counter('snowflake_upload_bytes_total', 'Parquet bytes staged for Snowflake')
+EVENT_LOOP_LAG_SECONDS = _histogram(
+    'event_loop_lag_seconds', 'Delay of a scheduled event-loop wakeup beyond its due time',
+    buckets=_LOOP_BUCKETS
+)
+EVENT_LOOP_STALLS = _counter(
+    'event_loop_stalls_total', 'Event-loop stalls beyond the threshold, by blocking function', ['function']
+)
+EVENT_LOOP_STALL_SECONDS = _histogram(
+    'event_loop_stall_seconds', 'Duration of event-loop stalls beyond the threshold', buckets=_LOOP_BUCKETS
+)
+
+
+# ========== Scrape-time gauges ==========
+
+_GaugeReader = Callable[[], Iterable[Tuple[Sequence[str], float]]]
+_gauge_readers: Dict[str, Tuple[str, List[str], _GaugeReader]] = {}
+
+
+class _CallbackCollector:
+    """Yields registered gauges, reading their values only when scraped"""
+
+    def collect(self):
+        for name, (documentation, labelnames, read) in list(_gauge_readers.items()):
+            family = GaugeMetricFamily(name, documentation, labels=labelnames)
+            try:
+                for label_values, value in read():
+                    family.add_metric([str(v) for v in label_values], value)
+            except Exception as e:
+                logger.debug(f"Could not read gauge {name}: {e}")
+                continue
+            yield family
+
+    def describe(self):
+        return []
+
+
+if METRICS_AVAILABLE:
+    REGISTRY.register(_CallbackCollector())
+
+
+def register_gauge(name: str, documentation: str, labelnames: Sequence[str], read: _GaugeReader) -> None:
+    """
+    Gauge whose samples come from read() at scrape time
+
+    read() returns (label values, value) pairs; registering a name again
+    replaces its reader.
+    """
+    _gauge_readers[name] = (documentation, list(labelnames), read)
+
+
+# ========== Recording helpers ==========
+
+# Path segments that are followed by an identifier in AMC URLs
+_AMC_ID_PARENTS = {'reporting', 'workflowExecutions', 'workflows'}
+
+
+def amc_endpoint(url: str) -> str:
+    """Low-cardinality endpoint label: IDs in AMC paths become {id}"""
+    path = urlparse(url).path
+    if not path.startswith('/amc/'):
+        # Pre-signed result download URLs
+        return 'results_download'
+    parts = path.strip('/').split('/')
+    return '/' + '/'.join(
+        '{id}' if i and parts[i - 1] in _AMC_ID_PARENTS else part
+        for i, part in enumerate(parts)
+    )
+
+
+def observe_amc_request(method: str, url: str, status: Any, seconds: float) -> None:
+    AMC_REQUEST_SECONDS.labels(method.upper(), amc_endpoint(url), str(status)).observe(seconds)
+
+
+def supabase_table(path: str) -> str:
+    """Table (or rpc/<function>) a PostgREST request path addresses"""
+    parts = [part for part in path.split('/') if part]
+    if 'v1' in parts:
+        parts = parts[parts.index('v1') + 1:]
+    if not parts:
+        return 'unknown'
+    if parts[0] == 'rpc' and len(parts) > 1:
+        return f"rpc/{parts[1]}"
+    return parts[0]
+
+
+def _stamp_supabase_request(request) -> None:
+    request.extensions['metrics_started'] = time.perf_counter()
+
+
+def _observe_supabase_response(response) -> None:
+    started = response.request.extensions.get('metrics_started')
+    if started is None:
+        return
+    SUPABASE_QUERY_SECONDS.labels(
+        supabase_table(response.request.url.path),
+        response.request.method,
+        str(response.status_code)
+    ).observe(time.perf_counter() - started)
+
+
+def instrument_supabase_client(client: Any) -> None:
+    """Record query latency per table on a supabase-py client's PostgREST session
+
+    Measures time to response headers. Clients without a PostgREST httpx
+    session (e.g. in-memory stand-ins) are left alone.
+    """
+    if not METRICS_AVAILABLE:
+        return
+    try:
+        session = client.postgrest.session
+        hooks = session.event_hooks
+    except Exception:
+        return
+    if _observe_supabase_response in hooks.get('response', []):
+        return
+    hooks['request'].append(_stamp_supabase_request)
+    hooks['response'].append(_observe_supabase_response)
+
+
+def observe_detection_lag(status: str, finished_at: Optional[str]) -> None:
+    """Record how long after AMC's end time an execution was seen as finished"""
+    if not finished_at:
+        return
+    try:
+        finished = datetime.fromisoformat(str(finished_at).replace('Z', '+00:00'))
+        if finished.tzinfo is None:
+            finished = finished.replace(tzinfo=timezone.utc)
+        lag = (datetime.now(timezone.utc) - finished).total_seconds()
+    except ValueError:
+        return
+    DETECTION_LAG_SECONDS.labels(status).observe(max(lag, 0.0))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus exposition body and content type"""
+    if not METRICS_AVAILABLE:
+        return b'# metrics disabled (prometheus-client missing or METRICS_ENABLED=false)\n', CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: Optional[int]) -> bool:
+    """Serve /metrics on its own port, apart from the public API"""
+    if not METRICS_AVAILABLE or not port:
+        return False
+    from prometheus_client import start_http_server
+    try:
+        start_http_server(port)
+    except OSError as e:
+        # Another process on this host (e.g. a sibling uvicorn worker) holds the port
+        logger.warning(f"Metrics port {port} unavailable: {e}")
+        return False
+    logger.info(f"Metrics served on :{port}/metrics")
+    return True
+
+
+# ========== Tracing ==========
+
+TRACING_ENABLED = otel_trace is not None and settings.tracing_enabled
+
+# Keyword arguments copied onto spans, so one execution can be followed across
+# the submit, poll, download, store and sync spans
+_SPAN_ATTRIBUTES = ('execution_id', 'workflow_id', 'instance_id', 'table_name')
+
+
+def span(name: str, **attributes: Any):
+    """Context manager for an OpenTelemetry span (a no-op unless tracing is enabled)"""
+    if not TRACING_ENABLED:
+        return nullcontext()
+    return otel_trace.get_tracer('amc_manager').start_as_current_span(
+        name, attributes={k: str(v) for k, v in attributes.items() if v is not None}
+    )
+
+
+def traced(name: str) -> Callable:
+    """Decorator running a (sync or async) function inside span(name)"""
+    def decorator(func: Callable) -> Callable:
+        if not TRACING_ENABLED:
+            return func
+
+        def _attributes(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            return {key: kwargs.get(key) for key in _SPAN_ATTRIBUTES if key in kwargs}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **_attributes(kwargs)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **_attributes(kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -0,0 +1,107 @@
+"""
+Startup Profiling
+Import time and memory of the API startup path
+
+main_supabase.py starts an ImportProfiler before its first import and stops
+it once every router is included, then logs how long the imports took and the
+process's resident memory. With PROFILE_IMPORTS=true it also logs the slowest
+imports (cumulative, like `python -X importtime`), which is where to look when
+startup gets slower.
+
+The budget below is enforced by tests/test_startup_budget.py: importing the
+API must stay within it and must not load DEFERRED_MODULES, which the code
+imports on first use instead.
+
+Only the standard library is imported here, so the profiler can be started
+before anything else.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Startup budget for `import main_supabase`
+IMPORT_BUDGET_SECONDS = 3.5
+IMPORT_BUDGET_RSS_MB = 120
+
+# Heavy dependencies that must not be imported at startup
+DEFERRED_MODULES = ('pandas', 'numpy', 'pyarrow', 'snowflake.connector', 'boto3', 'openai', 'anthropic')
+
+
+def rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (None where unsupported)
+
+    Current RSS from /proc on Linux; elsewhere the peak from getrusage (which
+    on Linux can carry over the parent's peak into a forked child).
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class ImportProfiler:
+    """Times the first import of every module while started"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.seconds = 0.0
+        self._started: Optional[float] = None
+        self._original_import = None
+
+    def start(self) -> 'ImportProfiler':
+        self._started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def stop(self) -> float:
+        """Stop timing; returns the seconds elapsed since start()"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+            self.seconds = time.perf_counter() - self._started
+        return self.seconds
+
+    def _import(self, name: str, globals=None, locals=None, fromlist=(), level: int = 0) -> Any:
+        module = name
+        if level:
+            try:
+                module = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+            except (ImportError, ValueError):
+                module = name
+        if module in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self.timings.setdefault(module, time.perf_counter() - started)
+
+    def slowest(self, limit: int = 15) -> List[Tuple[str, float]]:
+        """(module, cumulative seconds) of the slowest imports"""
+        return sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def log_summary(self, logger, top: int = 0) -> None:
+        rss = rss_mb()
+        logger.info(
+            f"Startup imports took {self.seconds:.2f}s ({len(self.timings)} modules)"
+            + (f", RSS {rss:.0f} MB" if rss is not None else "")
+        )
+        if top:
+            for module, seconds in self.slowest(top):
+                logger.info(f"  import {module}: {seconds * 1000:.0f} ms")
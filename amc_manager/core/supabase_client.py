@@ -5,6 +5,7 @@ from typing import Optional, Dict, Any, List
 from supabase import create_client, Client
 from ..config import settings
 from .logger_simple import get_logger
+from .metrics import instrument_supabase_client
 
 logger = get_logger(__name__)
 
@@ -14,6 +15,7 @@ class SupabaseManager:
     
     _instance: Optional[Client] = None
     _service_client: Optional[Client] = None
+    _override: Optional[Any] = None
     
     @classmethod
     def get_client(cls, use_service_role: bool = True) -> Client:
@@ -27,12 +29,16 @@ class SupabaseManager:
         Returns:
             Supabase client instance
         """
+        if cls._override is not None:
+            return cls._override
+        
         if use_service_role:
             if cls._service_client is None:
                 cls._service_client = create_client(
                     settings.supabase_url,
                     settings.supabase_service_role_key
                 )
+                instrument_supabase_client(cls._service_client)
                 logger.info("Created Supabase service role client")
             return cls._service_client
         else:
@@ -41,6 +47,7 @@ class SupabaseManager:
                     settings.supabase_url,
                     settings.supabase_anon_key
                 )
+                instrument_supabase_client(cls._instance)
                 logger.info("Created Supabase anon client")
             return cls._instance
     
@@ -49,6 +56,15 @@ class SupabaseManager:
         """Reset client instances (useful for testing)"""
         cls._instance = None
         cls._service_client = None
+    
+    @classmethod
+    def use_client(cls, client: Optional[Any]):
+        """
+        Route every get_client() call to a stand-in client (benchmarks, local runs)
+        
+        The override survives reset_clients(); pass None to remove it.
+        """
+        cls._override = client
 
 
 class SupabaseService:
@@ -231,7 +231,7 @@ class ExportRequest(BaseModel):
     """Model for export request"""
     format: str = Field(
         ...,
-        description="Export format (pdf, png, csv, excel)"
+        description="Export format (pdf, png, csv, excel, parquet)"
     )
     include_insights: bool = Field(
         default=True,
@@ -245,7 +245,7 @@ class ExportRequest(BaseModel):
     @validator('format')
     def validate_format(cls, v):
         """Validate export format"""
-        valid_formats = ['pdf', 'png', 'csv', 'excel']
+        valid_formats = ['pdf', 'png', 'csv', 'excel', 'parquet']
         if v not in valid_formats:
             raise ValueError(f"Export format must be one of: {', '.join(valid_formats)}")
         return v
@@ -0,0 +1,316 @@
+"""
+Adaptive AMC Concurrency
+Per-instance AIMD limits on running AMC executions
+
+Each AMC instance gets one limiter shared by every backfill-style executor
+(collections, report backfills, batch executions). The limit grows additively,
+by one per full window of successful submissions, and is cut multiplicatively
+when AMC pushes back: HTTP 429s, "too many concurrent executions" errors, or
+submission latency well above its running baseline.
+
+submit() admits a new execution only while the instance's executions that are
+still pending or running (counted in workflow_executions and
+report_executions, so submissions from every process and earlier passes are
+included) plus the submissions in progress stay under the limit, and spaces
+submissions to one instance at least amc_submit_spacing_seconds apart. Since
+that wait can be long, a submit callable may re-check its own state once
+admitted and raise SubmissionSkipped instead of starting. slot() only bounds
+concurrent AMC calls (status polls) and does not wait for running executions.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+from ..core.metrics import register_gauge
+
+logger = get_logger(__name__)
+
+T = TypeVar('T')
+
+ACTIVE_STATUSES = ['pending', 'running']
+# Seconds between recounts of running executions while an instance is at its limit
+ACTIVE_RECHECK_SECONDS = 15.0
+
+# Error text that means AMC is shedding load rather than rejecting the query
+THROTTLE_SIGNALS = {
+    'rate_limited': ('429', 'too many requests', 'rate limit', 'throttl'),
+    'concurrency_limit': ('too many concurrent', 'concurrent execution', 'maximum number of', 'limit exceeded'),
+}
+
+
+def classify_throttle(error: Any) -> Optional[str]:
+    """
+    Classify an AMC error as a throttling signal
+
+    Returns:
+        'rate_limited', 'concurrency_limit', or None for ordinary failures
+    """
+    if error is None:
+        return None
+    text = str(error).lower()
+    for reason, needles in THROTTLE_SIGNALS.items():
+        if any(needle in text for needle in needles):
+            return reason
+    return None
+
+
+class SubmissionSkipped(Exception):
+    """Raised by a submit callable that, once admitted, no longer wants to start (e.g. paused)
+
+    Counts as neither a success nor a failure of the instance.
+    """
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit with an async slot pool"""
+
+    def __init__(
+        self,
+        key: str,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 20,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 3.0,
+        decrease_cooldown_seconds: float = 10.0,
+        active_executions: Optional[Callable[[str], int]] = None,
+        spacing_seconds: float = 0.0,
+        recheck_seconds: float = ACTIVE_RECHECK_SECONDS
+    ):
+        self.key = key
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.decrease_cooldown_seconds = decrease_cooldown_seconds
+        self.spacing_seconds = spacing_seconds
+        self.recheck_seconds = recheck_seconds
+        self._active_executions = active_executions
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+        self._latency_baseline: Optional[float] = None
+        self._admission = asyncio.Lock()
+        self._submitted = asyncio.Event()
+        self._submitting = 0
+        self._next_submit_at = 0.0
+        self.active = 0
+
+        self.successes = 0
+        self.throttles: Dict[str, int] = {}
+        self.last_throttle_at: Optional[float] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        """Wait for a free slot under the current limit"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self._in_flight = max(self._in_flight - 1, 0)
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator['AdaptiveConcurrencyLimiter']:
+        """Hold one slot for the duration of an AMC call"""
+        await self.acquire()
+        try:
+            yield self
+        finally:
+            await self.release()
+
+    async def _count_active(self) -> int:
+        if self._active_executions is None:
+            return 0
+        try:
+            self.active = await asyncio.to_thread(self._active_executions, self.key)
+        except Exception as e:
+            # Fall back to in-flight accounting and spacing
+            logger.warning(f"Could not count running AMC executions for {self.key}: {e}")
+            self.active = 0
+        return self.active
+
+    async def _admit(self) -> None:
+        """Wait until the instance has room for one more running execution"""
+        async with self._admission:
+            while True:
+                self._submitted.clear()
+                if await self._count_active() + self._submitting < self.limit:
+                    break
+                # Recount when a submission of this process returns, or periodically
+                # for executions finishing on AMC
+                try:
+                    await asyncio.wait_for(self._submitted.wait(), self.recheck_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            delay = self._next_submit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_submit_at = time.monotonic() + self.spacing_seconds
+            self._submitting += 1
+
+    async def submit(self, submit: Callable[[], Awaitable[T]]) -> T:
+        """
+        Start one AMC execution within the limit and feed its outcome back into it
+
+        Waits until the instance's running executions leave room for it (see
+        module docstring). Exceptions and results with status 'failed' count as
+        failures (only throttling errors shrink the limit); anything else is a
+        success timed from the moment the slot was granted.
+        """
+        await self._admit()
+        try:
+            async with self.slot():
+                started = time.monotonic()
+                try:
+                    result = await submit()
+                except SubmissionSkipped:
+                    raise
+                except Exception as e:
+                    self.record_failure(e)
+                    raise
+                if isinstance(result, dict) and result.get('status') == 'failed':
+                    self.record_failure(result.get('error') or result.get('error_message'))
+                else:
+                    self.record_success(time.monotonic() - started)
+                return result
+        finally:
+            # Once submitted, the execution is counted by _active_executions
+            self._submitting -= 1
+            self._submitted.set()
+
+    def record_success(self, latency_seconds: Optional[float] = None) -> None:
+        """
+        Feed back a successful submission
+
+        Args:
+            latency_seconds: Submission (queue) time; a sample far above the running
+                baseline counts as congestion instead of success
+        """
+        if latency_seconds is not None:
+            baseline = self._latency_baseline
+            self._latency_baseline = latency_seconds if baseline is None else 0.9 * baseline + 0.1 * latency_seconds
+            if baseline is not None and latency_seconds > baseline * self.latency_tolerance:
+                self._decrease('queue_time')
+                return
+
+        self.successes += 1
+        # Additive increase: +1 per full window of successes
+        self._limit = min(self._limit + 1.0 / max(self.limit, 1), float(self.max_limit))
+
+    def record_failure(self, error: Any) -> Optional[str]:
+        """
+        Feed back a failed submission; only throttling errors shrink the limit
+
+        Returns:
+            The throttle reason, or None for ordinary failures
+        """
+        reason = classify_throttle(error)
+        if reason:
+            self._decrease(reason)
+        return reason
+
+    def _decrease(self, reason: str) -> None:
+        self.throttles[reason] = self.throttles.get(reason, 0) + 1
+        now = time.monotonic()
+        self.last_throttle_at = time.time()
+        # One cut per burst: submissions already in flight will report the same congestion
+        if now - self._last_decrease < self.decrease_cooldown_seconds:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+        logger.warning(f"AMC concurrency for {self.key} cut {previous} -> {self.limit} ({reason})")
+
+    def get_state(self) -> Dict[str, Any]:
+        """Limiter state for monitoring"""
+        return {
+            'key': self.key,
+            'limit': self.limit,
+            'in_flight': self._in_flight,
+            'active_executions': self.active,
+            'submitting': self._submitting,
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'successes': self.successes,
+            'throttles': dict(self.throttles),
+            'last_throttle_at': self.last_throttle_at,
+            'latency_baseline_seconds': round(self._latency_baseline, 3) if self._latency_baseline is not None else None,
+        }
+
+
+def count_active_executions(instance_id: str) -> int:
+    """
+    Pending or running AMC executions of an instance, from every process
+
+    Args:
+        instance_id: AMC instance ID (or the amc_instances UUID)
+    """
+    from ..core.supabase_client import SupabaseManager
+
+    client = SupabaseManager.get_client()
+    instance = client.table('amc_instances').select('id').eq('instance_id', instance_id).execute()
+    instance_uuid = instance.data[0]['id'] if instance.data else instance_id
+
+    workflow_executions = client.table('workflow_executions')\
+        .select('id, workflows!inner(instance_id)', count='exact')\
+        .eq('workflows.instance_id', instance_uuid)\
+        .in_('status', ACTIVE_STATUSES)\
+        .limit(1)\
+        .execute()
+    report_executions = client.table('report_executions')\
+        .select('id', count='exact')\
+        .eq('instance_id', instance_uuid)\
+        .in_('status', ACTIVE_STATUSES)\
+        .limit(1)\
+        .execute()
+    return (workflow_executions.count or 0) + (report_executions.count or 0)
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_instance_limiter(instance_id: str) -> AdaptiveConcurrencyLimiter:
+    """Get the shared limiter for an AMC instance"""
+    limiter = _limiters.get(instance_id)
+    if limiter is None:
+        limiter = AdaptiveConcurrencyLimiter(
+            instance_id,
+            initial_limit=settings.amc_concurrency_initial,
+            min_limit=settings.amc_concurrency_min,
+            max_limit=settings.amc_concurrency_max,
+            active_executions=count_active_executions,
+            spacing_seconds=settings.amc_submit_spacing_seconds
+        )
+        _limiters[instance_id] = limiter
+    return limiter
+
+
+def get_concurrency_state() -> Dict[str, Dict[str, Any]]:
+    """State of every instance limiter, keyed by instance ID"""
+    return {key: limiter.get_state() for key, limiter in _limiters.items()}
+
+
+register_gauge(
+    'amc_concurrency_in_flight', 'AMC submissions holding a limiter slot', ['instance'],
+    lambda: [((key,), limiter.in_flight) for key, limiter in list(_limiters.items())]
+)
+register_gauge(
+    'amc_concurrency_limit', 'Current adaptive AMC submission limit', ['instance'],
+    lambda: [((key,), limiter.limit) for key, limiter in list(_limiters.items())]
+)
@@ -7,7 +7,9 @@ from datetime import datetime, timedelta, date
 from enum import Enum
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
+from ..config.settings import settings
 from ..core.logger_simple import get_logger
+from .insight_cache import LRUCache, fingerprint, insight_cache_key
 from .reporting_database_service import reporting_db_service
 from .dashboard_data_service import dashboard_data_service
 from .data_aggregation_service import data_aggregation_service
@@ -15,6 +17,14 @@ from .db_service import db_service
 
 logger = get_logger(__name__)
 
+# Bounds of the data context sent to the model
+MAX_CONTEXT_METRICS = 12
+MAX_CONTEXT_TRENDS = 5
+MAX_CONTEXT_ANOMALIES = 5
+MAX_TREND_CHARS = 200
+# Earlier exchanges included in a prompt
+PROMPT_HISTORY_EXCHANGES = 3
+
 
 class InsightType(Enum):
     """Types of insights that can be generated"""
@@ -41,11 +51,16 @@ class AIInsightsService:
         self.default_model = 'gpt-4-turbo-preview'
         self.fallback_model = 'claude-3-sonnet'
         
-        # Conversation context management
-        self.conversation_contexts = {}  # user_id -> context
+        # Conversation context management (least recently active users are evicted)
+        self.conversation_contexts = LRUCache(settings.insight_context_max_users)  # user_id -> context
         self.context_max_tokens = 4000
         self.context_max_messages = 10
         
+        # Answers by (insight type, question, data fingerprint) and context
+        # summaries by data fingerprint
+        self.insight_cache = LRUCache(settings.insight_cache_max_entries, settings.insight_cache_ttl_seconds)
+        self.summary_cache = LRUCache(256, settings.insight_cache_ttl_seconds)
+        
         # Prompt templates
         self.prompt_templates = self._initialize_prompt_templates()
     
@@ -166,25 +181,44 @@ Keep the summary concise and action-oriented.
             Generated insight with metadata
         """
         try:
-            # Prepare context for AI
-            context_str = self._prepare_data_context(data_context)
-            
             # Get or create conversation context
             conversation_context = self._get_conversation_context(user_id)
             
-            # Build prompt
-            prompt = self._build_prompt(
-                query_text,
-                context_str,
-                insight_type,
-                conversation_context
-            )
+            # The same question about unchanged data, asked after the same
+            # exchanges, is answered from the cache
+            data_fingerprint = self._context_fingerprint(data_context)
+            cache_key = None
+            cached = None
+            if data_fingerprint:
+                cache_key = insight_cache_key(
+                    insight_type.value, query_text, data_fingerprint,
+                    user_id, self._prompt_history(conversation_context)
+                )
+                cached = self.insight_cache.get(cache_key)
             
-            # Generate insight using AI
-            response_text, confidence_score = await self._call_ai_api(
-                prompt,
-                user_id
-            )
+            if cached:
+                response_text, confidence_score = cached
+            else:
+                # Prepare context for AI
+                context_str = self._prepare_data_context(data_context, data_fingerprint)
+                
+                # Build prompt
+                prompt = self._build_prompt(
+                    query_text,
+                    context_str,
+                    insight_type,
+                    conversation_context
+                )
+                
+                # Generate insight using AI
+                response_text, confidence_score = await self._call_ai_api(
+                    prompt,
+                    user_id
+                )
+                
+                # Error answers (confidence 0) are not cached
+                if cache_key and confidence_score > 0:
+                    self.insight_cache.set(cache_key, (response_text, confidence_score))
             
             # Extract metrics referenced in the response
             related_metrics = self._extract_related_metrics(
@@ -219,6 +253,7 @@ Keep the summary concise and action-oriented.
                 'confidence': confidence_score,
                 'type': insight_type.value,
                 'related_metrics': related_metrics,
+                'cached': cached is not None,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -230,52 +265,138 @@ Keep the summary concise and action-oriented.
                 'confidence': 0
             }
     
-    def _prepare_data_context(self, data_context: Dict[str, Any]) -> str:
-        """Prepare data context for AI prompt"""
+    def _context_fingerprint(self, data_context: Dict[str, Any]) -> Optional[str]:
+        """
+        Fingerprint of a data context and of the data it refers to
+        
+        Contexts naming a workflow_id and instance_id include the version of
+        their aggregates, so answers about them expire when new data lands.
+        None (no caching) when that version cannot be read.
+        """
+        version = None
+        workflow_id = data_context.get('workflow_id')
+        instance_id = data_context.get('instance_id')
+        if workflow_id and instance_id:
+            try:
+                version = self.reporting_db.get_aggregates_version(workflow_id, instance_id)
+            except Exception as e:
+                logger.warning(f"Insight cache bypassed, data version unavailable: {e}")
+                return None
+        return fingerprint([data_context, version])
+    
+    def _prepare_data_context(self, data_context: Dict[str, Any], data_fingerprint: Optional[str] = None) -> str:
+        """
+        Prepare a compact data summary for the AI prompt
+        
+        Numbers are abbreviated and lists capped. Contexts with a workflow_id,
+        instance_id and date_range but no metrics are summarized from the
+        rollup cube and stored anomalies rather than from raw rows. Summaries
+        are reused per data fingerprint.
+        """
+        if data_fingerprint:
+            summary = self.summary_cache.get(data_fingerprint)
+            if summary is not None:
+                return summary
+        
         try:
-            # Extract key information from data context
-            context_parts = []
-            
-            # Add metrics summary
-            if 'metrics' in data_context:
-                metrics = data_context['metrics']
-                context_parts.append("Current Metrics:")
-                for key, value in metrics.items():
-                    if isinstance(value, (int, float)):
-                        context_parts.append(f"  - {key}: {value:,.2f}")
-            
-            # Add time period
-            if 'date_range' in data_context:
-                date_range = data_context['date_range']
-                context_parts.append(f"\nTime Period: {date_range[0]} to {date_range[1]}")
-            
-            # Add trends if available
-            if 'trends' in data_context:
-                context_parts.append("\nTrends:")
-                for trend in data_context['trends'][:5]:  # Limit to 5 trends
-                    context_parts.append(f"  - {trend}")
-            
-            # Add dimensions
-            if 'dimensions' in data_context:
-                dims = data_context['dimensions']
-                if 'total_campaigns' in dims:
-                    context_parts.append(f"\nCampaigns: {dims['total_campaigns']}")
-                if 'total_asins' in dims:
-                    context_parts.append(f"ASINs: {dims['total_asins']}")
-            
-            # Add comparisons if available
-            if 'comparison' in data_context:
-                comp = data_context['comparison']
-                context_parts.append("\nPeriod-over-Period Changes:")
-                for key, value in comp.items():
-                    if isinstance(value, (int, float)):
-                        context_parts.append(f"  - {key}: {value:+.1f}%")
-            
-            return '\n'.join(context_parts)
-            
+            summary = self._summarize_data_context(data_context)
         except Exception as e:
             logger.error(f"Error preparing data context: {e}")
-            return str(data_context)[:2000]  # Fallback to truncated raw context
+            # Fall back to the context's top-level scalars
+            scalars = {key: value for key, value in data_context.items()
+                       if isinstance(value, (str, int, float, bool))}
+            summary = json.dumps(scalars, default=str)[:1000]
+        
+        if data_fingerprint:
+            self.summary_cache.set(data_fingerprint, summary)
+        return summary
+    
+    def _summarize_data_context(self, data_context: Dict[str, Any]) -> str:
+        context_parts = []
+        metrics = data_context.get('metrics')
+        comparison = data_context.get('comparison')
+        anomalies = data_context.get('anomalies')
+        
+        # Precomputed summaries for a workflow/instance and date range
+        date_range = self._parse_date_range(data_context.get('date_range'))
+        workflow_id = data_context.get('workflow_id')
+        instance_id = data_context.get('instance_id')
+        if workflow_id and instance_id and date_range:
+            if metrics is None:
+                ranges = self.aggregation_service.compare_ranges(workflow_id, instance_id, date_range)
+                metrics = ranges['current']
+                if comparison is None:
+                    comparison = {metric: delta['percent'] for metric, delta in ranges['delta'].items()
+                                  if delta['percent']}
+            if anomalies is None:
+                anomalies = self.reporting_db.get_anomalies(
+                    workflow_id, instance_id,
+                    start_date=date_range[0], end_date=date_range[1],
+                    limit=MAX_CONTEXT_ANOMALIES
+                )
+        
+        # Add metrics summary
+        if metrics:
+            numeric = [(key, value) for key, value in metrics.items()
+                       if isinstance(value, (int, float)) and not isinstance(value, bool)]
+            context_parts.append("Current Metrics:")
+            for key, value in numeric[:MAX_CONTEXT_METRICS]:
+                context_parts.append(f"  - {key}: {self._compact_number(value)}")
+        
+        # Add time period
+        if 'date_range' in data_context:
+            date_range = data_context['date_range']
+            context_parts.append(f"\nTime Period: {date_range[0]} to {date_range[1]}")
+        
+        # Add trends if available
+        if data_context.get('trends'):
+            context_parts.append("\nTrends:")
+            for trend in data_context['trends'][:MAX_CONTEXT_TRENDS]:
+                context_parts.append(f"  - {str(trend)[:MAX_TREND_CHARS]}")
+        
+        # Add dimensions
+        if 'dimensions' in data_context:
+            dims = data_context['dimensions']
+            if 'total_campaigns' in dims:
+                context_parts.append(f"\nCampaigns: {dims['total_campaigns']}")
+            if 'total_asins' in dims:
+                context_parts.append(f"ASINs: {dims['total_asins']}")
+        
+        # Add comparisons if available
+        if comparison:
+            context_parts.append("\nPeriod-over-Period Changes:")
+            for key, value in list(comparison.items())[:MAX_CONTEXT_METRICS]:
+                if isinstance(value, (int, float)):
+                    context_parts.append(f"  - {key}: {value:+.1f}%")
+        
+        # Add detected anomalies
+        if anomalies:
+            context_parts.append("\nAnomalies:")
+            for anomaly in anomalies[:MAX_CONTEXT_ANOMALIES]:
+                context_parts.append(
+                    f"  - {anomaly.get('metric')} {anomaly.get('direction')} in week of "
+                    f"{anomaly.get('period_start')}: {self._compact_number(anomaly.get('value', 0))} "
+                    f"vs {self._compact_number(anomaly.get('expected', 0))} expected"
+                )
+        
+        return '\n'.join(context_parts)
+    
+    @staticmethod
+    def _parse_date_range(date_range: Any) -> Optional[Tuple[date, date]]:
+        """(start, end) dates of a context date_range, or None"""
+        try:
+            start, end = (date.fromisoformat(str(value)[:10]) for value in date_range)
+            return start, end
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def _compact_number(value: float) -> str:
+        """Abbreviated number for prompts (1.2M, 45.3K, 0.85)"""
+        for limit, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+            if abs(value) >= limit:
+                return f"{value / limit:.1f}{suffix}"
+        return f"{value:.2f}".rstrip('0').rstrip('.')
     
     def _build_prompt(
         self,
@@ -303,8 +424,8 @@ Keep responses concise but comprehensive."""
         context_prompt = ""
         if conversation_context:
             context_prompt = "\nPrevious conversation context:\n"
-            for msg in conversation_context[-3:]:  # Last 3 exchanges
-                context_prompt += f"User: {msg['query']}\nAssistant: {msg['response'][:200]}...\n"
+            for query, response in self._prompt_history(conversation_context):
+                context_prompt += f"User: {query}\nAssistant: {response}...\n"
         
         # Combine all parts
         full_prompt = f"{system_prompt}\n\n{context_prompt}\n\nUser Query: {query_text}\n\n{template.format(data_context=context_str)}"
@@ -495,11 +616,13 @@ This is a simulated insight. Configure AI API keys for detailed analysis."""
         
         return related_metrics
     
+    def _prompt_history(self, conversation_context: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+        """The (query, response) exchanges a prompt includes"""
+        return [(msg['query'], msg['response'][:200]) for msg in conversation_context[-PROMPT_HISTORY_EXCHANGES:]]
+    
     def _get_conversation_context(self, user_id: str) -> List[Dict[str, str]]:
         """Get conversation context for a user"""
-        if user_id not in self.conversation_contexts:
-            self.conversation_contexts[user_id] = []
-        return self.conversation_contexts[user_id]
+        return self.conversation_contexts.get(user_id) or []
     
     def _update_conversation_context(
         self,
@@ -508,10 +631,7 @@ This is a simulated insight. Configure AI API keys for detailed analysis."""
         response: str
     ) -> None:
         """Update conversation context with new exchange"""
-        if user_id not in self.conversation_contexts:
-            self.conversation_contexts[user_id] = []
-        
-        context = self.conversation_contexts[user_id]
+        context = list(self.conversation_contexts.get(user_id) or [])
         
         # Add new exchange
         context.append({
@@ -524,7 +644,7 @@ This is a simulated insight. Configure AI API keys for detailed analysis."""
         if len(context) > self.context_max_messages:
             context = context[-self.context_max_messages:]
         
-        self.conversation_contexts[user_id] = context
+        self.conversation_contexts.set(user_id, context)
     
     async def get_suggested_questions(
         self,
@@ -589,70 +709,42 @@ This is a simulated insight. Configure AI API keys for detailed analysis."""
         workflow_id: str,
         instance_id: str,
         date_range: Tuple[date, date],
-        sensitivity: float = 2.0
+        sensitivity: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """
-        Detect anomalies in metrics data
+        Get detected anomalies in metrics data
+        
+        Anomalies are scored in bulk by the background anomaly engine
+        (anomaly_engine.py) with rolling median/MAD and seasonal baselines;
+        this reads its stored findings.
         
         Args:
             workflow_id: Workflow UUID
             instance_id: Instance UUID
             date_range: Date range to analyze
-            sensitivity: Standard deviations for anomaly threshold
+            sensitivity: Minimum robust z-score (default: the engine threshold)
             
         Returns:
-            List of detected anomalies
+            List of detected anomalies, most significant first
         """
-        anomalies = []
-        
         try:
-            # Get aggregated data
-            aggregates = self.reporting_db.get_aggregates_for_dashboard(
-                workflow_id, instance_id, 'weekly',
-                date_range[0], date_range[1]
+            findings = self.reporting_db.get_anomalies(
+                workflow_id, instance_id, date_range[0], date_range[1],
+                min_severity=sensitivity,
+                limit=10  # Return top 10 anomalies
             )
             
-            if len(aggregates) < 4:
-                return []  # Need at least 4 data points
-            
-            # Analyze each metric
-            metrics_to_analyze = ['impressions', 'clicks', 'spend', 'sales', 'roas', 'acos']
-            
-            for metric in metrics_to_analyze:
-                values = []
-                dates = []
-                
-                for agg in aggregates:
-                    if metric in agg.get('metrics', {}):
-                        values.append(agg['metrics'][metric])
-                        dates.append(agg['data_date'])
-                
-                if len(values) < 4:
-                    continue
-                
-                # Calculate statistics
-                import statistics
-                mean = statistics.mean(values)
-                stdev = statistics.stdev(values)
-                
-                # Find anomalies
-                for i, value in enumerate(values):
-                    z_score = abs((value - mean) / stdev) if stdev > 0 else 0
-                    
-                    if z_score > sensitivity:
-                        anomalies.append({
-                            'metric': metric,
-                            'date': dates[i],
-                            'value': value,
-                            'expected': mean,
-                            'deviation': z_score,
-                            'type': 'high' if value > mean else 'low'
-                        })
-            
-            # Sort by deviation (most significant first)
-            anomalies.sort(key=lambda x: x['deviation'], reverse=True)
-            
-            return anomalies[:10]  # Return top 10 anomalies
+            return [
+                {
+                    'metric': finding['metric'],
+                    'date': finding['period_start'],
+                    'value': finding['value'],
+                    'expected': finding['expected'],
+                    'deviation': finding['severity'],
+                    'type': finding['direction']
+                }
+                for finding in findings
+            ]
             
         except Exception as e:
             logger.error(f"Error analyzing anomalies: {e}")
@@ -660,8 +752,7 @@ This is a simulated insight. Configure AI API keys for detailed analysis."""
     
     def clear_conversation_context(self, user_id: str) -> None:
         """Clear conversation context for a user"""
-        if user_id in self.conversation_contexts:
-            del self.conversation_contexts[user_id]
+        if self.conversation_contexts.pop(user_id) is not None:
             logger.info(f"Cleared conversation context for user {user_id}")
 
 
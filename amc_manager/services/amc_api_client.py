@@ -1,25 +1,38 @@
 """
 AMC API Client for real query execution
 """
-import csv
-import io
 import json
 import logging
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 import requests
 from datetime import datetime
 
 from ..config.settings import settings
+from ..core.metrics import observe_amc_request, traced
+from .result_download import fetch_result, part_url
+from .result_set import ResultSet
 
 logger = logging.getLogger(__name__)
 
 
+def _amc_request(method: str, url: str, **kwargs) -> requests.Response:
+    """requests.request() with its latency recorded per AMC endpoint and HTTP status"""
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        response = requests.request(method, url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        observe_amc_request(method, url, status, time.perf_counter() - started)
+
+
 class AMCAPIClient:
     """Client for Amazon Marketing Cloud API operations"""
     
     def __init__(self):
-        self.base_url = "https://advertising-api.amazon.com"
+        self.base_url = settings.amc_api_base_url
     
     def create_workflow_execution(
         self,
@@ -30,7 +43,7 @@ class AMCAPIClient:
         sql_query: Optional[str] = None,
         workflow_id: Optional[str] = None,
         parameter_values: Optional[Dict[str, Any]] = None,
-        output_format: str = "CSV"
+        output_format: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a new AMC workflow execution
@@ -62,7 +75,7 @@ class AMCAPIClient:
             sql_query: SQL query for ad-hoc execution (mutually exclusive with workflow_id)
             workflow_id: Workflow ID for saved workflow execution (mutually exclusive with sql_query)
             parameter_values: Parameter values for saved workflow execution
-            output_format: Output format (CSV, JSON, PARQUET)
+            output_format: Output format (CSV, JSON, PARQUET); defaults to AMC_OUTPUT_FORMAT
 
         Returns:
             Execution details including execution ID
@@ -250,7 +263,7 @@ class AMCAPIClient:
                 "timeWindowStart": time_window_start,
                 "timeWindowEnd": time_window_end,
                 "timeWindowTimeZone": "America/New_York",
-                "outputFormat": output_format
+                "outputFormat": output_format or settings.amc_output_format
             }
             # Add parameter values if provided (for workflow parameters, not time window)
             if parameter_values:
@@ -287,14 +300,15 @@ class AMCAPIClient:
                 "timeWindowStart": time_window_start,
                 "timeWindowEnd": time_window_end,
                 "timeWindowTimeZone": "America/New_York",
-                "outputFormat": output_format
+                "outputFormat": output_format or settings.amc_output_format
             }
         
         logger.info(f"Creating AMC workflow execution for instance {instance_id}")
         logger.info(f"Request payload: {json.dumps(payload, indent=2)}")
         
         try:
-            response = requests.post(
+            response = _amc_request(
+                'POST',
                 url,
                 headers=headers,
                 json=payload,
@@ -355,6 +369,9 @@ class AMCAPIClient:
                     }
             else:
                 error_msg = response_data.get('message') or response_data.get('details') or f'API Error: {response.status_code}'
+                if response.status_code == 429:
+                    # Keep the status visible so callers can recognise throttling
+                    error_msg = f"{error_msg} (HTTP 429)"
                 logger.error(f"Failed to create execution: Status {response.status_code}, Response: {response_data}")
                 logger.error(f"Response text: {response.text}")
                 
@@ -453,7 +470,8 @@ class AMCAPIClient:
         logger.info(f"Status URL: {url}")
         
         try:
-            response = requests.get(
+            response = _amc_request(
+                'GET',
                 url,
                 headers=headers,
                 timeout=30
@@ -517,6 +535,7 @@ class AMCAPIClient:
                 "error": str(e)
             }
     
+    @traced('amc.download')
     def get_execution_results(
         self,
         execution_id: str,
@@ -570,48 +589,28 @@ class AMCAPIClient:
                 "error": "No download URLs available"
             }
         
-        # Download the first URL (should be the CSV results)
-        csv_url = download_urls[0] if isinstance(download_urls[0], str) else download_urls[0].get('url')
-        logger.info(f"Downloading CSV from S3 for execution {execution_id}")
+        # Large outputs come in several parts: download all of them in
+        # parallel and stitch them into one result
+        logger.info(f"Downloading {len(download_urls)} result part(s) from S3 for execution {execution_id}")
         
         try:
-            # Download the CSV file
-            csv_response = requests.get(csv_url, timeout=60)
-            if csv_response.status_code != 200:
-                logger.error(f"Failed to download CSV: Status {csv_response.status_code}")
-                return {
-                    "success": False,
-                    "error": f"Failed to download CSV: Status {csv_response.status_code}"
-                }
-            
-            logger.info(f"Successfully downloaded CSV, size: {len(csv_response.text)} bytes")
-            
-            # Parse CSV content
-            csv_content = csv_response.text
-            
-            # Log first few lines for debugging (without sensitive data)
-            if len(csv_content) > 0:
-                preview_lines = csv_content.split('\n')[:5]
-                logger.info(f"CSV preview (first 5 lines): {preview_lines}")
-            
-            csv_reader = csv.reader(io.StringIO(csv_content))
+            result = fetch_result(download_urls, _amc_request)
+            headers, rows = result.headers, result.rows
             
-            # Get headers (first row)
-            headers = next(csv_reader, [])
+            # Log first few rows for debugging (without sensitive data)
+            if rows:
+                logger.info(f"CSV preview (first 5 lines): {[headers] + rows[:4]}")
             
-            # Get all rows
-            rows = list(csv_reader)
-            
-            logger.info(f"Parsed CSV: {len(headers)} columns, {len(rows)} rows")
+            logger.info(f"Parsed {result.format} result: {len(headers)} columns, {len(rows)} rows")
             
             # Check for empty results
             if len(rows) == 0:
-                logger.warning("CSV file contains headers but no data rows - query returned empty results")
+                logger.warning("Result contains headers but no data rows - query returned empty results")
                 logger.info(f"Headers found: {headers}")
                 logger.info("Possible causes: 1) Date range has no data, 2) Query filters too restrictive, 3) AMC data lag")
             
-            # Convert to our format with column metadata
-            columns = [{"name": header, "type": "string"} for header in headers]
+            # Column types come from the Parquet schema (all strings for CSV)
+            columns = result.columns
             
             return {
                 "success": True,
@@ -625,7 +624,9 @@ class AMCAPIClient:
                 "metadata": {
                     "rowCount": len(rows),
                     "columnCount": len(columns),
-                    "dataSizeBytes": len(csv_content.encode('utf-8')),
+                    "dataSizeBytes": result.data_bytes,
+                    "partCount": result.part_count,
+                    "format": result.format,
                     "queryRuntime": 0  # This would come from AMC metadata
                 }
             }
@@ -637,48 +638,32 @@ class AMCAPIClient:
                 "error": str(e)
             }
     
-    def download_and_parse_csv(self, csv_url: str) -> Dict[str, Any]:
+    def download_and_parse_csv(self, csv_url: Union[str, List[Any]]) -> Dict[str, Any]:
         """
-        Download and parse a CSV file from a URL
+        Download and parse a CSV result from its URL(s)
         
         Args:
-            csv_url: URL to download the CSV from
+            csv_url: URL to download the CSV from, or every downloadUrls
+                entry of a multi-part result (downloaded in parallel and
+                stitched together)
             
         Returns:
             Dict with parsed CSV data
         """
         try:
-            logger.info(f"Starting CSV download from: {csv_url[:100]}...")  # Log first 100 chars of URL
-            
-            # Download the CSV file
-            csv_response = requests.get(csv_url, timeout=60)
-            if csv_response.status_code != 200:
-                logger.error(f"Failed to download CSV: Status {csv_response.status_code}")
-                return {
-                    "success": False,
-                    "error": f"Failed to download CSV: Status {csv_response.status_code}"
-                }
+            urls = csv_url if isinstance(csv_url, list) else [csv_url]
+            logger.info(f"Starting CSV download of {len(urls)} part(s) from: {part_url(urls[0])[:100]}...")  # Log first 100 chars of URL
             
-            # Parse CSV content
-            csv_content = csv_response.text
-            content_length = len(csv_content)
-            logger.info(f"Downloaded CSV content: {content_length} bytes")
+            result = fetch_result(urls, _amc_request)
+            headers, rows = result.headers, result.rows
+            logger.info(f"Downloaded {result.format} content: {result.downloaded_bytes} bytes")
             
             # Log first few lines for debugging (without sensitive data)
-            if content_length > 0:
-                preview_lines = csv_content.split('\n')[:3]
-                logger.info(f"CSV preview (first 3 lines): {preview_lines}")
-            
-            csv_reader = csv.reader(io.StringIO(csv_content))
-            
-            # Get headers (first row)
-            headers = next(csv_reader, [])
-            
-            # Get all rows
-            rows = list(csv_reader)
+            if headers:
+                logger.info(f"CSV preview (first 3 lines): {[headers] + rows[:2]}")
             
             # Log parsing results
-            logger.info(f"Parsed CSV: {len(headers)} columns, {len(rows)} data rows")
+            logger.info(f"Parsed {result.format} result: {len(headers)} columns, {len(rows)} data rows")
             if len(headers) > 0:
                 logger.info(f"Column headers: {headers}")
             
@@ -692,16 +677,8 @@ class AMCAPIClient:
                 logger.info("4. Timezone issues - AMC uses America/New_York by default")
                 logger.info("5. Parameter substitution issues - check that parameters are correctly replaced in SQL")
             
-            # Convert rows to list of objects with column names as keys
-            data_objects = []
-            for row in rows:
-                row_object = {}
-                for i, header in enumerate(headers):
-                    row_object[header] = row[i] if i < len(row) else None
-                data_objects.append(row_object)
-            
-            # Convert to our format with column metadata
-            columns = [{"name": header, "type": "string"} for header in headers]
+            # Column types come from the Parquet schema (all strings for CSV)
+            columns = result.columns
             
             return {
                 "success": True,
@@ -709,11 +686,13 @@ class AMCAPIClient:
                 "rows": rows,  # Keep raw rows for backwards compatibility
                 "rowCount": len(rows),
                 "columnCount": len(columns),
-                "data": data_objects,  # Use objects with column names as keys
+                "data": ResultSet.from_rows(columns, rows),  # Typed columns; iterates as dict-like rows
                 "metadata": {
                     "rowCount": len(rows),
                     "columnCount": len(columns),
-                    "dataSizeBytes": len(csv_content.encode('utf-8')),
+                    "dataSizeBytes": result.data_bytes,
+                    "partCount": result.part_count,
+                    "format": result.format,
                     "isEmpty": len(rows) == 0
                 }
             }
@@ -791,7 +770,8 @@ class AMCAPIClient:
         logger.info(f"Token preview: {access_token[:30]}..." if len(access_token) > 30 else f"Token: {access_token}")
         
         try:
-            response = requests.get(
+            response = _amc_request(
+                'GET',
                 url,
                 headers=headers,
                 params=params,
@@ -870,7 +850,8 @@ class AMCAPIClient:
         logger.info(f"Listing workflows for instance {instance_id}")
         
         try:
-            response = requests.get(
+            response = _amc_request(
+                'GET',
                 url,
                 headers=headers,
                 params=params,
@@ -911,7 +892,7 @@ class AMCAPIClient:
         filtered_metrics_discriminator_column: Optional[str] = None,
         filtered_reason_column: Optional[str] = None,
         input_parameters: Optional[List[Dict[str, Any]]] = None,
-        output_format: str = "CSV"
+        output_format: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a workflow definition in AMC
@@ -945,7 +926,7 @@ class AMCAPIClient:
         body = {
             'workflowId': workflow_id,
             'sqlQuery': sql_query,
-            'outputFormat': output_format
+            'outputFormat': output_format or settings.amc_output_format
         }
         
         # Add optional aggregation threshold columns
@@ -965,7 +946,8 @@ class AMCAPIClient:
         logger.debug(f"SQL Query preview (first 500 chars): {sql_query[:500]}")
 
         try:
-            response = requests.post(
+            response = _amc_request(
+                'POST',
                 url,
                 headers=headers,
                 json=body,
@@ -1015,7 +997,7 @@ class AMCAPIClient:
         filtered_metrics_discriminator_column: Optional[str] = None,
         filtered_reason_column: Optional[str] = None,
         input_parameters: Optional[List[Dict[str, Any]]] = None,
-        output_format: str = "CSV"
+        output_format: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Update an existing workflow definition in AMC
@@ -1049,7 +1031,7 @@ class AMCAPIClient:
         body = {
             'workflowId': workflow_id,
             'sqlQuery': sql_query,
-            'outputFormat': output_format
+            'outputFormat': output_format or settings.amc_output_format
         }
         
         # Add optional aggregation threshold columns
@@ -1067,7 +1049,8 @@ class AMCAPIClient:
         logger.debug(f"SQL Query preview (first 500 chars): {sql_query[:500]}")
 
         try:
-            response = requests.put(
+            response = _amc_request(
+                'PUT',
                 url,
                 headers=headers,
                 json=body,
@@ -1130,7 +1113,8 @@ class AMCAPIClient:
         logger.info(f"Deleting workflow {workflow_id} from instance {instance_id}")
         
         try:
-            response = requests.delete(
+            response = _amc_request(
+                'DELETE',
                 url,
                 headers=headers,
                 timeout=30
@@ -1190,7 +1174,8 @@ class AMCAPIClient:
         logger.info(f"Getting workflow {workflow_id} from instance {instance_id}")
         
         try:
-            response = requests.get(
+            response = _amc_request(
+                'GET',
                 url,
                 headers=headers,
                 timeout=30
@@ -1253,7 +1238,8 @@ class AMCAPIClient:
         }
         
         try:
-            response = requests.get(
+            response = _amc_request(
+                'GET',
                 url,
                 headers=headers,
                 timeout=30
@@ -109,7 +109,7 @@ class AMCAPIClientWithRetry:
         sql_query: Optional[str] = None,
         workflow_id: Optional[str] = None,
         parameter_values: Optional[Dict[str, Any]] = None,
-        output_format: str = "CSV"
+        output_format: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a workflow execution with automatic token refresh
@@ -230,7 +230,7 @@ class AMCAPIClientWithRetry:
         filtered_metrics_discriminator_column: Optional[str] = None,
         filtered_reason_column: Optional[str] = None,
         input_parameters: Optional[list] = None,
-        output_format: str = "CSV"
+        output_format: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a workflow with automatic token refresh
@@ -263,7 +263,7 @@ class AMCAPIClientWithRetry:
         filtered_metrics_discriminator_column: Optional[str] = None,
         filtered_reason_column: Optional[str] = None,
         input_parameters: Optional[list] = None,
-        output_format: str = "CSV"
+        output_format: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Update a workflow with automatic token refresh
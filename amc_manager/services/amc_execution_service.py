@@ -1,12 +1,15 @@
 """AMC Workflow Execution Service - Handles execution of workflows on AMC instances"""
 
+import asyncio
 import json
 import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone, timedelta
 import re
 
+from ..core.lazy import LazyService
 from ..core.logger_simple import get_logger
+from ..core.metrics import observe_detection_lag, traced
 from ..core.supabase_client import SupabaseManager
 from ..config import settings
 from .db_service import db_service
@@ -26,6 +29,7 @@ class AMCExecutionService:
         # Always use real AMC API - no test/simulation mode
         logger.info("AMC Execution Service configured to use REAL AMC API")
         
+    @traced('amc.submit')
     async def execute_workflow(
         self,
         workflow_id: str,
@@ -191,7 +195,7 @@ class AMCExecutionService:
                             access_token=valid_token,
                             entity_id=entity_id,
                             marketplace_id=marketplace_id,
-                            output_format='CSV'
+                            output_format=settings.amc_output_format
                         )
                         
                         if create_response.get('success'):
@@ -284,6 +288,7 @@ class AMCExecutionService:
                 "execution_id": execution['execution_id'],
                 "workflow_id": workflow['workflow_id'],
                 "status": update_data['status'],
+                "error": update_data['error_message'],
                 "started_at": execution['started_at'],
                 "message": "Workflow execution started successfully"
             }
@@ -687,7 +692,7 @@ class AMCExecutionService:
             self._update_execution_progress(execution_id, 'running', 10)
 
             try:
-                output_format = execution_parameters.get('output_format', 'CSV') if execution_parameters else 'CSV'
+                output_format = (execution_parameters or {}).get('output_format', settings.amc_output_format)
                 sql_length = len(processed_sql_query)
                 logger.info(f"Prepared SQL length: {sql_length} characters")
 
@@ -816,6 +821,14 @@ class AMCExecutionService:
                 
                 execution_uuid = exec_response.data[0]['id'] if exec_response.data else None
                 
+                # Queue the first status poll; the job re-queues itself until AMC finishes
+                if execution_uuid:
+                    from ..services.execution_status_poller import execution_status_poller
+                    await execution_status_poller.enqueue(
+                        execution_uuid,
+                        delay_seconds=execution_status_poller.poll_interval
+                    )
+                
                 # Return immediately with pending status
                 # The frontend will poll for status updates
                 return {
@@ -859,6 +872,7 @@ class AMCExecutionService:
             logger.error(f"Error updating execution status: {e}")
             return None
     
+    @traced('amc.poll')
     async def poll_and_update_execution(self, execution_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Poll AMC for execution status and update database
@@ -940,15 +954,18 @@ class AMCExecutionService:
             if execution.get('status') == 'pending' and execution.get('progress', 0) < 20:
                 logger.info(f"First status check - execution status: {execution.get('status')}, progress: {execution.get('progress', 0)}")
                 logger.info("Waiting 10 seconds for AMC to register execution...")
-                time.sleep(10)
+                await asyncio.sleep(10)
                 logger.info("Delay complete, checking AMC status now")
             
             # Try status check with retry on first attempt
             max_retries = 3 if execution.get('progress', 0) < 20 else 1
             status_response = None
             
+            # AMC calls are blocking; run them off the event loop so concurrent
+            # refreshes (status_refresh.refresh_many) overlap
             for attempt in range(max_retries):
-                status_response = api_client.get_execution_status(
+                status_response = await asyncio.to_thread(
+                    api_client.get_execution_status,
                     execution_id=amc_execution_id,
                     access_token=valid_token,
                     entity_id=entity_id,
@@ -963,12 +980,13 @@ class AMCExecutionService:
                 error_msg = status_response.get('error', '')
                 if 'does not exist' in error_msg and attempt < max_retries - 1:
                     logger.info(f"Execution not found on attempt {attempt + 1}, waiting 10 seconds before retry...")
-                    time.sleep(10)
+                    await asyncio.sleep(10)
                     
                     # On second attempt, try listing executions to find it
                     if attempt == 1:
                         logger.info("Trying to find execution by listing all executions...")
-                        list_response = api_client.list_executions(
+                        list_response = await asyncio.to_thread(
+                            api_client.list_executions,
                             instance_id=instance_id,
                             access_token=valid_token,
                             entity_id=entity_id,
@@ -990,11 +1008,14 @@ class AMCExecutionService:
                 
                 # Update our execution record
                 self._update_execution_progress(execution_id, status, progress)
+                if status in ('completed', 'failed'):
+                    observe_detection_lag(status, status_response.get('endTime'))
                 
                 # If completed, fetch results
                 if status == 'completed':
                     logger.info(f"Execution {execution_id} completed, fetching results from S3...")
-                    results_response = api_client.get_execution_results(
+                    results_response = await asyncio.to_thread(
+                        api_client.get_execution_results,
                         execution_id=amc_execution_id,
                         access_token=valid_token,
                         entity_id=entity_id,
@@ -1021,6 +1042,10 @@ class AMCExecutionService:
                             row_count=result_data['total_rows'],
                             results=result_data
                         )
+                        
+                        # Roll the results into report aggregates
+                        from .data_aggregation_service import data_aggregation_service
+                        await data_aggregation_service.aggregate_completed_execution(execution_id, result_data)
                     else:
                         logger.error(f"Failed to fetch results for execution {execution_id}: {results_response.get('error')}")
                 elif status == 'failed':
@@ -1156,6 +1181,7 @@ class AMCExecutionService:
         except Exception as e:
             logger.error(f"Error updating AMC execution ID: {e}")
     
+    @traced('amc.store')
     def _update_execution_completed(
         self, 
         execution_id: str, 
@@ -1230,5 +1256,5 @@ class AMCExecutionService:
             logger.error(f"Error updating execution completion: {e}")
 
 
-# Singleton instance
-amc_execution_service = AMCExecutionService()
+# Singleton instance (built on first use)
+amc_execution_service = LazyService(AMCExecutionService)
@@ -0,0 +1,236 @@
+"""
+Anomaly Engine
+Background scoring of every weekly aggregate series, stored as report_anomalies
+
+Each scan reads the weekly aggregates of all workflows and instances over the
+lookback window in one paged read, lays every (workflow, instance, metric)
+series out as a row of one week-aligned matrix and scores all of them at once
+with numpy:
+
+- baseline: median of the WINDOW preceding points, scale: their MAD
+  (x 1.4826), so a single spike does not distort its neighbours' scores
+- seasonal baseline: once a series has a season of history, the deviation
+  from baseline at the same week one SEASON earlier is added to the expected
+  value, so recurring peaks (Prime Day, Q4) are not flagged every year
+- score: (value - expected) / scale, a robust z-score; points at or beyond
+  settings.anomaly_threshold are stored
+
+Flat series have a MAD of 0; their scale is floored at MIN_RELATIVE_SCALE of
+the baseline so any change is not an infinite score. Dashboards and
+AIInsightsService.analyze_anomalies read the stored findings. numpy is
+imported on first scan, so importing this module stays cheap.
+"""
+
+import asyncio
+import warnings
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..config.settings import settings
+from ..core.logger_simple import get_logger
+from .reporting_database_service import reporting_db_service
+from .rollup_cube import WEEK, period_start
+
+logger = get_logger(__name__)
+
+METRICS = ('impressions', 'clicks', 'spend', 'sales', 'roas', 'acos')
+AGGREGATION_TYPE = 'weekly'
+
+WINDOW = 8  # preceding points in the rolling baseline
+SEASON = 52  # weeks per season
+MIN_HISTORY = 4  # baseline points a point needs to be scored
+MAD_SCALE = 1.4826  # MAD of normal data to its standard deviation
+MIN_RELATIVE_SCALE = 0.05
+
+# Series scored per numpy pass, bounding the (series, weeks, WINDOW) temporaries
+_CHUNK_SERIES = 2048
+
+SeriesKey = Tuple[str, str, str]  # (workflow_id, instance_id, metric)
+
+
+def score_matrix(values: Any, window: int = WINDOW, season: int = SEASON,
+                 min_history: int = MIN_HISTORY) -> Tuple[Any, Any]:
+    """
+    Expected values and robust z-scores of many aligned series at once
+
+    Args:
+        values: (series, periods) array, NaN where a series has no point
+
+    Returns:
+        (expected, score) arrays shaped like values. score is NaN for missing
+        points, points with fewer than min_history baseline points and points
+        whose scale is 0.
+    """
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    values = np.asarray(values, dtype=float)
+    count, periods = values.shape
+    padded = np.concatenate([np.full((count, window), np.nan), values], axis=1)
+    # trailing[:, t] is the `window` points before t (a view, not a copy)
+    trailing = sliding_window_view(padded, window, axis=1)[:, :periods]
+    history = np.count_nonzero(~np.isnan(trailing), axis=2)
+
+    with warnings.catch_warnings():
+        # Windows without any point are expected (series start, gaps)
+        warnings.simplefilter('ignore', RuntimeWarning)
+        baseline = np.nanmedian(trailing, axis=2)
+        mad = np.nanmedian(np.abs(trailing - baseline[..., None]), axis=2)
+
+    expected = baseline.copy()
+    if season and periods > season:
+        last_season = values[:, :-season] - baseline[:, :-season]
+        expected[:, season:] += np.nan_to_num(last_season, nan=0.0)
+
+    scale = np.fmax(MAD_SCALE * mad, MIN_RELATIVE_SCALE * np.abs(baseline))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = (values - expected) / scale
+    score[(history < min_history) | np.isnan(values) | ~(scale > 0)] = np.nan
+    return expected, score
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def find_anomalies(
+    rows: Sequence[Dict[str, Any]],
+    start: date,
+    threshold: float,
+    metrics: Sequence[str] = METRICS
+) -> List[Dict[str, Any]]:
+    """
+    Score aggregate rows of any number of series and return the anomalies
+
+    Rows are get_all_aggregate_series() rows. Each series keeps one point per
+    ISO week from `start` on (a later row of the same week replaces an
+    earlier one). Returns report_anomalies rows, most severe first.
+    """
+    import numpy as np
+
+    grid_start = period_start(start, WEEK)
+    index: Dict[SeriesKey, int] = {}
+    cells: Dict[Tuple[int, int], Tuple[float, str]] = {}
+    periods = 0
+    for row in rows:
+        day = row.get('data_date')
+        try:
+            week = (period_start(date.fromisoformat(str(day)[:10]), WEEK) - grid_start).days // 7
+        except ValueError:
+            continue
+        if week < 0:
+            continue
+        periods = max(periods, week + 1)
+        for metric in metrics:
+            value = _as_float((row.get('metrics') or {}).get(metric))
+            if value is None:
+                continue
+            key = (row['workflow_id'], row['instance_id'], metric)
+            series = index.setdefault(key, len(index))
+            cells[(series, week)] = (value, str(day)[:10])
+
+    if not cells:
+        return []
+
+    values = np.full((len(index), periods), np.nan)
+    for (series, week), (value, _) in cells.items():
+        values[series, week] = value
+
+    keys = list(index)
+    findings = []
+    for first in range(0, len(keys), _CHUNK_SERIES):
+        expected, score = score_matrix(values[first:first + _CHUNK_SERIES])
+        with np.errstate(invalid='ignore'):
+            flagged = np.argwhere(np.abs(score) >= threshold)
+        for offset, week in flagged:
+            series = first + int(offset)
+            workflow_id, instance_id, metric = keys[series]
+            value, day = cells[(series, int(week))]
+            point_score = float(score[offset, week])
+            findings.append({
+                'workflow_id': workflow_id,
+                'instance_id': instance_id,
+                'aggregation_type': AGGREGATION_TYPE,
+                'metric': metric,
+                'period_start': day,
+                'value': value,
+                'expected': round(float(expected[offset, week]), 4),
+                'score': round(point_score, 3),
+                'severity': round(abs(point_score), 3),
+                'direction': 'high' if point_score > 0 else 'low'
+            })
+    findings.sort(key=lambda finding: finding['severity'], reverse=True)
+    return findings
+
+
+class AnomalyEngine:
+    """Periodic bulk anomaly scan (a singleton engine, see background_engines)"""
+
+    def __init__(self, reporting_db=reporting_db_service):
+        self.reporting_db = reporting_db
+        self.interval_seconds = settings.anomaly_scan_interval_minutes * 60
+        self.last_scan: Optional[Dict[str, Any]] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start scanning now and then every interval"""
+        if self._running:
+            logger.warning("Anomaly engine already running")
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._scan_loop())
+        logger.info("Anomaly engine started")
+
+    async def stop(self):
+        """Stop scanning"""
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        logger.info("Anomaly engine stopped")
+
+    async def _scan_loop(self):
+        while self._running:
+            try:
+                # Reading and scoring block; keep them off the event loop
+                await asyncio.to_thread(self.scan_once)
+            except Exception as e:
+                logger.error(f"Error in anomaly scan: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def scan_once(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Score every series over the lookback window and store the findings"""
+        scanned_at = datetime.now(timezone.utc)
+        today = today or scanned_at.date()
+        start = period_start(today - timedelta(weeks=settings.anomaly_lookback_weeks), WEEK)
+
+        rows = self.reporting_db.get_all_aggregate_series(AGGREGATION_TYPE, start, METRICS)
+        findings = find_anomalies(rows, start, settings.anomaly_threshold)
+        self.reporting_db.replace_anomalies(findings, start, scanned_at)
+
+        self.last_scan = {
+            'scanned_at': scanned_at.isoformat(),
+            'since': start.isoformat(),
+            'aggregates': len(rows),
+            'anomalies': len(findings)
+        }
+        logger.info(f"Anomaly scan: {len(findings)} anomalies in {len(rows)} aggregates since {start}")
+        return self.last_scan
+
+
+anomaly_engine = AnomalyEngine()
@@ -0,0 +1,164 @@
+"""
+Background Engines
+Starts and stops the polling loops that used to live in main_supabase.py
+
+Engines are either singletons, which must run in exactly one process and are
+gated by a leader lease, or partitioned, which run in every worker process
+and split their work with worker_coordinator.owns(). Execution polling,
+collections, report backfills and Snowflake sync additionally run as jobs on the durable queue
+(job_queue.py); their loops then only sweep for work that was never enqueued.
+Which processes run them is decided by settings.process_role:
+
+- 'worker': the dedicated worker entry point (worker_supabase.py)
+- 'all':    API process that also runs the engines (single-process deployments)
+- 'api':    HTTP only, no engines
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+from ..core.supabase_client import SupabaseManager
+from .job_queue import (
+    COLLECTION_QUEUE, EXECUTION_STATUS_QUEUE, REPORT_BACKFILL_QUEUE, SNOWFLAKE_SYNC_QUEUE, JobRunner,
+    job_runner
+)
+from .worker_coordinator import WorkerCoordinator, worker_coordinator
+
+logger = get_logger(__name__)
+
+Engine = Tuple[str, Callable[[], Awaitable[Any]], Optional[Callable[[], Awaitable[Any]]]]
+
+_partitioned_tasks: Dict[str, asyncio.Task] = {}
+_partitioned_stops: List[Tuple[str, Optional[Callable[[], Awaitable[Any]]]]] = []
+
+
+def runs_background_engines() -> bool:
+    """Whether this process's role includes the background engines"""
+    return settings.process_role in ('all', 'worker')
+
+
+async def _start_token_refresh():
+    """Track every user with stored tokens, then start the refresh loop"""
+    from .token_refresh_service import token_refresh_service
+
+    try:
+        users_response = SupabaseManager.get_client().table('users').select('id, auth_tokens').execute()
+        users_with_tokens = 0
+        for user in users_response.data or []:
+            if user.get('auth_tokens'):
+                token_refresh_service.add_user(user['id'])
+                users_with_tokens += 1
+        logger.info(f"✓ Added {users_with_tokens} users with tokens to refresh tracking (out of {len(users_response.data or [])} total)")
+    except Exception as e:
+        logger.warning(f"Could not load users for token refresh: {e}")
+
+    await token_refresh_service.start()
+
+
+def _singleton_engines() -> List[Engine]:
+    """Loops that must not run twice: cron-style schedulers, token refresh, anomaly scans and reconciliation"""
+    from .token_refresh_service import token_refresh_service
+    from .schedule_executor_service import get_schedule_executor
+    from .report_scheduler_executor_service import report_scheduler_executor
+    from .anomaly_engine import anomaly_engine
+    from .execution_reconciler import execution_reconciler
+
+    schedule_executor = get_schedule_executor()
+    return [
+        ('token_refresh', _start_token_refresh, token_refresh_service.stop),
+        ('schedule_executor', schedule_executor.start, schedule_executor.stop),
+        ('report_scheduler_executor', report_scheduler_executor.run, None),
+        ('anomaly_engine', anomaly_engine.start, anomaly_engine.stop),
+        ('execution_reconciler', execution_reconciler.start, execution_reconciler.stop),
+    ]
+
+
+def _partitioned_engines() -> List[Engine]:
+    """Loops that scale out; each filters its work with worker_coordinator.owns()"""
+    from .execution_status_poller import execution_status_poller
+    from .collection_executor_service import get_collection_executor
+    from .report_backfill_executor_service import report_backfill_executor
+    from .universal_snowflake_sync_service import universal_snowflake_sync_service
+
+    collection_executor = get_collection_executor()
+    return [
+        ('execution_status_poller', execution_status_poller.start, execution_status_poller.stop),
+        ('collection_executor', collection_executor.start, collection_executor.stop),
+        ('report_backfill_executor', report_backfill_executor.run, None),
+        ('universal_snowflake_sync', universal_snowflake_sync_service.start, universal_snowflake_sync_service.stop),
+    ]
+
+
+def _register_job_handlers(runner: JobRunner) -> None:
+    """Queues this worker processes, with their concurrency and lease settings"""
+    from .execution_status_poller import execution_status_poller
+    from .collection_executor_service import get_collection_executor
+    from .report_backfill_executor_service import report_backfill_executor
+    from .universal_snowflake_sync_service import universal_snowflake_sync_service
+
+    collection_executor = get_collection_executor()
+    runner.register(EXECUTION_STATUS_QUEUE, execution_status_poller.handle_job,
+                    concurrency=5, visibility_timeout=120)
+    runner.register(COLLECTION_QUEUE, collection_executor.handle_job,
+                    concurrency=collection_executor._max_concurrent_collections,
+                    key_limit=collection_executor._max_collections_per_instance,
+                    visibility_timeout=1800)
+    # Shares the per-instance key with collection jobs, so the cap covers both kinds
+    runner.register(REPORT_BACKFILL_QUEUE, report_backfill_executor.handle_job,
+                    concurrency=report_backfill_executor.max_concurrent_collections,
+                    key_limit=collection_executor._max_collections_per_instance,
+                    visibility_timeout=1800)
+    runner.register(SNOWFLAKE_SYNC_QUEUE, universal_snowflake_sync_service.handle_job,
+                    concurrency=universal_snowflake_sync_service.max_concurrent_syncs,
+                    visibility_timeout=600)
+
+
+async def start_background_engines(
+    coordinator: WorkerCoordinator = worker_coordinator,
+    runner: JobRunner = job_runner
+) -> None:
+    """Join the worker pool and start every engine this process is responsible for"""
+    for name, start, stop in _singleton_engines():
+        coordinator.register_singleton(name, start, stop)
+    # Starting the coordinator runs the first heartbeat, which starts the
+    # singletons whose leader lease this process wins
+    await coordinator.start()
+
+    # Before the partitioned loops, which check runner.active to pick queue or table polling
+    _register_job_handlers(runner)
+    await runner.start()
+
+    for name, start, stop in _partitioned_engines():
+        _partitioned_tasks[name] = asyncio.create_task(start())
+        _partitioned_stops.append((name, stop))
+        logger.info(f"✓ {name} started")
+
+    logger.info(
+        f"Background engines running in {coordinator.worker_id} "
+        f"(leader of: {', '.join(coordinator.get_state()['leader_of']) or 'none'})"
+    )
+
+
+async def stop_background_engines(
+    coordinator: WorkerCoordinator = worker_coordinator,
+    runner: JobRunner = job_runner
+) -> None:
+    """Stop partitioned engines and jobs, then singletons, and release this worker's leases"""
+    for name, stop in _partitioned_stops:
+        try:
+            if stop:
+                await stop()
+        except Exception as e:
+            logger.error(f"Error stopping {name}: {e}")
+    for task in _partitioned_tasks.values():
+        if not task.done():
+            task.cancel()
+    await asyncio.gather(*_partitioned_tasks.values(), return_exceptions=True)
+    _partitioned_tasks.clear()
+    _partitioned_stops.clear()
+
+    # In-flight jobs go back to the queue for another worker
+    await runner.stop()
+    await coordinator.stop()
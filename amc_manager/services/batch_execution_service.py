@@ -9,13 +9,14 @@ import uuid
 import secrets
 
 from ..core.supabase_client import SupabaseManager
+from .adaptive_concurrency import classify_throttle, get_concurrency_state, get_instance_limiter
 from .amc_execution_service import AMCExecutionService
 from .db_service import db_service
 
 logger = logging.getLogger(__name__)
 
 # Configuration constants
-MAX_CONCURRENT_EXECUTIONS = 5  # Rate limit for parallel executions
+# Concurrent submissions per AMC instance are governed by the shared adaptive limiter
 MAX_BATCH_SIZE = 100  # Maximum instances per batch
 MAX_RETRY_ATTEMPTS = 3  # Retry attempts for transient failures
 RETRY_DELAY_BASE = 2  # Base delay in seconds for exponential backoff
@@ -28,8 +29,6 @@ class BatchExecutionService:
         """Initialize the batch execution service."""
         self.supabase = SupabaseManager.get_client(use_service_role=True)
         self.amc_execution_service = AMCExecutionService()
-        # Semaphore for rate limiting concurrent executions
-        self.execution_semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXECUTIONS)
 
     def generate_batch_id(self) -> str:
         """Generate a unique batch ID.
@@ -271,16 +270,15 @@ class BatchExecutionService:
         
         for attempt in range(MAX_RETRY_ATTEMPTS):
             try:
-                # Use semaphore for rate limiting
-                async with self.execution_semaphore:
-                    result = await self._execute_single_instance(
-                        workflow_id=workflow_id,
-                        instance_id=instance_id,
-                        parameters=parameters,
-                        batch_execution_id=batch_execution_id,
-                        user_id=user_id
-                    )
-                    return result
+                # Concurrency is limited per instance inside _execute_single_instance
+                result = await self._execute_single_instance(
+                    workflow_id=workflow_id,
+                    instance_id=instance_id,
+                    parameters=parameters,
+                    batch_execution_id=batch_execution_id,
+                    user_id=user_id
+                )
+                return result
                     
             except Exception as e:
                 last_error = e
@@ -341,26 +339,28 @@ class BatchExecutionService:
                 else:
                     raise ValueError(f"Instance with UUID {instance_id} not found")
             
-            # Execute the workflow (AMCExecutionService.execute_workflow is synchronous)
-            # Run it in a thread executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                self.amc_execution_service.execute_workflow,
-                workflow_id,
-                user_id,
-                parameters,
-                'batch',  # triggered_by
-                amc_instance_id  # Pass AMC instance_id for batch execution
+            # Submit through the instance's adaptive concurrency limiter
+            result = await get_instance_limiter(amc_instance_id).submit(
+                lambda: self.amc_execution_service.execute_workflow(
+                    workflow_id,
+                    user_id,
+                    parameters,
+                    'batch',  # triggered_by
+                    amc_instance_id  # Pass AMC instance_id for batch execution
+                )
             )
             
+            # Throttled submissions are retried by _execute_single_instance_with_retry
+            if result and result.get('status') == 'failed' and classify_throttle(result.get('error')):
+                raise RuntimeError(f"AMC throttled execution on instance {amc_instance_id}: {result.get('error')}")
+            
             # Update the execution record to link it to the batch
-            if result and 'execution_id' in result:
+            if result and result.get('id'):
                 self.supabase.table('workflow_executions').update({
                     'batch_execution_id': batch_execution_id,
                     'target_instance_id': instance_id,
                     'is_batch_member': True
-                }).eq('id', result['execution_id']).execute()
+                }).eq('id', result['id']).execute()
             
             return result
             
@@ -761,7 +761,7 @@ class BatchExecutionService:
                     'success_rate': (completed_instances / total_instances * 100) if total_instances > 0 else 0
                 },
                 'current_running': status_counts.get('running', 0),
-                'semaphore_available': self.execution_semaphore._value if hasattr(self.execution_semaphore, '_value') else MAX_CONCURRENT_EXECUTIONS
+                'instance_concurrency': get_concurrency_state()
             }
             
         except Exception as e:
@@ -0,0 +1,266 @@
+"""
+Chart Downsampling
+Calendar bucketing and Largest-Triangle-Three-Buckets reduction of chart series
+
+A chart is drawn at a fixed pixel width, so sending more points than it has
+pixels only costs bandwidth and rendering time. Series are reduced in two
+steps, both optional:
+
+- bucket_series() rolls rows up to calendar days, ISO weeks (starting Monday)
+  or months, combining the values in each bucket (sum by default).
+- downsample_series() keeps at most `max_points` points with LTTB, which keeps
+  the point of each bucket that spans the largest triangle with its
+  neighbours. Peaks, troughs and the first and last points survive, so the
+  reduced line looks the same at chart resolution.
+
+Labels may be dates, datetimes, ISO date strings or numbers; anything else is
+treated as evenly spaced. Stdlib only, so chart endpoints stay cheap to import.
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+BUCKET_UNITS = (DAY, WEEK, MONTH)
+
+# Aliases used by aggregation_level settings
+_UNIT_ALIASES = {'daily': DAY, 'weekly': WEEK, 'monthly': MONTH}
+
+_AGGREGATORS: Dict[str, Callable[[List[float]], float]] = {
+    'sum': sum,
+    'avg': lambda values: sum(values) / len(values),
+    'mean': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max,
+    'last': lambda values: values[-1],
+}
+
+# LTTB needs the first point, the last point and at least one in between
+_MIN_POINTS = 3
+
+
+def bucket_unit(value: Optional[str]) -> Optional[str]:
+    """Normalized bucket unit ('day', 'week', 'month') or None"""
+    if not value:
+        return None
+    unit = _UNIT_ALIASES.get(str(value).lower(), str(value).lower())
+    if unit not in BUCKET_UNITS:
+        raise ValueError(f"Unsupported bucket unit: {value}")
+    return unit
+
+
+def max_points_for(config: Optional[Dict[str, Any]], default: Optional[int] = None) -> Optional[int]:
+    """Point budget of a chart config: 'max_points', else its pixel 'width', else default"""
+    config = config or {}
+    for key in ('max_points', 'width'):
+        value = config.get(key)
+        if value:
+            return max(_MIN_POINTS, int(value))
+    return default
+
+
+def _as_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if value != value else float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bucket_start(value: Any, unit: str) -> Optional[date]:
+    """First day of the calendar bucket containing `value`, or None if it is not a date"""
+    day = _as_date(value)
+    if day is None:
+        return None
+    if unit == WEEK:
+        return date.fromordinal(day.toordinal() - day.weekday())
+    if unit == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def bucket_series(
+    labels: Sequence[Any],
+    series: Dict[str, Sequence[Any]],
+    unit: str,
+    agg: str = 'sum'
+) -> Tuple[List[Any], Dict[str, List[Any]]]:
+    """
+    Roll series up to calendar buckets
+
+    Args:
+        labels: Date of each row
+        series: Values per series name, aligned with labels
+        unit: 'day', 'week' or 'month' (or daily/weekly/monthly)
+        agg: How values in a bucket combine: sum, avg, min, max or last
+
+    Returns:
+        (bucket labels as ISO dates in order, bucketed values per series).
+        Rows whose label is not a date are left out; buckets with no numeric
+        value for a series get None. If no label is a date the input is
+        returned unchanged.
+    """
+    unit = bucket_unit(unit)
+    combine = _AGGREGATORS.get(agg)
+    if combine is None:
+        raise ValueError(f"Unsupported bucket aggregation: {agg}")
+
+    starts = [bucket_start(label, unit) for label in labels]
+    keys = sorted({start for start in starts if start is not None})
+    if not keys:
+        return list(labels), {name: list(values) for name, values in series.items()}
+
+    position = {key: index for index, key in enumerate(keys)}
+    bucketed = {}
+    for name, values in series.items():
+        groups: List[List[float]] = [[] for _ in keys]
+        for start, value in zip(starts, values):
+            number = _as_number(value)
+            if start is not None and number is not None:
+                groups[position[start]].append(number)
+        bucketed[name] = [combine(group) if group else None for group in groups]
+    return [key.isoformat() for key in keys], bucketed
+
+
+def _x_values(labels: Sequence[Any]) -> Optional[List[float]]:
+    """Labels as numbers (day ordinals for dates), or None if they are not all one or the other"""
+    xs = [_as_number(label) for label in labels]
+    if any(x is None for x in xs):
+        days = [_as_date(label) for label in labels]
+        xs = [None if day is None else float(day.toordinal()) for day in days]
+    return None if any(x is None for x in xs) else xs
+
+
+def x_positions(labels: Sequence[Any]) -> List[float]:
+    """Numeric x of each label: the number or the day ordinal of a date
+
+    Labels that are not all numbers or all dates, or are out of order, are
+    spaced evenly by index.
+    """
+    xs = _x_values(labels)
+    if xs is None or any(a > b for a, b in zip(xs, xs[1:])):
+        return [float(index) for index in range(len(labels))]
+    return xs
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[Any], threshold: int) -> List[int]:
+    """
+    Indices of the points LTTB keeps (ascending)
+
+    `xs` must be non-decreasing. Missing y values count as 0 when picking
+    points. With `threshold` at or above the point count every index is kept.
+    """
+    count = len(ys)
+    if threshold >= count or count <= _MIN_POINTS:
+        return list(range(count))
+    threshold = max(_MIN_POINTS, threshold)
+    values = [_as_number(y) or 0.0 for y in ys]
+
+    kept = [0]
+    # The first and last points are fixed; the rest are split into threshold - 2 buckets
+    every = (count - 2) / (threshold - 2)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        if end >= count - 1 or next_end <= end:
+            avg_x, avg_y = xs[count - 1], values[count - 1]
+        else:
+            span = next_end - end
+            avg_x = sum(xs[end:next_end]) / span
+            avg_y = sum(values[end:next_end]) / span
+
+        ax, ay = xs[selected], values[selected]
+        best, best_area = start, -1.0
+        for index in range(start, min(end, count - 1)):
+            area = abs((ax - avg_x) * (values[index] - ay) - (ax - xs[index]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        selected = best
+    kept.append(count - 1)
+    return kept
+
+
+def _combined_values(series: Any, indices: Sequence[int]) -> List[float]:
+    """Sum of every series at `indices`, each scaled to 0..1 so no series dominates"""
+    combined = [0.0] * len(indices)
+    for values in series:
+        numbers = [_as_number(values[index]) for index in indices]
+        present = [number for number in numbers if number is not None]
+        if not present:
+            continue
+        low, span = min(present), (max(present) - min(present)) or 1.0
+        for position, number in enumerate(numbers):
+            if number is not None:
+                combined[position] += (number - low) / span
+    return combined
+
+
+def downsample_series(
+    labels: Sequence[Any],
+    series: Dict[str, Sequence[Any]],
+    max_points: Optional[int]
+) -> Tuple[List[Any], Dict[str, List[Any]]]:
+    """
+    Reduce aligned series to at most `max_points` shared labels with LTTB
+
+    Every series gets an equal share of the budget and the union of the
+    points each one keeps is used for all of them, so every line keeps its
+    own peaks and the datasets stay aligned with the labels. With more series
+    than the budget allows 3 points each, the union is reduced once more with
+    LTTB over the series' summed, range-normalized values, so the kept points
+    still span the whole chart.
+    """
+    count = len(labels)
+    if not max_points or count <= max_points or not series:
+        return list(labels), {name: list(values) for name, values in series.items()}
+
+    xs = x_positions(labels)
+    share = max(_MIN_POINTS, max_points // len(series))
+    kept = set()
+    for values in series.values():
+        kept.update(lttb_indices(xs, values, share))
+    indices = sorted(kept)
+    if len(indices) > max_points:
+        combined = _combined_values(series.values(), indices)
+        indices = [indices[k] for k in lttb_indices([xs[i] for i in indices], combined, max_points)]
+    return (
+        [labels[index] for index in indices],
+        {name: [values[index] for index in indices] for name, values in series.items()}
+    )
+
+
+def downsample_points(points: List[Dict[str, Any]], max_points: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Reduce {'x', 'y', ...} points to at most `max_points` with LTTB
+
+    Points are ordered by x for the reduction (scatter input need not be
+    sorted); the kept points are returned in their original order.
+    """
+    if not max_points or len(points) <= max_points:
+        return points
+    xs = _x_values([point.get('x') for point in points]) or [float(i) for i in range(len(points))]
+    order = sorted(range(len(points)), key=xs.__getitem__)
+    kept = lttb_indices([xs[i] for i in order], [points[i].get('y') for i in order], max_points)
+    return [points[i] for i in sorted(order[k] for k in kept)]
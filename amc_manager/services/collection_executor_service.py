@@ -1,16 +1,20 @@
 """Background Collection Executor Service - Executes data collection operations asynchronously"""
 
 import asyncio
-from typing import Dict, Any, List, Optional, Set
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
 from datetime import datetime, timedelta
 import uuid
 
+from ..config import settings
 from ..core.logger_simple import get_logger
+from ..core.metrics import POLL_CYCLE_SECONDS, QUEUE_DEPTH
 from ..core.supabase_client import SupabaseManager
 from .historical_collection_service import historical_collection_service
 from .reporting_database_service import reporting_db_service
 from .db_service import db_service
 from .token_service import token_service
+from .job_queue import COLLECTION_QUEUE, Job, job_runner
+from .worker_coordinator import worker_coordinator
 
 logger = get_logger(__name__)
 
@@ -30,15 +34,14 @@ class CollectionExecutorService:
         # Execution management
         self._execution_tasks: Dict[str, asyncio.Task] = {}
         self._max_concurrent_collections = 5  # Limit concurrent collections
-        self._max_concurrent_weeks = 10  # Limit concurrent week executions
+        self._max_collections_per_instance = 2  # Across all workers, when run as jobs
+        # Local cap on week tasks; AMC submissions per instance are governed by the
+        # shared adaptive limiter (see adaptive_concurrency), which never exceeds this
+        self._max_concurrent_weeks = settings.amc_concurrency_max
         self._collection_semaphore = asyncio.Semaphore(self._max_concurrent_collections)
         self._week_semaphore = asyncio.Semaphore(self._max_concurrent_weeks)
         self._claimed_collections: Set[str] = set()  # Track claimed collections
         
-        # Rate limiting
-        self._rate_limit_delay = 2  # Seconds between AMC API calls
-        self._last_api_call = datetime.now()
-        
         # Retry configuration
         self._max_retries = 3
         self._retry_delay = 60  # Seconds before retry
@@ -53,12 +56,18 @@ class CollectionExecutorService:
         
         while self.running:
             try:
-                await self._check_and_execute_collections()
+                with POLL_CYCLE_SECONDS.labels('collection_executor').time():
+                    if job_runner.active:
+                        # Collections run as collection jobs; only catch up on missed ones
+                        await self._enqueue_pending_collections()
+                        await self._check_failed_collections()
+                    else:
+                        await self._check_and_execute_collections()
             except Exception as e:
                 logger.error(f"Collection executor error: {e}", exc_info=True)
             
             # Wait for next check interval
-            await asyncio.sleep(self.check_interval)
+            await asyncio.sleep(settings.job_queue_sweep_seconds if job_runner.active else self.check_interval)
     
     async def stop(self):
         """Stop the collection executor service"""
@@ -70,11 +79,49 @@ class CollectionExecutorService:
             logger.info(f"Waiting for {len(self._execution_tasks)} collections to complete")
             await asyncio.gather(*self._execution_tasks.values(), return_exceptions=True)
     
+    async def enqueue(self, collection: Dict[str, Any]):
+        """Queue a collection for execution, at most one per collection and capped per instance"""
+        await job_runner.enqueue(
+            COLLECTION_QUEUE,
+            {'collection_uuid': collection['id']},
+            job_key=collection['id'],
+            concurrency_key=collection.get('instance_id')
+        )
+    
+    async def _enqueue_pending_collections(self):
+        """Make sure every pending collection has a job"""
+        response = self.db.table('report_data_collections')\
+            .select('id, instance_id')\
+            .eq('status', 'pending')\
+            .execute()
+        for collection in response.data or []:
+            if worker_coordinator.owns(collection['id']):
+                await self.enqueue(collection)
+    
+    async def handle_job(self, job: Job):
+        """collection job: run the collection; the job lease replaces the status claim"""
+        collection_uuid = job.payload['collection_uuid']
+        response = self.db.table('report_data_collections')\
+            .select('*')\
+            .eq('id', collection_uuid)\
+            .execute()
+        collection = response.data[0] if response.data else None
+        # 'running' means a previous holder of this job died mid-collection
+        if not collection or collection['status'] not in ('pending', 'running'):
+            return
+        
+        self.db.table('report_data_collections')\
+            .update({'status': 'running', 'updated_at': datetime.now().isoformat()})\
+            .eq('id', collection_uuid)\
+            .execute()
+        await self._execute_collection(collection)
+    
     async def _check_and_execute_collections(self):
         """Check for pending collections and execute them"""
         try:
             # Find pending collections
             pending_collections = await self._get_pending_collections()
+            QUEUE_DEPTH.labels('collection_executor').set(len(pending_collections))
             
             if pending_collections:
                 logger.info(f"Found {len(pending_collections)} pending collections")
@@ -82,8 +129,8 @@ class CollectionExecutorService:
                 for collection in pending_collections:
                     collection_id = collection['collection_id']
                     
-                    # Skip if already executing
-                    if collection_id in self._execution_tasks:
+                    # Skip if already executing or owned by another worker
+                    if collection_id in self._execution_tasks or not worker_coordinator.owns(collection['id']):
                         continue
                     
                     # Atomically claim the collection
@@ -114,7 +161,7 @@ class CollectionExecutorService:
                 .select('*')\
                 .in_('status', ['pending', 'running'])\
                 .order('created_at')\
-                .limit(10)\
+                .limit(worker_coordinator.batch_size(10))\
                 .execute()
             
             return response.data or []
@@ -173,25 +220,38 @@ class CollectionExecutorService:
             
             logger.info(f"Processing {len(weeks)} weeks for collection {collection_id}")
             
-            # Process weeks with rate limiting
+            # Weeks run concurrently; the instance's adaptive limiter decides how
+            # many AMC submissions are in flight at once
             completed_weeks = 0
             failed_weeks = 0
+            stop = asyncio.Event()
             
-            for week in weeks:
-                # Check if collection was paused
+            async def still_wanted() -> bool:
+                """False once the collection is paused or stopped for failures"""
+                if stop.is_set():
+                    return False
                 if await self._is_collection_paused(collection_uuid):
-                    logger.info(f"Collection {collection_id} was paused")
-                    break
-                
-                # Rate limiting
-                await self._apply_rate_limit()
+                    if not stop.is_set():
+                        logger.info(f"Collection {collection_id} was paused")
+                    stop.set()
+                    return False
+                return True
+            
+            async def run_week(week: Dict[str, Any]):
+                nonlocal completed_weeks, failed_weeks
+                if stop.is_set():
+                    return
                 
-                # Execute week with semaphore control
+                # Execute week with semaphore control; every week is queued at
+                # once, so pause and stop are checked when it is admitted to AMC
                 success = await self._execute_week_with_semaphore(
                     collection_uuid,
                     collection_id,
-                    week
+                    week,
+                    still_wanted
                 )
+                if success is None:
+                    return
                 
                 if success:
                     completed_weeks += 1
@@ -199,10 +259,9 @@ class CollectionExecutorService:
                     failed_weeks += 1
                     
                     # Stop on too many failures
-                    if failed_weeks >= 3:
+                    if failed_weeks >= 3 and not stop.is_set():
                         logger.error(f"Too many failures for collection {collection_id}")
-                        await self._fail_collection(collection_uuid, "Too many week execution failures")
-                        break
+                        stop.set()
                 
                 # Update progress
                 progress = int((completed_weeks / len(weeks)) * 100)
@@ -213,8 +272,12 @@ class CollectionExecutorService:
                     completed_weeks
                 )
             
+            await asyncio.gather(*(run_week(week) for week in weeks))
+            
+            if failed_weeks >= 3:
+                await self._fail_collection(collection_uuid, "Too many week execution failures")
             # Complete collection if all weeks processed
-            if completed_weeks == len(weeks):
+            elif completed_weeks == len(weeks):
                 await self._complete_collection(collection_uuid)
             elif not await self._is_collection_paused(collection_uuid):
                 # Mark as failed if not paused and not all weeks completed
@@ -234,28 +297,31 @@ class CollectionExecutorService:
         self,
         collection_uuid: str,
         collection_id: str,
-        week: Dict[str, Any]
-    ) -> bool:
+        week: Dict[str, Any],
+        should_submit: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Optional[bool]:
         """Execute a week with semaphore control"""
         async with self._week_semaphore:
-            return await self._execute_week(collection_uuid, collection_id, week)
+            return await self._execute_week(collection_uuid, collection_id, week, should_submit)
     
     async def _execute_week(
         self,
         collection_uuid: str,
         collection_id: str,
-        week: Dict[str, Any]
-    ) -> bool:
-        """Execute a single week of data collection"""
+        week: Dict[str, Any],
+        should_submit: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Optional[bool]:
+        """Execute a single week of data collection; None when should_submit declined it"""
         try:
             logger.info(f"Executing week {week['week_start_date']} to {week['week_end_date']}")
             
             # Execute via collection service
             success = await self.collection_service.execute_collection_week(
-                collection_id,
+                collection_uuid,
                 week['id'],
                 week['week_start_date'],
-                week['week_end_date']
+                week['week_end_date'],
+                should_submit
             )
             
             return success
@@ -287,16 +353,6 @@ class CollectionExecutorService:
             logger.error(f"Error getting pending weeks: {e}")
             return []
     
-    async def _apply_rate_limit(self):
-        """Apply rate limiting between AMC API calls"""
-        now = datetime.now()
-        time_since_last = (now - self._last_api_call).total_seconds()
-        
-        if time_since_last < self._rate_limit_delay:
-            await asyncio.sleep(self._rate_limit_delay - time_since_last)
-        
-        self._last_api_call = datetime.now()
-    
     async def _is_collection_paused(self, collection_uuid: str) -> bool:
         """Check if a collection has been paused"""
         try:
@@ -1,13 +1,16 @@
 """Dashboard Data Service - Queries and formats data for dashboard widgets"""
 
 from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta, date
 from enum import Enum
+import asyncio
 import json
 from ..core.logger_simple import get_logger
 from .reporting_database_service import reporting_db_service
 from .data_aggregation_service import data_aggregation_service
 from .db_service import db_service
+from .chart_downsampling import bucket_series, downsample_series, max_points_for
 
 logger = get_logger(__name__)
 
@@ -25,6 +28,12 @@ class ChartType(Enum):
     FUNNEL = "funnel"
 
 
+# AggregateSource.aggregation_type of a range total read from the rollup cube
+ROLLUP = 'rollup'
+# AggregateSource.aggregation_type of the stored anomaly engine findings for a range
+ANOMALIES = 'anomalies'
+
+
 class AggregationLevel(Enum):
     """Data aggregation levels"""
     DAILY = "daily"
@@ -34,6 +43,31 @@ class AggregationLevel(Enum):
     YEARLY = "yearly"
 
 
+@dataclass(frozen=True)
+class AggregateSource:
+    """One aggregate series read by dashboard widgets (fetched once per batch)"""
+    workflow_id: str
+    instance_id: str
+    aggregation_type: str
+    start_date: date
+    end_date: date
+
+
+@dataclass
+class WidgetPlan:
+    """How one widget's data is produced: its formatter and the series it reads"""
+    kind: str  # metric_card, table or a ChartType value
+    workflow_id: str
+    instance_id: str
+    metrics: List[str]
+    dimensions: List[str]
+    sources: Dict[str, AggregateSource]  # role ('series', 'current', 'previous') -> series
+    needs_dimensions: bool = False
+    bucket: Optional[str] = None  # calendar bucket for time series: day, week or month
+    bucket_agg: str = 'sum'
+    max_points: Optional[int] = None
+
+
 class DashboardDataService:
     """Service for querying and formatting dashboard data"""
     
@@ -47,7 +81,7 @@ class DashboardDataService:
         self.cache = {}  # Simple in-memory cache
         
         # Data formatting configurations
-        self.MAX_DATA_POINTS = 365  # Maximum data points for time series
+        self.MAX_DATA_POINTS = 365  # Maximum data points for time series (LTTB-reduced beyond)
         self.MAX_TABLE_ROWS = 1000  # Maximum rows for table widgets
     
     async def get_widget_data(
@@ -68,414 +102,491 @@ class DashboardDataService:
             Formatted data ready for visualization
         """
         try:
-            widget_type = widget_config.get('widget_type', 'chart')
-            chart_type = widget_config.get('chart_type', 'line')
-            data_source = widget_config.get('data_source', {})
-            
-            # Extract data source parameters
-            workflow_id = data_source.get('workflow_id')
-            instance_id = data_source.get('instance_id')
-            metrics = data_source.get('metrics', [])
-            dimensions = data_source.get('dimensions', [])
-            aggregation_level = data_source.get('aggregation_level', 'weekly')
-            
-            if not workflow_id or not instance_id:
-                logger.error("Missing workflow_id or instance_id in data source")
-                return {'error': 'Invalid data source configuration'}
-            
-            # Apply date range
-            if not date_range:
-                # Default to last 30 days
-                end_date = date.today()
-                start_date = end_date - timedelta(days=30)
-                date_range = (start_date, end_date)
-            
-            # Check cache
-            cache_key = self._generate_cache_key(
-                widget_config, date_range, filters
-            )
-            cached_data = self._get_cached_data(cache_key)
-            if cached_data:
-                logger.info(f"Returning cached data for widget")
-                return cached_data
-            
-            # Fetch data based on widget type
-            if widget_type == 'metric_card':
-                data = await self._get_metric_card_data(
-                    workflow_id, instance_id, metrics, date_range, filters
-                )
-            elif widget_type == 'table':
-                data = await self._get_table_data(
-                    workflow_id, instance_id, metrics, dimensions, 
-                    date_range, filters
-                )
-            elif chart_type == ChartType.LINE.value:
-                data = await self._get_line_chart_data(
-                    workflow_id, instance_id, metrics, 
-                    aggregation_level, date_range, filters
-                )
-            elif chart_type == ChartType.BAR.value:
-                data = await self._get_bar_chart_data(
-                    workflow_id, instance_id, metrics, dimensions,
-                    date_range, filters
-                )
-            elif chart_type == ChartType.PIE.value:
-                data = await self._get_pie_chart_data(
-                    workflow_id, instance_id, metrics[0] if metrics else 'impressions',
-                    dimensions[0] if dimensions else 'campaign',
-                    date_range, filters
-                )
-            elif chart_type == ChartType.AREA.value:
-                data = await self._get_area_chart_data(
-                    workflow_id, instance_id, metrics,
-                    aggregation_level, date_range, filters
-                )
-            else:
-                # Default to line chart
-                data = await self._get_line_chart_data(
-                    workflow_id, instance_id, metrics,
-                    aggregation_level, date_range, filters
-                )
-            
-            # Cache the result
-            self._cache_data(cache_key, data)
-            
-            return data
-            
+            widget_data = await self.get_dashboard_widget_data([widget_config], date_range, filters)
+            return widget_data[0]
         except Exception as e:
             logger.error(f"Error getting widget data: {e}")
             return {'error': str(e)}
     
-    async def _get_metric_card_data(
+    async def get_dashboard_widget_data(
         self,
-        workflow_id: str,
-        instance_id: str,
-        metrics: List[str],
-        date_range: Tuple[date, date],
+        widget_configs: List[Dict[str, Any]],
+        date_range: Optional[Tuple[date, date]] = None,
         filters: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """Get data for metric card widgets (KPIs with comparison)"""
-        try:
-            metric_name = metrics[0] if metrics else 'impressions'
+    ) -> List[Dict[str, Any]]:
+        """
+        Get formatted data for every widget of a dashboard in one pass
+        
+        Widgets reading the same aggregate series (workflow, instance,
+        aggregation level and date range) share a single fetch, which selects
+        only the metric keys all of them need. The distinct series are fetched
+        concurrently and handed to each widget's formatter.
+        
+        Args:
+            widget_configs: Widget configurations, as for get_widget_data()
+            date_range: Optional date range filter (default: last 30 days)
+            filters: Optional additional filters (instances, campaigns, etc.)
             
-            # Get current period data
-            current_aggregates = self.reporting_db.get_aggregates_for_dashboard(
-                workflow_id, instance_id, 'weekly',
-                date_range[0], date_range[1]
-            )
+        Returns:
+            Formatted data per widget, in the order of widget_configs
+        """
+        if not date_range:
+            # Default to last 30 days
+            end_date = date.today()
+            date_range = (end_date - timedelta(days=30), end_date)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(widget_configs)
+        plans: Dict[int, Tuple[WidgetPlan, str]] = {}
+        # Per series: metric keys and whether any widget needs dimensions
+        needed: Dict[AggregateSource, Tuple[set, bool]] = {}
+        
+        for index, widget_config in enumerate(widget_configs):
+            cache_key = self._generate_cache_key(widget_config, date_range, filters)
+            cached_data = self._get_cached_data(cache_key)
+            if cached_data:
+                results[index] = cached_data
+                continue
             
-            # Calculate current value
-            current_value = 0
-            for agg in current_aggregates:
-                if metric_name in agg.get('metrics', {}):
-                    current_value += agg['metrics'][metric_name]
+            plan = self._plan_widget(widget_config, date_range)
+            if plan is None:
+                logger.error("Missing workflow_id or instance_id in data source")
+                results[index] = {'error': 'Invalid data source configuration'}
+                continue
             
-            # Get previous period for comparison
+            plans[index] = (plan, cache_key)
+            for source in plan.sources.values():
+                metric_keys, dimensions = needed.get(source, (set(), False))
+                needed[source] = (metric_keys | set(plan.metrics), dimensions or plan.needs_dimensions)
+        
+        # One fetch per distinct series
+        sources = list(needed)
+        series = await asyncio.gather(*(
+            asyncio.to_thread(self._fetch_source, source, sorted(needed[source][0]), needed[source][1])
+            for source in sources
+        ))
+        fetched = dict(zip(sources, series))
+        if plans:
+            logger.info(f"Fetched {len(sources)} aggregate series for {len(plans)} dashboard widgets")
+        
+        for index, (plan, cache_key) in plans.items():
+            try:
+                if plan.kind == 'table':
+                    data = await self._get_table_data(
+                        plan.workflow_id, plan.instance_id, plan.metrics, plan.dimensions,
+                        date_range, filters
+                    )
+                else:
+                    aggregates = {role: fetched[source] for role, source in plan.sources.items()}
+                    data = self._format_widget(plan, aggregates, date_range)
+            except Exception as e:
+                logger.error(f"Error formatting {plan.kind} widget data: {e}")
+                data = {'error': str(e)}
+            
+            if 'error' not in data:
+                self._cache_data(cache_key, data)
+            results[index] = data
+        
+        return results
+    
+    def _fetch_source(
+        self,
+        source: AggregateSource,
+        metrics: List[str],
+        include_dimensions: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate rows of one source
+        
+        ROLLUP sources are range totals from the rollup cube, returned as one
+        row; ranges the cube holds nothing for fall back to the weekly series.
+        ANOMALIES sources are the anomaly engine's stored findings.
+        """
+        if source.aggregation_type == ROLLUP:
+            total = self.aggregation_service.get_range_metrics(
+                source.workflow_id, source.instance_id, source.start_date, source.end_date, metrics=metrics
+            )
+            if total['nodes']:
+                return [{'data_date': source.end_date.isoformat(), 'metrics': total['metrics']}]
+            aggregation_type = 'weekly'
+        elif source.aggregation_type == ANOMALIES:
+            return self.reporting_db.get_anomalies(
+                source.workflow_id, source.instance_id, source.start_date, source.end_date, metrics=metrics
+            )
+        else:
+            aggregation_type = source.aggregation_type
+        return self.reporting_db.get_aggregate_series(
+            source.workflow_id, source.instance_id, aggregation_type,
+            source.start_date, source.end_date,
+            metrics=metrics,
+            include_dimensions=include_dimensions
+        )
+    
+    def _plan_widget(
+        self,
+        widget_config: Dict[str, Any],
+        date_range: Tuple[date, date]
+    ) -> Optional[WidgetPlan]:
+        """Resolve a widget to its formatter and the aggregate series it reads"""
+        widget_type = widget_config.get('widget_type', 'chart')
+        chart_type = widget_config.get('chart_type', 'line')
+        data_source = widget_config.get('data_source', {}) or {}
+        
+        # Extract data source parameters
+        workflow_id = data_source.get('workflow_id')
+        instance_id = data_source.get('instance_id')
+        metrics = data_source.get('metrics', [])
+        dimensions = data_source.get('dimensions', [])
+        aggregation_level = data_source.get('aggregation_level', 'weekly')
+        
+        if not workflow_id or not instance_id:
+            return None
+        
+        def series(aggregation_type: str, start: date, end: date) -> AggregateSource:
+            return AggregateSource(workflow_id, instance_id, aggregation_type, start, end)
+        
+        if widget_type in ('metric_card', 'table'):
+            kind = widget_type
+        elif chart_type in (ChartType.BAR.value, ChartType.PIE.value, ChartType.AREA.value):
+            kind = chart_type
+        else:
+            # Default to line chart
+            kind = ChartType.LINE.value
+        
+        sources = {}
+        needs_dimensions = False
+        if kind == 'metric_card':
+            metrics = [metrics[0] if metrics else 'impressions']
+            # Previous period of the same length, for comparison (both from the rollup cube)
             period_length = (date_range[1] - date_range[0]).days
             prev_end = date_range[0] - timedelta(days=1)
             prev_start = prev_end - timedelta(days=period_length)
-            
-            prev_aggregates = self.reporting_db.get_aggregates_for_dashboard(
-                workflow_id, instance_id, 'weekly',
-                prev_start, prev_end
-            )
-            
-            # Calculate previous value
-            prev_value = 0
-            for agg in prev_aggregates:
-                if metric_name in agg.get('metrics', {}):
-                    prev_value += agg['metrics'][metric_name]
-            
-            # Calculate change
-            change = 0
-            change_percent = 0
-            if prev_value > 0:
-                change = current_value - prev_value
-                change_percent = (change / prev_value) * 100
-            
-            return {
-                'type': 'metric_card',
-                'metric': metric_name,
-                'current_value': round(current_value, 2),
-                'previous_value': round(prev_value, 2),
-                'change': round(change, 2),
-                'change_percent': round(change_percent, 2),
-                'trend': 'up' if change > 0 else 'down' if change < 0 else 'neutral',
-                'period': f"{date_range[0]} to {date_range[1]}"
+            sources = {
+                'current': series(ROLLUP, date_range[0], date_range[1]),
+                'previous': series(ROLLUP, prev_start, prev_end)
             }
-            
-        except Exception as e:
-            logger.error(f"Error getting metric card data: {e}")
-            return {'error': str(e)}
+        elif kind in (ChartType.LINE.value, ChartType.AREA.value):
+            sources = {'series': series(aggregation_level, date_range[0], date_range[1])}
+            if data_source.get('show_anomalies', True):
+                sources['anomalies'] = series(ANOMALIES, date_range[0], date_range[1])
+        elif kind == ChartType.BAR.value:
+            dimensions = [dimensions[0] if dimensions else 'campaigns']
+            sources = {'series': series('weekly', date_range[0], date_range[1])}
+            needs_dimensions = True
+        elif kind == ChartType.PIE.value:
+            metrics = [metrics[0] if metrics else 'impressions']
+            dimensions = [dimensions[0] if dimensions else 'campaign']
+            sources = {'series': series('weekly', date_range[0], date_range[1])}
+            needs_dimensions = True
+        
+        return WidgetPlan(
+            kind, workflow_id, instance_id, metrics, dimensions, sources, needs_dimensions,
+            bucket=data_source.get('bucket'),
+            bucket_agg=data_source.get('bucket_agg', 'sum'),
+            max_points=min(max_points_for(data_source, self.MAX_DATA_POINTS), self.MAX_DATA_POINTS)
+        )
     
-    async def _get_line_chart_data(
+    def _format_widget(
         self,
-        workflow_id: str,
-        instance_id: str,
-        metrics: List[str],
-        aggregation_level: str,
-        date_range: Tuple[date, date],
-        filters: Optional[Dict[str, Any]] = None
+        plan: WidgetPlan,
+        aggregates: Dict[str, List[Dict[str, Any]]],
+        date_range: Tuple[date, date]
     ) -> Dict[str, Any]:
-        """Get time-series data for line charts"""
-        try:
-            # Get aggregated data
-            aggregates = self.reporting_db.get_aggregates_for_dashboard(
-                workflow_id, instance_id, aggregation_level,
-                date_range[0], date_range[1]
+        """Format fetched aggregate series for one widget"""
+        if plan.kind == 'metric_card':
+            return self._format_metric_card(
+                plan.metrics[0], aggregates['current'], aggregates['previous'], date_range
             )
-            
-            if not aggregates:
-                return {
-                    'type': 'line_chart',
-                    'labels': [],
-                    'datasets': []
+        if plan.kind == ChartType.BAR.value:
+            return self._format_bar_chart(aggregates['series'], plan.metrics, plan.dimensions[0])
+        if plan.kind == ChartType.PIE.value:
+            return self._format_pie_chart(aggregates['series'], plan.metrics[0], plan.dimensions[0])
+        if plan.kind == ChartType.AREA.value:
+            data = self._format_area_chart(
+                aggregates['series'], plan.metrics, plan.bucket, plan.bucket_agg, plan.max_points
+            )
+        else:
+            data = self._format_line_chart(
+                aggregates['series'], plan.metrics, plan.bucket, plan.bucket_agg, plan.max_points
+            )
+        if 'anomalies' in aggregates and 'error' not in data:
+            data['anomalies'] = [
+                {
+                    'metric': finding['metric'],
+                    'date': finding['period_start'],
+                    'value': finding['value'],
+                    'expected': finding['expected'],
+                    'score': finding['score'],
+                    'type': finding['direction']
                 }
-            
-            # Extract dates and organize by metric
-            dates = []
-            metric_data = {metric: [] for metric in metrics}
-            
-            for agg in aggregates:
-                data_date = agg['data_date']
-                dates.append(data_date)
-                
-                agg_metrics = agg.get('metrics', {})
-                for metric in metrics:
-                    value = agg_metrics.get(metric, 0)
-                    metric_data[metric].append(value)
-            
-            # Format for Chart.js
-            datasets = []
-            colors = self._get_chart_colors(len(metrics))
-            
-            for i, metric in enumerate(metrics):
-                datasets.append({
-                    'label': self._format_metric_label(metric),
-                    'data': metric_data[metric],
-                    'borderColor': colors[i],
-                    'backgroundColor': colors[i] + '20',  # Add transparency
-                    'tension': 0.4,  # Smooth lines
-                    'fill': False
-                })
-            
+                for finding in aggregates['anomalies'] if finding['metric'] in plan.metrics
+            ]
+        return data
+    
+    def _format_metric_card(
+        self,
+        metric_name: str,
+        current_aggregates: List[Dict[str, Any]],
+        prev_aggregates: List[Dict[str, Any]],
+        date_range: Tuple[date, date]
+    ) -> Dict[str, Any]:
+        """Format data for metric card widgets (KPIs with comparison)"""
+        # Calculate current value
+        current_value = 0
+        for agg in current_aggregates:
+            if metric_name in agg.get('metrics', {}):
+                current_value += agg['metrics'][metric_name]
+        
+        # Calculate previous value
+        prev_value = 0
+        for agg in prev_aggregates:
+            if metric_name in agg.get('metrics', {}):
+                prev_value += agg['metrics'][metric_name]
+        
+        # Calculate change
+        change = 0
+        change_percent = 0
+        if prev_value > 0:
+            change = current_value - prev_value
+            change_percent = (change / prev_value) * 100
+        
+        return {
+            'type': 'metric_card',
+            'metric': metric_name,
+            'current_value': round(current_value, 2),
+            'previous_value': round(prev_value, 2),
+            'change': round(change, 2),
+            'change_percent': round(change_percent, 2),
+            'trend': 'up' if change > 0 else 'down' if change < 0 else 'neutral',
+            'period': f"{date_range[0]} to {date_range[1]}"
+        }
+    
+    def _format_line_chart(
+        self,
+        aggregates: List[Dict[str, Any]],
+        metrics: List[str],
+        bucket: Optional[str] = None,
+        bucket_agg: str = 'sum',
+        max_points: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Format time-series data for line charts
+        
+        Rows are rolled up to `bucket` (day, week or month) when given, then
+        reduced with LTTB to max_points (default MAX_DATA_POINTS).
+        """
+        if not aggregates:
             return {
                 'type': 'line_chart',
-                'labels': [d.strftime('%Y-%m-%d') for d in dates],
-                'datasets': datasets,
-                'options': {
-                    'responsive': True,
-                    'plugins': {
-                        'legend': {'position': 'top'},
-                        'title': {'display': True, 'text': 'Metrics Over Time'}
-                    },
-                    'scales': {
-                        'y': {'beginAtZero': True}
-                    }
-                }
+                'labels': [],
+                'datasets': []
             }
+        
+        # Extract dates and organize by metric
+        dates = []
+        metric_data = {metric: [] for metric in metrics}
+        
+        for agg in aggregates:
+            dates.append(agg['data_date'])
             
-        except Exception as e:
-            logger.error(f"Error getting line chart data: {e}")
-            return {'error': str(e)}
+            agg_metrics = agg.get('metrics', {})
+            for metric in metrics:
+                value = agg_metrics.get(metric, 0)
+                metric_data[metric].append(value)
+        
+        if bucket:
+            dates, metric_data = bucket_series(dates, metric_data, bucket, bucket_agg)
+        dates, metric_data = downsample_series(dates, metric_data, max_points or self.MAX_DATA_POINTS)
+        
+        # Format for Chart.js
+        datasets = []
+        colors = self._get_chart_colors(len(metrics))
+        
+        for i, metric in enumerate(metrics):
+            datasets.append({
+                'label': self._format_metric_label(metric),
+                'data': metric_data[metric],
+                'borderColor': colors[i],
+                'backgroundColor': colors[i] + '20',  # Add transparency
+                'tension': 0.4,  # Smooth lines
+                'fill': False
+            })
+        
+        return {
+            'type': 'line_chart',
+            # data_date arrives as an ISO string from the API
+            'labels': [d.strftime('%Y-%m-%d') if isinstance(d, date) else str(d)[:10] for d in dates],
+            'datasets': datasets,
+            'options': {
+                'responsive': True,
+                'plugins': {
+                    'legend': {'position': 'top'},
+                    'title': {'display': True, 'text': 'Metrics Over Time'}
+                },
+                'scales': {
+                    'y': {'beginAtZero': True}
+                }
+            }
+        }
     
-    async def _get_bar_chart_data(
+    def _format_bar_chart(
         self,
-        workflow_id: str,
-        instance_id: str,
+        aggregates: List[Dict[str, Any]],
         metrics: List[str],
-        dimensions: List[str],
-        date_range: Tuple[date, date],
-        filters: Optional[Dict[str, Any]] = None
+        dimension: str
     ) -> Dict[str, Any]:
-        """Get categorical data for bar charts"""
-        try:
-            # Get aggregated data
-            aggregates = self.reporting_db.get_aggregates_for_dashboard(
-                workflow_id, instance_id, 'weekly',
-                date_range[0], date_range[1]
-            )
-            
-            if not aggregates:
-                return {
-                    'type': 'bar_chart',
-                    'labels': [],
-                    'datasets': []
-                }
-            
-            # Aggregate by dimension (e.g., by campaign)
-            dimension = dimensions[0] if dimensions else 'campaigns'
-            dimension_totals = {}
-            
-            for agg in aggregates:
-                agg_dimensions = agg.get('dimensions', {})
-                dimension_values = agg_dimensions.get(dimension, [])
-                agg_metrics = agg.get('metrics', {})
-                
-                for dim_value in dimension_values[:10]:  # Limit to top 10
-                    if dim_value not in dimension_totals:
-                        dimension_totals[dim_value] = {m: 0 for m in metrics}
-                    
-                    for metric in metrics:
-                        if metric in agg_metrics:
-                            dimension_totals[dim_value][metric] += agg_metrics[metric]
-            
-            # Sort by first metric and take top items
-            if dimension_totals and metrics:
-                sorted_dims = sorted(
-                    dimension_totals.items(),
-                    key=lambda x: x[1][metrics[0]],
-                    reverse=True
-                )[:20]  # Top 20 items
-            else:
-                sorted_dims = []
-            
-            # Format for Chart.js
-            labels = [dim[0] for dim in sorted_dims]
-            datasets = []
-            colors = self._get_chart_colors(len(metrics))
-            
-            for i, metric in enumerate(metrics):
-                datasets.append({
-                    'label': self._format_metric_label(metric),
-                    'data': [dim[1][metric] for dim in sorted_dims],
-                    'backgroundColor': colors[i]
-                })
-            
+        """Format categorical data for bar charts"""
+        if not aggregates:
             return {
                 'type': 'bar_chart',
-                'labels': labels,
-                'datasets': datasets,
-                'options': {
-                    'responsive': True,
-                    'plugins': {
-                        'legend': {'position': 'top'},
-                        'title': {'display': True, 'text': f'Metrics by {dimension.title()}'}
-                    },
-                    'scales': {
-                        'y': {'beginAtZero': True}
-                    }
-                }
+                'labels': [],
+                'datasets': []
             }
-            
-        except Exception as e:
-            logger.error(f"Error getting bar chart data: {e}")
-            return {'error': str(e)}
-    
-    async def _get_pie_chart_data(
-        self,
-        workflow_id: str,
-        instance_id: str,
-        metric: str,
-        dimension: str,
-        date_range: Tuple[date, date],
-        filters: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """Get composition data for pie charts"""
-        try:
-            # Get aggregated data
-            aggregates = self.reporting_db.get_aggregates_for_dashboard(
-                workflow_id, instance_id, 'weekly',
-                date_range[0], date_range[1]
-            )
-            
-            if not aggregates:
-                return {
-                    'type': 'pie_chart',
-                    'labels': [],
-                    'data': [],
-                    'backgroundColor': []
-                }
-            
-            # Aggregate by dimension
-            dimension_totals = {}
-            
-            for agg in aggregates:
-                agg_dimensions = agg.get('dimensions', {})
-                dimension_values = agg_dimensions.get(dimension, [])
-                agg_metrics = agg.get('metrics', {})
+        
+        # Aggregate by dimension (e.g., by campaign)
+        dimension_totals = {}
+        
+        for agg in aggregates:
+            agg_dimensions = agg.get('dimensions', {})
+            dimension_values = agg_dimensions.get(dimension, [])
+            agg_metrics = agg.get('metrics', {})
+            
+            for dim_value in dimension_values[:10]:  # Limit to top 10
+                if dim_value not in dimension_totals:
+                    dimension_totals[dim_value] = {m: 0 for m in metrics}
                 
-                for dim_value in dimension_values:
-                    if dim_value not in dimension_totals:
-                        dimension_totals[dim_value] = 0
-                    
+                for metric in metrics:
                     if metric in agg_metrics:
-                        dimension_totals[dim_value] += agg_metrics[metric]
-            
-            # Sort and take top items
+                        dimension_totals[dim_value][metric] += agg_metrics[metric]
+        
+        # Sort by first metric and take top items
+        if dimension_totals and metrics:
             sorted_dims = sorted(
                 dimension_totals.items(),
-                key=lambda x: x[1],
+                key=lambda x: x[1][metrics[0]],
                 reverse=True
-            )[:10]  # Top 10 for pie chart
-            
-            # Add "Others" category if there are more items
-            if len(dimension_totals) > 10:
-                others_total = sum(
-                    val for key, val in dimension_totals.items()
-                    if key not in [d[0] for d in sorted_dims]
-                )
-                if others_total > 0:
-                    sorted_dims.append(('Others', others_total))
-            
-            # Format for Chart.js
-            labels = [dim[0] for dim in sorted_dims]
-            data = [dim[1] for dim in sorted_dims]
-            colors = self._get_chart_colors(len(labels))
-            
+            )[:20]  # Top 20 items
+        else:
+            sorted_dims = []
+        
+        # Format for Chart.js
+        labels = [dim[0] for dim in sorted_dims]
+        datasets = []
+        colors = self._get_chart_colors(len(metrics))
+        
+        for i, metric in enumerate(metrics):
+            datasets.append({
+                'label': self._format_metric_label(metric),
+                'data': [dim[1][metric] for dim in sorted_dims],
+                'backgroundColor': colors[i]
+            })
+        
+        return {
+            'type': 'bar_chart',
+            'labels': labels,
+            'datasets': datasets,
+            'options': {
+                'responsive': True,
+                'plugins': {
+                    'legend': {'position': 'top'},
+                    'title': {'display': True, 'text': f'Metrics by {dimension.title()}'}
+                },
+                'scales': {
+                    'y': {'beginAtZero': True}
+                }
+            }
+        }
+    
+    def _format_pie_chart(
+        self,
+        aggregates: List[Dict[str, Any]],
+        metric: str,
+        dimension: str
+    ) -> Dict[str, Any]:
+        """Format composition data for pie charts"""
+        if not aggregates:
             return {
                 'type': 'pie_chart',
-                'labels': labels,
-                'datasets': [{
-                    'data': data,
-                    'backgroundColor': colors,
-                    'borderWidth': 1
-                }],
-                'options': {
-                    'responsive': True,
-                    'plugins': {
-                        'legend': {'position': 'right'},
-                        'title': {
-                            'display': True,
-                            'text': f'{self._format_metric_label(metric)} by {dimension.title()}'
-                        }
+                'labels': [],
+                'data': [],
+                'backgroundColor': []
+            }
+        
+        # Aggregate by dimension
+        dimension_totals = {}
+        
+        for agg in aggregates:
+            agg_dimensions = agg.get('dimensions', {})
+            dimension_values = agg_dimensions.get(dimension, [])
+            agg_metrics = agg.get('metrics', {})
+            
+            for dim_value in dimension_values:
+                if dim_value not in dimension_totals:
+                    dimension_totals[dim_value] = 0
+                
+                if metric in agg_metrics:
+                    dimension_totals[dim_value] += agg_metrics[metric]
+        
+        # Sort and take top items
+        sorted_dims = sorted(
+            dimension_totals.items(),
+            key=lambda x: x[1],
+            reverse=True
+        )[:10]  # Top 10 for pie chart
+        
+        # Add "Others" category if there are more items
+        if len(dimension_totals) > 10:
+            others_total = sum(
+                val for key, val in dimension_totals.items()
+                if key not in [d[0] for d in sorted_dims]
+            )
+            if others_total > 0:
+                sorted_dims.append(('Others', others_total))
+        
+        # Format for Chart.js
+        labels = [dim[0] for dim in sorted_dims]
+        data = [dim[1] for dim in sorted_dims]
+        colors = self._get_chart_colors(len(labels))
+        
+        return {
+            'type': 'pie_chart',
+            'labels': labels,
+            'datasets': [{
+                'data': data,
+                'backgroundColor': colors,
+                'borderWidth': 1
+            }],
+            'options': {
+                'responsive': True,
+                'plugins': {
+                    'legend': {'position': 'right'},
+                    'title': {
+                        'display': True,
+                        'text': f'{self._format_metric_label(metric)} by {dimension.title()}'
                     }
                 }
             }
-            
-        except Exception as e:
-            logger.error(f"Error getting pie chart data: {e}")
-            return {'error': str(e)}
+        }
     
-    async def _get_area_chart_data(
+    def _format_area_chart(
         self,
-        workflow_id: str,
-        instance_id: str,
+        aggregates: List[Dict[str, Any]],
         metrics: List[str],
-        aggregation_level: str,
-        date_range: Tuple[date, date],
-        filters: Optional[Dict[str, Any]] = None
+        bucket: Optional[str] = None,
+        bucket_agg: str = 'sum',
+        max_points: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Get stacked area chart data"""
-        try:
-            # Similar to line chart but with fill
-            line_data = await self._get_line_chart_data(
-                workflow_id, instance_id, metrics,
-                aggregation_level, date_range, filters
-            )
-            
-            # Modify datasets for area chart
-            if 'datasets' in line_data:
-                for dataset in line_data['datasets']:
-                    dataset['fill'] = True
-                    
-                line_data['type'] = 'area_chart'
-            
-            return line_data
-            
-        except Exception as e:
-            logger.error(f"Error getting area chart data: {e}")
-            return {'error': str(e)}
+        """Format stacked area chart data"""
+        # Similar to line chart but with fill
+        line_data = self._format_line_chart(aggregates, metrics, bucket, bucket_agg, max_points)
+        
+        # Modify datasets for area chart
+        if 'datasets' in line_data:
+            for dataset in line_data['datasets']:
+                dataset['fill'] = True
+                
+            line_data['type'] = 'area_chart'
+        
+        return line_data
     
     async def _get_table_data(
         self,
@@ -1,15 +1,22 @@
 """Data Aggregation Service - Pre-computes metrics for fast dashboard queries"""
 
-from typing import Dict, Any, Optional, List, Tuple
+import asyncio
+from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 import json
+from ..config.settings import settings
 from ..core.logger_simple import get_logger
 from .reporting_database_service import reporting_db_service
 from .db_service import db_service
+from .result_set import ResultSet
+from . import rollup_cube
 
 logger = get_logger(__name__)
 
+# Execution fields aggregation reads; stored results only when not passed in
+_EXECUTION_FIELDS = 'id, workflow_id, execution_parameters, workflows(instance_id)'
+
 
 class DataAggregationService:
     """Service for computing and managing aggregated reporting data"""
@@ -46,80 +53,81 @@ class DataAggregationService:
     async def compute_weekly_aggregates(
         self,
         workflow_execution_id: str,
-        execution_results: List[Dict[str, Any]]
+        execution_results: Union[ResultSet, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
         """
         Compute weekly aggregates from workflow execution results
         
         Args:
             workflow_execution_id: Execution UUID
-            execution_results: Raw results from AMC execution
+            execution_results: Raw results from AMC execution (ResultSet or row dicts)
             
         Returns:
             Aggregated metrics for the week
         """
         try:
-            # Get execution details
-            execution = self.db.client.table('workflow_executions')\
-                .select('*, workflows(*)')\
-                .eq('id', workflow_execution_id)\
-                .single()\
-                .execute()
-            
-            if not execution.data:
+            execution = await asyncio.to_thread(self._get_execution, 'id', workflow_execution_id)
+            if not execution:
                 logger.error(f"Execution {workflow_execution_id} not found")
                 return {}
             
-            execution_data = execution.data
-            workflow = execution_data.get('workflows', {})
-            
-            # Determine date range from execution parameters
-            params = execution_data.get('execution_parameters', {})
-            start_date = self._parse_date(params.get('startDate'))
-            end_date = self._parse_date(params.get('endDate'))
-            
+            start_date, end_date = self._execution_window(execution)
             if not start_date or not end_date:
                 logger.warning("Could not determine date range for aggregation")
                 return {}
             
-            # Compute base metrics
-            base_metrics = self._compute_base_metrics(execution_results)
-            
-            # Compute calculated metrics
-            calculated_metrics = self._compute_calculated_metrics(base_metrics)
-            
-            # Combine all metrics
-            all_metrics = {**base_metrics, **calculated_metrics}
-            
-            # Extract dimensions (campaigns, ASINs, etc.)
-            dimensions = self._extract_dimensions(execution_results)
-            
-            # Create aggregation record
-            aggregate_data = {
-                'workflow_id': workflow['id'],
-                'instance_id': execution_data['instance_id'],
-                'aggregation_type': 'weekly',
-                'aggregation_key': f"{start_date}_{end_date}",
-                'metrics': all_metrics,
-                'dimensions': dimensions,
-                'data_date': end_date,
-                'row_count': len(execution_results)
-            }
-            
-            # Store in database
-            stored = self.reporting_db.create_or_update_aggregate(aggregate_data)
-            
-            if stored:
-                logger.info(f"Stored weekly aggregate for {start_date} to {end_date}")
-                return all_metrics
-            else:
-                logger.error("Failed to store aggregate")
-                return {}
-                
+            instance_id = (execution.get('workflows') or {}).get('instance_id')
+            return await asyncio.to_thread(
+                self._store_weekly_aggregate, execution, instance_id,
+                ResultSet.of(execution_results), start_date, end_date
+            )
         except Exception as e:
             logger.error(f"Error computing weekly aggregates: {e}")
             return {}
     
+    def _store_weekly_aggregate(
+        self,
+        execution: Dict[str, Any],
+        instance_id: str,
+        results: ResultSet,
+        start_date: date,
+        end_date: date
+    ) -> Dict[str, Any]:
+        """Compute and store the weekly aggregate of one execution's results"""
+        # Typed columns: each metric is summed straight from its array
+        base_metrics = self._compute_base_metrics(results)
+        
+        # Compute calculated metrics
+        calculated_metrics = self._compute_calculated_metrics(base_metrics)
+        
+        # Combine all metrics
+        all_metrics = {**base_metrics, **calculated_metrics}
+        
+        # Extract dimensions (campaigns, ASINs, etc.)
+        dimensions = self._extract_dimensions(results)
+        
+        # Create aggregation record
+        aggregate_data = {
+            'workflow_id': execution['workflow_id'],
+            'instance_id': instance_id,
+            'aggregation_type': 'weekly',
+            'aggregation_key': f"{start_date}_{end_date}",
+            'metrics': all_metrics,
+            'dimensions': dimensions,
+            'data_date': end_date,
+            'row_count': len(results)
+        }
+        
+        # Store in database
+        stored = self.reporting_db.create_or_update_aggregate(aggregate_data)
+        
+        if stored:
+            logger.info(f"Stored weekly aggregate for {start_date} to {end_date}")
+            return all_metrics
+        else:
+            logger.error("Failed to store aggregate")
+            return {}
+    
     async def compute_monthly_aggregates(
         self,
         workflow_id: str,
@@ -188,28 +196,13 @@ class DataAggregationService:
             logger.error(f"Error computing monthly aggregates: {e}")
             return {}
     
-    def _compute_base_metrics(self, results: List[Dict[str, Any]]) -> Dict[str, float]:
+    def _compute_base_metrics(self, results: ResultSet) -> Dict[str, float]:
         """Compute base metrics from raw results"""
         metrics = {}
         
         for metric in self.STANDARD_METRICS:
-            total = 0
-            count = 0
-            
-            for row in results:
-                if metric in row:
-                    value = row[metric]
-                    if value is not None:
-                        try:
-                            total += float(value)
-                            count += 1
-                        except (ValueError, TypeError):
-                            continue
-            
-            if count > 0:
-                metrics[metric] = round(total, 2)
-            else:
-                metrics[metric] = 0
+            values = results.column(metric).numbers() if results.has_column(metric) else ()
+            metrics[metric] = round(sum(values), 2) if values else 0
         
         return metrics
     
@@ -291,39 +284,32 @@ class DataAggregationService:
         
         return calculated
     
-    def _extract_dimensions(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _extract_dimensions(self, results: ResultSet) -> Dict[str, Any]:
         """Extract dimension values from results (campaigns, ASINs, etc.)"""
+        def distinct(column: str, as_str: bool = False) -> set:
+            if not results.has_column(column):
+                return set()
+            # Distinct values come straight from dictionary-encoded columns
+            values = results.column(column).distinct()
+            return {str(v) if as_str else v for v in values if v}
+        
+        # ASINs: asin, falling back to product_asin on rows without one
+        asins = distinct('asin')
+        if results.has_column('product_asin'):
+            asin_values = results.values('asin')
+            asins.update(
+                product_asin for asin, product_asin in zip(asin_values, results.column('product_asin'))
+                if not asin and product_asin
+            )
+        
         dimensions = {
-            'campaigns': set(),
-            'asins': set(),
-            'keywords': set(),
-            'placements': set(),
-            'audiences': set()
+            'campaigns': distinct('campaign_id', as_str=True),
+            'asins': asins,
+            'keywords': distinct('keyword'),
+            'placements': distinct('placement'),
+            'audiences': distinct('audience_id', as_str=True)
         }
         
-        for row in results:
-            # Extract campaign IDs
-            if 'campaign_id' in row and row['campaign_id']:
-                dimensions['campaigns'].add(str(row['campaign_id']))
-            
-            # Extract ASINs
-            if 'asin' in row and row['asin']:
-                dimensions['asins'].add(row['asin'])
-            elif 'product_asin' in row and row['product_asin']:
-                dimensions['asins'].add(row['product_asin'])
-            
-            # Extract keywords
-            if 'keyword' in row and row['keyword']:
-                dimensions['keywords'].add(row['keyword'])
-            
-            # Extract placements
-            if 'placement' in row and row['placement']:
-                dimensions['placements'].add(row['placement'])
-            
-            # Extract audiences
-            if 'audience_id' in row and row['audience_id']:
-                dimensions['audiences'].add(str(row['audience_id']))
-        
         # Convert sets to lists for JSON storage
         return {
             'campaigns': list(dimensions['campaigns'])[:100],  # Limit to 100
@@ -406,49 +392,241 @@ class DataAggregationService:
         self,
         workflow_id: str,
         instance_id: str,
-        new_execution_id: str
+        new_execution_id: str,
+        results: Optional[Union[ResultSet, Dict[str, Any], List[Dict[str, Any]]]] = None
     ) -> bool:
         """
         Update aggregates incrementally when new data arrives
         
+        Stores the execution's weekly aggregate and writes its day nodes into
+        the rollup cube, refreshing the weeks, months and quarters above them.
+        Only collection weeks and other 7-day windows are aggregated. Runs in
+        a worker thread, off the event loop.
+        
         Args:
             workflow_id: Workflow UUID
             instance_id: Instance UUID
             new_execution_id: New execution to incorporate
+            results: The execution's results, when the caller already has them
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Get the new execution data
-            execution = self.db.client.table('workflow_executions')\
-                .select('*')\
-                .eq('id', new_execution_id)\
-                .single()\
-                .execute()
-            
-            if not execution.data:
+            execution = await asyncio.to_thread(self._get_execution, 'id', new_execution_id)
+            if not execution:
                 logger.error(f"Execution {new_execution_id} not found")
                 return False
-            
-            # Get the results
-            results = execution.data.get('result_data', {}).get('results', [])
-            if not results:
-                logger.warning("No results to aggregate")
-                return True  # Not an error, just no data
-            
-            # Compute aggregates for this execution
-            aggregates = await self.compute_weekly_aggregates(
-                new_execution_id,
-                results
-            )
-            
-            return bool(aggregates)
-            
+            return await asyncio.to_thread(self._incorporate_execution, execution, workflow_id, instance_id, results)
         except Exception as e:
             logger.error(f"Error updating incremental aggregates: {e}")
             return False
     
+    async def aggregate_completed_execution(
+        self,
+        execution_id: str,
+        results: Union[ResultSet, Dict[str, Any], List[Dict[str, Any]]]
+    ) -> bool:
+        """Fold a just-completed execution (by its execution_id) into the aggregates and rollup cube"""
+        try:
+            execution = await asyncio.to_thread(self._get_execution, 'execution_id', execution_id)
+            if not execution:
+                return False
+            instance_id = (execution.get('workflows') or {}).get('instance_id')
+            return await asyncio.to_thread(
+                self._incorporate_execution, execution, execution['workflow_id'], instance_id, results
+            )
+        except Exception as e:
+            logger.error(f"Error aggregating execution {execution_id}: {e}")
+            return False
+    
+    def _get_execution(self, column: str, value: str) -> Optional[Dict[str, Any]]:
+        """The execution fields aggregation needs (not its stored results)"""
+        response = self.db.client.table('workflow_executions')\
+            .select(_EXECUTION_FIELDS)\
+            .eq(column, value)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+    
+    def _execution_window(self, execution: Dict[str, Any]) -> Tuple[Optional[date], Optional[date]]:
+        """First and last day the execution's parameters cover"""
+        params = execution.get('execution_parameters') or {}
+        return (
+            self._parse_date(params.get('startDate') or params.get('timeWindowStart')),
+            self._parse_date(params.get('endDate') or params.get('timeWindowEnd'))
+        )
+    
+    def _is_collection_week(self, execution_uuid: str) -> bool:
+        """Whether a report data collection ran this execution for one of its weeks"""
+        response = self.db.client.table('report_data_weeks')\
+            .select('id')\
+            .eq('execution_id', execution_uuid)\
+            .limit(1)\
+            .execute()
+        return bool(response.data)
+    
+    def _incorporate_execution(
+        self,
+        execution: Dict[str, Any],
+        workflow_id: str,
+        instance_id: str,
+        results: Optional[Union[ResultSet, Dict[str, Any], List[Dict[str, Any]]]]
+    ) -> bool:
+        """Weekly aggregate and rollup day nodes of one execution (blocking)"""
+        start_date, end_date = self._execution_window(execution)
+        if not start_date or not end_date:
+            logger.warning("Could not determine date range for aggregation")
+            return False
+        
+        # Ad-hoc runs over arbitrary windows would leave 'weekly' aggregates
+        # that are not weeks and overwrite the cube's days with partial data
+        if (end_date - start_date).days != 6 and not self._is_collection_week(execution['id']):
+            logger.debug(f"Execution {execution['id']} is not a collection week or 7-day window; not aggregated")
+            return True
+        
+        # Get the results
+        if results is None:
+            stored = self.db.client.table('workflow_executions')\
+                .select('result_data, result_columns, result_rows')\
+                .eq('id', execution['id'])\
+                .single()\
+                .execute().data or {}
+            if (stored.get('result_data') or {}).get('results'):
+                results = stored['result_data']['results']
+            elif stored.get('result_rows'):
+                results = {
+                    'columns': stored.get('result_columns') or [],
+                    'rows': stored['result_rows']
+                }
+        results = ResultSet.of(results or [])
+        if not len(results):
+            logger.warning("No results to aggregate")
+            return True  # Not an error, just no data
+        
+        # Compute aggregates for this execution
+        aggregates = self._store_weekly_aggregate(execution, instance_id, results, start_date, end_date)
+        self.update_rollups(workflow_id, instance_id, results, start_date, end_date)
+        
+        return bool(aggregates)
+    
+    # ========== Rollup Cube ==========
+    
+    def update_rollups(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        results: ResultSet,
+        start_date: date,
+        end_date: date
+    ) -> int:
+        """
+        Write one execution's day nodes and refresh the rollups above them
+        
+        Each day in [start_date, end_date] is replaced by this execution's
+        rows for it (days without rows become zero when the results carry a
+        date column); results without one count on end_date. Dimension nodes
+        stored for those days that these results no longer have are zeroed
+        too, so a re-run leaves no stale values in the cube.
+        
+        Returns:
+            Day nodes written
+        """
+        dimensions = [d.strip() for d in settings.rollup_dimensions.split(',') if d.strip()]
+        leaves = rollup_cube.day_leaves(results, self.STANDARD_METRICS, dimensions, end_date)
+        first_day = start_date if rollup_cube.date_column(results) else end_date
+        day = first_day
+        while day <= end_date:
+            leaves.setdefault((rollup_cube.TOTAL, day), {'metrics': {}, 'row_count': 0})
+            day += timedelta(days=1)
+        for node in self.reporting_db.get_rollup_day_dimensions(workflow_id, instance_id, first_day, end_date):
+            leaves.setdefault(node, {'metrics': {}, 'row_count': 0})
+        
+        rows = [
+            {
+                'workflow_id': workflow_id,
+                'instance_id': instance_id,
+                'dimension': dimension,
+                'level': rollup_cube.DAY,
+                'period_start': day.isoformat(),
+                'period_end': day.isoformat(),
+                'metrics': {metric: round(value, 6) for metric, value in leaf['metrics'].items()},
+                'row_count': leaf['row_count']
+            }
+            for (dimension, day), leaf in leaves.items()
+        ]
+        written = self.reporting_db.upsert_rollups(rows)
+        if written:
+            days = [day for _, day in leaves]
+            refreshed = self.reporting_db.refresh_rollups(workflow_id, instance_id, min(days), max(days))
+            logger.info(f"Wrote {written} day rollups and refreshed {refreshed} parent rollups for workflow {workflow_id}")
+        return written
+    
+    def get_range_metrics(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        start_date: date,
+        end_date: date,
+        metrics: Optional[List[str]] = None,
+        dimension: str = rollup_cube.TOTAL
+    ) -> Dict[str, Any]:
+        """
+        Metrics over any date range, combined from the fewest rollup nodes
+        
+        Returns:
+            {'metrics': base and derived metrics, 'row_count': n, 'nodes': nodes read}.
+            'nodes' is 0 when the cube holds nothing for the range.
+        """
+        nodes = rollup_cube.cover(start_date, end_date)
+        rows = self.reporting_db.get_rollup_nodes(workflow_id, instance_id, nodes, dimension)
+        combined = rollup_cube.combine(rows)
+        totals = {metric: round(combined['metrics'].get(metric, 0), 2) for metric in self.STANDARD_METRICS}
+        all_metrics = {**combined['metrics'], **totals, **self._compute_calculated_metrics(totals)}
+        if metrics is not None:
+            all_metrics = {metric: all_metrics.get(metric, 0) for metric in metrics}
+        return {'metrics': all_metrics, 'row_count': combined['row_count'], 'nodes': combined['nodes']}
+    
+    def compare_ranges(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        current: Tuple[date, date],
+        previous: Optional[Tuple[date, date]] = None,
+        metrics: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Period-over-period metrics from the rollup cube
+        
+        Args:
+            current: (start, end) of the current period
+            previous: (start, end) to compare with; defaults to the equally
+                long period just before `current`
+        """
+        if previous is None:
+            length = current[1] - current[0]
+            previous_end = current[0] - timedelta(days=1)
+            previous = (previous_end - length, previous_end)
+        
+        current_metrics = self.get_range_metrics(workflow_id, instance_id, *current, metrics=metrics)['metrics']
+        previous_metrics = self.get_range_metrics(workflow_id, instance_id, *previous, metrics=metrics)['metrics']
+        delta = {}
+        for metric, value in current_metrics.items():
+            before = previous_metrics.get(metric, 0)
+            delta[metric] = {
+                'value': value - before,
+                'percent': ((value - before) / before * 100) if before else 0
+            }
+        return {
+            'current': current_metrics,
+            'previous': previous_metrics,
+            'delta': delta,
+            'periods': {
+                'current': [current[0].isoformat(), current[1].isoformat()],
+                'previous': [previous[0].isoformat(), previous[1].isoformat()]
+            }
+        }
+    
     async def get_metric_trends(
         self,
         workflow_id: str,
@@ -2,27 +2,30 @@
 Data Analysis Service for analyzing execution result data
 """
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 import statistics
 from collections import Counter
 from datetime import datetime
+from itertools import islice
+
+from .result_set import Column, ResultSet
 
 logger = logging.getLogger(__name__)
 
 class DataAnalysisService:
     """Service for analyzing execution result data"""
     
-    def analyze_data(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_data(self, data: Union[ResultSet, List[Dict[str, Any]]]) -> Dict[str, Any]:
         """
         Analyze execution result data and return insights
         
         Args:
-            data: List of data rows from execution results
+            data: Execution results as a ResultSet or a list of row dicts
             
         Returns:
             Analysis results including statistics and insights
         """
-        if not data or not isinstance(data, list) or len(data) == 0:
+        if not data or not isinstance(data, (list, ResultSet)) or len(data) == 0:
             return {
                 "summary": {
                     "row_count": 0,
@@ -33,14 +36,15 @@ class DataAnalysisService:
                 "insights": []
             }
         
-        # Get column information
-        columns = list(data[0].keys()) if data else []
+        # Typed columns: numeric values are parsed once, not per statistic
+        data = ResultSet.of(data)
+        columns = data.names
         row_count = len(data)
         
         # Analyze each column
         column_stats = {}
         for column in columns:
-            column_stats[column] = self._analyze_column(data, column)
+            column_stats[column] = self._analyze_column(data.column(column))
         
         # Generate insights
         insights = self._generate_insights(data, column_stats)
@@ -60,30 +64,34 @@ class DataAnalysisService:
             "correlations": self._find_correlations(data, columns)
         }
     
-    def _analyze_column(self, data: List[Dict], column: str) -> Dict[str, Any]:
+    def _analyze_column(self, column: Column) -> Dict[str, Any]:
         """Analyze a single column of data"""
-        values = [row.get(column) for row in data if row.get(column) is not None]
+        row_count = len(column)
+        null_count = column.null_count
         
-        if not values:
+        if null_count == row_count:
             return {
                 "type": "empty",
-                "null_count": len(data),
+                "null_count": row_count,
                 "null_percentage": 100.0
             }
         
-        # Determine data type
-        data_type = self._determine_data_type(values)
+        values = [v for v in column if v is not None]
+        unique_count = len([v for v in column.distinct() if v is not None])
+        
+        # Determine data type (typed numeric columns need no sniffing)
+        data_type = "numeric" if column.is_numeric else self._determine_data_type(values)
         
         stats = {
             "type": data_type,
-            "null_count": len(data) - len(values),
-            "null_percentage": ((len(data) - len(values)) / len(data)) * 100 if len(data) > 0 else 0,
-            "unique_count": len(set(values)),
-            "unique_percentage": (len(set(values)) / len(values)) * 100 if len(values) > 0 else 0
+            "null_count": null_count,
+            "null_percentage": (null_count / row_count) * 100 if row_count > 0 else 0,
+            "unique_count": unique_count,
+            "unique_percentage": (unique_count / len(values)) * 100 if len(values) > 0 else 0
         }
         
         if data_type == "numeric":
-            numeric_values = [float(v) for v in values if self._is_numeric(v)]
+            numeric_values = column.numbers()
             if numeric_values:
                 stats.update({
                     "min": min(numeric_values),
@@ -172,7 +180,7 @@ class DataAnalysisService:
         except (ValueError, TypeError):
             return False
     
-    def _generate_insights(self, data: List[Dict], column_stats: Dict) -> List[Dict[str, str]]:
+    def _generate_insights(self, data: ResultSet, column_stats: Dict) -> List[Dict[str, str]]:
         """Generate insights from the data analysis"""
         insights = []
         
@@ -205,9 +213,8 @@ class DataAnalysisService:
                 upper_bound = q3 + 1.5 * iqr
                 
                 outlier_count = sum(
-                    1 for row in data 
-                    if self._is_numeric(row.get(column)) and 
-                    (float(row.get(column)) < lower_bound or float(row.get(column)) > upper_bound)
+                    1 for value in data.column(column).numbers()
+                    if value < lower_bound or value > upper_bound
                 )
                 
                 if outlier_count > 0:
@@ -230,7 +237,7 @@ class DataAnalysisService:
         
         return insights
     
-    def _assess_data_quality(self, data: List[Dict], column_stats: Dict) -> str:
+    def _assess_data_quality(self, data: ResultSet, column_stats: Dict) -> str:
         """Assess overall data quality"""
         if not data:
             return "No data"
@@ -261,22 +268,24 @@ class DataAnalysisService:
         else:
             return "Very Poor"
     
-    def _find_correlations(self, data: List[Dict], columns: List[str]) -> Dict[str, Any]:
+    def _find_correlations(self, data: ResultSet, columns: List[str]) -> Dict[str, Any]:
         """Find potential correlations between numeric columns"""
         correlations = {}
         
-        # Get numeric columns
-        numeric_columns = [
-            col for col in columns 
-            if any(self._is_numeric(row.get(col)) for row in data[:min(100, len(data))])
-        ]
+        # Numeric values of each column, parsed once for every pair
+        numbers = {}
+        for col in columns:
+            column = data.column(col)
+            if column.is_numeric or any(self._is_numeric(v) for v in islice(column, 100)):
+                numbers[col] = column.numbers()
+        numeric_columns = list(numbers)
         
         # Calculate correlations between numeric columns
         for i, col1 in enumerate(numeric_columns):
             for col2 in numeric_columns[i+1:]:
                 try:
-                    values1 = [float(row.get(col1)) for row in data if self._is_numeric(row.get(col1))]
-                    values2 = [float(row.get(col2)) for row in data if self._is_numeric(row.get(col2))]
+                    values1 = numbers[col1]
+                    values2 = numbers[col2]
                     
                     if len(values1) == len(values2) and len(values1) > 2:
                         # Simple correlation coefficient calculation
@@ -300,16 +309,17 @@ class DataAnalysisService:
         
         return correlations
     
-    def get_summary_statistics(self, data: List[Dict]) -> Dict[str, Any]:
+    def get_summary_statistics(self, data: Union[ResultSet, List[Dict]]) -> Dict[str, Any]:
         """Get quick summary statistics for the data"""
         if not data:
             return {"error": "No data provided"}
         
+        data = ResultSet.of(data)
         return {
             "row_count": len(data),
-            "column_count": len(data[0].keys()) if data else 0,
-            "columns": list(data[0].keys()) if data else [],
-            "sample_rows": data[:5] if len(data) > 5 else data
+            "column_count": len(data.names),
+            "columns": data.names,
+            "sample_rows": [dict(data[i]) for i in range(min(5, len(data)))]
         }
 
 # Global instance
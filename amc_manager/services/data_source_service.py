@@ -1,9 +1,18 @@
 """
 AMC Data Source Service
 Handles operations for AMC schema documentation and field definitions
+
+The catalog only changes when scripts/import_amc_schemas.py runs, so the whole
+catalog is loaded once into an in-memory snapshot (with derived counts,
+capabilities and a field search index precomputed) and reused until the
+catalog version stamp bumped by the importer changes. Snapshot rows are
+shared by every request, so callers always get copies.
 """
 
+import copy
 import json
+import threading
+import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import logging
@@ -12,9 +21,388 @@ from .db_service import DatabaseService as SupabaseService
 
 logger = logging.getLogger(__name__)
 
+# Catalog tables are read in pages because PostgREST caps responses at 1000 rows
+CATALOG_PAGE_SIZE = 1000
+
+# How often (seconds) to re-check the version stamp before trusting the snapshot
+VERSION_CHECK_INTERVAL_SECONDS = 30
+
+# Without a version stamp (migration 17 not applied) reload after this many seconds
+SNAPSHOT_MAX_AGE_SECONDS = 600
+
+# Field-name keywords that mark a data source as supporting an audience capability
+AUDIENCE_CAPABILITY_KEYWORDS = [
+    (('user_id', 'customer'), 'User Targeting'),
+    (('conversion', 'purchase'), 'Purchase Behavior'),
+    (('impression', 'view'), 'Ad Engagement'),
+    (('cart', 'basket'), 'Cart Analysis'),
+    (('click',), 'Click Behavior'),
+    (('campaign',), 'Campaign Targeting'),
+]
+
+
+def _parse_json(value: Any, default: Any = None) -> Any:
+    """Parse a JSON column that may be stored as a string"""
+    if isinstance(value, str):
+        return json.loads(value) if value else default
+    return value
+
+
+def _data_freshness(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Typical AMC data lags based on name/category"""
+    if 'real-time' in item.get('name', '').lower():
+        return {'data_lag_days': 0, 'update_frequency': 'Real-time'}
+    if item.get('category') == 'Conversion':
+        return {'data_lag_days': 14, 'update_frequency': 'Daily'}
+    if item.get('category') == 'Attribution':
+        return {'data_lag_days': 7, 'update_frequency': 'Daily'}
+    return {'data_lag_days': 14, 'update_frequency': 'Daily'}
+
+
+class CatalogSnapshot:
+    """Immutable in-memory view of the AMC schema catalog with precomputed metadata"""
+
+    def __init__(
+        self,
+        version: Optional[int],
+        data_sources: List[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        examples: List[Dict[str, Any]],
+        sections: List[Dict[str, Any]],
+        relationships: List[Dict[str, Any]]
+    ):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.etag = f'W/"amc-catalog-{version if version is not None else int(time.time())}"'
+
+        # Data sources, parsed once and ordered like the original category/name query
+        self.data_sources: List[Dict[str, Any]] = []
+        for row in data_sources:
+            item = dict(row)
+            if item.get('data_sources'):
+                item['data_sources'] = _parse_json(item['data_sources'], [])
+            if item.get('tags'):
+                item['tags'] = _parse_json(item['tags'], [])
+            if item.get('availability'):
+                item['availability'] = _parse_json(item['availability'])
+            self.data_sources.append(item)
+        self.data_sources.sort(key=lambda x: (x.get('category') or '', x.get('name') or ''))
+
+        self.by_schema_id: Dict[str, Dict[str, Any]] = {ds['schema_id']: ds for ds in self.data_sources}
+        self.by_id: Dict[str, Dict[str, Any]] = {ds['id']: ds for ds in self.data_sources}
+
+        # Fields grouped per data source, ordered like the original field_order/field_name query
+        self.fields_by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for row in fields:
+            field = dict(row)
+            if field.get('examples'):
+                field['examples'] = _parse_json(field['examples'])
+            self.fields_by_source.setdefault(field['data_source_id'], []).append(field)
+        for source_fields in self.fields_by_source.values():
+            source_fields.sort(key=lambda f: (f.get('field_order') or 0, f.get('field_name') or ''))
+
+        self.examples_by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for row in examples:
+            example = dict(row)
+            if example.get('parameters'):
+                example['parameters'] = _parse_json(example['parameters'])
+            self.examples_by_source.setdefault(example['data_source_id'], []).append(example)
+        for source_examples in self.examples_by_source.values():
+            source_examples.sort(key=lambda e: (e.get('example_order') or 0, e.get('title') or ''))
+
+        self.sections_by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for row in sections:
+            self.sections_by_source.setdefault(row['data_source_id'], []).append(dict(row))
+        for source_sections in self.sections_by_source.values():
+            source_sections.sort(key=lambda s: s.get('section_order') or 0)
+
+        # Relationships, with the joined source/target summaries PostgREST would embed
+        self.relationships_from: Dict[str, List[Dict[str, Any]]] = {}
+        self.relationships_to: Dict[str, List[Dict[str, Any]]] = {}
+        for row in relationships:
+            source = self.by_id.get(row['source_schema_id'])
+            target = self.by_id.get(row['target_schema_id'])
+            outgoing = dict(row)
+            outgoing['target'] = {'schema_id': target['schema_id'], 'name': target['name']} if target else None
+            incoming = dict(row)
+            incoming['source'] = {'schema_id': source['schema_id'], 'name': source['name']} if source else None
+            self.relationships_from.setdefault(row['source_schema_id'], []).append(outgoing)
+            self.relationships_to.setdefault(row['target_schema_id'], []).append(incoming)
+
+        self._precompute_metadata()
+        self._build_field_index()
+
+        self.categories: List[str] = sorted({ds['category'] for ds in self.data_sources if ds.get('category')})
+
+        tag_counts: Dict[str, int] = {}
+        for ds in self.data_sources:
+            for tag in ds.get('tags') or []:
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        self.tag_counts = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+
+        # Lazily built derived documents
+        self._ai_export: Optional[Dict[str, Any]] = None
+
+    def _precompute_metadata(self) -> None:
+        """Attach counts, capabilities, joinable sources and complexity to each data source"""
+        for item in self.data_sources:
+            ds_id = item['id']
+            source_fields = self.fields_by_source.get(ds_id, [])
+
+            dimension_count = sum(1 for f in source_fields if f.get('dimension_or_metric') == 'Dimension')
+            item['dimension_count'] = dimension_count
+            item['metric_count'] = len(source_fields) - dimension_count
+            item['field_count'] = len(source_fields)
+
+            capabilities: List[str] = []
+            for field in source_fields:
+                field_lower = (field.get('field_name') or '').lower()
+                for keywords, capability in AUDIENCE_CAPABILITY_KEYWORDS:
+                    if capability not in capabilities and any(k in field_lower for k in keywords):
+                        capabilities.append(capability)
+            item['audience_capabilities'] = capabilities[:4]  # Limit to 4 for display
+
+            joins = [r for r in self.relationships_from.get(ds_id, []) if r.get('relationship_type') == 'joins_with']
+            item['joinable_sources'] = [r['target'] for r in joins if r.get('target')][:5]
+            item['relationship_count'] = len(joins)
+
+            item['example_count'] = len(self.examples_by_source.get(ds_id, []))
+            item.update(_data_freshness(item))
+
+            if item['field_count'] < 20:
+                item['complexity'] = 'simple'
+            elif item['field_count'] < 50:
+                item['complexity'] = 'medium'
+            else:
+                item['complexity'] = 'complex'
+
+            # Lowercased haystack for in-memory data source search
+            item_tags = ' '.join(item.get('tags') or [])
+            item['_search_text'] = ' '.join([
+                item.get('name') or '', item.get('description') or '',
+                item.get('category') or '', item_tags
+            ]).lower()
+
+    def _build_field_index(self) -> None:
+        """Build the field search index: exact-name lookup plus lowercased haystacks"""
+        self.field_entries: List[Dict[str, Any]] = []
+        self.field_name_index: Dict[str, List[int]] = {}
+        self._field_haystacks: List[str] = []
+
+        for ds in self.data_sources:
+            for field in self.fields_by_source.get(ds['id'], []):
+                entry = dict(field)
+                entry['data_source'] = {
+                    'schema_id': ds['schema_id'],
+                    'name': ds['name'],
+                    'category': ds.get('category')
+                }
+                name_lower = (field.get('field_name') or '').lower()
+                position = len(self.field_entries)
+                self.field_entries.append(entry)
+                self.field_name_index.setdefault(name_lower, []).append(position)
+                self._field_haystacks.append(f"{name_lower}\n{(field.get('description') or '').lower()}")
+
+    def search_fields(self, search_term: str, limit: int) -> List[Dict[str, Any]]:
+        """Exact field-name matches first, then substring matches on name or description"""
+        term = search_term.lower()
+        positions = list(self.field_name_index.get(term, []))
+        seen = set(positions)
+        for position, haystack in enumerate(self._field_haystacks):
+            if len(positions) >= limit:
+                break
+            if position not in seen and term in haystack:
+                positions.append(position)
+        return _copies(self.field_entries[p] for p in positions[:limit])
+
+    def search_data_sources(self, search: str) -> List[Dict[str, Any]]:
+        """All-terms match over name, description, category and tags"""
+        terms = search.lower().split()
+        return [ds for ds in self.data_sources if all(t in ds['_search_text'] for t in terms)]
+
+    def complete_schema(self, schema_id: str) -> Optional[Dict[str, Any]]:
+        """Assemble the complete schema document for a data source"""
+        ds = self.by_schema_id.get(schema_id)
+        if not ds:
+            return None
+        return {
+            'schema': _public(ds),
+            'fields': _copies(self.fields_by_source.get(ds['id'], [])),
+            'examples': _copies(self.examples_by_source.get(ds['id'], [])),
+            'sections': _copies(self.sections_by_source.get(ds['id'], [])),
+            'relationships': {
+                'from': _copies(self.relationships_from.get(ds['id'], [])),
+                'to': _copies(self.relationships_to.get(ds['id'], []))
+            }
+        }
+
+    def ai_export(self) -> Dict[str, Any]:
+        """AI/LLM-oriented export of every schema, built once per snapshot"""
+        if self._ai_export is not None:
+            return self._ai_export
+
+        ai_export = {
+            'version': '1.0',
+            'catalog_version': self.version,
+            'generated_at': datetime.utcnow().isoformat(),
+            'total_schemas': len(self.data_sources),
+            'schemas': []
+        }
+
+        for schema in self.data_sources:
+            ai_schema = {
+                'id': schema['schema_id'],
+                'name': schema['name'],
+                'category': schema['category'],
+                'description': schema.get('description'),
+                'tables': schema.get('data_sources') or [],
+                'tags': schema.get('tags') or [],
+                'key_fields': [],
+                'metrics': [],
+                'dimensions': [],
+                'example_queries': [],
+                'use_cases': [],
+                'relationships': []
+            }
+
+            for field in self.fields_by_source.get(schema['id'], []):
+                field_info = {
+                    'name': field['field_name'],
+                    'type': field['data_type'],
+                    'description': field.get('description', '')
+                }
+                if field['dimension_or_metric'] == 'Metric':
+                    ai_schema['metrics'].append(field_info)
+                else:
+                    ai_schema['dimensions'].append(field_info)
+                if any(key in field['field_name'].lower() for key in ['id', 'key', 'name']):
+                    ai_schema['key_fields'].append(field['field_name'])
+
+            for example in self.examples_by_source.get(schema['id'], []):
+                ai_schema['example_queries'].append({
+                    'title': example['title'],
+                    'sql': example['sql_query'],
+                    'category': example.get('category', 'General')
+                })
+
+            for rel in self.relationships_from.get(schema['id'], []):
+                if rel.get('target'):
+                    ai_schema['relationships'].append({
+                        'type': rel['relationship_type'],
+                        'target': rel['target']['schema_id'],
+                        'direction': 'outgoing'
+                    })
+
+            ai_export['schemas'].append(ai_schema)
+
+        self._ai_export = ai_export
+        return ai_export
+
+
+def _public(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a snapshot row without internal keys, safe to hand to callers"""
+    return {k: copy.deepcopy(v) for k, v in item.items() if not k.startswith('_')}
+
+
+def _copies(rows: Any) -> List[Dict[str, Any]]:
+    """Deep copies of snapshot rows, so callers cannot change the shared snapshot"""
+    return [copy.deepcopy(row) for row in rows]
+
 
 class DataSourceService(SupabaseService):
     """Service for managing AMC data source schemas"""
+
+    # Shared by every DataSourceService instance in the process
+    _snapshot: Optional[CatalogSnapshot] = None
+    _snapshot_lock = threading.Lock()
+    _last_version_check: float = 0.0
+
+    # ========== Catalog snapshot ==========
+
+    def _fetch_catalog_version(self) -> Optional[int]:
+        """Read the catalog version stamp bumped by the schema importer"""
+        try:
+            result = self.client.table('amc_catalog_version').select('version').eq('id', 1).limit(1).execute()
+            if result.data:
+                return int(result.data[0]['version'])
+        except Exception as e:
+            logger.debug(f"Catalog version stamp unavailable: {e}")
+        return None
+
+    def _fetch_all(self, table: str, columns: str = '*') -> List[Dict[str, Any]]:
+        """Read every row of a catalog table, page by page"""
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            result = self.client.table(table).select(columns)\
+                .range(offset, offset + CATALOG_PAGE_SIZE - 1)\
+                .execute()
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < CATALOG_PAGE_SIZE:
+                return rows
+            offset += CATALOG_PAGE_SIZE
+
+    def _load_snapshot(self, version: Optional[int]) -> CatalogSnapshot:
+        """Load the full catalog from Supabase and precompute derived metadata"""
+        started = time.monotonic()
+        snapshot = CatalogSnapshot(
+            version=version,
+            data_sources=self._fetch_all('amc_data_sources'),
+            fields=self._fetch_all('amc_schema_fields'),
+            examples=self._fetch_all('amc_query_examples'),
+            sections=self._fetch_all('amc_schema_sections'),
+            relationships=self._fetch_all('amc_schema_relationships')
+        )
+        logger.info(
+            f"Loaded AMC catalog snapshot v{version}: {len(snapshot.data_sources)} data sources, "
+            f"{len(snapshot.field_entries)} fields in {(time.monotonic() - started) * 1000:.0f}ms"
+        )
+        return snapshot
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        """
+        Get the current catalog snapshot, reloading it if the version stamp changed
+        
+        The version stamp is checked at most every VERSION_CHECK_INTERVAL_SECONDS;
+        when no stamp exists the snapshot expires after SNAPSHOT_MAX_AGE_SECONDS.
+        """
+        cls = DataSourceService
+        snapshot = cls._snapshot
+        now = time.monotonic()
+
+        if snapshot is not None and now - cls._last_version_check < VERSION_CHECK_INTERVAL_SECONDS:
+            return snapshot
+
+        with cls._snapshot_lock:
+            snapshot = cls._snapshot
+            if snapshot is not None and now - cls._last_version_check < VERSION_CHECK_INTERVAL_SECONDS:
+                return snapshot
+
+            version = self._fetch_catalog_version()
+            cls._last_version_check = time.monotonic()
+
+            if snapshot is not None:
+                if version is not None and version == snapshot.version:
+                    return snapshot
+                if version is None and snapshot.version is None and now - snapshot.loaded_at < SNAPSHOT_MAX_AGE_SECONDS:
+                    return snapshot
+
+            cls._snapshot = self._load_snapshot(version)
+            return cls._snapshot
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Drop the in-memory catalog snapshot; the next call reloads it"""
+        with cls._snapshot_lock:
+            cls._snapshot = None
+            cls._last_version_check = 0.0
+
+    def get_catalog_etag(self) -> str:
+        """ETag identifying the catalog version responses were built from"""
+        return self.get_snapshot().etag
+
+    # ========== Catalog queries ==========
     
     def list_data_sources(
         self,
@@ -29,8 +417,8 @@ class DataSourceService(SupabaseService):
         
         Args:
             category: Filter by category
-            search: Search term for full-text search
-            tags: Filter by tags
+            search: Search term matched against name, description, category and tags
+            tags: Filter by tags (all must be present)
             limit: Maximum number of results
             offset: Pagination offset
             
@@ -38,182 +426,16 @@ class DataSourceService(SupabaseService):
             List of data sources with enhanced metadata for AMC
         """
         try:
-            query = self.client.table('amc_data_sources').select('*')
+            snapshot = self.get_snapshot()
+            items = snapshot.search_data_sources(search) if search else snapshot.data_sources
             
             if category:
-                query = query.eq('category', category)
+                items = [ds for ds in items if ds.get('category') == category]
             
             if tags:
-                # Filter by tags using JSONB containment
-                query = query.contains('tags', json.dumps(tags))
-            
-            if search:
-                # Use the search function for full-text search
-                result = self.client.rpc('search_amc_schemas', {'search_query': search}).execute()
-                if result.data:
-                    schema_ids = [r['schema_id'] for r in result.data]
-                    query = query.in_('schema_id', schema_ids)
-            
-            query = query.order('category').order('name')
-            query = query.range(offset, offset + limit - 1)
-            
-            result = query.execute()
-            
-            # Get field and example counts for each data source
-            for item in result.data:
-                # Parse JSON fields
-                if item.get('data_sources'):
-                    item['data_sources'] = json.loads(item['data_sources']) if isinstance(item['data_sources'], str) else item['data_sources']
-                if item.get('tags'):
-                    item['tags'] = json.loads(item['tags']) if isinstance(item['tags'], str) else item['tags']
-                if item.get('availability'):
-                    item['availability'] = json.loads(item['availability']) if isinstance(item['availability'], str) else item['availability']
-                
-            # Batch fetch counts and metadata for all data sources to avoid N+1 queries
-            if result.data:
-                data_source_ids = [item['id'] for item in result.data]
-                
-                # Get detailed field information including dimension/metric split
-                try:
-                    fields_result = self.client.table('amc_schema_fields')\
-                        .select('data_source_id, dimension_or_metric, field_name')\
-                        .in_('data_source_id', data_source_ids)\
-                        .execute()
-                    
-                    # Count dimensions and metrics per data source
-                    dimension_count_map = {}
-                    metric_count_map = {}
-                    audience_capabilities_map = {}
-                    
-                    if fields_result.data:
-                        for field in fields_result.data:
-                            ds_id = field['data_source_id']
-                            
-                            # Count by type
-                            if field['dimension_or_metric'] == 'Dimension':
-                                dimension_count_map[ds_id] = dimension_count_map.get(ds_id, 0) + 1
-                            else:  # Metric
-                                metric_count_map[ds_id] = metric_count_map.get(ds_id, 0) + 1
-                            
-                            # Determine audience capabilities based on field names
-                            if ds_id not in audience_capabilities_map:
-                                audience_capabilities_map[ds_id] = set()
-                            
-                            field_lower = field['field_name'].lower()
-                            if 'user_id' in field_lower or 'customer' in field_lower:
-                                audience_capabilities_map[ds_id].add('User Targeting')
-                            if 'conversion' in field_lower or 'purchase' in field_lower:
-                                audience_capabilities_map[ds_id].add('Purchase Behavior')
-                            if 'impression' in field_lower or 'view' in field_lower:
-                                audience_capabilities_map[ds_id].add('Ad Engagement')
-                            if 'cart' in field_lower or 'basket' in field_lower:
-                                audience_capabilities_map[ds_id].add('Cart Analysis')
-                            if 'click' in field_lower:
-                                audience_capabilities_map[ds_id].add('Click Behavior')
-                            if 'campaign' in field_lower:
-                                audience_capabilities_map[ds_id].add('Campaign Targeting')
-                                
-                except Exception as e:
-                    logger.warning(f"Failed to get field details: {e}")
-                    dimension_count_map = {}
-                    metric_count_map = {}
-                    audience_capabilities_map = {}
-                
-                # Get relationships to determine joinable sources
-                try:
-                    relationships_result = self.client.table('amc_schema_relationships')\
-                        .select('source_schema_id, target_schema_id, relationship_type, target:amc_data_sources!target_schema_id(schema_id, name)')\
-                        .in_('source_schema_id', data_source_ids)\
-                        .eq('relationship_type', 'joins_with')\
-                        .execute()
-                    
-                    joinable_sources_map = {}
-                    relationship_count_map = {}
-                    
-                    if relationships_result.data:
-                        for rel in relationships_result.data:
-                            source_id = rel['source_schema_id']
-                            
-                            # Count relationships
-                            relationship_count_map[source_id] = relationship_count_map.get(source_id, 0) + 1
-                            
-                            # Track joinable sources
-                            if source_id not in joinable_sources_map:
-                                joinable_sources_map[source_id] = []
-                            
-                            if rel.get('target') and len(joinable_sources_map[source_id]) < 5:
-                                joinable_sources_map[source_id].append({
-                                    'schema_id': rel['target']['schema_id'],
-                                    'name': rel['target']['name']
-                                })
-                                
-                except Exception as e:
-                    logger.warning(f"Failed to get relationships: {e}")
-                    joinable_sources_map = {}
-                    relationship_count_map = {}
-                
-                # Single query for all example counts
-                try:
-                    example_counts_result = self.client.table('amc_query_examples')\
-                        .select('data_source_id, id')\
-                        .in_('data_source_id', data_source_ids)\
-                        .execute()
-                    
-                    # Count examples per data source
-                    example_count_map = {}
-                    if example_counts_result.data:
-                        for example in example_counts_result.data:
-                            ds_id = example['data_source_id']
-                            example_count_map[ds_id] = example_count_map.get(ds_id, 0) + 1
-                except Exception as e:
-                    logger.warning(f"Failed to get example counts: {e}")
-                    example_count_map = {}
-                
-                # Apply all metadata to each data source
-                for item in result.data:
-                    data_source_id = item['id']
-                    
-                    # Set dimension and metric counts
-                    item['dimension_count'] = dimension_count_map.get(data_source_id, 0)
-                    item['metric_count'] = metric_count_map.get(data_source_id, 0)
-                    item['field_count'] = item['dimension_count'] + item['metric_count']
-                    
-                    # Set audience capabilities
-                    capabilities = audience_capabilities_map.get(data_source_id, set())
-                    item['audience_capabilities'] = list(capabilities)[:4]  # Limit to 4 for display
-                    
-                    # Set joinable sources
-                    item['joinable_sources'] = joinable_sources_map.get(data_source_id, [])
-                    item['relationship_count'] = relationship_count_map.get(data_source_id, 0)
-                    
-                    # Set example count with fallback
-                    item['example_count'] = example_count_map.get(data_source_id, 0)
-                    
-                    # Determine data freshness based on category
-                    # These are typical AMC data lags
-                    if 'real-time' in item.get('name', '').lower():
-                        item['data_lag_days'] = 0
-                        item['update_frequency'] = 'Real-time'
-                    elif item.get('category') == 'Conversion':
-                        item['data_lag_days'] = 14
-                        item['update_frequency'] = 'Daily'
-                    elif item.get('category') == 'Attribution':
-                        item['data_lag_days'] = 7
-                        item['update_frequency'] = 'Daily'
-                    else:
-                        item['data_lag_days'] = 14
-                        item['update_frequency'] = 'Daily'
-                    
-                    # Calculate complexity based on field count
-                    field_count = item['field_count']
-                    if field_count < 20:
-                        item['complexity'] = 'simple'
-                    elif field_count < 50:
-                        item['complexity'] = 'medium'
-                    else:
-                        item['complexity'] = 'complex'
-            
-            return result.data
+                items = [ds for ds in items if all(tag in (ds.get('tags') or []) for tag in tags)]
+            
+            return [_public(ds) for ds in items[offset:offset + limit]]
             
         except Exception as e:
             logger.error(f"Error listing data sources: {str(e)}")
@@ -230,20 +452,8 @@ class DataSourceService(SupabaseService):
             Data source details or None
         """
         try:
-            result = self.client.table('amc_data_sources').select('*').eq('schema_id', schema_id).single().execute()
-            
-            if result.data:
-                # Parse JSON fields
-                if result.data.get('data_sources'):
-                    result.data['data_sources'] = json.loads(result.data['data_sources']) if isinstance(result.data['data_sources'], str) else result.data['data_sources']
-                if result.data.get('tags'):
-                    result.data['tags'] = json.loads(result.data['tags']) if isinstance(result.data['tags'], str) else result.data['tags']
-                if result.data.get('availability'):
-                    result.data['availability'] = json.loads(result.data['availability']) if isinstance(result.data['availability'], str) else result.data['availability']
-                
-                return result.data
-            
-            return None
+            ds = self.get_snapshot().by_schema_id.get(schema_id)
+            return _public(ds) if ds else None
             
         except Exception as e:
             logger.error(f"Error getting data source {schema_id}: {str(e)}")
@@ -267,33 +477,20 @@ class DataSourceService(SupabaseService):
             List of fields
         """
         try:
-            # First get the data source ID
-            ds_result = self.client.table('amc_data_sources').select('id').eq('schema_id', schema_id).single().execute()
-            
-            if not ds_result.data:
+            snapshot = self.get_snapshot()
+            ds = snapshot.by_schema_id.get(schema_id)
+            if not ds:
                 return []
             
-            data_source_id = ds_result.data['id']
-            
-            # Query fields
-            query = self.client.table('amc_schema_fields').select('*').eq('data_source_id', data_source_id)
+            fields = snapshot.fields_by_source.get(ds['id'], [])
             
             if dimension_or_metric:
-                query = query.eq('dimension_or_metric', dimension_or_metric)
+                fields = [f for f in fields if f.get('dimension_or_metric') == dimension_or_metric]
             
             if aggregation_threshold:
-                query = query.eq('aggregation_threshold', aggregation_threshold)
-            
-            query = query.order('field_order').order('field_name')
-            
-            result = query.execute()
-            
-            # Parse JSON examples
-            for field in result.data:
-                if field.get('examples'):
-                    field['examples'] = json.loads(field['examples']) if isinstance(field['examples'], str) else field['examples']
+                fields = [f for f in fields if f.get('aggregation_threshold') == aggregation_threshold]
             
-            return result.data
+            return _copies(fields)
             
         except Exception as e:
             logger.error(f"Error getting fields for {schema_id}: {str(e)}")
@@ -315,30 +512,17 @@ class DataSourceService(SupabaseService):
             List of query examples
         """
         try:
-            # First get the data source ID
-            ds_result = self.client.table('amc_data_sources').select('id').eq('schema_id', schema_id).single().execute()
-            
-            if not ds_result.data:
+            snapshot = self.get_snapshot()
+            ds = snapshot.by_schema_id.get(schema_id)
+            if not ds:
                 return []
             
-            data_source_id = ds_result.data['id']
-            
-            # Query examples
-            query = self.client.table('amc_query_examples').select('*').eq('data_source_id', data_source_id)
+            examples = snapshot.examples_by_source.get(ds['id'], [])
             
             if category:
-                query = query.eq('category', category)
-            
-            query = query.order('example_order').order('title')
-            
-            result = query.execute()
+                examples = [e for e in examples if e.get('category') == category]
             
-            # Parse JSON parameters if present
-            for example in result.data:
-                if example.get('parameters'):
-                    example['parameters'] = json.loads(example['parameters']) if isinstance(example['parameters'], str) else example['parameters']
-            
-            return result.data
+            return _copies(examples)
             
         except Exception as e:
             logger.error(f"Error getting examples for {schema_id}: {str(e)}")
@@ -355,22 +539,12 @@ class DataSourceService(SupabaseService):
             List of sections
         """
         try:
-            # First get the data source ID
-            ds_result = self.client.table('amc_data_sources').select('id').eq('schema_id', schema_id).single().execute()
-            
-            if not ds_result.data:
+            snapshot = self.get_snapshot()
+            ds = snapshot.by_schema_id.get(schema_id)
+            if not ds:
                 return []
             
-            data_source_id = ds_result.data['id']
-            
-            # Query sections
-            result = self.client.table('amc_schema_sections')\
-                .select('*')\
-                .eq('data_source_id', data_source_id)\
-                .order('section_order')\
-                .execute()
-            
-            return result.data
+            return _copies(snapshot.sections_by_source.get(ds['id'], []))
             
         except Exception as e:
             logger.error(f"Error getting sections for {schema_id}: {str(e)}")
@@ -387,29 +561,14 @@ class DataSourceService(SupabaseService):
             Dictionary with 'from' and 'to' relationships
         """
         try:
-            # First get the data source ID
-            ds_result = self.client.table('amc_data_sources').select('id').eq('schema_id', schema_id).single().execute()
-            
-            if not ds_result.data:
+            snapshot = self.get_snapshot()
+            ds = snapshot.by_schema_id.get(schema_id)
+            if not ds:
                 return {'from': [], 'to': []}
             
-            data_source_id = ds_result.data['id']
-            
-            # Get relationships where this schema is the source
-            from_result = self.client.table('amc_schema_relationships')\
-                .select('*, target:amc_data_sources!target_schema_id(schema_id, name)')\
-                .eq('source_schema_id', data_source_id)\
-                .execute()
-            
-            # Get relationships where this schema is the target
-            to_result = self.client.table('amc_schema_relationships')\
-                .select('*, source:amc_data_sources!source_schema_id(schema_id, name)')\
-                .eq('target_schema_id', data_source_id)\
-                .execute()
-            
             return {
-                'from': from_result.data,
-                'to': to_result.data
+                'from': _copies(snapshot.relationships_from.get(ds['id'], [])),
+                'to': _copies(snapshot.relationships_to.get(ds['id'], []))
             }
             
         except Exception as e:
@@ -427,61 +586,10 @@ class DataSourceService(SupabaseService):
             Complete schema data or None
         """
         try:
-            # Try to use the database function for efficiency
-            try:
-                result = self.client.rpc('get_amc_schema_details', {'p_schema_id': schema_id}).execute()
-                
-                if result.data:
-                    # Parse JSON fields in the schema object if they're strings
-                    if 'schema' in result.data and result.data['schema']:
-                        schema_data = result.data['schema']
-                        if isinstance(schema_data.get('data_sources'), str):
-                            schema_data['data_sources'] = json.loads(schema_data['data_sources']) if schema_data['data_sources'] else []
-                        if isinstance(schema_data.get('tags'), str):
-                            schema_data['tags'] = json.loads(schema_data['tags']) if schema_data['tags'] else []
-                        if isinstance(schema_data.get('availability'), str):
-                            schema_data['availability'] = json.loads(schema_data['availability']) if schema_data['availability'] else None
-                    
-                    # Ensure all array fields are never None
-                    if 'fields' not in result.data or result.data['fields'] is None:
-                        result.data['fields'] = []
-                    if 'examples' not in result.data or result.data['examples'] is None:
-                        result.data['examples'] = []
-                    if 'sections' not in result.data or result.data['sections'] is None:
-                        result.data['sections'] = []
-                    if 'relationships' not in result.data or result.data['relationships'] is None:
-                        result.data['relationships'] = {'from': [], 'to': []}
-                    
-                    return result.data
-            except Exception as rpc_error:
-                logger.debug(f"RPC function not available, falling back to manual assembly: {rpc_error}")
-            
-            # Fallback to manual assembly if function doesn't exist
-            schema = self.get_data_source(schema_id)
-            if not schema:
-                return None
-            
-            # Ensure all fields return arrays even if empty
-            return {
-                'schema': schema,
-                'fields': self.get_schema_fields(schema_id) or [],
-                'examples': self.get_query_examples(schema_id) or [],
-                'sections': self.get_schema_sections(schema_id) or [],
-                'relationships': self.get_schema_relationships(schema_id) or {'from': [], 'to': []}
-            }
+            return self.get_snapshot().complete_schema(schema_id)
             
         except Exception as e:
             logger.error(f"Error getting complete schema for {schema_id}: {str(e)}")
-            # Return minimal valid structure instead of None
-            schema = self.get_data_source(schema_id)
-            if schema:
-                return {
-                    'schema': schema,
-                    'fields': [],
-                    'examples': [],
-                    'sections': [],
-                    'relationships': {'from': [], 'to': []}
-                }
             return None
     
     def search_fields(
@@ -500,14 +608,7 @@ class DataSourceService(SupabaseService):
             List of matching fields with their data source info
         """
         try:
-            # Search fields
-            result = self.client.table('amc_schema_fields')\
-                .select('*, data_source:amc_data_sources(schema_id, name, category)')\
-                .or_(f"field_name.ilike.%{search_term}%,description.ilike.%{search_term}%")\
-                .limit(limit)\
-                .execute()
-            
-            return result.data
+            return self.get_snapshot().search_fields(search_term, limit)
             
         except Exception as e:
             logger.error(f"Error searching fields: {str(e)}")
@@ -521,12 +622,7 @@ class DataSourceService(SupabaseService):
             List of category names
         """
         try:
-            result = self.client.table('amc_data_sources')\
-                .select('category')\
-                .execute()
-            
-            categories = list(set(item['category'] for item in result.data if item.get('category')))
-            return sorted(categories)
+            return list(self.get_snapshot().categories)
             
         except Exception as e:
             logger.error(f"Error getting categories: {str(e)}")
@@ -543,18 +639,8 @@ class DataSourceService(SupabaseService):
             List of tags with usage counts
         """
         try:
-            result = self.client.table('amc_data_sources').select('tags').execute()
-            
-            tag_counts = {}
-            for item in result.data:
-                if item.get('tags'):
-                    tags = json.loads(item['tags']) if isinstance(item['tags'], str) else item['tags']
-                    for tag in tags:
-                        tag_counts[tag] = tag_counts.get(tag, 0) + 1
-            
-            # Sort by count and return top tags
-            sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
-            return [{'tag': tag, 'count': count} for tag, count in sorted_tags[:limit]]
+            tag_counts = self.get_snapshot().tag_counts
+            return [{'tag': tag, 'count': count} for tag, count in tag_counts[:limit]]
             
         except Exception as e:
             logger.error(f"Error getting popular tags: {str(e)}")
@@ -568,74 +654,8 @@ class DataSourceService(SupabaseService):
             Dictionary with all schema data structured for AI
         """
         try:
-            schemas = self.list_data_sources(limit=1000)
-            
-            ai_export = {
-                'version': '1.0',
-                'generated_at': datetime.utcnow().isoformat(),
-                'total_schemas': len(schemas),
-                'schemas': []
-            }
-            
-            for schema in schemas:
-                schema_data = self.get_complete_schema(schema['schema_id'])
-                if schema_data:
-                    # Structure for AI understanding
-                    ai_schema = {
-                        'id': schema['schema_id'],
-                        'name': schema['name'],
-                        'category': schema['category'],
-                        'description': schema['description'],
-                        'tables': schema.get('data_sources', []),
-                        'tags': schema.get('tags', []),
-                        'key_fields': [],
-                        'metrics': [],
-                        'dimensions': [],
-                        'example_queries': [],
-                        'use_cases': [],
-                        'relationships': []
-                    }
-                    
-                    # Categorize fields
-                    if schema_data.get('fields'):
-                        for field in schema_data['fields']:
-                            field_info = {
-                                'name': field['field_name'],
-                                'type': field['data_type'],
-                                'description': field.get('description', '')
-                            }
-                            
-                            if field['dimension_or_metric'] == 'Metric':
-                                ai_schema['metrics'].append(field_info)
-                            else:
-                                ai_schema['dimensions'].append(field_info)
-                            
-                            # Identify key fields
-                            if any(key in field['field_name'].lower() for key in ['id', 'key', 'name']):
-                                ai_schema['key_fields'].append(field['field_name'])
-                    
-                    # Add examples
-                    if schema_data.get('examples'):
-                        for example in schema_data['examples']:
-                            ai_schema['example_queries'].append({
-                                'title': example['title'],
-                                'sql': example['sql_query'],
-                                'category': example.get('category', 'General')
-                            })
-                    
-                    # Add relationships
-                    if schema_data.get('relationships'):
-                        for rel in schema_data['relationships'].get('from', []):
-                            ai_schema['relationships'].append({
-                                'type': rel['relationship_type'],
-                                'target': rel['target']['schema_id'],
-                                'direction': 'outgoing'
-                            })
-                    
-                    ai_export['schemas'].append(ai_schema)
-            
-            return ai_export
+            return copy.deepcopy(self.get_snapshot().ai_export())
             
         except Exception as e:
             logger.error(f"Error exporting for AI: {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
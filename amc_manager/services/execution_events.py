@@ -0,0 +1,263 @@
+"""
+Execution Events
+Push channel for execution status transitions (served as SSE)
+
+Clients used to learn about execution progress by polling status endpoints,
+each of which could call AMC. Now status is polled once, in the background
+(execution_status_poller), and every transition is fanned out to the
+subscribed clients of its user, optionally narrowed to an instance or a
+single execution.
+
+Sources of events:
+
+- the poller publishes each status it reads to the hub of its own process
+- every write to workflow_executions.status/progress sends NOTIFY
+  execution_status (25_execution_status_events.sql); when DATABASE_URL points
+  at Postgres and asyncpg is installed, each process's hub LISTENs to it, so
+  API processes receive transitions polled by separate worker processes
+
+Further sources (e.g. Redis pub/sub) plug in with add_source(). The same
+transition can arrive from several sources; the hub forwards it once.
+Subscribers that fall behind lose their oldest events rather than blocking
+the publisher.
+"""
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+
+logger = get_logger(__name__)
+
+NOTIFY_CHANNEL = 'execution_status'
+
+# Fields of an event; user_id routes it and is not sent to clients
+EVENT_FIELDS = (
+    'execution_id', 'workflow_id', 'instance_id', 'instance_uuid', 'status', 'progress',
+    'row_count', 'error_message', 'started_at', 'completed_at', 'updated_at'
+)
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Executions whose last transition is remembered for de-duplication
+_MAX_TRACKED_EXECUTIONS = 10000
+
+EventSource = Callable[[Callable[[Dict[str, Any]], None]], Awaitable[None]]
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One client's view of the event stream"""
+
+    user_id: str
+    instance_id: Optional[str] = None
+    execution_id: Optional[str] = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(settings.execution_events_queue_size))
+    loop: asyncio.AbstractEventLoop = field(default_factory=asyncio.get_running_loop)
+    dropped: int = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if event.get('user_id') != self.user_id:
+            return False
+        if self.instance_id and self.instance_id not in (event.get('instance_id'), event.get('instance_uuid')):
+            return False
+        return not self.execution_id or self.execution_id == event.get('execution_id')
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """Queue an event, dropping the oldest one when the client is behind"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class ExecutionEventHub:
+    """In-process fan-out of execution status events to subscriptions"""
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._last: 'OrderedDict[str, Tuple]' = OrderedDict()  # execution_id -> last (status, progress)
+        self._sources: List[EventSource] = [self._listen_postgres]
+        self._tasks: List[asyncio.Task] = []
+        self._listening = False
+        self._counts = {'published': 0, 'duplicates': 0, 'delivered': 0}
+        # Guards the subscriptions, the last transitions and the counts:
+        # publish() is called from worker threads as well as the loop
+        self._lock = threading.Lock()
+
+    def add_source(self, source: EventSource) -> None:
+        """Add an event source: a coroutine function run with the hub's publish callback"""
+        self._sources.append(source)
+
+    async def start(self) -> None:
+        """Start the event sources (idempotent)"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(source(self.publish)) for source in self._sources]
+        logger.info(f"Execution event hub started with {len(self._tasks)} sources")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def subscribe(
+        self,
+        user_id: str,
+        instance_id: Optional[str] = None,
+        execution_id: Optional[str] = None
+    ) -> Subscription:
+        """Register a subscription on the running event loop"""
+        subscription = Subscription(user_id=user_id, instance_id=instance_id, execution_id=execution_id)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """
+        Forward a status event to the matching subscriptions
+
+        Safe to call from any thread. Returns the number of subscriptions it
+        was delivered to; 0 for a repeat of the execution's last transition.
+        """
+        execution_id = event.get('execution_id')
+        if not execution_id or not event.get('user_id'):
+            return 0
+
+        transition = (event.get('status'), event.get('progress'))
+        with self._lock:
+            if self._last.get(execution_id) == transition:
+                self._counts['duplicates'] += 1
+                return 0
+            self._last[execution_id] = transition
+            self._last.move_to_end(execution_id)
+            while len(self._last) > _MAX_TRACKED_EXECUTIONS:
+                self._last.popitem(last=False)
+            self._counts['published'] += 1
+            subscriptions = [s for s in self._subscriptions if s.matches(event)]
+
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Its event loop is closed; the stream is gone
+                self.unsubscribe(subscription)
+                continue
+            delivered += 1
+        with self._lock:
+            self._counts['delivered'] += delivered
+        return delivered
+
+    async def events(
+        self,
+        user_id: str,
+        instance_id: Optional[str] = None,
+        execution_id: Optional[str] = None,
+        heartbeat_seconds: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        stream() of a subscription made when iteration starts
+
+        A response that is never iterated (the client left before the body
+        was sent) then leaves no subscription behind.
+        """
+        subscription = self.subscribe(user_id, instance_id, execution_id)
+        try:
+            async for chunk in self.stream(subscription, heartbeat_seconds):
+                yield chunk
+        finally:
+            self.unsubscribe(subscription)
+
+    async def stream(self, subscription: Subscription, heartbeat_seconds: Optional[float] = None) -> AsyncIterator[str]:
+        """Server-sent events of a subscription, with keep-alive comments while idle"""
+        heartbeat_seconds = heartbeat_seconds or settings.execution_events_heartbeat_seconds
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            self.unsubscribe(subscription)
+
+    async def _listen_postgres(self, publish: Callable[[Dict[str, Any]], None]) -> None:
+        """LISTEN execution_status when a direct Postgres connection is available"""
+        if not settings.database_url:
+            return
+        try:
+            import asyncpg
+        except ImportError:
+            logger.info("asyncpg not installed; execution events come from this process's poller only")
+            return
+
+        def on_notify(connection, pid, channel, payload):
+            try:
+                publish(json.loads(payload))
+            except ValueError:
+                logger.warning(f"Ignoring malformed {NOTIFY_CHANNEL} payload")
+
+        while True:
+            try:
+                connection = await asyncpg.connect(settings.database_url)
+                try:
+                    await connection.add_listener(NOTIFY_CHANNEL, on_notify)
+                    self._listening = True
+                    while not connection.is_closed():
+                        await asyncio.sleep(settings.execution_events_heartbeat_seconds)
+                finally:
+                    self._listening = False
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"LISTEN {NOTIFY_CHANNEL} failed, retrying: {e}")
+                await asyncio.sleep(30)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Hub state for monitoring"""
+        with self._lock:
+            return {
+                'subscriptions': len(self._subscriptions),
+                'sources': len(self._sources),
+                'listening': self._listening,
+                **self._counts
+            }
+
+
+def status_event(status: Dict[str, Any], user_id: str, workflow_id: Optional[str] = None,
+                 instance_id: Optional[str] = None, instance_uuid: Optional[str] = None) -> Dict[str, Any]:
+    """Event for a status as returned by amc_execution_service"""
+    event = {key: status.get(key) for key in EVENT_FIELDS}
+    event.update({
+        'user_id': user_id,
+        'workflow_id': workflow_id or status.get('workflow_id'),
+        'instance_id': instance_id or status.get('instance_id'),
+        'instance_uuid': instance_uuid or status.get('instance_uuid'),
+        'updated_at': status.get('updated_at') or datetime.now(timezone.utc).isoformat()
+    })
+    return event
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """One `status` server-sent event (user_id is not sent)"""
+    data = {key: event.get(key) for key in EVENT_FIELDS}
+    event_id = f"{data['execution_id']}:{data['status']}:{data['progress']}"
+    return f"id: {event_id}\nevent: status\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+execution_event_hub = ExecutionEventHub()
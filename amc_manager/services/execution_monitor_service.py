@@ -6,10 +6,10 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from ..core.lazy import LazyService
 from ..core.supabase_client import SupabaseManager
 from .amc_api_client import AMCAPIClient
 from .token_service import TokenService
-from .snowflake_service import SnowflakeService
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +20,7 @@ class ExecutionMonitorService:
     def __init__(self):
         self.api_client = AMCAPIClient()
         self.token_service = TokenService()
+        from .snowflake_service import SnowflakeService
         self.snowflake_service = SnowflakeService()
         self.monitoring_tasks = {}
         
@@ -176,8 +177,8 @@ class ExecutionMonitorService:
                 self._update_execution_completed(execution_id, None, error_message="No results available")
                 return
                 
-            # Download and parse CSV
-            csv_response = self.api_client.download_and_parse_csv(urls[0])
+            # Download and parse CSV (every part of a multi-part result)
+            csv_response = self.api_client.download_and_parse_csv(urls)
             if not csv_response.get('success'):
                 logger.error(f"Failed to parse CSV: {csv_response.get('error')}")
                 self._update_execution_completed(execution_id, None, error_message="Failed to parse results")
@@ -201,6 +202,10 @@ class ExecutionMonitorService:
             # Store results in database
             self._update_execution_completed(execution_id, results)
             
+            # Roll the results into report aggregates
+            from .data_aggregation_service import data_aggregation_service
+            await data_aggregation_service.aggregate_completed_execution(execution_id, csv_response.get('data'))
+            
             # Upload to Snowflake if enabled
             await self._upload_to_snowflake_if_enabled(execution_id, results, user_id)
             
@@ -410,5 +415,5 @@ class ExecutionMonitorService:
                 logger.error(f"Failed to update attempt count: {update_error}")
 
 
-# Singleton instance
-execution_monitor_service = ExecutionMonitorService()
\ No newline at end of file
+# Singleton instance (built on first use)
+execution_monitor_service = LazyService(ExecutionMonitorService)
\ No newline at end of file
@@ -0,0 +1,449 @@
+"""
+Execution Reconciler
+Continuous, incremental reconciliation of AMC executions with workflow_executions
+
+scripts/reconcile_executions.py and /workflows/executions/cross-reference
+diff an instance's whole recent history on demand. This engine keeps AMC and
+the database in step in the background at a cost proportional to what
+changed:
+
+- each instance has a watermark (amc_reconciliation_state); a pass lists
+  only the AMC executions created since it, paging with nextToken
+- every page is matched to local rows with one query on amc_execution_id
+  (indexed), then classified in a dict lookup per execution
+- fixes are batched: executions AMC reports running but that are pending
+  locally are updated in one statement, and executions that finished on AMC
+  but are still active locally are polled together through status_refresh,
+  which stores their results or errors
+- the watermark moves to the oldest execution still unfinished (on AMC, or
+  locally after a failed fix), or past the newest one when everything is
+  settled, so an idle instance costs one short page per pass
+- an execution unfinished for longer than RECONCILE_MAX_HOLD_HOURS no longer
+  holds the watermark back (the status poller keeps following it)
+- a pass that reaches RECONCILE_MAX_PAGES saves its nextToken and the bounds
+  seen so far in the state's sweep_cursor; the next pass resumes the same
+  sweep there, and the watermark moves once the sweep reaches the last page
+
+Executions that exist on only one side and terminal statuses that disagree
+are counted and sampled in the state's drift for investigation; they are not
+changed automatically.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config.settings import settings
+from ..core.logger_simple import get_logger
+from .amc_api_client import AMCAPIClient
+from .db_service import DatabaseService, with_connection_retry
+from .status_refresh import status_refresh
+from .token_service import token_service
+
+logger = get_logger(__name__)
+
+# AMC execution status -> workflow_executions status
+AMC_STATUS_MAP = {
+    'PENDING': 'pending',
+    'RUNNING': 'running',
+    'SUCCEEDED': 'completed',
+    'FAILED': 'failed',
+    'CANCELLED': 'cancelled',
+}
+ACTIVE_STATUSES = ('pending', 'running')
+
+PAGE_SIZE = 100
+_SAMPLE_SIZE = 10  # drift examples kept per kind
+
+
+def amc_execution_id(execution: Dict[str, Any]) -> Optional[str]:
+    return execution.get('workflowExecutionId') or execution.get('executionId')
+
+
+def parse_amc_time(value: Any) -> Optional[datetime]:
+    """UTC datetime of an AMC or Postgres timestamp"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def format_amc_time(value: datetime) -> str:
+    """minCreationTime format (yyyy-MM-ddTHH:mm:ss, UTC)"""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def diff_page(
+    amc_executions: Sequence[Dict[str, Any]],
+    local_by_amc_id: Dict[str, Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Classify a page of AMC executions against their local rows
+
+    Returns:
+        'finished': local rows still active whose execution ended on AMC
+        'started': local rows pending while AMC runs them
+        'conflicts': executions ended on both sides with different statuses
+        'amc_only': AMC executions without a local row
+    """
+    drift = {'finished': [], 'started': [], 'conflicts': [], 'amc_only': []}
+    for execution in amc_executions:
+        execution_id = amc_execution_id(execution)
+        if not execution_id:
+            continue
+        amc_status = AMC_STATUS_MAP.get(str(execution.get('status', '')).upper())
+        local = local_by_amc_id.get(execution_id)
+        if local is None:
+            drift['amc_only'].append({'amc_execution_id': execution_id, 'amc_status': execution.get('status'),
+                                      'created_time': execution.get('createdTime')})
+        elif amc_status is None or amc_status == local['status']:
+            continue
+        elif local['status'] in ACTIVE_STATUSES:
+            if amc_status not in ACTIVE_STATUSES:
+                drift['finished'].append({**local, 'amc_status': amc_status})
+            elif amc_status == 'running':
+                drift['started'].append(local)
+        elif amc_status not in ACTIVE_STATUSES:
+            drift['conflicts'].append({'execution_id': local['execution_id'], 'amc_execution_id': execution_id,
+                                       'status': local['status'], 'amc_status': amc_status})
+    return drift
+
+
+def watermark_bounds(
+    amc_executions: Iterable[Dict[str, Any]],
+    unsettled: Iterable[str] = (),
+    hold_after: Optional[datetime] = None
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    (oldest creation time still unfinished, newest creation time) of amc_executions
+
+    Executions unfinished on AMC or in `unsettled` (AMC IDs whose fix failed)
+    count as unfinished, except those created before hold_after.
+    """
+    unsettled = set(unsettled)
+    oldest_unfinished, newest = None, None
+    for execution in amc_executions:
+        created_at = parse_amc_time(execution.get('createdTime'))
+        if created_at is None:
+            continue
+        newest = created_at if newest is None else max(newest, created_at)
+        status = AMC_STATUS_MAP.get(str(execution.get('status', '')).upper())
+        if status not in ACTIVE_STATUSES and amc_execution_id(execution) not in unsettled:
+            continue
+        if hold_after is None or created_at >= hold_after:
+            oldest_unfinished = created_at if oldest_unfinished is None else min(oldest_unfinished, created_at)
+    return oldest_unfinished, newest
+
+
+def advance_watermark(current: datetime, oldest_unfinished: Optional[datetime], newest: Optional[datetime]) -> datetime:
+    """The oldest unfinished execution holds the watermark; otherwise it moves to the newest one"""
+    if oldest_unfinished is not None:
+        return max(oldest_unfinished, current)
+    return max(newest or current, current)
+
+
+def next_watermark(
+    amc_executions: Iterable[Dict[str, Any]],
+    current: datetime,
+    unsettled: Iterable[str] = (),
+    hold_after: Optional[datetime] = None
+) -> datetime:
+    """
+    Watermark after a pass over amc_executions (all created at or after current)
+
+    The oldest execution that is unfinished on AMC or in `unsettled` holds the
+    watermark back, unless it was created before hold_after (stuck too long
+    to keep re-reading everything after it); otherwise the watermark moves to
+    the newest creation time seen.
+    """
+    return advance_watermark(current, *watermark_bounds(amc_executions, unsettled, hold_after))
+
+
+class ExecutionReconciler(DatabaseService):
+    """Background engine reconciling each instance's executions since its watermark"""
+
+    def __init__(self, api_client: Optional[AMCAPIClient] = None, refresher=status_refresh):
+        super().__init__()
+        self.api_client = api_client or AMCAPIClient()
+        self.refresher = refresher
+        self.interval_seconds = settings.reconcile_interval_minutes * 60
+        self.last_pass: Optional[Dict[str, Any]] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Reconcile every instance now and then every interval"""
+        if self._running:
+            logger.warning("Execution reconciler already running")
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._reconcile_loop())
+        logger.info("Execution reconciler started")
+
+    async def stop(self):
+        """Stop reconciling"""
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        logger.info("Execution reconciler stopped")
+
+    async def _reconcile_loop(self):
+        while self._running:
+            try:
+                await self.reconcile_all()
+            except Exception as e:
+                logger.error(f"Error in execution reconciliation: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def reconcile_all(self) -> Dict[str, Any]:
+        """One pass over every active instance"""
+        totals = {'instances': 0, 'scanned': 0, 'fixed': 0, 'failed': 0}
+        for instance in await asyncio.to_thread(self._get_instances):
+            try:
+                result = await self.reconcile_instance(instance)
+            except Exception as e:
+                totals['failed'] += 1
+                logger.error(f"Reconciliation of instance {instance.get('instance_id')} failed: {e}")
+                await asyncio.to_thread(self._record_error, instance['id'], str(e))
+                continue
+            totals['instances'] += 1
+            totals['scanned'] += result['scanned']
+            totals['fixed'] += result['fixed']
+
+        self.last_pass = {'finished_at': datetime.now(timezone.utc).isoformat(), **totals}
+        if totals['fixed'] or totals['failed']:
+            logger.info(f"Execution reconciliation: {totals}")
+        return self.last_pass
+
+    async def reconcile_instance(self, instance: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reconcile one instance's executions created since its watermark
+
+        Args:
+            instance: amc_instances row with its amc_accounts row
+        """
+        now = datetime.now(timezone.utc)
+        state = await asyncio.to_thread(self._get_state, instance['id'])
+        watermark = parse_amc_time(state.get('watermark')) if state else None
+        watermark = watermark or now - timedelta(hours=settings.reconcile_initial_lookback_hours)
+        # Where the previous pass stopped, when it did not reach the last page
+        cursor = (state or {}).get('sweep_cursor') or {}
+        resumed = bool(cursor.get('next_token'))
+
+        account = instance.get('amc_accounts') or {}
+        token = await token_service.get_valid_token(account.get('user_id'))
+        if not token:
+            return {'instance_id': instance['instance_id'], 'scanned': 0, 'fixed': 0, 'skipped': 'no valid token'}
+
+        seen: List[Dict[str, Any]] = []
+        drift = {'finished': [], 'started': [], 'conflicts': [], 'amc_only': []}
+        next_token = cursor.get('next_token')
+        truncated = True
+        for _ in range(settings.reconcile_max_pages):
+            response = await asyncio.to_thread(
+                self.api_client.list_executions,
+                instance_id=instance['instance_id'],
+                access_token=token,
+                entity_id=account.get('account_id'),
+                marketplace_id=account.get('marketplace_id') or 'ATVPDKIKX0DER',
+                limit=PAGE_SIZE,
+                next_token=next_token,
+                min_creation_time=format_amc_time(watermark)
+            )
+            if not response.get('success'):
+                if resumed and not seen:
+                    # The saved nextToken may have expired; start the sweep over next pass
+                    await asyncio.to_thread(self._update_state, instance['id'], {'sweep_cursor': None})
+                raise RuntimeError(response.get('error') or 'list_executions failed')
+
+            page = response.get('executions') or []
+            seen.extend(page)
+            local = await asyncio.to_thread(
+                self._get_local_executions, [amc_execution_id(e) for e in page if amc_execution_id(e)]
+            )
+            for kind, rows in diff_page(page, local).items():
+                drift[kind].extend(rows)
+
+            next_token = response.get('nextToken')
+            if not next_token:
+                truncated = False
+                break
+
+        # Batched fixes: one update for started executions, concurrent polls for finished ones
+        fixed = await asyncio.to_thread(self._mark_running, [row['id'] for row in drift['started']])
+        unsettled = []
+        by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for row in drift['finished']:
+            by_user.setdefault(row['user_id'], []).append(row)
+        for user_id, rows in by_user.items():
+            results = await self.refresher.refresh_many(
+                [(row['execution_id'], instance['instance_id']) for row in rows], user_id, max_age=0
+            )
+            for row in rows:
+                result = results.get(row['execution_id'])
+                if isinstance(result, dict) and result.get('status') not in ACTIVE_STATUSES:
+                    fixed += 1
+                else:
+                    unsettled.append(row['amc_execution_id'])
+
+        # Local executions AMC did not list, when this pass saw the whole sweep
+        missing = []
+        if not resumed and not truncated:
+            seen_ids = {amc_execution_id(e) for e in seen}
+            active = await asyncio.to_thread(self._get_active_local_executions, instance['id'], watermark)
+            missing = [row for row in active
+                       if row.get('amc_execution_id') and row['amc_execution_id'] not in seen_ids]
+
+        # Bounds of this pass, combined with those of earlier passes of the same sweep
+        hold_after = now - timedelta(hours=settings.reconcile_max_hold_hours)
+        oldest_unfinished, newest = watermark_bounds(seen, unsettled, hold_after)
+        carried_unfinished = parse_amc_time(cursor.get('oldest_unfinished'))
+        carried_newest = parse_amc_time(cursor.get('newest'))
+        if carried_unfinished and (oldest_unfinished is None or carried_unfinished < oldest_unfinished):
+            oldest_unfinished = carried_unfinished
+        if carried_newest and (newest is None or carried_newest > newest):
+            newest = carried_newest
+
+        summary = {
+            'finished': len(drift['finished']),
+            'started': len(drift['started']),
+            'conflicts': len(drift['conflicts']),
+            'amc_only': len(drift['amc_only']),
+            'missing_in_amc': len(missing),
+            'unsettled': len(unsettled),
+            'truncated': truncated,
+            'resumed': resumed,
+            'samples': {
+                'conflicts': drift['conflicts'][:_SAMPLE_SIZE],
+                'amc_only': drift['amc_only'][:_SAMPLE_SIZE],
+                'missing_in_amc': [row['execution_id'] for row in missing[:_SAMPLE_SIZE]],
+            }
+        }
+        # A truncated sweep has not seen everything since the watermark: keep
+        # it, and continue from the next page on the next pass
+        if truncated:
+            new_watermark = watermark
+            sweep_cursor = {
+                'next_token': next_token,
+                'oldest_unfinished': oldest_unfinished.isoformat() if oldest_unfinished else None,
+                'newest': newest.isoformat() if newest else None,
+            }
+        else:
+            new_watermark = advance_watermark(watermark, oldest_unfinished, newest)
+            sweep_cursor = None
+        await asyncio.to_thread(self._save_state, instance['id'], {
+            'watermark': new_watermark.isoformat(),
+            'sweep_cursor': sweep_cursor,
+            'last_run_at': now.isoformat(),
+            'last_error': None,
+            'scanned': len(seen),
+            'drift': summary,
+            'fixed_total': (state or {}).get('fixed_total', 0) + fixed,
+            'updated_at': now.isoformat()
+        })
+        if truncated:
+            logger.info(f"Reconciliation of {instance['instance_id']} read {len(seen)} executions "
+                        f"without reaching the end; the next pass continues from there")
+        return {'instance_id': instance['instance_id'], 'scanned': len(seen), 'fixed': fixed, 'drift': summary}
+
+    # ========== Database Operations ==========
+
+    @with_connection_retry
+    def _get_instances(self) -> List[Dict[str, Any]]:
+        response = self.client.table('amc_instances')\
+            .select('id, instance_id, amc_accounts(account_id, marketplace_id, user_id)')\
+            .eq('status', 'active')\
+            .execute()
+        return response.data or []
+
+    @with_connection_retry
+    def _get_state(self, instance_uuid: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table('amc_reconciliation_state')\
+            .select('*')\
+            .eq('instance_id', instance_uuid)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    @with_connection_retry
+    def _save_state(self, instance_uuid: str, state: Dict[str, Any]) -> None:
+        self.client.table('amc_reconciliation_state')\
+            .upsert({'instance_id': instance_uuid, **state}, on_conflict='instance_id')\
+            .execute()
+
+    @with_connection_retry
+    def _update_state(self, instance_uuid: str, fields: Dict[str, Any]) -> None:
+        self.client.table('amc_reconciliation_state')\
+            .update(fields)\
+            .eq('instance_id', instance_uuid)\
+            .execute()
+
+    def _record_error(self, instance_uuid: str, error: str) -> None:
+        try:
+            self.client.table('amc_reconciliation_state')\
+                .update({'last_error': error[:1000], 'last_run_at': datetime.now(timezone.utc).isoformat()})\
+                .eq('instance_id', instance_uuid)\
+                .execute()
+        except Exception as e:
+            logger.error(f"Error recording reconciliation failure: {e}")
+
+    @with_connection_retry
+    def _get_local_executions(self, amc_execution_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Local rows of a page of AMC executions, by amc_execution_id"""
+        if not amc_execution_ids:
+            return {}
+        response = self.client.table('workflow_executions')\
+            .select('id, execution_id, amc_execution_id, status, workflows!inner(user_id)')\
+            .in_('amc_execution_id', amc_execution_ids)\
+            .execute()
+        return {
+            row['amc_execution_id']: {
+                'id': row['id'],
+                'execution_id': row['execution_id'],
+                'amc_execution_id': row['amc_execution_id'],
+                'status': row['status'],
+                'user_id': (row.get('workflows') or {}).get('user_id')
+            }
+            for row in response.data or []
+        }
+
+    @with_connection_retry
+    def _get_active_local_executions(self, instance_uuid: str, since: datetime) -> List[Dict[str, Any]]:
+        """Pending/running executions of an instance started since a time"""
+        response = self.client.table('workflow_executions')\
+            .select('execution_id, amc_execution_id, workflows!inner(instance_id)')\
+            .eq('workflows.instance_id', instance_uuid)\
+            .in_('status', list(ACTIVE_STATUSES))\
+            .gte('started_at', since.isoformat())\
+            .execute()
+        return response.data or []
+
+    @with_connection_retry
+    def _mark_running(self, execution_uuids: List[str]) -> int:
+        if not execution_uuids:
+            return 0
+        response = self.client.table('workflow_executions')\
+            .update({'status': 'running'})\
+            .in_('id', execution_uuids)\
+            .eq('status', 'pending')\
+            .execute()
+        # Rows another process moved on meanwhile are not counted
+        return len(response.data or [])
+
+    def get_state(self) -> Dict[str, Any]:
+        """Engine state for monitoring"""
+        return {'running': self._running, 'interval_seconds': self.interval_seconds, 'last_pass': self.last_pass}
+
+
+execution_reconciler = ExecutionReconciler()
@@ -0,0 +1,373 @@
+"""
+Execution Results Service
+Paginated, projected, sorted and filtered access to stored execution results
+
+Unfiltered pages are sliced inside Postgres by the get_execution_result_page
+function (migration 19), so opening an execution only transfers one page.
+Sorted or filtered views fall back to loading the stored rows once and applying
+the query in Python. Totals come from the stored result metadata.
+"""
+
+import base64
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .db_service import DatabaseService, with_connection_retry
+from ..core.logger_simple import get_logger
+
+logger = get_logger(__name__)
+
+# Hard cap on page size, regardless of what the client asks for
+MAX_PAGE_SIZE = 10000
+
+FILTER_OPERATORS = ('eq', 'ne', 'gt', 'gte', 'lt', 'lte', 'contains', 'in')
+
+
+@dataclass
+class ResultQuery:
+    """Page, projection, sort and filter options for a results request"""
+    offset: int = 0
+    limit: Optional[int] = None
+    columns: Optional[List[str]] = None
+    sort: List[Tuple[str, bool]] = field(default_factory=list)  # (column, descending)
+    filters: List[Tuple[str, str, str]] = field(default_factory=list)  # (column, operator, value)
+
+    @property
+    def is_simple(self) -> bool:
+        """True when the page can be sliced without looking at row values"""
+        return not self.sort and not self.filters
+
+    @classmethod
+    def from_params(
+        cls,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        columns: Optional[str] = None,
+        sort: Optional[str] = None,
+        filters: Optional[List[str]] = None
+    ) -> 'ResultQuery':
+        """
+        Build a query from API parameters
+
+        Args:
+            offset: Row offset (ignored when a cursor is given)
+            limit: Page size; None returns all rows
+            cursor: Opaque cursor from a previous page's next_cursor
+            columns: Comma-separated column projection
+            sort: Comma-separated sort keys, '-' prefix for descending
+            filters: 'column:operator:value' expressions
+
+        Raises:
+            ValueError: On malformed cursor, sort or filter expressions
+        """
+        if cursor:
+            offset = decode_cursor(cursor)
+
+        sort_keys = []
+        for key in (sort or '').split(','):
+            key = key.strip()
+            if key:
+                sort_keys.append((key[1:], True) if key.startswith('-') else (key, False))
+
+        parsed_filters = []
+        for expression in filters or []:
+            parts = expression.split(':', 2)
+            if len(parts) != 3 or parts[1] not in FILTER_OPERATORS:
+                raise ValueError(
+                    f"Invalid filter '{expression}', expected column:operator:value "
+                    f"with operator in {', '.join(FILTER_OPERATORS)}"
+                )
+            parsed_filters.append((parts[0], parts[1], parts[2]))
+
+        projection = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+
+        return cls(
+            offset=max(offset, 0),
+            limit=min(limit, MAX_PAGE_SIZE) if limit is not None else None,
+            columns=projection,
+            sort=sort_keys,
+            filters=parsed_filters
+        )
+
+
+def encode_cursor(offset: int) -> str:
+    """Opaque cursor for the page starting at offset"""
+    return base64.urlsafe_b64encode(json.dumps({'o': offset}).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Offset encoded in a cursor"""
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))['o'])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _column_names(columns: List[Any]) -> List[str]:
+    return [c['name'] if isinstance(c, dict) else str(c) for c in columns or []]
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    """Numbers before strings, missing values last"""
+    if value is None or value == '':
+        return (2, '')
+    number = _as_number(value)
+    if number is not None:
+        return (0, number)
+    return (1, str(value).lower())
+
+
+def _matches(value: Any, operator: str, expected: str) -> bool:
+    if operator == 'contains':
+        return value is not None and expected.lower() in str(value).lower()
+    if operator == 'in':
+        return value is not None and str(value) in expected.split('|')
+
+    left, right = _as_number(value), _as_number(expected)
+    if left is None or right is None:
+        left, right = ('' if value is None else str(value)), expected
+
+    if operator == 'eq':
+        return left == right
+    if operator == 'ne':
+        return left != right
+    if operator == 'gt':
+        return left > right
+    if operator == 'gte':
+        return left >= right
+    if operator == 'lt':
+        return left < right
+    return left <= right
+
+
+def apply_result_query(
+    columns: List[Any],
+    rows: List[Any],
+    query: ResultQuery,
+    total_rows: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Apply filter, sort, pagination and projection to in-memory result rows
+
+    Rows may be positional lists (matching `columns`) or dicts keyed by column name;
+    the output keeps the input row shape.
+
+    Args:
+        columns: Result column metadata (dicts with 'name') or names
+        rows: Result rows
+        query: Query options
+        total_rows: Stored row count to report for unfiltered results
+
+    Returns:
+        Page dict with columns, rows, offset, limit, total_rows and next_cursor
+    """
+    names = _column_names(columns)
+    positions = {name: i for i, name in enumerate(names)}
+
+    def getter(column: str):
+        if column not in positions and rows and not isinstance(rows[0], dict):
+            raise ValueError(f"Unknown column '{column}'")
+        index = positions.get(column)
+        return lambda row: row.get(column) if isinstance(row, dict) else (
+            row[index] if index is not None and index < len(row) else None
+        )
+
+    selected = rows
+    for column, operator, expected in query.filters:
+        get = getter(column)
+        selected = [row for row in selected if _matches(get(row), operator, expected)]
+
+    # Stable multi-key sort: apply keys from last to first
+    if query.sort:
+        selected = list(selected)
+        for column, descending in reversed(query.sort):
+            get = getter(column)
+            selected.sort(key=lambda row: _sort_key(get(row)), reverse=descending)
+
+    matched = len(selected)
+    end = matched if query.limit is None else query.offset + query.limit
+    page = selected[query.offset:end]
+
+    return _build_page(columns, page, query, matched if query.filters or total_rows is None else total_rows)
+
+
+def _build_page(columns: List[Any], page: List[Any], query: ResultQuery, total_rows: int) -> Dict[str, Any]:
+    """Project the page and attach pagination metadata"""
+    names = _column_names(columns)
+    out_columns = columns or []
+    if query.columns:
+        unknown = [c for c in query.columns if c not in names]
+        if unknown and names:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+        indexes = [names.index(c) for c in query.columns if c in names]
+        out_columns = [columns[i] for i in indexes] if columns else [{'name': c} for c in query.columns]
+        page = [
+            {c: row.get(c) for c in query.columns} if isinstance(row, dict)
+            else [row[i] if i < len(row) else None for i in indexes]
+            for row in page
+        ]
+
+    next_offset = query.offset + len(page)
+    has_more = query.limit is not None and next_offset < total_rows
+    return {
+        'columns': out_columns,
+        'rows': page,
+        'offset': query.offset,
+        'limit': query.limit,
+        'total_rows': total_rows,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(next_offset) if has_more else None
+    }
+
+
+def iter_ndjson(page: Dict[str, Any]) -> Iterator[bytes]:
+    """Stream a page as NDJSON: one metadata line, then one object per row"""
+    meta = {k: v for k, v in page.items() if k != 'rows'}
+    yield (json.dumps({'meta': meta}, default=str) + '\n').encode('utf-8')
+    for record in rows_as_records(page):
+        yield (json.dumps(record, default=str) + '\n').encode('utf-8')
+
+
+def rows_as_records(page: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Page rows as dicts keyed by column name"""
+    names = _column_names(page['columns'])
+    return [row if isinstance(row, dict) else dict(zip(names, row)) for row in page['rows']]
+
+
+def to_arrow_ipc(page: Dict[str, Any]) -> bytes:
+    """Serialize a page as an Arrow IPC stream (string columns, nulls preserved)"""
+    import pyarrow as pa
+
+    names = _column_names(page['columns'])
+    if not names and page['rows'] and isinstance(page['rows'][0], dict):
+        names = list(page['rows'][0].keys())
+
+    arrays = []
+    for i, name in enumerate(names):
+        values = [row.get(name) if isinstance(row, dict) else (row[i] if i < len(row) else None)
+                  for row in page['rows']]
+        arrays.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+
+    table = pa.Table.from_arrays(arrays, names=names)
+    metadata = {b'total_rows': str(page['total_rows']).encode(), b'offset': str(page['offset']).encode()}
+    table = table.replace_schema_metadata(metadata)
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class ExecutionResultsService(DatabaseService):
+    """Reads stored execution results page by page"""
+
+    RESULT_METADATA_COLUMNS = (
+        'id, execution_id, status, result_columns, result_total_rows, result_sample_size, '
+        'query_runtime_seconds, data_scanned_gb, cost_estimate_usd, workflows!inner(user_id)'
+    )
+
+    @with_connection_retry
+    def get_result_metadata(self, execution_id: str, id_column: str = 'execution_id') -> Optional[Dict[str, Any]]:
+        """Execution result metadata without the rows themselves (id_column: execution_id or amc_execution_id)"""
+        response = self.client.table('workflow_executions')\
+            .select(self.RESULT_METADATA_COLUMNS)\
+            .eq(id_column, execution_id)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    @with_connection_retry
+    def _fetch_all_rows(self, execution_id: str) -> List[Any]:
+        response = self.client.table('workflow_executions')\
+            .select('result_rows')\
+            .eq('execution_id', execution_id)\
+            .limit(1)\
+            .execute()
+        return (response.data[0].get('result_rows') if response.data else None) or []
+
+    def _fetch_row_slice(self, execution_id: str, offset: int, limit: int) -> Optional[List[Any]]:
+        """Slice result_rows inside Postgres; None when the function is unavailable"""
+        try:
+            response = self.client.rpc('get_execution_result_page', {
+                'p_execution_id': execution_id,
+                'p_offset': offset,
+                'p_limit': limit
+            }).execute()
+            return response.data or []
+        except Exception as e:
+            logger.debug(f"Server-side result paging unavailable, loading all rows: {e}")
+            return None
+
+    def get_results_page(
+        self,
+        execution_id: str,
+        user_id: Optional[str],
+        query: ResultQuery,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get one page of a completed execution's stored results
+
+        Args:
+            execution_id: Internal execution ID (exec_*)
+            user_id: Requesting user, must own the workflow; None when access was checked by the caller
+            query: Page/projection/sort/filter options
+            metadata: Already-fetched result metadata, to skip the lookup
+
+        Returns:
+            Page dict, or None when not found, not owned or not completed
+
+        Raises:
+            ValueError: On invalid columns in the query
+        """
+        metadata = metadata or self.get_result_metadata(execution_id)
+        if not metadata:
+            return None
+        if user_id is not None and (metadata.get('workflows') or {}).get('user_id') != user_id:
+            return None
+        if metadata.get('status') != 'completed':
+            return None
+
+        columns = metadata.get('result_columns') or []
+        stored_total = metadata.get('result_total_rows')
+
+        # Internal execution ID, which get_execution_result_page and the row lookup key on
+        execution_id = metadata.get('execution_id') or execution_id
+
+        rows = None
+        if query.is_simple and query.limit is not None:
+            rows = self._fetch_row_slice(execution_id, query.offset, query.limit)
+
+        if rows is not None:
+            if stored_total is None:
+                stored_total = query.offset + len(rows) + (1 if len(rows) == query.limit else 0)
+            page = _build_page(columns, rows, query, stored_total)
+        else:
+            all_rows = self._fetch_all_rows(execution_id)
+            page = apply_result_query(
+                columns, all_rows, query,
+                total_rows=stored_total if stored_total is not None else len(all_rows)
+            )
+
+        page['sample_size'] = metadata.get('result_sample_size', 0)
+        page['execution_details'] = {
+            'query_runtime_seconds': metadata.get('query_runtime_seconds'),
+            'data_scanned_gb': metadata.get('data_scanned_gb'),
+            'cost_estimate_usd': metadata.get('cost_estimate_usd')
+        }
+        return page
+
+
+execution_results_service = ExecutionResultsService()
@@ -4,13 +4,23 @@ Background service to poll AMC execution statuses
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Set
+from typing import Any, Dict, List, Optional, Set
 
+from ..config import settings
+from ..core.metrics import POLL_CYCLE_SECONDS, QUEUE_DEPTH
 from ..core.supabase_client import SupabaseManager
-from .amc_execution_service import amc_execution_service
+from .execution_events import execution_event_hub, status_event
+from .job_queue import EXECUTION_STATUS_QUEUE, Job, RetryLater, job_runner
+from .status_refresh import status_refresh
+from .worker_coordinator import worker_coordinator
 
 logger = logging.getLogger(__name__)
 
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Running report weeks settled per cycle; the rest follow on later cycles
+SETTLE_BATCH_SIZE = 100
+
 
 class ExecutionStatusPoller:
     """Service to poll pending/running executions and update their status"""
@@ -52,88 +62,100 @@ class ExecutionStatusPoller:
         """Main polling loop"""
         while self.is_running:
             try:
-                await self._poll_executions()
+                with POLL_CYCLE_SECONDS.labels('execution_status_poller').time():
+                    if job_runner.active:
+                        # Executions are polled by execution_status jobs; this only
+                        # catches executions whose job was never enqueued
+                        await self._enqueue_executions()
+                    else:
+                        await self._poll_executions()
             except Exception as e:
                 logger.error(f"Error in polling loop: {e}")
             
             # Wait before next poll
-            await asyncio.sleep(self.poll_interval)
-            
+            await asyncio.sleep(settings.job_queue_sweep_seconds if job_runner.active else self.poll_interval)
+    
+    def _active_executions(self, client, execution_uuid: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Pending/running executions started in the last 2 hours (older ones are not polled)"""
+        cutoff_time = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+        
+        query = client.table('workflow_executions')\
+            .select('id, execution_id, amc_execution_id, workflow_id, progress')\
+            .in_('status', ['pending', 'running'])\
+            .gte('started_at', cutoff_time)
+        if execution_uuid:
+            query = query.eq('id', execution_uuid)
+        return query.execute().data or []
+    
+    async def enqueue(self, execution_uuid: str, delay_seconds: float = 0):
+        """Queue a status poll for an execution (no-op if one is already queued)"""
+        await job_runner.enqueue(
+            EXECUTION_STATUS_QUEUE,
+            {'execution_uuid': execution_uuid},
+            job_key=execution_uuid,
+            delay_seconds=delay_seconds
+        )
+    
+    async def _enqueue_executions(self):
+        """Make sure every active execution has a status job"""
+        client = SupabaseManager.get_client(use_service_role=True)
+        for execution in self._active_executions(client):
+            if execution.get('amc_execution_id') and worker_coordinator.owns(execution['id']):
+                await self.enqueue(execution['id'])
+    
+    async def handle_job(self, job: Job):
+        """execution_status job: poll AMC once and snooze until the execution finishes"""
+        client = SupabaseManager.get_client(use_service_role=True)
+        executions = self._active_executions(client, job.payload['execution_uuid'])
+        if not executions:
+            # Too old to keep polling, or finished by the execution monitor first;
+            # a finished execution still owes its report week the final status
+            finished = client.table('workflow_executions')\
+                .select('id, execution_id, status, row_count, error_message')\
+                .eq('id', job.payload['execution_uuid'])\
+                .in_('status', list(TERMINAL_STATUSES))\
+                .execute()
+            for execution in finished.data or []:
+                await self._update_report_week_status(
+                    execution['id'], execution['execution_id'], execution['status'],
+                    {k: v for k, v in execution.items() if v is not None}
+                )
+            return
+        
+        status = await self._poll_one(client, executions[0])
+        if not status or status.get('status') not in TERMINAL_STATUSES:
+            raise RetryLater(self.poll_interval)
+    
     async def _poll_executions(self):
         """Poll all pending/running executions"""
         try:
             client = SupabaseManager.get_client(use_service_role=True)
             
-            # Get executions that need status updates
-            # Only get executions from the last 2 hours to avoid polling old ones
-            cutoff_time = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+            # Weeks whose execution another component finished still need its status
+            await self._settle_report_weeks(client)
             
-            response = client.table('workflow_executions')\
-                .select('id, execution_id, amc_execution_id, workflow_id, progress')\
-                .in_('status', ['pending', 'running'])\
-                .gte('started_at', cutoff_time)\
-                .execute()
+            # Get executions that need status updates
+            executions = self._active_executions(client)
+            QUEUE_DEPTH.labels('execution_status_poller').set(len(executions))
             
-            if not response.data:
+            if not executions:
                 return
             
-            logger.info(f"Found {len(response.data)} executions to poll")
+            logger.info(f"Found {len(executions)} executions to poll")
             
-            for execution in response.data:
-                execution_uuid = execution['id']  # Internal UUID for database relations
+            for execution in executions:
                 execution_id = execution['execution_id']  # Human-readable ID
-                amc_execution_id = execution.get('amc_execution_id')
                 
-                if not amc_execution_id:
+                if not execution.get('amc_execution_id'):
                     logger.debug(f"Skipping {execution_id} - no AMC execution ID yet")
                     continue
                 
-                # Get workflow info to find instance and user
-                workflow_response = client.table('workflows')\
-                    .select('instance_id, user_id')\
-                    .eq('id', execution['workflow_id'])\
-                    .single()\
-                    .execute()
-                
-                if not workflow_response.data:
-                    logger.warning(f"Workflow not found for execution {execution_id}")
-                    continue
-                
-                # Get instance info
-                instance_response = client.table('amc_instances')\
-                    .select('instance_id')\
-                    .eq('id', workflow_response.data['instance_id'])\
-                    .single()\
-                    .execute()
-                
-                if not instance_response.data:
-                    logger.warning(f"Instance not found for execution {execution_id}")
+                # Another worker polls this execution
+                if not worker_coordinator.owns(execution['id']):
                     continue
                 
-                # Poll AMC for status update
                 try:
-                    logger.info(f"Polling status for execution {execution_id} (AMC: {amc_execution_id})")
-                    
-                    # Use the amc_execution_service to poll and update
-                    user_id = workflow_response.data.get('user_id')
-                    status = await amc_execution_service.poll_and_update_execution(
-                        execution_id=execution_id,
-                        user_id=user_id
-                    )
-                    
-                    if status:
-                        current_status = status.get('status', 'unknown')
-                        progress = status.get('progress', 0)
-                        logger.info(f"Execution {execution_id}: status={current_status}, progress={progress}%")
-                        
-                        # Update report_data_weeks if this execution is part of a collection
-                        if current_status in ['completed', 'failed', 'cancelled']:
-                            self._processed_executions.add(execution_id)
-                            
-                            # Check if this execution is linked to a report_data_weeks record
-                            # Pass both the UUID and the execution_id
-                            await self._update_report_week_status(execution_uuid, execution_id, current_status, status)
-                    
+                    await self._poll_one(client, execution)
                 except Exception as e:
                     logger.error(f"Error polling execution {execution_id}: {e}")
                     
@@ -143,6 +165,98 @@ class ExecutionStatusPoller:
         except Exception as e:
             logger.error(f"Error in poll_executions: {e}")
     
+    async def _settle_report_weeks(self, client):
+        """Give running report weeks the final status of executions finished elsewhere
+        
+        The execution monitor also completes executions; when it gets there
+        before this poller, the poller never sees the final status (as in
+        handle_job, a finished execution still owes its week the status).
+        The join and the terminal-status filter run server-side, and only one
+        bounded batch is read per cycle: settled weeks leave 'running', so the
+        next cycle picks up where this one stopped.
+        """
+        weeks = client.table('report_data_weeks')\
+            .select('id, workflow_executions!execution_id!inner(id, execution_id, status, row_count, error_message)')\
+            .eq('status', 'running')\
+            .in_('workflow_executions.status', list(TERMINAL_STATUSES))\
+            .limit(SETTLE_BATCH_SIZE)\
+            .execute()
+        for week in weeks.data or []:
+            execution = week['workflow_executions']
+            if worker_coordinator.owns(execution['id']):
+                await self._update_report_week_status(
+                    execution['id'], execution['execution_id'], execution['status'],
+                    {k: v for k, v in execution.items() if v is not None}
+                )
+    
+    async def _poll_one(self, client, execution: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Poll AMC for one execution and propagate a final status to its report week
+        
+        Returns:
+            The status returned by AMC, or None if the execution cannot be polled yet
+        """
+        execution_uuid = execution['id']  # Internal UUID for database relations
+        execution_id = execution['execution_id']  # Human-readable ID
+        amc_execution_id = execution.get('amc_execution_id')
+        
+        if not amc_execution_id:
+            logger.debug(f"Skipping {execution_id} - no AMC execution ID yet")
+            return None
+        
+        # Get workflow info to find instance and user
+        workflow_response = client.table('workflows')\
+            .select('instance_id, user_id')\
+            .eq('id', execution['workflow_id'])\
+            .single()\
+            .execute()
+        
+        if not workflow_response.data:
+            logger.warning(f"Workflow not found for execution {execution_id}")
+            return None
+        
+        # Get instance info
+        instance_response = client.table('amc_instances')\
+            .select('instance_id')\
+            .eq('id', workflow_response.data['instance_id'])\
+            .single()\
+            .execute()
+        
+        if not instance_response.data:
+            logger.warning(f"Instance not found for execution {execution_id}")
+            return None
+        
+        # Poll AMC for status update
+        logger.info(f"Polling status for execution {execution_id} (AMC: {amc_execution_id})")
+        
+        # Poll and update through the coordinator, so a user refresh of the
+        # same execution in flight or within half a cycle is reused (the
+        # poller's own concurrency is bounded by its job queue, not a limiter)
+        user_id = workflow_response.data.get('user_id')
+        status = await status_refresh.refresh(execution_id, user_id, max_age=self.poll_interval / 2)
+        
+        if status:
+            current_status = status.get('status', 'unknown')
+            progress = status.get('progress', 0)
+            logger.info(f"Execution {execution_id}: status={current_status}, progress={progress}%")
+            
+            # Push the status to subscribed clients (repeats are dropped by the hub)
+            execution_event_hub.publish(status_event(
+                status, user_id,
+                workflow_id=execution['workflow_id'],
+                instance_id=instance_response.data['instance_id'],
+                instance_uuid=workflow_response.data['instance_id']
+            ))
+            
+            # Update report_data_weeks if this execution is part of a collection
+            if current_status in TERMINAL_STATUSES:
+                self._processed_executions.add(execution_id)
+                
+                # Check if this execution is linked to a report_data_weeks record
+                # Pass both the UUID and the execution_id
+                await self._update_report_week_status(execution_uuid, execution_id, current_status, status)
+        
+        return status
+    
     async def _update_report_week_status(self, execution_uuid: str, execution_id: str, status: str, execution_data: dict):
         """Update report_data_weeks record if this execution is part of a collection
         
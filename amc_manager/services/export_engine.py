@@ -0,0 +1,384 @@
+"""
+Report Export Engine
+Streams execution results into CSV, XLSX and Parquet files with bounded memory
+
+Rows are pulled one execution at a time and written in fixed-size chunks, so a
+multi-week collection export never holds more than one execution's rows plus one
+chunk in memory. Files are written to local disk and optionally published to S3.
+Exports run on a thread pool with a per-user concurrency cap, and identical
+exports a user starts at the same time share one build.
+"""
+
+import asyncio
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+
+logger = get_logger(__name__)
+
+# Formats the engine can stream; pdf/png dashboards are rendered client-side
+STREAMABLE_FORMATS = ('csv', 'excel', 'parquet')
+
+# Map AMC result column types to Arrow types for Parquet output
+PARQUET_NUMERIC_TYPES = {
+    'long': 'int64', 'integer': 'int64', 'int': 'int64', 'bigint': 'int64',
+    'double': 'float64', 'decimal': 'float64', 'float': 'float64', 'number': 'float64',
+}
+
+
+def export_parameters_hash(config_id: str, export_format: str, date_range: Optional[Dict[str, str]] = None) -> str:
+    """Stable hash identifying an export's content, used for de-duplication"""
+    payload = json.dumps(
+        {'config_id': str(config_id), 'format': export_format, 'date_range': date_range or {}},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _row_values(row: Any, columns: Sequence[str], source_columns: Sequence[str]) -> List[Any]:
+    """Project a stored result row (list or dict) onto the export's column order"""
+    if isinstance(row, dict):
+        return [row.get(col) for col in columns]
+    if list(source_columns) == list(columns):
+        return list(row)
+    positions = {name: i for i, name in enumerate(source_columns)}
+    return [row[positions[col]] if col in positions and positions[col] < len(row) else None for col in columns]
+
+
+# ========== Sources ==========
+
+class ExecutionResultSource:
+    """
+    Streams stored results of one or more workflow executions
+
+    Each entry in `executions` is a dict with the workflow_executions `id` and
+    optional `labels` (e.g. week_start/week_end) prepended as leading columns.
+    """
+
+    def __init__(self, client: Any, executions: List[Dict[str, Any]], chunk_rows: int = 5000):
+        self.client = client
+        self.executions = executions
+        self.chunk_rows = chunk_rows
+        self.label_columns: List[str] = []
+        for execution in executions:
+            for key in (execution.get('labels') or {}):
+                if key not in self.label_columns:
+                    self.label_columns.append(key)
+        self.columns: Optional[List[str]] = None
+        self.column_types: Dict[str, str] = {}
+
+    def _fetch(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table('workflow_executions')\
+            .select('id, result_columns, result_rows')\
+            .eq('id', execution_id)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def batches(self) -> Iterator[Tuple[List[str], List[List[Any]]]]:
+        """Yield (columns, rows) chunks; columns are fixed by the first execution with results"""
+        for execution in self.executions:
+            record = self._fetch(execution['id'])
+            if not record or not record.get('result_rows'):
+                continue
+
+            source_columns = [
+                c['name'] if isinstance(c, dict) else str(c)
+                for c in (record.get('result_columns') or [])
+            ]
+            rows = record['result_rows']
+            if not source_columns and isinstance(rows[0], dict):
+                source_columns = list(rows[0].keys())
+
+            if self.columns is None:
+                self.columns = self.label_columns + source_columns
+                for c in record.get('result_columns') or []:
+                    if isinstance(c, dict) and c.get('type'):
+                        self.column_types[c['name']] = str(c['type']).lower()
+
+            data_columns = self.columns[len(self.label_columns):]
+            labels = execution.get('labels') or {}
+            label_values = [labels.get(col) for col in self.label_columns]
+
+            for start in range(0, len(rows), self.chunk_rows):
+                chunk = rows[start:start + self.chunk_rows]
+                yield self.columns, [
+                    label_values + _row_values(row, data_columns, source_columns) for row in chunk
+                ]
+
+            # Release this execution's rows before fetching the next one
+            del rows, record
+
+
+# ========== Writers ==========
+
+class CsvExportWriter:
+    """Chunked CSV writer"""
+
+    def __init__(self, path: Path, columns: List[str], column_types: Dict[str, str]):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write_rows(self, rows: List[List[Any]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class XlsxExportWriter:
+    """XLSX writer using openpyxl write-only mode (rows are streamed to disk)"""
+
+    def __init__(self, path: Path, columns: List[str], column_types: Dict[str, str]):
+        from openpyxl import Workbook
+
+        self._path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet('Results')
+        self._sheet.append(columns)
+
+    def write_rows(self, rows: List[List[Any]]) -> None:
+        for row in rows:
+            self._sheet.append(row)
+
+    def close(self) -> None:
+        self._workbook.save(self._path)
+
+
+class ParquetExportWriter:
+    """Parquet writer emitting one zstd-compressed row group per chunk"""
+
+    def __init__(self, path: Path, columns: List[str], column_types: Dict[str, str]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._columns = columns
+        fields = []
+        for col in columns:
+            arrow_type = PARQUET_NUMERIC_TYPES.get(column_types.get(col, ''))
+            fields.append(pa.field(col, pa.int64() if arrow_type == 'int64' else
+                                   pa.float64() if arrow_type == 'float64' else pa.string()))
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(str(path), self._schema, compression='zstd')
+
+    def _coerce(self, value: Any, arrow_type: Any) -> Any:
+        if value is None or value == '':
+            return None
+        try:
+            if arrow_type == self._pa.int64():
+                return int(float(value))
+            if arrow_type == self._pa.float64():
+                return float(value)
+        except (TypeError, ValueError):
+            return None
+        return value if isinstance(value, str) else str(value)
+
+    def write_rows(self, rows: List[List[Any]]) -> None:
+        arrays = []
+        for i, field in enumerate(self._schema):
+            arrays.append(self._pa.array([self._coerce(row[i], field.type) for row in rows], type=field.type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+EXPORT_WRITERS = {
+    'csv': CsvExportWriter,
+    'excel': XlsxExportWriter,
+    'parquet': ParquetExportWriter,
+}
+
+
+def write_export(source: ExecutionResultSource, export_format: str, path: Path) -> Dict[str, Any]:
+    """
+    Stream a source into a file
+
+    Returns:
+        Dict with row_count and file_size
+    """
+    writer_class = EXPORT_WRITERS.get(export_format)
+    if writer_class is None:
+        raise ValueError(f"Export format '{export_format}' is not supported by the export engine")
+
+    writer = None
+    row_count = 0
+    try:
+        for columns, rows in source.batches():
+            if writer is None:
+                writer = writer_class(path, columns, source.column_types)
+            writer.write_rows(rows)
+            row_count += len(rows)
+
+        if writer is None:
+            # No results at all: still produce a valid, empty file
+            writer = writer_class(path, source.label_columns or ['no_results'], {})
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return {'row_count': row_count, 'file_size': path.stat().st_size}
+
+
+# ========== Storage ==========
+
+class LocalExportStorage:
+    """Keeps export files on local disk, served by the export download endpoint"""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = Path(base_dir)
+
+    def path_for(self, export_id: str, extension: str) -> Path:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        return self.base_dir / f"{export_id}{extension}"
+
+    def publish(self, export_id: str, path: Path) -> str:
+        return f"/api/reports/exports/{export_id}/download"
+
+    def exists(self, file_url: Optional[str]) -> bool:
+        if not file_url or not file_url.startswith('/api/reports/exports/'):
+            return False
+        export_id = file_url.split('/')[-2]
+        return any(self.base_dir.glob(f"{export_id}.*"))
+
+    def local_path(self, export_id: str) -> Optional[Path]:
+        matches = sorted(self.base_dir.glob(f"{export_id}.*"))
+        return matches[0] if matches else None
+
+
+class S3ExportStorage(LocalExportStorage):
+    """Writes locally, then uploads to S3 (multipart, streamed) and returns a presigned URL"""
+
+    def __init__(self, base_dir: str, bucket: str, prefix: str = 'exports/'):
+        super().__init__(base_dir)
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self._s3 = boto3.client(
+            's3',
+            aws_access_key_id=settings.aws_access_key_id,
+            aws_secret_access_key=settings.aws_secret_access_key,
+            region_name=settings.aws_region
+        )
+
+    def publish(self, export_id: str, path: Path) -> str:
+        key = f"{self.prefix}{path.name}"
+        self._s3.upload_file(str(path), self.bucket, key)
+        os.remove(path)
+        return self._s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=7 * 24 * 3600
+        )
+
+    def exists(self, file_url: Optional[str]) -> bool:
+        # Presigned URLs are valid for the export's lifetime (expires_at); exports
+        # that reuse a file keep the expires_at of the export that published it
+        return bool(file_url)
+
+
+def get_export_storage() -> LocalExportStorage:
+    """Object storage when S3 is configured, local disk otherwise"""
+    if settings.s3_bucket_name and settings.aws_access_key_id and settings.aws_secret_access_key:
+        return S3ExportStorage(settings.export_storage_dir, settings.s3_bucket_name)
+    return LocalExportStorage(settings.export_storage_dir)
+
+
+# ========== Engine ==========
+
+class ExportEngine:
+    """Runs export builds on a worker pool with per-user caps and in-flight de-duplication"""
+
+    def __init__(self, max_workers: int = 4, per_user_limit: int = 2):
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        # Per-user semaphores with the number of builds using them; dropped when unused
+        self._user_semaphores: Dict[str, Tuple[asyncio.Semaphore, int]] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @asynccontextmanager
+    async def _user_slot(self, user_id: str) -> AsyncIterator[None]:
+        semaphore, users = self._user_semaphores.get(user_id, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_user_limit)
+        self._user_semaphores[user_id] = (semaphore, users + 1)
+        try:
+            async with semaphore:
+                yield
+        finally:
+            semaphore, users = self._user_semaphores[user_id]
+            if users == 1:
+                del self._user_semaphores[user_id]
+            else:
+                self._user_semaphores[user_id] = (semaphore, users - 1)
+
+    async def run(
+        self,
+        dedup_key: str,
+        user_id: str,
+        build: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Run a blocking export build, sharing the result with the same user's identical
+        in-flight builds
+
+        Args:
+            dedup_key: Identifies the export content (see export_parameters_hash)
+            user_id: Owner, for the per-user concurrency cap and de-duplication
+            build: Blocking callable producing the export result
+        """
+        inflight_key = (user_id, dedup_key)
+        existing = self._inflight.get(inflight_key)
+        if existing is not None:
+            logger.info(f"Export {dedup_key} already building, waiting for shared result")
+            return await asyncio.shield(existing)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            async with self._user_slot(user_id):
+                result = await loop.run_in_executor(self._executor, build)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current engine occupancy for monitoring"""
+        return {
+            'max_workers': self.max_workers,
+            'per_user_limit': self.per_user_limit,
+            'inflight_exports': len(self._inflight),
+            'users_exporting': len(self._user_semaphores),
+        }
+
+
+_export_engine: Optional[ExportEngine] = None
+
+
+def get_export_engine() -> ExportEngine:
+    """Get the process-wide export engine"""
+    global _export_engine
+    if _export_engine is None:
+        _export_engine = ExportEngine(
+            max_workers=settings.export_max_workers,
+            per_user_limit=settings.export_per_user_limit
+        )
+    return _export_engine
@@ -1,10 +1,11 @@
 """Historical Data Collection Service - Manages 52-week backfill operations"""
 
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Awaitable, Callable
 from datetime import datetime, timedelta, date
 import uuid
 from ..core.logger_simple import get_logger
+from .adaptive_concurrency import SubmissionSkipped, get_instance_limiter
 from .reporting_database_service import reporting_db_service
 from .amc_execution_service import AMCExecutionService
 from .db_service import db_service
@@ -105,6 +106,10 @@ class HistoricalCollectionService:
                 target_weeks
             )
             
+            # Hand the collection to the background workers
+            from .collection_executor_service import get_collection_executor
+            await get_collection_executor().enqueue(collection)
+            
             # Return collection info (actual execution happens in background)
             return {
                 'collection_id': collection['collection_id'],
@@ -157,8 +162,9 @@ class HistoricalCollectionService:
         collection_id: str,
         week_record_id: str,
         week_start: date,
-        week_end: date
-    ) -> bool:
+        week_end: date,
+        should_submit: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Optional[bool]:
         """
         Execute workflow for a single week of data collection
         
@@ -167,9 +173,11 @@ class HistoricalCollectionService:
             week_record_id: Week record UUID
             week_start: Start date of the week (can be date object or ISO string)
             week_end: End date of the week (can be date object or ISO string)
+            should_submit: Asked once the instance limiter admits the week; False
+                leaves the week pending (e.g. the collection was paused meanwhile)
             
         Returns:
-            True if successful, False otherwise
+            True if successful, False otherwise, None if should_submit declined
         """
         try:
             # Convert string dates to date objects if necessary
@@ -209,15 +217,23 @@ class HistoricalCollectionService:
                 execution_date=datetime.now(timezone.utc).isoformat()
             )
             
-            # Execute workflow via AMC
-            try:
-                execution_result = await self.amc_execution.execute_workflow(
+            # Execute workflow via AMC, within the instance's adaptive concurrency limit
+            limiter = get_instance_limiter(collection.get('amc_instance_id') or collection['instance_id'])
+            
+            async def start_execution():
+                # The week may have waited in the limiter long after it was queued
+                if should_submit is not None and not await should_submit():
+                    raise SubmissionSkipped()
+                return await self.amc_execution.execute_workflow(
                     workflow_id=collection['workflow_id'],
                     user_id=collection['user_id'],
                     execution_parameters=parameters,
                     triggered_by='collection',
                     instance_id=collection['instance_id']
                 )
+            
+            try:
+                execution_result = await limiter.submit(start_execution)
                 
                 # Store execution ID in week record
                 if execution_result:
@@ -277,10 +293,18 @@ class HistoricalCollectionService:
                         return True
                     else:
                         # Execution failed to start
-                        raise ValueError(f"Execution failed with status: {execution_status}")
+                        raise ValueError(
+                            f"Execution failed with status: {execution_status}"
+                            + (f" - {execution_result['error']}" if execution_result.get('error') else '')
+                        )
                 else:
                     raise ValueError("No execution result returned")
                     
+            except SubmissionSkipped:
+                self.reporting_db.update_week_status(week_record_id, 'pending')
+                logger.info(f"Week {week_start} left pending, collection no longer running")
+                return None
+                
             except Exception as exec_error:
                 logger.error(f"AMC execution failed for week {week_start}: {exec_error}")
                 
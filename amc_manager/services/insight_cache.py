@@ -0,0 +1,110 @@
+"""
+Insight Cache
+Bounded LRU store and cache keys for AI insight generation
+
+An insight is a function of its type, the question and the data it is asked
+about, so the same question about unchanged data is answered from the cache
+instead of the LLM. Keys hash the insight type, the normalized question and a
+fingerprint of the data context; the fingerprint also covers the version of
+the aggregates the context reads (their latest updated_at), so new data
+changes the key and stale answers are never served.
+
+LRUCache bounds memory by entry count (and optionally age) and is also used
+for the per-user conversation contexts, which were an unbounded dict.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Sequence
+
+_MISSING = object()
+
+_SPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = '?!.,;: '
+
+
+class LRUCache:
+    """Thread-safe mapping keeping the `max_entries` most recently used entries"""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Value of `key` (marking it most recently used), or default if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl_seconds is not None \
+                    and self._clock() - entry[0] >= self.ttl_seconds:
+                del self._entries[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a value"""
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def normalize_question(text: str) -> str:
+    """Question text with case, spacing and trailing punctuation normalized"""
+    return _SPACE_RE.sub(' ', (text or '').lower()).strip().rstrip(_TRAILING_PUNCTUATION)
+
+
+def fingerprint(value: Any) -> str:
+    """Stable hash of JSON-like data (key order and date types do not matter)"""
+    canonical = json.dumps(value, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def insight_cache_key(
+    insight_type: str,
+    question: str,
+    context_fingerprint: str,
+    user_id: Optional[str] = None,
+    history: Sequence[Any] = ()
+) -> str:
+    """
+    Cache key of one insight request
+
+    A conversation's first question is answered from the question and data
+    alone, so its answer is shared between users. Follow-ups also depend on
+    the earlier exchanges in the prompt (history) and are keyed by user and
+    those exchanges.
+    """
+    scope = [user_id, fingerprint(list(history))] if history else None
+    return fingerprint([insight_type, normalize_question(question), context_fingerprint, scope])
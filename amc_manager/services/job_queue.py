@@ -0,0 +1,609 @@
+"""
+Background Job Queue
+Durable, leased work queue shared by the background engines
+
+Producers enqueue a job when work appears (an AMC execution is submitted, a
+collection is created, a Snowflake sync item is queued by its trigger). Workers
+claim due jobs with FOR UPDATE SKIP LOCKED and hold them for a visibility
+timeout that a heartbeat keeps extending; when a worker dies its leases expire
+and another worker picks the jobs up. Failed jobs retry with exponential
+backoff and are dead-lettered after max_attempts (see 21_background_jobs.sql).
+Finished jobs are pruned hourly: succeeded ones after
+settings.job_queue_succeeded_retention_days, dead ones after
+settings.job_queue_dead_retention_days.
+
+Idle workers wake on NOTIFY background_jobs when DATABASE_URL points at
+Postgres and asyncpg is installed, on local enqueues, and otherwise every
+settings.job_queue_poll_seconds.
+
+MemoryJobQueue implements the same claim semantics in-process for tests and
+benchmarks.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+from ..core.metrics import JOB_SECONDS, register_gauge
+from .db_service import DatabaseService, with_connection_retry
+from .worker_coordinator import worker_coordinator
+
+logger = get_logger(__name__)
+
+NOTIFY_CHANNEL = 'background_jobs'
+
+# Queue names used by producers and the engines that handle them
+EXECUTION_STATUS_QUEUE = 'execution_status'
+COLLECTION_QUEUE = 'collection'
+SNOWFLAKE_SYNC_QUEUE = 'snowflake_sync'
+REPORT_BACKFILL_QUEUE = 'report_backfill'
+
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+class RetryLater(Exception):
+    """Raised by a handler whose work is not finished yet (e.g. AMC still running)
+
+    The job is queued again after delay_seconds without using up an attempt.
+    """
+
+    def __init__(self, delay_seconds: float, reason: str = ''):
+        super().__init__(reason or f"retry in {delay_seconds}s")
+        self.delay_seconds = delay_seconds
+
+
+@dataclass
+class Job:
+    """A claimed or enqueued background_jobs row"""
+    id: str
+    queue: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    job_key: Optional[str] = None
+    concurrency_key: Optional[str] = None
+    priority: int = 0
+    status: str = 'queued'
+    attempts: int = 0
+    max_attempts: int = 5
+    last_error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'Job':
+        return cls(
+            id=str(row['id']),
+            queue=row['queue'],
+            payload=row.get('payload') or {},
+            job_key=row.get('job_key'),
+            concurrency_key=row.get('concurrency_key'),
+            priority=row.get('priority') or 0,
+            status=row.get('status') or 'queued',
+            attempts=row.get('attempts') or 0,
+            max_attempts=row.get('max_attempts') or 5,
+            last_error=row.get('last_error'),
+        )
+
+
+class PostgresJobQueue(DatabaseService):
+    """background_jobs through the SQL functions in 21_background_jobs.sql"""
+
+    @with_connection_retry
+    def enqueue(
+        self,
+        queue: str,
+        payload: Optional[Dict[str, Any]] = None,
+        job_key: Optional[str] = None,
+        concurrency_key: Optional[str] = None,
+        priority: int = 0,
+        delay_seconds: int = 0,
+        max_attempts: int = 5
+    ) -> Optional[Job]:
+        """Enqueue a job; returns the live job instead when job_key is already queued/running"""
+        response = self.client.rpc('enqueue_background_job', {
+            'p_queue': queue,
+            'p_payload': payload or {},
+            'p_job_key': job_key,
+            'p_concurrency_key': concurrency_key,
+            'p_priority': priority,
+            'p_delay_seconds': int(delay_seconds),
+            'p_max_attempts': max_attempts
+        }).execute()
+        row = response.data[0] if isinstance(response.data, list) and response.data else response.data
+        return Job.from_row(row) if row and row.get('id') else None
+
+    @with_connection_retry
+    def claim(
+        self,
+        queues: List[str],
+        worker: str,
+        limit: int,
+        visibility_seconds: int,
+        key_limit: Optional[int] = None
+    ) -> List[Job]:
+        response = self.client.rpc('claim_background_jobs', {
+            'p_queues': queues,
+            'p_worker': worker,
+            'p_limit': limit,
+            'p_visibility_seconds': int(visibility_seconds),
+            'p_key_limit': key_limit
+        }).execute()
+        return [Job.from_row(row) for row in response.data or []]
+
+    @with_connection_retry
+    def heartbeat(self, job_ids: List[str], worker: str, visibility_seconds: int) -> List[str]:
+        """Extend leases; returns the IDs this worker still holds"""
+        response = self.client.rpc('heartbeat_background_jobs', {
+            'p_ids': job_ids,
+            'p_worker': worker,
+            'p_visibility_seconds': int(visibility_seconds)
+        }).execute()
+        return [
+            str(row if not isinstance(row, dict) else next(iter(row.values())))
+            for row in response.data or []
+        ]
+
+    @with_connection_retry
+    def finish(
+        self,
+        job_id: str,
+        worker: str,
+        outcome: str,
+        error: Optional[str] = None,
+        delay_seconds: float = 0
+    ) -> Optional[Job]:
+        """outcome: 'succeeded', 'retry' (counts as a failed attempt) or 'snooze'"""
+        response = self.client.rpc('finish_background_job', {
+            'p_id': job_id,
+            'p_worker': worker,
+            'p_outcome': outcome,
+            'p_error': error,
+            'p_delay_seconds': int(delay_seconds)
+        }).execute()
+        row = response.data[0] if isinstance(response.data, list) and response.data else response.data
+        return Job.from_row(row) if row and row.get('id') else None
+
+    @with_connection_retry
+    def prune(self, succeeded_days: int, dead_days: int) -> int:
+        """Delete finished jobs past their retention; returns the number deleted"""
+        response = self.client.rpc('prune_background_jobs', {
+            'p_succeeded_retention': f"{int(succeeded_days)} days",
+            'p_dead_retention': f"{int(dead_days)} days"
+        }).execute()
+        return int(response.data or 0)
+
+    @with_connection_retry
+    def stats(self) -> List[Dict[str, Any]]:
+        response = self.client.table('background_jobs_summary').select('*').execute()
+        return response.data or []
+
+
+class MemoryJobQueue:
+    """In-process background_jobs with the claim semantics of the SQL functions"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, queue, payload=None, job_key=None, concurrency_key=None,
+                priority=0, delay_seconds=0, max_attempts=5) -> Optional[Job]:
+        with self._lock:
+            if job_key is not None:
+                for row in self.jobs.values():
+                    if row['queue'] == queue and row['job_key'] == job_key and row['status'] in ('queued', 'running'):
+                        return Job.from_row(row)
+            row = {
+                'id': str(uuid.uuid4()), 'queue': queue, 'payload': dict(payload or {}),
+                'job_key': job_key, 'concurrency_key': concurrency_key, 'priority': priority,
+                'status': 'queued', 'attempts': 0, 'max_attempts': max_attempts,
+                'run_at': self.clock() + max(delay_seconds, 0), 'seq': len(self.jobs),
+                'locked_by': None, 'locked_until': None, 'last_error': None,
+                'updated_at': self.clock(),
+            }
+            self.jobs[row['id']] = row
+            return Job.from_row(row)
+
+    def claim(self, queues, worker, limit, visibility_seconds, key_limit=None) -> List[Job]:
+        with self._lock:
+            now = self.clock()
+            running: Dict[str, int] = {}
+            for row in self.jobs.values():
+                if row['status'] == 'running' and row['locked_until'] > now and row['concurrency_key']:
+                    running[row['concurrency_key']] = running.get(row['concurrency_key'], 0) + 1
+            due = [
+                row for row in self.jobs.values()
+                if row['queue'] in queues and (
+                    (row['status'] == 'queued' and row['run_at'] <= now)
+                    or (row['status'] == 'running' and row['locked_until'] < now)
+                )
+            ]
+            due.sort(key=lambda row: (-row['priority'], row['run_at'], row['seq']))
+
+            claimed = []
+            for row in due:
+                if len(claimed) >= limit:
+                    break
+                key = row['concurrency_key']
+                if key_limit is not None and key and running.get(key, 0) >= key_limit:
+                    continue
+                if key:
+                    running[key] = running.get(key, 0) + 1
+                row.update(status='running', locked_by=worker,
+                           locked_until=now + visibility_seconds, attempts=row['attempts'] + 1)
+                claimed.append(Job.from_row(row))
+            return claimed
+
+    def heartbeat(self, job_ids, worker, visibility_seconds) -> List[str]:
+        with self._lock:
+            held = []
+            for job_id in job_ids:
+                row = self.jobs.get(job_id)
+                if row and row['locked_by'] == worker and row['status'] == 'running':
+                    row['locked_until'] = self.clock() + visibility_seconds
+                    held.append(job_id)
+            return held
+
+    def finish(self, job_id, worker, outcome, error=None, delay_seconds=0) -> Optional[Job]:
+        with self._lock:
+            row = self.jobs.get(job_id)
+            if not row or row['locked_by'] != worker or row['status'] != 'running':
+                return None
+            if outcome == 'succeeded':
+                row['status'] = 'succeeded'
+            elif outcome == 'retry' and row['attempts'] >= row['max_attempts']:
+                row['status'] = 'dead'
+            else:
+                row['status'] = 'queued'
+            if outcome == 'snooze':
+                row['attempts'] = max(row['attempts'] - 1, 0)
+            row.update(run_at=self.clock() + max(delay_seconds, 0), locked_by=None, locked_until=None,
+                       updated_at=self.clock())
+            if error is not None:
+                row['last_error'] = error
+            return Job.from_row(row)
+
+    def prune(self, succeeded_days: int, dead_days: int) -> int:
+        with self._lock:
+            now = self.clock()
+            cutoffs = {'succeeded': now - succeeded_days * 86400, 'dead': now - dead_days * 86400}
+            expired = [
+                job_id for job_id, row in self.jobs.items()
+                if row['status'] in cutoffs and row['updated_at'] < cutoffs[row['status']]
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+            return len(expired)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            counts: Dict[tuple, int] = {}
+            for row in self.jobs.values():
+                counts[(row['queue'], row['status'])] = counts.get((row['queue'], row['status']), 0) + 1
+            return [{'queue': q, 'status': s, 'count': n} for (q, s), n in sorted(counts.items())]
+
+
+JobHandlerFn = Callable[[Job], Awaitable[Any]]
+
+
+@dataclass
+class JobHandler:
+    """How one queue is processed by this worker"""
+    queue: str
+    handler: JobHandlerFn
+    concurrency: int = 5
+    key_limit: Optional[int] = None
+    visibility_timeout: int = 300
+    backoff_seconds: float = 30
+    max_backoff_seconds: float = 3600
+    in_flight: Dict[str, asyncio.Task] = field(default_factory=dict, repr=False)
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.backoff_seconds * (2 ** max(attempts - 1, 0)), self.max_backoff_seconds)
+
+
+class JobRunner:
+    """Claims jobs for registered queues and runs their handlers"""
+
+    def __init__(self, backend=None, worker_id: Optional[str] = None, poll_seconds: Optional[float] = None):
+        self.backend = backend or PostgresJobQueue()
+        self._worker_id = worker_id
+        self.poll_seconds = poll_seconds or settings.job_queue_poll_seconds
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._running = False
+        self._listening = False
+        # None until start(); False when background_jobs is unreachable
+        self.available: Optional[bool] = None
+        self._enqueue_errors = 0
+        self._counts = {'succeeded': 0, 'retried': 0, 'snoozed': 0, 'dead': 0, 'lost': 0, 'pruned': 0}
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id or worker_coordinator.worker_id
+
+    @property
+    def active(self) -> bool:
+        """True while jobs are being claimed; engines fall back to their own loops otherwise"""
+        return self._running and bool(self.available)
+
+    # ----- registration -----
+    def register(
+        self,
+        queue: str,
+        handler: JobHandlerFn,
+        concurrency: int = 5,
+        key_limit: Optional[int] = None,
+        visibility_timeout: int = 300,
+        backoff_seconds: float = 30,
+        max_backoff_seconds: float = 3600
+    ) -> None:
+        """
+        Process `queue` with `handler` in this worker
+
+        Args:
+            queue: Queue name
+            handler: Coroutine function taking the Job; raise RetryLater to snooze
+            concurrency: Jobs of this queue run at once in this worker
+            key_limit: Running jobs allowed per concurrency_key across all workers
+            visibility_timeout: Lease length in seconds, renewed while the job runs
+            backoff_seconds: First retry delay after a failure, doubled per attempt
+            max_backoff_seconds: Upper bound for the retry delay
+        """
+        self._handlers[queue] = JobHandler(
+            queue=queue,
+            handler=handler,
+            concurrency=concurrency,
+            key_limit=key_limit,
+            visibility_timeout=visibility_timeout,
+            backoff_seconds=backoff_seconds,
+            max_backoff_seconds=max_backoff_seconds
+        )
+
+    # ----- producing -----
+    async def enqueue(
+        self,
+        queue: str,
+        payload: Optional[Dict[str, Any]] = None,
+        job_key: Optional[str] = None,
+        concurrency_key: Optional[str] = None,
+        priority: int = 0,
+        delay_seconds: float = 0,
+        max_attempts: int = 5
+    ) -> Optional[Job]:
+        """Enqueue a job; None if the queue is unreachable (the engines' sweeps catch up)"""
+        try:
+            job = await asyncio.to_thread(
+                self.backend.enqueue, queue, payload, job_key, concurrency_key,
+                priority, delay_seconds, max_attempts
+            )
+        except Exception as e:
+            self._enqueue_errors += 1
+            # Without migration 21 every enqueue fails; say so once
+            log = logger.warning if self._enqueue_errors == 1 else logger.debug
+            log(f"Could not enqueue {queue} job {job_key or ''}: {e}")
+            return None
+        if self._wake and queue in self._handlers and not delay_seconds:
+            self._wake.set()
+        return job
+
+    # ----- lifecycle -----
+    async def start(self) -> None:
+        if self._running:
+            return
+        try:
+            await asyncio.to_thread(self.backend.stats)
+            self.available = True
+        except Exception as e:
+            # Migration 21 not applied: every engine keeps its own polling loop
+            self.available = False
+            logger.warning(f"background_jobs unavailable; engines poll their tables instead: {e}")
+            return
+
+        self._running = True
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._claim_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._prune_loop()),
+        ]
+        logger.info(f"Job runner started for queues: {', '.join(sorted(self._handlers)) or 'none'}")
+
+    async def stop(self) -> None:
+        """Stop claiming and hand in-flight jobs back to the queue"""
+        if not self._running:
+            return
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        in_flight = [task for h in self._handlers.values() for task in h.in_flight.values()]
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *in_flight, return_exceptions=True)
+        self._tasks = []
+        logger.info("Job runner stopped")
+
+    async def _claim_loop(self) -> None:
+        while self._running:
+            self._wake.clear()
+            try:
+                await self.claim_once()
+            except Exception as e:
+                logger.error(f"Error claiming background jobs: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def claim_once(self) -> int:
+        """Claim due jobs up to each queue's free slots and start them; returns jobs started"""
+        started = 0
+        for handler in self._handlers.values():
+            free = handler.concurrency - len(handler.in_flight)
+            if free <= 0:
+                continue
+            jobs = await asyncio.to_thread(
+                self.backend.claim, [handler.queue], self.worker_id, free,
+                handler.visibility_timeout, handler.key_limit
+            )
+            for job in jobs:
+                task = asyncio.create_task(self._run(handler, job))
+                handler.in_flight[job.id] = task
+                task.add_done_callback(lambda t, h=handler, job_id=job.id: self._job_done(h, job_id))
+                started += 1
+        return started
+
+    def _job_done(self, handler: JobHandler, job_id: str) -> None:
+        handler.in_flight.pop(job_id, None)
+        if self._wake:
+            # A slot is free
+            self._wake.set()
+
+    async def _run(self, handler: JobHandler, job: Job) -> None:
+        started = time.perf_counter()
+        try:
+            await handler.handler(job)
+        except RetryLater as later:
+            self._counts['snoozed'] += 1
+            JOB_SECONDS.labels(job.queue, 'snoozed').observe(time.perf_counter() - started)
+            await self._finish(job, 'snooze', delay_seconds=later.delay_seconds)
+        except asyncio.CancelledError:
+            # Shutdown or lost lease: make the job claimable again right away
+            await self._finish(job, 'snooze')
+            raise
+        except Exception as e:
+            JOB_SECONDS.labels(job.queue, 'failed').observe(time.perf_counter() - started)
+            delay = handler.backoff(job.attempts)
+            if job.attempts >= job.max_attempts:
+                self._counts['dead'] += 1
+                logger.error(f"{job.queue} job {job.job_key or job.id} dead-lettered after {job.attempts} attempts: {e}")
+            else:
+                self._counts['retried'] += 1
+                logger.warning(f"{job.queue} job {job.job_key or job.id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {e}")
+            await self._finish(job, 'retry', error=str(e)[:2000], delay_seconds=delay)
+        else:
+            self._counts['succeeded'] += 1
+            JOB_SECONDS.labels(job.queue, 'succeeded').observe(time.perf_counter() - started)
+            await self._finish(job, 'succeeded')
+
+    async def _finish(self, job: Job, outcome: str, error: Optional[str] = None, delay_seconds: float = 0) -> None:
+        try:
+            await asyncio.to_thread(self.backend.finish, job.id, self.worker_id, outcome, error, delay_seconds)
+        except Exception as e:
+            # The lease expires and the job is claimed again
+            logger.error(f"Could not finish {job.queue} job {job.id}: {e}")
+
+    async def _heartbeat_loop(self) -> None:
+        while self._running:
+            interval = min([h.visibility_timeout for h in self._handlers.values()] or [300]) / 3
+            await asyncio.sleep(max(interval, 1.0))
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    async def heartbeat(self) -> None:
+        """Extend the leases of running jobs; cancel jobs whose lease was lost"""
+        for handler in self._handlers.values():
+            job_ids = list(handler.in_flight)
+            if not job_ids:
+                continue
+            held = set(await asyncio.to_thread(
+                self.backend.heartbeat, job_ids, self.worker_id, handler.visibility_timeout
+            ))
+            for job_id in job_ids:
+                task = handler.in_flight.get(job_id)
+                if job_id not in held and task and not task.done():
+                    # Another worker reclaimed it after our lease expired
+                    self._counts['lost'] += 1
+                    logger.warning(f"Lost lease on {handler.queue} job {job_id}; cancelling it")
+                    task.cancel()
+
+    async def _prune_loop(self) -> None:
+        while self._running:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.error(f"Could not prune finished background jobs: {e}")
+            await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+
+    async def prune(self) -> int:
+        """Delete finished jobs past their retention so background_jobs stays small"""
+        pruned = await asyncio.to_thread(
+            self.backend.prune,
+            settings.job_queue_succeeded_retention_days,
+            settings.job_queue_dead_retention_days
+        )
+        if pruned:
+            self._counts['pruned'] += pruned
+            logger.info(f"Pruned {pruned} finished background jobs")
+        return pruned
+
+    async def _listen(self) -> None:
+        """Wake on NOTIFY background_jobs when a direct Postgres connection is available"""
+        if not settings.database_url:
+            return
+        try:
+            import asyncpg
+        except ImportError:
+            logger.info(f"asyncpg not installed; job runner polls every {self.poll_seconds}s")
+            return
+
+        while self._running:
+            try:
+                connection = await asyncpg.connect(settings.database_url)
+                try:
+                    await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                    self._listening = True
+                    while self._running and not connection.is_closed():
+                        await asyncio.sleep(self.poll_seconds)
+                finally:
+                    self._listening = False
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"LISTEN {NOTIFY_CHANNEL} failed, polling until reconnected: {e}")
+                await asyncio.sleep(30)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        if payload in self._handlers and self._wake:
+            self._wake.set()
+
+    def get_state(self) -> Dict[str, Any]:
+        """Runner state for monitoring"""
+        return {
+            'worker_id': self.worker_id,
+            'available': self.available,
+            'running': self._running,
+            'listening': self._listening,
+            'poll_seconds': self.poll_seconds,
+            'queues': {
+                name: {
+                    'in_flight': len(h.in_flight),
+                    'concurrency': h.concurrency,
+                    'key_limit': h.key_limit,
+                    'visibility_timeout': h.visibility_timeout,
+                }
+                for name, h in sorted(self._handlers.items())
+            },
+            'counts': dict(self._counts),
+            'enqueue_errors': self._enqueue_errors,
+        }
+
+
+# Process-wide runner; producers call job_runner.enqueue(...)
+job_runner = JobRunner()
+
+register_gauge(
+    'background_jobs_in_flight', 'Jobs this process is running, per queue', ['queue'],
+    lambda: [((name,), len(h.in_flight)) for name, h in list(job_runner._handlers.items())]
+)
+register_gauge(
+    'background_jobs_concurrency', 'Configured job concurrency of this process, per queue', ['queue'],
+    lambda: [((name,), h.concurrency) for name, h in list(job_runner._handlers.items())]
+)
@@ -1,15 +1,24 @@
 """
 Report Backfill Executor Service
-Handles sequential execution of report backfill segments with rate limiting
+Executes report backfill segments concurrently, bounded by a call-rate ceiling
+and the AMC instance's adaptive concurrency limit
+
+With the job queue running, each active collection is a report_backfill job
+that runs a batch of segments and snoozes until the collection settles;
+otherwise the service polls report_data_collections.
 """
 
 import asyncio
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Awaitable, Callable
 from datetime import datetime, timedelta
 import uuid
 
+from amc_manager.config import settings
+from amc_manager.services.adaptive_concurrency import SubmissionSkipped, get_instance_limiter
 from amc_manager.services.db_service import DatabaseService, with_connection_retry
+from amc_manager.services.job_queue import REPORT_BACKFILL_QUEUE, Job, RetryLater, job_runner
 from amc_manager.services.report_execution_service import ReportExecutionService
+from amc_manager.services.worker_coordinator import worker_coordinator
 from amc_manager.core.logger_simple import get_logger
 
 logger = get_logger(__name__)
@@ -22,9 +31,15 @@ class RateLimiter:
         self.max_calls = max_calls
         self.window_seconds = window_seconds
         self.calls = []
+        self._lock = asyncio.Lock()
 
     async def wait_if_needed(self):
         """Wait if rate limit would be exceeded"""
+        # Serialise callers so concurrent segments cannot overshoot the window
+        async with self._lock:
+            await self._wait_if_needed()
+
+    async def _wait_if_needed(self):
         now = datetime.utcnow()
 
         # Remove calls outside the window
@@ -48,7 +63,8 @@ class RateLimiter:
 class ReportBackfillExecutorService(DatabaseService):
     """
     Background service that processes report backfill collections
-    Executes segments sequentially with rate limiting and retry logic
+    Executes segments concurrently with rate limiting, adaptive per-instance
+    concurrency and retry logic
     """
 
     def __init__(self):
@@ -58,6 +74,7 @@ class ReportBackfillExecutorService(DatabaseService):
         self.check_interval = 30  # Check for work every 30 seconds
         self.max_retries = 3
         self.retry_delay = 5  # Seconds between retries
+        self.max_concurrent_collections = 3  # report_backfill jobs per worker
 
     async def run(self):
         """Main loop for the backfill executor service"""
@@ -73,18 +90,70 @@ class ReportBackfillExecutorService(DatabaseService):
                         logger.info(f"Found {len(active_collections)} active backfill collections")
 
                         for collection in active_collections:
-                            await self.process_collection(collection)
+                            # Collections are partitioned across worker processes
+                            if not worker_coordinator.owns(collection['id']):
+                                continue
+                            if job_runner.active:
+                                # Collections run as report_backfill jobs; only catch up on missed ones
+                                await self.enqueue(collection)
+                            else:
+                                await self.process_collection(collection)
 
                 except Exception as e:
                     logger.error(f"Error in backfill loop: {e}")
 
                 # Wait before next check
-                await asyncio.sleep(self.check_interval)
+                await asyncio.sleep(settings.job_queue_sweep_seconds if job_runner.active else self.check_interval)
 
         except asyncio.CancelledError:
             logger.info("Report Backfill Executor Service stopped")
             raise
 
+    async def enqueue(self, collection: Dict[str, Any]):
+        """Queue a backfill collection, at most one per collection and capped per instance"""
+        await job_runner.enqueue(
+            REPORT_BACKFILL_QUEUE,
+            {'collection_uuid': collection['id']},
+            job_key=collection['id'],
+            concurrency_key=collection.get('instance_id')
+        )
+
+    async def handle_job(self, job: Job):
+        """
+        report_backfill job: run the next batch of pending segments
+
+        Raises:
+            RetryLater: The collection still has segments to run or settle
+        """
+        collection = await self.get_collection(job.payload['collection_uuid'])
+        if not collection or collection['status'] not in ('pending', 'running'):
+            return
+
+        await self.process_collection(collection)
+
+        if await self.get_pending_segments(collection['id']):
+            raise RetryLater(0, 'more pending segments')
+        collection = await self.get_collection(collection['id'])
+        if collection and collection['status'] in ('pending', 'running'):
+            raise RetryLater(self.check_interval, 'segments still running')
+
+    @with_connection_retry
+    async def get_collection(self, collection_uuid: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a backfill collection with its embedded report
+
+        Args:
+            collection_uuid: Collection UUID
+
+        Returns:
+            Collection record or None
+        """
+        response = self.client.table('report_data_collections').select(
+            '*, report_definitions!inner(*)'
+        ).eq('id', collection_uuid).execute()
+
+        return response.data[0] if response.data else None
+
     @with_connection_retry
     async def get_active_collections(self) -> List[Dict[str, Any]]:
         """
@@ -108,7 +177,7 @@ class ReportBackfillExecutorService(DatabaseService):
 
     async def process_collection(self, collection: Dict[str, Any]):
         """
-        Process a single collection's segments sequentially
+        Process a single collection's pending segments concurrently
 
         Args:
             collection: Collection record with embedded report
@@ -145,25 +214,37 @@ class ReportBackfillExecutorService(DatabaseService):
                 logger.error(f"Instance not found for collection {collection['collection_id']}")
                 return
 
-            # Process segments sequentially
-            for segment in pending_segments:
-                try:
-                    # Apply rate limiting
-                    await self.wait_for_rate_limit()
+            # Segments run concurrently; the instance limiter decides how many reach AMC at once,
+            # so whether the collection is still active is checked when each one is admitted
+            async def still_wanted() -> bool:
+                return await self.is_collection_active(collection['id'])
 
+            async def run_segment(segment: Dict[str, Any]):
+                try:
                     # Execute segment with retry logic
-                    await self.execute_segment_with_retry(segment, report, instance)
+                    await self.execute_segment_with_retry(segment, report, instance, still_wanted)
 
                     # Update progress
                     await self.update_collection_progress(collection['id'])
 
                 except Exception as e:
                     logger.error(f"Error processing segment {segment.get('week_number')}: {e}")
-                    # Continue with next segment even if this one fails
+                    # Other segments continue even if this one fails
+
+            await asyncio.gather(*(run_segment(segment) for segment in pending_segments))
 
         except Exception as e:
             logger.error(f"Error processing collection {collection['collection_id']}: {e}")
 
+    @with_connection_retry
+    async def is_collection_active(self, collection_id: str) -> bool:
+        """Whether a collection is still pending or running (not paused, cancelled or finished)"""
+        response = self.client.table('report_data_collections').select('status').eq(
+            'id', collection_id
+        ).execute()
+
+        return bool(response.data) and response.data[0]['status'] in ('pending', 'running')
+
     @with_connection_retry
     async def get_pending_segments(self, collection_id: str) -> List[Dict[str, Any]]:
         """
@@ -194,7 +275,8 @@ class ReportBackfillExecutorService(DatabaseService):
         self,
         segment: Dict[str, Any],
         report: Dict[str, Any],
-        instance: Dict[str, Any]
+        instance: Dict[str, Any],
+        should_submit: Optional[Callable[[], Awaitable[bool]]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Execute a segment with retry logic
@@ -203,9 +285,11 @@ class ReportBackfillExecutorService(DatabaseService):
             segment: Segment record
             report: Report definition
             instance: AMC instance with entity
+            should_submit: Asked once the instance limiter admits the segment;
+                False leaves the segment pending
 
         Returns:
-            Execution result or None if failed after retries
+            Execution result or None if failed after retries or not submitted
         """
         retry_count = segment.get('retry_count', 0)
 
@@ -231,19 +315,30 @@ class ReportBackfillExecutorService(DatabaseService):
                 start_date = datetime.fromisoformat(segment['start_date'])
                 end_date = datetime.fromisoformat(segment['end_date'])
 
-                # Execute via ad-hoc AMC query
-                execution_result = await self.execution_service.execute_report_adhoc(
-                    report_id=report['id'],
-                    instance_id=instance['instance_id'],
-                    sql_query=processed_sql,
-                    parameters=report.get('parameters', {}),
-                    user_id=report.get('user_id'),
-                    entity_id=instance['entity_id'],
-                    triggered_by='backfill',
-                    collection_id=segment['collection_id'],
-                    time_window_start=start_date,
-                    time_window_end=end_date
-                )
+                # Apply rate limiting
+                await self.wait_for_rate_limit()
+
+                async def start_execution():
+                    if should_submit is not None and not await should_submit():
+                        raise SubmissionSkipped()
+                    return await self.execution_service.execute_report_adhoc(
+                        report_id=report['id'],
+                        instance_id=instance['instance_id'],
+                        sql_query=processed_sql,
+                        parameters=report.get('parameters', {}),
+                        user_id=report.get('user_id'),
+                        entity_id=instance['entity_id'],
+                        triggered_by='backfill',
+                        collection_id=segment['collection_id'],
+                        time_window_start=start_date,
+                        time_window_end=end_date
+                    )
+
+                # Execute via ad-hoc AMC query, within the instance's adaptive concurrency limit
+                execution_result = await get_instance_limiter(instance['instance_id']).submit(start_execution)
+
+                if execution_result and execution_result.get('status') == 'failed':
+                    raise Exception(execution_result.get('error_message') or "AMC execution failed")
 
                 if execution_result:
                     # Update segment as completed
@@ -259,6 +354,13 @@ class ReportBackfillExecutorService(DatabaseService):
                 # Execution returned None, treat as failure
                 raise Exception("Execution returned no result")
 
+            except SubmissionSkipped:
+                self.client.table('report_data_weeks').update({
+                    'status': 'pending'
+                }).eq('id', segment['id']).execute()
+                logger.info(f"Segment {segment['week_number']} left pending, collection no longer active")
+                return None
+
             except Exception as e:
                 logger.error(f"Segment execution failed (attempt {retry_count + 1}): {e}")
                 retry_count += 1
@@ -1,6 +1,6 @@
 """Report Dashboard Service - Manages collection report dashboard data and operations"""
 
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime, date, timedelta
 import json
 import uuid
@@ -9,6 +9,9 @@ from collections import defaultdict
 
 from ..core.logger_simple import get_logger
 from .db_service import DatabaseService, with_connection_retry, db_service
+from .result_set import ResultSet
+from .chart_downsampling import bucket_series, downsample_series
+from .data_aggregation_service import data_aggregation_service
 
 logger = get_logger(__name__)
 
@@ -175,18 +178,20 @@ class ReportDashboardService(DatabaseService):
         
         return processed
     
-    def _extract_metrics_from_results(self, result_rows: List[Dict]) -> Dict[str, Any]:
+    def _extract_metrics_from_results(self, result_rows: Union[ResultSet, List[Dict]]) -> Dict[str, Any]:
         """Extract and aggregate metrics from execution result rows"""
         if not result_rows:
             return {}
         
+        results = ResultSet.of(result_rows)
         metrics = defaultdict(float)
-        count = len(result_rows)
+        count = len(results)
         
-        for row in result_rows:
-            for key, value in row.items():
-                if isinstance(value, (int, float, Decimal)):
-                    metrics[f'total_{key}'] += float(value)
+        # Numeric columns are summed straight from their typed arrays
+        for name in results.names:
+            column = results.column(name)
+            if column.is_numeric:
+                metrics[f'total_{name}'] = column.sum()
         
         # Calculate averages
         for key in list(metrics.keys()):
@@ -297,6 +302,29 @@ class ReportDashboardService(DatabaseService):
             'delta': delta
         }
     
+    def calculate_range_comparison(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        period1: Tuple[date, date],
+        period2: Tuple[date, date],
+        metrics: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Compare two date ranges from the rollup cube
+        
+        Same shape as calculate_comparison(), but each period is combined from
+        pre-aggregated rollup nodes instead of the weeks' raw rows.
+        """
+        comparison = data_aggregation_service.compare_ranges(
+            workflow_id, instance_id, current=period2, previous=period1, metrics=metrics
+        )
+        return {
+            'period1': comparison['previous'],
+            'period2': comparison['current'],
+            'delta': comparison['delta']
+        }
+    
     def _aggregate_metrics(self, data: List[Dict], metrics: List[str]) -> Dict[str, float]:
         """Aggregate specific metrics from data"""
         aggregated = {metric: 0 for metric in metrics}
@@ -351,7 +379,9 @@ class ReportDashboardService(DatabaseService):
         self,
         data: List[Dict],
         chart_type: str,
-        metrics: List[str]
+        metrics: List[str],
+        bucket: Optional[str] = None,
+        max_points: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Transform data into Chart.js format
@@ -360,6 +390,8 @@ class ReportDashboardService(DatabaseService):
             data: Raw data to transform
             chart_type: Type of chart ('line', 'bar', 'area', etc.)
             metrics: List of metrics to include
+            bucket: Roll line/area series up to 'week' or 'month' buckets
+            max_points: LTTB-reduce line/area series to this many points
             
         Returns:
             Chart.js formatted data
@@ -374,8 +406,9 @@ class ReportDashboardService(DatabaseService):
             elif 'week_start_date' in item:
                 labels.append(item['week_start_date'])
         
-        # Create dataset for each metric
-        for i, metric in enumerate(metrics):
+        # Values per metric, aligned with labels
+        series = {}
+        for metric in metrics:
             dataset_data = []
             
             for item in data:
@@ -391,7 +424,16 @@ class ReportDashboardService(DatabaseService):
                     value = item[metric]
                 
                 dataset_data.append(float(value) if value is not None else 0)
-            
+            series[metric] = dataset_data
+        
+        if chart_type in ('line', 'area') and len(labels) == len(data):
+            if bucket:
+                labels, series = bucket_series(labels, series, bucket)
+            labels, series = downsample_series(labels, series, max_points)
+        
+        # Create dataset for each metric
+        for i, metric in enumerate(metrics):
+            dataset_data = series[metric]
             color = self.default_colors[i % len(self.default_colors)]
             
             dataset = {
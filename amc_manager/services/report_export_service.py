@@ -5,6 +5,15 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 from ..services.db_service import DatabaseService, with_connection_retry
+from ..services.export_engine import (
+    STREAMABLE_FORMATS,
+    ExecutionResultSource,
+    export_parameters_hash,
+    get_export_engine,
+    get_export_storage,
+    write_export
+)
+from ..config import settings
 from ..core.logger_simple import get_logger
 
 logger = get_logger(__name__)
@@ -24,8 +33,9 @@ class ReportExportService(DatabaseService):
         Args:
             export_data: Export request data including:
                 - report_configuration_id: Report configuration to export
-                - export_format: Format (pdf, png, csv, excel)
+                - export_format: Format (pdf, png, csv, excel, parquet)
                 - user_id: User requesting the export
+                - parameters_hash: Optional content hash used for de-duplication
 
         Returns:
             Created export request
@@ -43,6 +53,8 @@ class ReportExportService(DatabaseService):
                 'status': 'pending',
                 'created_at': datetime.utcnow().isoformat()
             }
+            if export_data.get('parameters_hash'):
+                insert_data['parameters_hash'] = export_data['parameters_hash']
 
             response = self.client.table('report_exports').insert(insert_data).execute()
 
@@ -165,7 +177,13 @@ class ReportExportService(DatabaseService):
             raise
 
     @with_connection_retry
-    def update_export_file_info(self, export_id: str, file_url: str, file_size: int) -> Optional[Dict[str, Any]]:
+    def update_export_file_info(
+        self,
+        export_id: str,
+        file_url: str,
+        file_size: int,
+        expires_at: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Update file information for an export
 
@@ -173,6 +191,7 @@ class ReportExportService(DatabaseService):
             export_id: Export ID
             file_url: URL of the exported file
             file_size: Size of the file in bytes
+            expires_at: When file_url stops working (defaults to 7 days from now)
 
         Returns:
             Updated export record or None if not found
@@ -183,7 +202,7 @@ class ReportExportService(DatabaseService):
                 'file_size': file_size,
                 'status': 'completed',
                 'generated_at': datetime.utcnow().isoformat(),
-                'expires_at': (datetime.utcnow() + timedelta(days=7)).isoformat()
+                'expires_at': expires_at or (datetime.utcnow() + timedelta(days=7)).isoformat()
             }
 
             response = self.client.table('report_exports')\
@@ -413,7 +432,10 @@ class ReportExportService(DatabaseService):
         report_config_id: str,
         user_id: str,
         export_format: str,
-        hours: int = 1
+        hours: int = 1,
+        parameters_hash: Optional[str] = None,
+        exclude_export_id: Optional[str] = None,
+        statuses: Optional[List[str]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Check if a similar export was recently created to avoid duplicates
@@ -423,6 +445,9 @@ class ReportExportService(DatabaseService):
             user_id: User ID
             export_format: Export format
             hours: Number of hours to look back for duplicates
+            parameters_hash: Only match exports built from the same parameters
+            exclude_export_id: Export to ignore (typically the one being built)
+            statuses: Statuses to match (defaults to pending, processing, completed)
 
         Returns:
             Existing export if found, None otherwise
@@ -430,14 +455,20 @@ class ReportExportService(DatabaseService):
         try:
             cutoff_time = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
 
-            response = self.client.table('report_exports')\
+            query = self.client.table('report_exports')\
                 .select('*')\
                 .eq('report_configuration_id', report_config_id)\
                 .eq('user_id', user_id)\
                 .eq('export_format', export_format)\
-                .in_('status', ['pending', 'processing', 'completed'])\
-                .gte('created_at', cutoff_time)\
-                .order('created_at', desc=True)\
+                .in_('status', statuses or ['pending', 'processing', 'completed'])\
+                .gte('created_at', cutoff_time)
+
+            if parameters_hash:
+                query = query.eq('parameters_hash', parameters_hash)
+            if exclude_export_id:
+                query = query.neq('id', exclude_export_id)
+
+            response = query.order('created_at', desc=True)\
                 .limit(1)\
                 .execute()
 
@@ -459,7 +490,7 @@ class ReportExportService(DatabaseService):
         Returns:
             True if valid, False otherwise
         """
-        valid_formats = ['pdf', 'png', 'csv', 'excel']
+        valid_formats = ['pdf', 'png', 'csv', 'excel', 'parquet']
         return export_format in valid_formats
 
     def validate_export_status(self, status: str) -> bool:
@@ -489,7 +520,8 @@ class ReportExportService(DatabaseService):
             'pdf': '.pdf',
             'png': '.png',
             'csv': '.csv',
-            'excel': '.xlsx'
+            'excel': '.xlsx',
+            'parquet': '.parquet'
         }
         return extensions.get(export_format, '.dat')
 
@@ -507,7 +539,8 @@ class ReportExportService(DatabaseService):
             'pdf': 'application/pdf',
             'png': 'image/png',
             'csv': 'text/csv',
-            'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'parquet': 'application/vnd.apache.parquet'
         }
         return mime_types.get(export_format, 'application/octet-stream')
 
@@ -544,52 +577,179 @@ class ReportExportService(DatabaseService):
         # Apply limit
         return exports[:limit]
 
-    async def create_export_async(self, export_id: str, config_id: str, format: str, include_insights: bool = True, date_range: Optional[Dict[str, str]] = None):
+    @with_connection_retry
+    def _get_export_by_id(self, export_id: str) -> Optional[Dict[str, Any]]:
+        """Get an export record without user scoping (background use only)"""
+        response = self.client.table('report_exports')\
+            .select('*')\
+            .eq('id', export_id)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    @with_connection_retry
+    def resolve_export_executions(
+        self,
+        config: Dict[str, Any],
+        date_range: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Work out which stored execution results an export covers
+
+        Collections are preferred (one execution per completed week, labelled with
+        the week range); otherwise the latest completed execution of the workflow.
+
+        Args:
+            config: Report configuration record
+            date_range: Optional {'start': ..., 'end': ...} filter on week dates
+
+        Returns:
+            List of {'id': workflow_executions.id, 'labels': {...}}
+        """
+        workflow_id = config.get('workflow_id')
+        if not workflow_id:
+            raise ValueError("Only workflow-based report configurations can be exported")
+
+        collections = self.client.table('report_data_collections')\
+            .select('id')\
+            .eq('workflow_id', workflow_id)\
+            .order('created_at', desc=True)\
+            .limit(1)\
+            .execute()
+
+        if collections.data:
+            weeks_query = self.client.table('report_data_weeks')\
+                .select('workflow_execution_id, week_start_date, week_end_date')\
+                .eq('collection_id', collections.data[0]['id'])\
+                .eq('status', 'completed')\
+                .not_.is_('workflow_execution_id', 'null')
+            if date_range and date_range.get('start'):
+                weeks_query = weeks_query.gte('week_start_date', date_range['start'])
+            if date_range and date_range.get('end'):
+                weeks_query = weeks_query.lte('week_end_date', date_range['end'])
+
+            weeks = weeks_query.order('week_start_date').execute().data or []
+            if weeks:
+                return [
+                    {
+                        'id': week['workflow_execution_id'],
+                        'labels': {'week_start': week['week_start_date'], 'week_end': week['week_end_date']}
+                    }
+                    for week in weeks
+                ]
+
+        latest = self.client.table('workflow_executions')\
+            .select('id')\
+            .eq('workflow_id', workflow_id)\
+            .eq('status', 'completed')\
+            .order('completed_at', desc=True)\
+            .limit(1)\
+            .execute()
+
+        return [{'id': row['id'], 'labels': {}} for row in (latest.data or [])]
+
+    def _build_export_file(
+        self,
+        export_id: str,
+        config: Dict[str, Any],
+        format: str,
+        date_range: Optional[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        """Blocking build: stream results to a file and publish it (runs on the export pool)"""
+        storage = get_export_storage()
+        executions = self.resolve_export_executions(config, date_range)
+        source = ExecutionResultSource(self.client, executions, chunk_rows=settings.export_chunk_rows)
+
+        path = storage.path_for(export_id, self.get_file_extension(format))
+        written = write_export(source, format, path)
+        file_url = storage.publish(export_id, path)
+
+        logger.info(
+            f"Export {export_id}: wrote {written['row_count']} rows from {len(executions)} executions "
+            f"({written['file_size']} bytes, {format})"
+        )
+        return {'file_url': file_url, 'file_size': written['file_size']}
+
+    async def create_export_async(
+        self,
+        export_id: str,
+        config_id: str,
+        format: str,
+        include_insights: bool = True,
+        date_range: Optional[Dict[str, str]] = None,
+        user_id: Optional[str] = None
+    ):
         """
         Asynchronously create an export
 
+        Streams the configuration's stored results into the requested format on the
+        export engine's worker pool. A completed export built from the same
+        parameters within the last hour is served instead of rebuilding, and
+        identical exports already building in this process share one build.
+
         Args:
             export_id: Export record ID
             config_id: Report configuration ID
             format: Export format
-            include_insights: Include insights in export
+            include_insights: Include insights in export (not applicable to data exports)
             date_range: Date range for data
-
-        Note: This is a placeholder for async export generation.
-        Actual implementation would generate the file and upload to storage.
+            user_id: Owner of the export (looked up from the record when omitted)
         """
         try:
             logger.info(f"Starting async export generation for export {export_id}, config {config_id}")
 
+            if format not in STREAMABLE_FORMATS:
+                raise ValueError(
+                    f"Export format '{format}' is not supported for data exports; "
+                    f"use one of: {', '.join(STREAMABLE_FORMATS)}"
+                )
+
+            if user_id is None:
+                record = self._get_export_by_id(export_id)
+                if not record:
+                    raise ValueError(f"Export {export_id} not found")
+                user_id = record['user_id']
+
+            parameters_hash = export_parameters_hash(config_id, format, date_range)
+
+            # Serve an identical, already-built export
+            duplicate = self.check_duplicate_export(
+                config_id, user_id, format,
+                parameters_hash=parameters_hash,
+                exclude_export_id=export_id,
+                statuses=['completed']
+            )
+            if duplicate and get_export_storage().exists(duplicate.get('file_url')):
+                logger.info(f"Export {export_id} reuses completed export {duplicate['id']}")
+                # The file (and its presigned URL) expires with the export that built it
+                self.update_export_file_info(
+                    export_id, duplicate['file_url'], duplicate.get('file_size') or 0,
+                    expires_at=duplicate.get('expires_at')
+                )
+                return
+
             # Update status to processing
             self.update_export_status(export_id, 'processing')
 
-            # In a real implementation, this would:
-            # 1. Fetch data for the configuration
-            # 2. Generate the export file
-            # 3. Upload to storage
-            # 4. Update export record with file URL
-
-            # For now, just log the operation
-            logger.info(f"Export would generate {format} for config {config_id}")
-
-            if include_insights:
-                logger.info("Including insights in export")
-
-            if date_range:
-                logger.info(f"Using date range: {date_range}")
-
-            # Simulate async processing
-            import asyncio
-            await asyncio.sleep(3)
+            response = self.client.table('report_configurations')\
+                .select('*')\
+                .eq('id', config_id)\
+                .limit(1)\
+                .execute()
+            if not response.data:
+                raise ValueError(f"Report configuration {config_id} not found")
+            config = response.data[0]
 
-            # Update export status with mock file URL
-            mock_file_url = f"https://storage.example.com/exports/{export_id}{self.get_file_extension(format)}"
-            self.update_export_status(export_id, 'completed', mock_file_url)
+            result = await get_export_engine().run(
+                parameters_hash,
+                user_id,
+                lambda: self._build_export_file(export_id, config, format, date_range)
+            )
 
+            self.update_export_file_info(export_id, result['file_url'], result['file_size'])
             logger.info(f"Completed async export generation for export {export_id}")
 
         except Exception as e:
             logger.error(f"Error in async export generation: {e}")
             self.update_export_status(export_id, 'failed', error_message=str(e))
-            raise
\ No newline at end of file
+            raise
@@ -1,7 +1,8 @@
 """Database service for Reports & Analytics Platform operations"""
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from datetime import datetime, date, timezone
+import re
 import uuid
 import hashlib
 import json
@@ -10,6 +11,18 @@ from ..core.logger_simple import get_logger
 
 logger = get_logger(__name__)
 
+# Metric keys that can be projected out of the metrics JSON column in the select
+_METRIC_KEY_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Rollup rows upserted per request
+_ROLLUP_BATCH_SIZE = 500
+
+# Rows per page when reading aggregates of every workflow (PostgREST caps responses)
+_AGGREGATE_PAGE_SIZE = 1000
+
+# Anomaly rows upserted per request
+_ANOMALY_BATCH_SIZE = 500
+
 
 class ReportingDatabaseService(DatabaseService):
     """Service layer for reporting platform database operations"""
@@ -498,6 +511,275 @@ class ReportingDatabaseService(DatabaseService):
             logger.error(f"Error fetching aggregates: {e}")
             return []
     
+    @with_connection_retry
+    def get_aggregate_series(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        aggregation_type: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        metrics: Optional[Sequence[str]] = None,
+        include_dimensions: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get dashboard aggregates with only the fields widgets read
+        
+        Rows look like get_aggregates_for_dashboard() rows, but `metrics`
+        holds only the requested keys (projected in Postgres with
+        metrics->key, so the rest of the JSON is never sent) and
+        `dimensions` is selected only when asked for.
+        """
+        try:
+            keys = list(dict.fromkeys(metrics or []))
+            projected = metrics is not None and all(_METRIC_KEY_RE.match(key) for key in keys)
+            columns = ['data_date']
+            if projected:
+                columns.extend(f"metric_{i}:metrics->{key}" for i, key in enumerate(keys))
+            else:
+                columns.append('metrics')
+            if include_dimensions:
+                columns.append('dimensions')
+            
+            query = self.client.table('report_data_aggregates')\
+                .select(','.join(columns))\
+                .eq('workflow_id', workflow_id)\
+                .eq('instance_id', instance_id)\
+                .eq('aggregation_type', aggregation_type)
+            
+            if start_date:
+                query = query.gte('data_date', start_date.isoformat())
+            if end_date:
+                query = query.lte('data_date', end_date.isoformat())
+            
+            rows = query.order('data_date', desc=False).execute().data or []
+            if projected:
+                for row in rows:
+                    values = [row.pop(f"metric_{i}", None) for i in range(len(keys))]
+                    row['metrics'] = {key: value for key, value in zip(keys, values) if value is not None}
+            return rows
+        except Exception as e:
+            logger.error(f"Error fetching aggregate series: {e}")
+            return []
+    
+    @with_connection_retry
+    def get_aggregates_version(self, workflow_id: str, instance_id: str) -> Optional[str]:
+        """
+        Latest write to a workflow/instance's aggregates, rollups and anomalies
+        
+        Changes whenever any of them is rewritten, so it versions anything
+        derived from them (cached AI insights). None when there is nothing yet.
+        """
+        try:
+            versions = []
+            for table, column in (('report_data_aggregates', 'updated_at'),
+                                  ('report_rollups', 'updated_at'),
+                                  ('report_anomalies', 'detected_at')):
+                response = self.client.table(table)\
+                    .select(column)\
+                    .eq('workflow_id', workflow_id)\
+                    .eq('instance_id', instance_id)\
+                    .order(column, desc=True)\
+                    .limit(1)\
+                    .execute()
+                versions.extend(row[column] for row in response.data or [] if row.get(column))
+            return max(versions) if versions else None
+        except Exception as e:
+            logger.error(f"Error fetching aggregates version: {e}")
+            raise
+    
+    # ========== Rollup Cube Operations ==========
+    
+    @with_connection_retry
+    def upsert_rollups(self, rows: List[Dict[str, Any]]) -> int:
+        """Write rollup nodes (report_rollups rows), replacing existing ones"""
+        written = 0
+        try:
+            for offset in range(0, len(rows), _ROLLUP_BATCH_SIZE):
+                batch = rows[offset:offset + _ROLLUP_BATCH_SIZE]
+                self.client.table('report_rollups')\
+                    .upsert(batch, on_conflict='workflow_id,instance_id,dimension,level,period_start')\
+                    .execute()
+                written += len(batch)
+            return written
+        except Exception as e:
+            logger.error(f"Error writing rollups: {e}")
+            return written
+    
+    @with_connection_retry
+    def get_rollup_day_dimensions(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        start_date: date,
+        end_date: date
+    ) -> List[Tuple[str, date]]:
+        """
+        (dimension, day) of the stored dimension day nodes between two dates
+        
+        Read in pages. Errors are raised: a partial read would leave stale
+        nodes behind when they are cleared.
+        """
+        nodes = []
+        offset = 0
+        while True:
+            page = self.client.table('report_rollups')\
+                .select('dimension,period_start')\
+                .eq('workflow_id', workflow_id)\
+                .eq('instance_id', instance_id)\
+                .eq('level', 'day')\
+                .neq('dimension', '')\
+                .gte('period_start', start_date.isoformat())\
+                .lte('period_start', end_date.isoformat())\
+                .order('period_start')\
+                .order('dimension')\
+                .range(offset, offset + _AGGREGATE_PAGE_SIZE - 1)\
+                .execute().data or []
+            nodes.extend((row['dimension'], date.fromisoformat(str(row['period_start'])[:10])) for row in page)
+            if len(page) < _AGGREGATE_PAGE_SIZE:
+                return nodes
+            offset += _AGGREGATE_PAGE_SIZE
+    
+    @with_connection_retry
+    def refresh_rollups(self, workflow_id: str, instance_id: str, start_date: date, end_date: date) -> int:
+        """Recompute the week, month and quarter nodes over the day nodes between two dates"""
+        try:
+            response = self.client.rpc('refresh_report_rollups', {
+                'p_workflow_id': workflow_id,
+                'p_instance_id': instance_id,
+                'p_start': start_date.isoformat(),
+                'p_end': end_date.isoformat()
+            }).execute()
+            return response.data or 0
+        except Exception as e:
+            logger.error(f"Error refreshing rollups: {e}")
+            return 0
+    
+    @with_connection_retry
+    def get_rollup_nodes(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        nodes: Sequence[Tuple[str, date]],
+        dimension: str = ''
+    ) -> List[Dict[str, Any]]:
+        """Rollup rows of the given (level, period_start) nodes, one query per level"""
+        starts_by_level: Dict[str, List[str]] = {}
+        for level, start in nodes:
+            starts_by_level.setdefault(level, []).append(start.isoformat())
+        
+        rows = []
+        try:
+            for level, starts in starts_by_level.items():
+                response = self.client.table('report_rollups')\
+                    .select('level,period_start,metrics,row_count')\
+                    .eq('workflow_id', workflow_id)\
+                    .eq('instance_id', instance_id)\
+                    .eq('dimension', dimension)\
+                    .eq('level', level)\
+                    .in_('period_start', starts)\
+                    .execute()
+                rows.extend(response.data or [])
+            return rows
+        except Exception as e:
+            logger.error(f"Error fetching rollups: {e}")
+            return []
+    
+    # ========== Anomaly Operations ==========
+    
+    @with_connection_retry
+    def get_all_aggregate_series(
+        self,
+        aggregation_type: str,
+        start_date: date,
+        metrics: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregates of every workflow and instance since a date, for bulk scoring
+        
+        Rows carry workflow_id, instance_id, data_date and only the requested
+        metric keys (projected as in get_aggregate_series), read in pages.
+        Errors are raised: a partial read must not pass for the full set.
+        """
+        keys = [key for key in dict.fromkeys(metrics) if _METRIC_KEY_RE.match(key)]
+        columns = ['workflow_id', 'instance_id', 'data_date']
+        columns.extend(f"metric_{i}:metrics->{key}" for i, key in enumerate(keys))
+        
+        rows = []
+        offset = 0
+        while True:
+            page = self.client.table('report_data_aggregates')\
+                .select(','.join(columns))\
+                .eq('aggregation_type', aggregation_type)\
+                .gte('data_date', start_date.isoformat())\
+                .order('id')\
+                .range(offset, offset + _AGGREGATE_PAGE_SIZE - 1)\
+                .execute().data or []
+            for row in page:
+                values = [row.pop(f"metric_{i}", None) for i in range(len(keys))]
+                row['metrics'] = {key: value for key, value in zip(keys, values) if value is not None}
+            rows.extend(page)
+            if len(page) < _AGGREGATE_PAGE_SIZE:
+                return rows
+            offset += _AGGREGATE_PAGE_SIZE
+    
+    @with_connection_retry
+    def replace_anomalies(self, rows: List[Dict[str, Any]], scanned_from: date, scanned_at: datetime) -> int:
+        """
+        Store one scan's findings and drop earlier findings it did not confirm
+        
+        Rows are upserted with detected_at = scanned_at first, then anomalies
+        from scanned_from on that are older than the scan are deleted, so
+        readers never see an empty table in between.
+        """
+        detected_at = scanned_at.isoformat()
+        for offset in range(0, len(rows), _ANOMALY_BATCH_SIZE):
+            batch = [{**row, 'detected_at': detected_at} for row in rows[offset:offset + _ANOMALY_BATCH_SIZE]]
+            self.client.table('report_anomalies')\
+                .upsert(batch, on_conflict='workflow_id,instance_id,aggregation_type,metric,period_start')\
+                .execute()
+        self.client.table('report_anomalies')\
+            .delete()\
+            .gte('period_start', scanned_from.isoformat())\
+            .lt('detected_at', detected_at)\
+            .execute()
+        return len(rows)
+    
+    @with_connection_retry
+    def get_anomalies(
+        self,
+        workflow_id: str,
+        instance_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        metrics: Optional[Sequence[str]] = None,
+        min_severity: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Stored anomalies of one workflow and instance, most severe first"""
+        try:
+            query = self.client.table('report_anomalies')\
+                .select('metric,period_start,value,expected,score,severity,direction,detected_at')\
+                .eq('workflow_id', workflow_id)\
+                .eq('instance_id', instance_id)
+            
+            if start_date:
+                query = query.gte('period_start', start_date.isoformat())
+            if end_date:
+                query = query.lte('period_start', end_date.isoformat())
+            if metrics:
+                query = query.in_('metric', list(metrics))
+            if min_severity is not None:
+                query = query.gte('severity', min_severity)
+            query = query.order('severity', desc=True)
+            if limit:
+                query = query.limit(limit)
+            
+            return query.execute().data or []
+        except Exception as e:
+            logger.error(f"Error fetching anomalies: {e}")
+            return []
+    
     @with_connection_retry
     def cleanup_old_aggregates(self, days_to_keep: int = 365) -> int:
         """Clean up aggregates older than specified days"""
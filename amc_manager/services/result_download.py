@@ -0,0 +1,341 @@
+"""
+AMC Result Download
+Parallel, resumable download of every part of an execution's output
+
+AMC returns one pre-signed URL per output part; large outputs come in
+several. Every part is streamed to a temporary file, parts are downloaded
+concurrently (bounded by AMC_DOWNLOAD_CONCURRENCY), and a dropped connection
+resumes with an HTTP Range request from the last byte written instead of
+starting over. Parts are stored as sent (gzip stays gzip) and decompressed
+while they are read back, so the output is never held decompressed in
+memory before parsing.
+
+read_result_rows() stitches CSV parts into one stream of rows: the header of
+the first part, then the data rows of every part in URL order. PARQUET output
+is read with Arrow instead, and its column types are carried into
+result_columns so consumers do not re-infer them from strings.
+"""
+
+import csv
+import gzip
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+import urllib3
+
+from ..config.settings import settings
+from ..core.logger_simple import get_logger
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = get_logger(__name__)
+
+_CHUNK_BYTES = 1024 * 1024
+# (connect, read) timeouts; the read timeout applies per chunk, not per file
+_TIMEOUT = (10, 60)
+_GZIP_MAGIC = b'\x1f\x8b'
+_PARQUET_MAGIC = b'PAR1'
+
+# Errors after which a part is resumed from the bytes already written
+_RESUMABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.HTTPError,
+)
+
+
+class ResultDownloadError(Exception):
+    """A result part could not be downloaded"""
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+def part_url(part: Any) -> str:
+    """URL of a downloadUrls entry (a string or a {'url': ...} object)"""
+    return part if isinstance(part, str) else part.get('url')
+
+
+def download_part(
+    url: str,
+    path: str,
+    request: Callable[..., requests.Response],
+    retries: Optional[int] = None
+) -> int:
+    """
+    Stream one part to `path`, resuming with Range requests on failure
+
+    Args:
+        url: Pre-signed part URL
+        path: File to write
+        request: requests.request-compatible callable (records AMC metrics)
+        retries: Resumes allowed after the first attempt
+
+    Returns:
+        Bytes written
+
+    Raises:
+        ResultDownloadError: Non-retryable status or retries exhausted
+    """
+    retries = settings.amc_download_retries if retries is None else retries
+    written = 0
+    attempt = 0
+    with open(path, 'wb') as out:
+        while True:
+            # Identity encoding: byte ranges must address the stored object
+            headers = {'Accept-Encoding': 'identity'}
+            if written:
+                headers['Range'] = f'bytes={written}-'
+            try:
+                response = request('GET', url, headers=headers, stream=True, timeout=_TIMEOUT)
+                with response:
+                    if written and response.status_code == 416:
+                        # Everything was written before the connection dropped
+                        return written
+                    if response.status_code >= 500 or response.status_code == 429:
+                        raise _RetryableStatus(f"Status {response.status_code}")
+                    if response.status_code not in (200, 206):
+                        raise ResultDownloadError(f"Failed to download result part: Status {response.status_code}")
+                    if written and response.status_code == 200:
+                        # Range ignored: the whole part is being sent again
+                        out.seek(0)
+                        out.truncate()
+                        written = 0
+                    for chunk in response.raw.stream(_CHUNK_BYTES, decode_content=False):
+                        out.write(chunk)
+                        written += len(chunk)
+                return written
+            except (_RetryableStatus, *_RESUMABLE_ERRORS) as e:
+                attempt += 1
+                if attempt > retries:
+                    raise ResultDownloadError(
+                        f"Result part download failed after {attempt} attempts: {e}"
+                    ) from e
+                logger.warning(f"Result part download interrupted at byte {written} ({e}); resuming")
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 5))
+
+
+def download_result_parts(
+    urls: List[Any],
+    directory: str,
+    request: Callable[..., requests.Response],
+    concurrency: Optional[int] = None
+) -> Tuple[List[str], int]:
+    """
+    Download every part into `directory`, several at a time
+
+    Returns:
+        (part file paths in URL order, total bytes downloaded)
+    """
+    paths = [os.path.join(directory, f"part-{index:05d}") for index in range(len(urls))]
+    concurrency = max(1, min(concurrency or settings.amc_download_concurrency, len(urls)))
+
+    def fetch(index: int) -> int:
+        return download_part(part_url(urls[index]), paths[index], request)
+
+    if concurrency == 1:
+        sizes = [fetch(index) for index in range(len(urls))]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='amc-download') as pool:
+            sizes = list(pool.map(fetch, range(len(urls))))
+    return paths, sum(sizes)
+
+
+class _CountingReader(io.RawIOBase):
+    """Counts the (decompressed) bytes read through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self.raw.readinto(buffer) or 0
+        self.bytes_read += count
+        return count
+
+
+@contextmanager
+def _open_part(path: str) -> Iterator[Tuple[Any, _CountingReader]]:
+    with open(path, 'rb') as raw:
+        compressed = raw.read(2) == _GZIP_MAGIC
+        raw.seek(0)
+        source = gzip.GzipFile(fileobj=raw) if compressed else raw
+        counter = _CountingReader(source)
+        text = io.TextIOWrapper(io.BufferedReader(counter, _CHUNK_BYTES), encoding='utf-8-sig', newline='')
+        try:
+            yield text, counter
+        finally:
+            text.close()
+
+
+class ResultRows:
+    """One CSV result stitched together from its downloaded parts
+
+    Iterating yields the data rows of every part in order; `headers` is set
+    from the first part before the first row. A part that starts with the
+    same header row has it skipped. `data_bytes` counts decompressed bytes
+    read so far.
+    """
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.headers: List[str] = []
+        self.data_bytes = 0
+
+    def __iter__(self) -> Iterator[List[str]]:
+        for index, path in enumerate(self.paths):
+            with _open_part(path) as (text, counter):
+                reader = csv.reader(text)
+                first = next(reader, None)
+                if index == 0:
+                    self.headers = first or []
+                elif first is not None and first != self.headers:
+                    yield first
+                yield from reader
+                self.data_bytes += counter.bytes_read
+
+
+def read_result_rows(paths: List[str]) -> Tuple[List[str], List[List[str]], int]:
+    """(headers, all data rows, decompressed bytes) of downloaded parts"""
+    result = ResultRows(paths)
+    rows = list(result)
+    return result.headers, rows, result.data_bytes
+
+
+# ========== Parquet ==========
+
+def is_parquet(path: str) -> bool:
+    with open(path, 'rb') as part:
+        return part.read(4) == _PARQUET_MAGIC
+
+
+def read_parquet_parts(paths: List[str]) -> 'pa.Table':
+    """Arrow table of Parquet parts
+
+    Read into memory rather than memory-mapped: the parts live in a temporary
+    directory that is removed once the rows are built.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = [pq.read_table(path) for path in paths]
+    if len(tables) == 1:
+        return tables[0]
+    try:
+        return pa.concat_tables(tables)
+    except pa.ArrowInvalid:
+        # e.g. a column that is all-null (type null) in one part
+        schema = pa.unify_schemas([table.schema for table in tables])
+        return pa.concat_tables([table.cast(schema) for table in tables])
+
+
+def result_column_type(arrow_type: Any) -> str:
+    """result_columns type for an Arrow type (the names export_engine understands)"""
+    import pyarrow as pa
+
+    if pa.types.is_integer(arrow_type):
+        return 'long'
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return 'double'
+    if pa.types.is_boolean(arrow_type):
+        return 'boolean'
+    if pa.types.is_date(arrow_type):
+        return 'date'
+    if pa.types.is_timestamp(arrow_type):
+        return 'timestamp'
+    return 'string'
+
+
+def table_rows(table: 'pa.Table', offset: int = 0, limit: Optional[int] = None) -> List[List[Any]]:
+    """JSON-ready rows of a slice of an Arrow table
+
+    Numbers and booleans stay typed; dates and timestamps become ISO strings
+    and NaN becomes null. Only the requested slice is converted.
+    """
+    import pyarrow as pa
+
+    part = table.slice(offset, limit) if offset or limit is not None else table
+    columns = []
+    for column in part.columns:
+        values = column.to_pylist()
+        arrow_type = column.type
+        if pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type) or pa.types.is_time(arrow_type):
+            values = [None if v is None else v.isoformat() for v in values]
+        elif pa.types.is_decimal(arrow_type):
+            values = [None if v is None else float(v) for v in values]
+        elif pa.types.is_floating(arrow_type):
+            values = [None if v is None or v != v else v for v in values]
+        elif pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+            values = [None if v is None else v.decode('utf-8', 'replace') for v in values]
+        columns.append(values)
+    if not columns:
+        return [[] for _ in range(part.num_rows)]
+    return [list(row) for row in zip(*columns)]
+
+
+@dataclass
+class DownloadedResult:
+    """Every part of one execution's output, parsed"""
+    columns: List[Dict[str, str]]  # [{'name': ..., 'type': ...}]
+    rows: List[List[Any]]
+    data_bytes: int  # decompressed CSV bytes, or Arrow buffer size
+    downloaded_bytes: int
+    part_count: int
+    format: str  # 'parquet' or 'csv'
+
+    @property
+    def headers(self) -> List[str]:
+        return [column['name'] for column in self.columns]
+
+
+def fetch_result(
+    urls: List[Any],
+    request: Callable[..., requests.Response],
+    concurrency: Optional[int] = None
+) -> DownloadedResult:
+    """
+    Download and parse every part of a result
+
+    Parquet parts (PARQUET output) are read with Arrow and keep their column
+    types; anything else is parsed as CSV with string columns.
+    """
+    with tempfile.TemporaryDirectory(prefix='amc-result-', ignore_cleanup_errors=True) as directory:
+        paths, downloaded = download_result_parts(urls, directory, request, concurrency)
+        if all(is_parquet(path) for path in paths):
+            table = read_parquet_parts(paths)
+            result = DownloadedResult(
+                columns=[{'name': f.name, 'type': result_column_type(f.type)} for f in table.schema],
+                rows=table_rows(table),
+                data_bytes=table.nbytes,
+                downloaded_bytes=downloaded,
+                part_count=len(paths),
+                format='parquet'
+            )
+        else:
+            headers, rows, data_bytes = read_result_rows(paths)
+            result = DownloadedResult(
+                columns=[{'name': header, 'type': 'string'} for header in headers],
+                rows=rows,
+                data_bytes=data_bytes,
+                downloaded_bytes=downloaded,
+                part_count=len(paths),
+                format='csv'
+            )
+    logger.info(
+        f"Downloaded {len(urls)} {result.format} result part(s): {downloaded} bytes, "
+        f"{len(result.rows)} rows, {len(result.columns)} columns"
+    )
+    return result
@@ -0,0 +1,424 @@
+"""
+Result Set
+Compact, typed, columnar form of an execution's result rows
+
+Results used to travel as lists of dicts: every row repeated every column
+name, and numbers stayed strings that each consumer float()-ed again. A
+ResultSet keeps one array per column instead. Integers, doubles and booleans
+live in `array` buffers with a null mask; strings are kept as a plain list or,
+when few distinct values repeat (campaign names, dates, ...), dictionary-
+encoded as small integer codes into one list of the distinct values.
+
+Column types are the result_columns names (long, double, boolean, date,
+timestamp, string). Declared numeric types (Parquet output) are used as given;
+'string' columns (all CSV columns) are inferred once from their values and
+numeric strings are converted. Leading-zero codes such as "007" stay strings.
+value_type() is the one classification of a single value; snowflake_loader
+maps infer_type(values, temporal=True) to its Snowflake column types.
+
+Code that expects dicts can iterate RowView objects, read-only Mappings over
+one row; records() and rows() build plain dicts and lists where a real copy
+is needed (JSON responses, storage).
+"""
+
+import re
+import sys
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+LONG = 'long'
+DOUBLE = 'double'
+BOOLEAN = 'boolean'
+DATE = 'date'
+TIMESTAMP = 'timestamp'
+STRING = 'string'
+
+NUMERIC_TYPES = (LONG, DOUBLE)
+
+# Dictionary-encode a text column when its distinct values are at most this share of its rows
+DICTIONARY_MAX_RATIO = 0.5
+
+_TYPECODES = {LONG: 'q', DOUBLE: 'd', BOOLEAN: 'b'}
+_INT_RE = re.compile(r'^[+-]?\d+$')
+_FLOAT_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+# Zero-padded codes ("007") must stay strings
+_LEADING_ZERO_RE = re.compile(r'^[+-]?0\d')
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?Z?$')
+BOOLEAN_VALUES = {'true': True, 'false': False}
+_INT64_MAX = 2 ** 63 - 1
+
+# Mixed value types a column can still hold
+_WIDER = {frozenset((LONG, DOUBLE)): DOUBLE, frozenset((DATE, TIMESTAMP)): TIMESTAMP}
+
+
+def is_empty(value: Any) -> bool:
+    return value is None or value == ''
+
+
+def value_type(value: Any) -> str:
+    """Narrowest column type a single non-empty value fits"""
+    if isinstance(value, bool):
+        return BOOLEAN
+    if isinstance(value, int):
+        return LONG if abs(value) <= _INT64_MAX else DOUBLE
+    if isinstance(value, (float, Decimal)):
+        return DOUBLE
+    if isinstance(value, datetime):
+        return TIMESTAMP
+    if isinstance(value, date):
+        return DATE
+    if not isinstance(value, str):
+        return STRING
+    text = value.strip()
+    if text.lower() in BOOLEAN_VALUES:
+        return BOOLEAN
+    if _LEADING_ZERO_RE.match(text):
+        return STRING
+    if _INT_RE.match(text):
+        return LONG if abs(int(text)) <= _INT64_MAX else DOUBLE
+    if _FLOAT_RE.match(text):
+        return DOUBLE
+    if _DATE_RE.match(text):
+        return DATE
+    if _TIMESTAMP_RE.match(text):
+        return TIMESTAMP
+    return STRING
+
+
+def infer_type(values: Sequence[Any], temporal: bool = False) -> str:
+    """
+    Column type every non-empty value fits
+
+    long, double, boolean or string; with `temporal`, also date or timestamp
+    (otherwise those columns stay strings). Columns without any value are strings.
+    """
+    found = None
+    for value in values:
+        if is_empty(value):
+            continue
+        current = value_type(value)
+        if not temporal and current in (DATE, TIMESTAMP):
+            return STRING
+        if current == found:
+            continue
+        if found is None:
+            found = current
+        else:
+            found = _WIDER.get(frozenset((found, current)), STRING)
+        if found == STRING:
+            return STRING
+    return found or STRING
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_long(value: Any) -> int:
+    return value if isinstance(value, int) else int(str(value).strip())
+
+
+def _to_bool(value: Any) -> bool:
+    return value if isinstance(value, bool) else BOOLEAN_VALUES[str(value).strip().lower()]
+
+
+_CONVERTERS = {LONG: _to_long, DOUBLE: float, BOOLEAN: _to_bool}
+
+
+class Column:
+    """One typed column of a ResultSet
+
+    Numeric and boolean columns: `array` data plus a null mask (None when
+    nothing is null). Text columns: a list of values, or array codes into
+    `dictionary` when dictionary-encoded; nulls are kept as values.
+    """
+
+    __slots__ = ('name', 'type', '_data', '_nulls', '_dictionary')
+
+    def __init__(self, name: str, type: str, data: Any, nulls: Optional[bytearray] = None,
+                 dictionary: Optional[List[Any]] = None):
+        self.name = name
+        self.type = type
+        self._data = data
+        self._nulls = nulls
+        self._dictionary = dictionary
+
+    @classmethod
+    def from_values(cls, name: str, values: Sequence[Any], declared_type: Optional[str] = None) -> 'Column':
+        """Build a column, using `declared_type` when it is a numeric or boolean type"""
+        if declared_type in (DATE, TIMESTAMP):
+            return cls._text(name, values, declared_type)
+        if declared_type in _TYPECODES:
+            try:
+                return cls._typed(name, values, declared_type)
+            except (ValueError, TypeError, KeyError, OverflowError):
+                pass
+        column_type = infer_type(values)
+        if column_type == STRING:
+            return cls._text(name, values, STRING)
+        return cls._typed(name, values, column_type)
+
+    @classmethod
+    def _typed(cls, name: str, values: Sequence[Any], column_type: str) -> 'Column':
+        convert = _CONVERTERS[column_type]
+        data = array(_TYPECODES[column_type])
+        nulls = None
+        for index, value in enumerate(values):
+            if is_empty(value):
+                if nulls is None:
+                    nulls = bytearray(len(values))
+                nulls[index] = 1
+                data.append(0)
+            else:
+                data.append(convert(value))
+        return cls(name, column_type, data, nulls)
+
+    @classmethod
+    def _text(cls, name: str, values: Sequence[Any], column_type: str) -> 'Column':
+        codes: Dict[Any, int] = {}
+        try:
+            encoded = [codes.setdefault(value, len(codes)) for value in values]
+        except TypeError:  # unhashable values (nested JSON)
+            return cls(name, column_type, list(values))
+        if len(codes) > max(1, len(values) * DICTIONARY_MAX_RATIO):
+            return cls(name, column_type, list(values))
+        typecode = 'B' if len(codes) <= 0xFF else 'H' if len(codes) <= 0xFFFF else 'I'
+        return cls(name, column_type, array(typecode, encoded), dictionary=list(codes))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, index: int) -> Any:
+        if self._nulls is not None and self._nulls[index]:
+            return None
+        value = self._data[index]
+        if self._dictionary is not None:
+            return self._dictionary[value]
+        if self.type == BOOLEAN:
+            return bool(value)
+        return value
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._dictionary is not None:
+            dictionary = self._dictionary
+            return (dictionary[code] for code in self._data)
+        if self._nulls is None:
+            return (bool(v) for v in self._data) if self.type == BOOLEAN else iter(self._data)
+        return (self[index] for index in range(len(self._data)))
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.type in NUMERIC_TYPES
+
+    @property
+    def is_dictionary_encoded(self) -> bool:
+        return self._dictionary is not None
+
+    @property
+    def null_count(self) -> int:
+        if self._nulls is not None:
+            return self._nulls.count(1)
+        if self.type in _TYPECODES:
+            return 0
+        return sum(1 for value in self if value is None)
+
+    def to_list(self) -> List[Any]:
+        return list(self)
+
+    def numbers(self) -> array:
+        """Non-null values as doubles; text columns keep the values that parse as numbers"""
+        if self.type in _TYPECODES:
+            if self._nulls is None:
+                return array('d', self._data)
+            return array('d', (value for value, null in zip(self._data, self._nulls) if not null))
+        if self._dictionary is not None:
+            # Parse each distinct value once
+            parsed = [_as_float(value) for value in self._dictionary]
+            return array('d', (parsed[code] for code in self._data if parsed[code] is not None))
+        return array('d', (number for number in map(_as_float, self._data) if number is not None))
+
+    def sum(self) -> float:
+        return float(sum(self.numbers()))
+
+    def distinct(self) -> List[Any]:
+        """Distinct values in order of first appearance"""
+        if self._dictionary is not None:
+            return list(self._dictionary)
+        return list(dict.fromkeys(self))
+
+    def renamed(self, name: str) -> 'Column':
+        """The same data under another name (no copy)"""
+        return Column(name, self.type, self._data, self._nulls, self._dictionary)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the column's values"""
+        if isinstance(self._data, array):
+            size = self._data.itemsize * len(self._data)
+        else:
+            size = sys.getsizeof(self._data) + sum(sys.getsizeof(v) for v in self._data if v is not None)
+        if self._nulls is not None:
+            size += len(self._nulls)
+        if self._dictionary is not None:
+            size += sys.getsizeof(self._dictionary) + sum(sys.getsizeof(v) for v in self._dictionary)
+        return size
+
+
+class RowView(Mapping):
+    """Read-only, dict-like view of one ResultSet row"""
+
+    __slots__ = ('_result', '_index')
+
+    def __init__(self, result: 'ResultSet', index: int):
+        self._result = result
+        self._index = index
+
+    def __getitem__(self, name: str) -> Any:
+        result = self._result
+        return result._columns[result._positions[name]][self._index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._result._positions)
+
+    def __len__(self) -> int:
+        return len(self._result._positions)
+
+    def __repr__(self) -> str:
+        return f"RowView({dict(self)!r})"
+
+
+class ResultSet:
+    """Columnar result rows with typed columns"""
+
+    __slots__ = ('_columns', '_positions', '_length')
+
+    def __init__(self, columns: Sequence[Column]):
+        self._columns = list(columns)
+        self._positions = {column.name: index for index, column in enumerate(self._columns)}
+        lengths = {len(column) for column in self._columns}
+        if len(lengths) > 1:
+            raise ValueError(f"Result columns differ in length: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[Any], rows: Sequence[Any]) -> 'ResultSet':
+        """
+        Build from result_columns metadata (or plain names) and rows
+
+        Rows may be positional lists matching `columns` or dicts keyed by
+        column name. Columns are converted one at a time.
+        """
+        names = [c['name'] if isinstance(c, dict) else str(c) for c in columns or []]
+        types = [c.get('type') if isinstance(c, dict) else None for c in columns or []]
+        if rows and isinstance(rows[0], Mapping):
+            column_values = ([row.get(name) for row in rows] for name in names)
+        elif all(len(row) == len(names) for row in rows):
+            column_values = zip(*rows) if rows else ([] for _ in names)
+        else:
+            column_values = (
+                [row[index] if index < len(row) else None for row in rows] for index in range(len(names))
+            )
+        return cls([
+            Column.from_values(name, values, declared_type)
+            for name, declared_type, values in zip(names, types, column_values)
+        ])
+
+    @classmethod
+    def from_records(cls, records: Sequence[Mapping]) -> 'ResultSet':
+        """Build from a list of dicts; columns in order of first appearance"""
+        names: Dict[str, None] = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+        return cls.from_rows(list(names), records)
+
+    @classmethod
+    def of(cls, data: Any) -> 'ResultSet':
+        """
+        ResultSet of results in any of the shapes they travel in
+
+        A ResultSet is returned unchanged; a stored result payload
+        ({'columns': ..., 'rows': ...}) and lists of dicts are converted.
+        """
+        if isinstance(data, ResultSet):
+            return data
+        if isinstance(data, Mapping):
+            if 'rows' in data:
+                return cls.from_rows(data.get('columns') or [], data['rows'] or [])
+            for key in ('data', 'results'):
+                if key in data:
+                    return cls.of(data[key])
+            raise ValueError("Result payload has no rows")
+        if not data:
+            return cls([])
+        if isinstance(data[0], Mapping):
+            return cls.from_records(data)
+        raise ValueError("Positional rows need their columns; use ResultSet.from_rows")
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self, index) for index in range(self._length))
+
+    def __getitem__(self, index: int) -> RowView:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('ResultSet index out of range')
+        return RowView(self, index)
+
+    def __repr__(self) -> str:
+        return f"ResultSet({self._length} rows, {self.columns!r})"
+
+    @property
+    def names(self) -> List[str]:
+        return [column.name for column in self._columns]
+
+    @property
+    def columns(self) -> List[Dict[str, str]]:
+        """result_columns metadata: [{'name': ..., 'type': ...}]"""
+        return [{'name': column.name, 'type': column.type} for column in self._columns]
+
+    def has_column(self, name: str) -> bool:
+        return name in self._positions
+
+    def column(self, name: str) -> Column:
+        """Column by name (KeyError when missing)"""
+        return self._columns[self._positions[name]]
+
+    def values(self, name: str, default: Any = None) -> List[Any]:
+        """Values of a column; `default` for every row when the column is missing"""
+        if name not in self._positions:
+            return [default] * self._length
+        return self.column(name).to_list()
+
+    def rename(self, mapping: Dict[str, str]) -> 'ResultSet':
+        """Columns renamed by `mapping`, sharing the same data"""
+        if not mapping:
+            return self
+        return ResultSet([column.renamed(mapping.get(column.name, column.name)) for column in self._columns])
+
+    def rows(self) -> List[List[Any]]:
+        """Plain positional rows"""
+        if not self._columns:
+            return [[] for _ in range(self._length)]
+        return [list(row) for row in zip(*self._columns)]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Plain dict rows"""
+        names = self.names
+        return [dict(zip(names, row)) for row in zip(*self._columns)] if self._columns else [
+            {} for _ in range(self._length)
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the values of every column"""
+        return sum(column.nbytes for column in self._columns)
@@ -0,0 +1,181 @@
+"""
+Rollup Cube
+Calendar hierarchy of pre-aggregated metrics answering any date range
+
+Metrics are kept per workflow, instance and dimension at four levels: day,
+ISO week (starting Monday), month and quarter. Day nodes are written from
+execution results; weeks and months are sums of their days and quarters sums
+of their months (refresh_report_rollups() recomputes them in Postgres).
+
+cover() splits any date range into the fewest whole nodes, largest first:
+whole quarters in the middle, then whole months, whole weeks and single days
+towards the edges, so a range of years reads a few dozen nodes at most and
+never raw results. Only additive metrics (sums and row counts) are stored;
+ratios such as CTR or ROAS are derived after nodes are combined.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .result_set import ResultSet
+from .widget_aggregates import SharedAggregates
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+QUARTER = 'quarter'
+LEVELS = (DAY, WEEK, MONTH, QUARTER)
+
+# Dimension of the nodes holding totals across all dimension values
+TOTAL = ''
+
+# Result columns holding the event date of each row, in order of preference
+DATE_COLUMNS = ('date', 'event_date', 'event_dt', 'day', 'data_date', 'report_date')
+
+Node = Tuple[str, date]  # (level, period start)
+
+
+def period_start(day: date, level: str) -> date:
+    """First day of the `level` period containing `day`"""
+    if level == WEEK:
+        return day - timedelta(days=day.weekday())
+    if level == MONTH:
+        return day.replace(day=1)
+    if level == QUARTER:
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    return day
+
+
+def period_end(day: date, level: str) -> date:
+    """Last day of the `level` period containing `day`"""
+    start = period_start(day, level)
+    if level == WEEK:
+        return start + timedelta(days=6)
+    if level in (MONTH, QUARTER):
+        months = 1 if level == MONTH else 3
+        year, month = divmod(start.month - 1 + months, 12)
+        return date(start.year + year, month + 1, 1) - timedelta(days=1)
+    return start
+
+
+def cover(start: date, end: date) -> List[Node]:
+    """
+    Fewest whole nodes covering [start, end] (inclusive), in date order
+
+    Each level takes the whole periods inside the range and leaves the
+    partial edges to the next smaller level, down to days.
+    """
+    nodes: List[Node] = []
+
+    def split(first: date, last: date, levels: Sequence[str]) -> None:
+        if first > last:
+            return
+        if not levels:
+            nodes.extend((DAY, first + timedelta(days=n)) for n in range((last - first).days + 1))
+            return
+        level, smaller = levels[0], levels[1:]
+        whole_start = first if period_start(first, level) == first else period_end(first, level) + timedelta(days=1)
+        whole_end = last if period_end(last, level) == last else period_start(last, level) - timedelta(days=1)
+        if whole_start > whole_end:
+            split(first, last, smaller)
+            return
+        split(first, whole_start - timedelta(days=1), smaller)
+        current = whole_start
+        while current <= whole_end:
+            nodes.append((level, current))
+            current = period_end(current, level) + timedelta(days=1)
+        split(whole_end + timedelta(days=1), last, smaller)
+
+    split(start, end, (QUARTER, MONTH, WEEK))
+    return nodes
+
+
+def combine(rows: Iterable[Dict[str, Any]], metrics: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Sum node rows: {'metrics': {...}, 'row_count': n, 'nodes': count}"""
+    totals: Dict[str, float] = {metric: 0 for metric in metrics or ()}
+    row_count = 0
+    count = 0
+    for row in rows:
+        count += 1
+        row_count += row.get('row_count') or 0
+        for key, value in (row.get('metrics') or {}).items():
+            if (metrics is None or key in totals) and isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+    return {'metrics': totals, 'row_count': row_count, 'nodes': count}
+
+
+def _as_day(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def date_column(results: ResultSet) -> Optional[str]:
+    """The result column giving each row's date, if there is one"""
+    for name in DATE_COLUMNS:
+        if results.has_column(name):
+            return name
+    return None
+
+
+def day_leaves(
+    results: ResultSet,
+    metrics: Sequence[str],
+    dimensions: Sequence[str],
+    fallback_day: date
+) -> Dict[Tuple[str, date], Dict[str, Any]]:
+    """
+    Day nodes of one execution's results
+
+    Rows are attributed to the day in their date column; results without
+    one (or rows whose date does not parse) count on `fallback_day`, the end
+    of the execution's window. Every day gets a TOTAL node and one node per
+    value of each dimension column present, keyed '<column>:<value>'.
+
+    Returns:
+        {(dimension, day): {'metrics': {metric: sum}, 'row_count': n}}
+    """
+    shared = SharedAggregates(results)
+    day_field = date_column(results)
+    metrics = [metric for metric in metrics if results.has_column(metric)]
+    groupings = [((day_field,) if day_field else (), TOTAL, None)]
+    for dimension in dimensions:
+        if results.has_column(dimension):
+            groupings.append(((day_field, dimension) if day_field else (dimension,), dimension, dimension))
+
+    leaves: Dict[Tuple[str, date], Dict[str, Any]] = {}
+    for keys, name, dimension in groupings:
+        if keys:
+            grouping = shared.grouping(keys)
+            labels = grouping.labels
+            sums = {metric: shared.aggregate(keys, metric, 'sum') for metric in metrics}
+            counts = [0] * len(labels)
+            for group in grouping.index:
+                counts[group] += 1
+        else:
+            labels = [()]
+            sums = {metric: [shared.total(metric)] for metric in metrics}
+            counts = [len(results)]
+
+        for position, label in enumerate(labels):
+            label = dict(zip(keys, label))
+            day = (_as_day(label[day_field]) if day_field else None) or fallback_day
+            if dimension:
+                value = label[dimension]
+                if value is None or value == '':
+                    continue
+                node_key = (f"{dimension}:{value}", day)
+            else:
+                node_key = (name, day)
+            leaf = leaves.setdefault(node_key, {'metrics': {metric: 0 for metric in metrics}, 'row_count': 0})
+            leaf['row_count'] += counts[position]
+            for metric in metrics:
+                leaf['metrics'][metric] += sums[metric][position]
+    return leaves
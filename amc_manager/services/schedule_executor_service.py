@@ -7,6 +7,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta, timezone
 
 from ..core.logger_simple import get_logger
+from ..core.metrics import POLL_CYCLE_SECONDS, QUEUE_DEPTH
 from ..core.supabase_client import SupabaseManager
 from .enhanced_schedule_service import EnhancedScheduleService
 from .token_service import TokenService
@@ -37,7 +38,8 @@ class ScheduleExecutorService:
         
         while self.running:
             try:
-                await self.check_and_execute_schedules()
+                with POLL_CYCLE_SECONDS.labels('schedule_executor').time():
+                    await self.check_and_execute_schedules()
             except Exception as e:
                 logger.error(f"Schedule executor error: {e}", exc_info=True)
             
@@ -59,6 +61,7 @@ class ScheduleExecutorService:
         try:
             # Get all due schedules with a tighter buffer (30 seconds instead of 2 minutes)
             due_schedules = self.schedule_service.get_due_schedules(buffer_minutes=0.5)
+            QUEUE_DEPTH.labels('schedule_executor').set(len(due_schedules or []))
             
             if due_schedules:
                 logger.info(f"Found {len(due_schedules)} potentially due schedules")
@@ -2,10 +2,11 @@
 
 import json
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from ..core.logger_simple import get_logger
 from .db_service import DatabaseService
+from . import schedule_run_stats
 
 logger = get_logger(__name__)
 
@@ -121,95 +122,77 @@ class ScheduleHistoryService(DatabaseService):
         Returns:
             Dictionary of metrics
         """
-        try:
-            # Handle both UUID and string schedule IDs
-            if schedule_id.startswith('sched_'):
-                schedule_result = self.client.table('workflow_schedules').select('id').eq('schedule_id', schedule_id).single().execute()
-                if schedule_result.data:
-                    actual_schedule_id = schedule_result.data['id']
-                else:
-                    return self._empty_metrics()
-            else:
-                actual_schedule_id = schedule_id
-            
-            # Calculate cutoff date
-            cutoff_date = datetime.utcnow() - timedelta(days=period_days)
-            
-            # Get all runs within period
-            result = self.client.table('schedule_runs').select('*').eq(
-                'schedule_id', actual_schedule_id
-            ).gte('scheduled_at', cutoff_date.isoformat()).execute()
-            
-            runs = result.data or []
-            
-            # Calculate basic metrics
-            total_runs = len(runs)
-            successful_runs = sum(1 for r in runs if r['status'] == 'completed')
-            failed_runs = sum(1 for r in runs if r['status'] == 'failed')
-            pending_runs = sum(1 for r in runs if r['status'] == 'pending')
-            running_runs = sum(1 for r in runs if r['status'] == 'running')
-            
-            # Calculate success rate
-            success_rate = (successful_runs / total_runs * 100) if total_runs > 0 else 0
-            
-            # Calculate average runtime for successful runs
-            runtimes = []
-            for run in runs:
-                if run['status'] == 'completed' and run.get('started_at') and run.get('completed_at'):
-                    start = self._parse_datetime(run['started_at'])
-                    end = self._parse_datetime(run['completed_at'])
-                    if start and end:
-                        runtimes.append((end - start).total_seconds())
-            
-            avg_runtime_seconds = sum(runtimes) / len(runtimes) if runtimes else None
-            
-            # Calculate totals
-            total_rows_processed = sum(r.get('total_rows', 0) for r in runs)
-            total_cost = sum(r.get('total_cost', 0) for r in runs)
-            
-            # Get schedule details for next/last run
-            schedule_result = self.client.table('workflow_schedules').select('*').eq(
-                'id', schedule_id
-            ).single().execute()
-            
-            schedule = schedule_result.data if schedule_result.data else {}
-            
-            return {
-                'schedule_id': schedule_id,
-                'period_days': period_days,
-                'total_runs': total_runs,
-                'successful_runs': successful_runs,
-                'failed_runs': failed_runs,
-                'pending_runs': pending_runs,
-                'running_runs': running_runs,
-                'success_rate': round(success_rate, 2),
-                'avg_runtime_seconds': round(avg_runtime_seconds, 2) if avg_runtime_seconds else None,
-                'total_rows_processed': total_rows_processed,
-                'total_cost': round(total_cost, 2),
-                'next_run': schedule.get('next_run_at'),
-                'last_run': schedule.get('last_run_at'),
-                'first_run_in_period': min((r['scheduled_at'] for r in runs), default=None),
-                'last_run_in_period': max((r['scheduled_at'] for r in runs), default=None)
-            }
+        metrics = self.get_batch_schedule_metrics([schedule_id], period_days)
+        return metrics.get(schedule_id) or {
+            'schedule_id': schedule_id,
+            'period_days': period_days,
+            **self._empty_metrics()
+        }
+    
+    def get_batch_schedule_metrics(
+        self,
+        schedule_ids: List[str],
+        period_days: int = 30
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get performance metrics for many schedules at once
+        
+        Reads the schedules and their daily run counters in one query each,
+        whatever the number of schedules.
+        
+        Args:
+            schedule_ids: Schedule IDs (UUIDs or sched_ string IDs)
+            period_days: Period in days for metrics calculation
             
+        Returns:
+            Metrics keyed by the IDs as given; unknown schedules are left out
+        """
+        try:
+            schedules = self._resolve_schedules(schedule_ids)
+            return self.get_metrics_for_schedules(schedules, period_days)
         except Exception as e:
             logger.error(f"Error getting schedule metrics: {e}")
             return {
-                'schedule_id': schedule_id,
+                schedule_id: {
+                    'schedule_id': schedule_id,
+                    'period_days': period_days,
+                    **self._empty_metrics(),
+                    'error': str(e)
+                }
+                for schedule_id in schedule_ids
+            }
+    
+    def get_metrics_for_schedules(
+        self,
+        schedules: Dict[str, Dict[str, Any]],
+        period_days: int = 30
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get performance metrics for schedule records already loaded
+        
+        Args:
+            schedules: Schedule records (with id, next_run_at, last_run_at)
+                keyed by the ID to report them under
+            period_days: Period in days for metrics calculation
+            
+        Returns:
+            Metrics keyed like `schedules`
+        """
+        # Counters are per UTC day: the period starts at the beginning of the cutoff day
+        start_day = (datetime.utcnow() - timedelta(days=period_days)).date()
+        days = self._get_daily_stats([schedule['id'] for schedule in schedules.values()], start_day)
+        
+        metrics = {}
+        for key, schedule in schedules.items():
+            totals = schedule_run_stats.combine_days(days.get(schedule['id'], []))
+            metrics[key] = {
+                'schedule_id': key,
                 'period_days': period_days,
-                'total_runs': 0,
-                'successful_runs': 0,
-                'failed_runs': 0,
-                'pending_runs': 0,
-                'running_runs': 0,
-                'success_rate': 0.0,
-                'avg_runtime_seconds': None,
-                'total_rows_processed': 0,
-                'total_cost': 0.0,
-                'next_run': None,
-                'last_run': None,
-                'error': str(e)
+                **schedule_run_stats.health_metrics(totals),
+                'next_run': schedule.get('next_run_at'),
+                'last_run': schedule.get('last_run_at')
             }
+        return metrics
     
     def compare_periods(
         self,
@@ -222,6 +205,8 @@ class ScheduleHistoryService(DatabaseService):
         """
         Compare metrics between two periods
         
+        Periods are read from the daily run counters and cover whole UTC days.
+        
         Args:
             schedule_id: Schedule ID
             period1_start: Start of first period
@@ -233,44 +218,22 @@ class ScheduleHistoryService(DatabaseService):
             Comparison metrics
         """
         try:
-            # Get runs for period 1
-            period1_result = self.client.table('schedule_runs').select('*').eq(
-                'schedule_id', schedule_id
-            ).gte('scheduled_at', period1_start.isoformat()).lte(
-                'scheduled_at', period1_end.isoformat()
-            ).execute()
-            
-            period1_runs = period1_result.data or []
-            
-            # Get runs for period 2
-            period2_result = self.client.table('schedule_runs').select('*').eq(
-                'schedule_id', schedule_id
-            ).gte('scheduled_at', period2_start.isoformat()).lte(
-                'scheduled_at', period2_end.isoformat()
-            ).execute()
-            
-            period2_runs = period2_result.data or []
-            
-            # Calculate metrics for each period
-            def calculate_period_metrics(runs):
-                total = len(runs)
-                successful = sum(1 for r in runs if r['status'] == 'completed')
-                failed = sum(1 for r in runs if r['status'] == 'failed')
-                success_rate = (successful / total * 100) if total > 0 else 0
-                total_rows = sum(r.get('total_rows', 0) for r in runs)
-                total_cost = sum(r.get('total_cost', 0) for r in runs)
+            def calculate_period_metrics(start: datetime, end: datetime) -> Dict[str, Any]:
+                days = self._get_daily_stats([schedule_id], start.date(), end.date())
+                totals = schedule_run_stats.combine_days(days.get(schedule_id, []))
+                metrics = schedule_run_stats.health_metrics(totals)
                 
                 return {
-                    'total_runs': total,
-                    'successful_runs': successful,
-                    'failed_runs': failed,
-                    'success_rate': round(success_rate, 2),
-                    'total_rows': total_rows,
-                    'total_cost': round(total_cost, 2)
+                    'total_runs': metrics['total_runs'],
+                    'successful_runs': metrics['successful_runs'],
+                    'failed_runs': metrics['failed_runs'],
+                    'success_rate': metrics['success_rate'],
+                    'total_rows': metrics['total_rows_processed'],
+                    'total_cost': metrics['total_cost']
                 }
             
-            period1_metrics = calculate_period_metrics(period1_runs)
-            period2_metrics = calculate_period_metrics(period2_runs)
+            period1_metrics = calculate_period_metrics(period1_start, period1_end)
+            period2_metrics = calculate_period_metrics(period2_start, period2_end)
             
             # Calculate changes
             changes = {}
@@ -321,10 +284,10 @@ class ScheduleHistoryService(DatabaseService):
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get all runs and executions
+            # Get the runs and their executions, only the columns the timeline shows
             result = self.client.table('schedule_runs').select(
-                '*',
-                'workflow_executions(*)'
+                'id, run_number, scheduled_at, started_at, completed_at, status',
+                'workflow_executions(id, status, started_at, completed_at, row_count)'
             ).eq('schedule_id', schedule_id).gte(
                 'scheduled_at', cutoff_date.isoformat()
             ).order('scheduled_at', desc=False).execute()
@@ -462,21 +425,68 @@ class ScheduleHistoryService(DatabaseService):
             Dictionary with empty/default metric values
         """
         return {
-            'total_runs': 0,
-            'successful_runs': 0,
-            'failed_runs': 0,
-            'pending_runs': 0,
-            'running_runs': 0,
-            'success_rate': 0.0,
-            'avg_runtime_seconds': None,
-            'total_rows_processed': 0,
-            'total_cost': 0.0,
+            **schedule_run_stats.health_metrics(schedule_run_stats.combine_days([])),
             'next_run': None,
-            'last_run': None,
-            'first_run_in_period': None,
-            'last_run_in_period': None
+            'last_run': None
         }
     
+    def _resolve_schedules(self, schedule_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up schedules by UUID or sched_ string ID
+        
+        Args:
+            schedule_ids: Schedule IDs in either form
+            
+        Returns:
+            Schedule records (id, schedule_id, next_run_at, last_run_at) keyed
+            by the ID as given
+        """
+        columns = 'id, schedule_id, next_run_at, last_run_at'
+        string_ids = [sid for sid in schedule_ids if sid.startswith('sched_')]
+        uuids = [sid for sid in schedule_ids if not sid.startswith('sched_')]
+        
+        schedules = {}
+        if string_ids:
+            result = self.client.table('workflow_schedules').select(columns).in_('schedule_id', string_ids).execute()
+            schedules.update({row['schedule_id']: row for row in result.data or []})
+        if uuids:
+            result = self.client.table('workflow_schedules').select(columns).in_('id', uuids).execute()
+            schedules.update({row['id']: row for row in result.data or []})
+        
+        return {sid: schedules[sid] for sid in schedule_ids if sid in schedules}
+    
+    def _get_daily_stats(
+        self,
+        schedule_uuids: List[str],
+        start_day: date,
+        end_day: Optional[date] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get daily run counters of schedules in one query
+        
+        Args:
+            schedule_uuids: Schedule UUIDs
+            start_day: First UTC day (inclusive)
+            end_day: Last UTC day (inclusive), open-ended if None
+            
+        Returns:
+            Counter rows per schedule UUID
+        """
+        if not schedule_uuids:
+            return {}
+        
+        query = self.client.table('schedule_run_daily_stats').select('*').in_(
+            'schedule_id', list(dict.fromkeys(schedule_uuids))
+        ).gte('day', start_day.isoformat())
+        if end_day:
+            query = query.lte('day', end_day.isoformat())
+        result = query.execute()
+        
+        days: Dict[str, List[Dict[str, Any]]] = {}
+        for row in result.data or []:
+            days.setdefault(row['schedule_id'], []).append(row)
+        return days
+    
     def _parse_datetime(self, dt_str: str) -> Optional[datetime]:
         """
         Parse datetime string to datetime object
@@ -499,4 +509,7 @@ class ScheduleHistoryService(DatabaseService):
             else:
                 return datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S')
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+
+schedule_history_service = ScheduleHistoryService()
@@ -0,0 +1,111 @@
+"""
+Schedule Run Stats
+Schedule health metrics from daily run counters
+
+schedule_run_daily_stats holds one row per schedule and UTC day with run
+counts by status, runtime sum/count, rows and cost, kept current by a trigger
+on schedule_runs (migration 23). Any period is the sum of its days, so
+metrics never scan runs.
+
+Runtime percentiles come from a log-bucket sketch: a completed run of s
+seconds counts in bucket ceil(ln(s) / ln(GAMMA)). Buckets of different days
+simply add up, and a percentile read from the merged buckets is within
+(GAMMA - 1) / 2 of the true runtime. GAMMA must match the migration.
+"""
+
+import math
+from typing import Any, Dict, Iterable, Optional
+
+GAMMA = 1.02
+
+# Shortest runtime told apart from zero
+_MIN_SECONDS = 0.001
+
+STATUSES = ('pending', 'running', 'completed', 'failed', 'cancelled')
+
+_COUNTERS = ('total_runs',) + tuple(f'{status}_runs' for status in STATUSES) + (
+    'runtime_count', 'runtime_sum', 'total_rows', 'total_cost'
+)
+_FLOAT_COUNTERS = ('runtime_sum', 'total_cost')
+
+
+def sketch_bucket(seconds: float) -> int:
+    """Sketch bucket of a runtime (same formula as apply_schedule_run_stats())"""
+    return math.ceil(math.log(max(seconds, _MIN_SECONDS)) / math.log(GAMMA))
+
+
+def merge_sketches(sketches: Iterable[Optional[Dict[str, int]]]) -> Dict[int, int]:
+    """Add up {bucket: count} sketches"""
+    merged: Dict[int, int] = {}
+    for sketch in sketches:
+        for bucket, count in (sketch or {}).items():
+            merged[int(bucket)] = merged.get(int(bucket), 0) + int(count)
+    return merged
+
+
+def sketch_quantile(sketch: Dict[int, int], q: float) -> Optional[float]:
+    """
+    Runtime at quantile `q` (0..1) of a merged sketch, or None if it is empty
+
+    Each bucket is represented by the midpoint that keeps the relative error
+    of every value in it within (GAMMA - 1) / 2.
+    """
+    total = sum(count for count in sketch.values() if count > 0)
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bucket in sorted(sketch):
+        seen += max(sketch[bucket], 0)
+        if seen > rank:
+            return 2 * GAMMA ** bucket / (GAMMA + 1)
+    return 2 * GAMMA ** max(sketch) / (GAMMA + 1)
+
+
+def combine_days(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Sum daily counter rows of one or more schedules
+
+    Returns the summed counters plus the merged 'runtime_sketch' and the
+    first/last scheduled_at over all days.
+    """
+    totals: Dict[str, Any] = {name: 0 for name in _COUNTERS}
+    sketches = []
+    first = last = None
+    for row in rows:
+        for name in _COUNTERS:
+            value = row.get(name) or 0
+            totals[name] += float(value) if name in _FLOAT_COUNTERS else int(value)
+        sketches.append(row.get('runtime_sketch'))
+        if row.get('first_scheduled_at') and (first is None or row['first_scheduled_at'] < first):
+            first = row['first_scheduled_at']
+        if row.get('last_scheduled_at') and (last is None or row['last_scheduled_at'] > last):
+            last = row['last_scheduled_at']
+    totals['runtime_sketch'] = merge_sketches(sketches)
+    totals['first_scheduled_at'] = first
+    totals['last_scheduled_at'] = last
+    return totals
+
+
+def health_metrics(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Success rate, runtime and volume metrics of combined counters"""
+    total_runs = totals['total_runs']
+    runtime_count = totals['runtime_count']
+    sketch = totals['runtime_sketch']
+    p50 = sketch_quantile(sketch, 0.5)
+    p95 = sketch_quantile(sketch, 0.95)
+    return {
+        'total_runs': total_runs,
+        'successful_runs': totals['completed_runs'],
+        'failed_runs': totals['failed_runs'],
+        'pending_runs': totals['pending_runs'],
+        'running_runs': totals['running_runs'],
+        'success_rate': round(totals['completed_runs'] / total_runs * 100, 2) if total_runs else 0.0,
+        'avg_runtime_seconds': round(totals['runtime_sum'] / runtime_count, 2) if runtime_count else None,
+        'p50_runtime_seconds': round(p50, 2) if p50 is not None else None,
+        'p95_runtime_seconds': round(p95, 2) if p95 is not None else None,
+        'total_rows_processed': totals['total_rows'],
+        'total_cost': round(totals['total_cost'], 2),
+        'first_run_in_period': totals['first_scheduled_at'],
+        'last_run_in_period': totals['last_scheduled_at']
+    }
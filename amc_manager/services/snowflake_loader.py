@@ -0,0 +1,296 @@
+"""
+Snowflake Loader
+Typed Arrow tables for Snowflake uploads
+
+AMC results arrive as CSV-derived lists of strings. Loading them through a
+pandas DataFrame made every column `object`, so every Snowflake column became
+VARCHAR. Here each column's type is inferred once per result set and the
+values are converted straight into typed Arrow arrays, which are written as
+Parquet and loaded with a staged COPY (see SnowflakeService).
+
+Types are Snowflake column types as used in DDL; SNOWFLAKE_ARROW_TYPES maps
+them to the Arrow types the Parquet file carries. Results downloaded as
+Parquet already declare their column types (result_columns), and
+declared_column_types() takes those instead of inferring them again.
+
+A known type is a starting point, not a constraint: when a later result has
+values that do not fit it (a decimal in an INTEGER column, text in a DATE
+column), the column widens along WIDER_TYPES (INTEGER -> FLOAT -> VARCHAR,
+DATE -> TIMESTAMP_NTZ -> VARCHAR) and TableMetadata.widened_columns() tells
+the uploader which existing columns have to be migrated.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+
+from . import result_set
+
+VARCHAR = 'VARCHAR(16777216)'
+INTEGER = 'INTEGER'
+FLOAT = 'FLOAT'
+BOOLEAN = 'BOOLEAN'
+DATE = 'DATE'
+TIMESTAMP = 'TIMESTAMP_NTZ'
+
+SNOWFLAKE_ARROW_TYPES = {
+    VARCHAR: pa.string(),
+    INTEGER: pa.int64(),
+    FLOAT: pa.float64(),
+    BOOLEAN: pa.bool_(),
+    DATE: pa.date32(),
+    TIMESTAMP: pa.timestamp('us'),
+}
+
+# Types a column widens to, narrowest first, when its values do not fit;
+# VARCHAR takes any value
+WIDER_TYPES = {
+    INTEGER: (FLOAT, VARCHAR),
+    FLOAT: (VARCHAR,),
+    BOOLEAN: (VARCHAR,),
+    DATE: (TIMESTAMP, VARCHAR),
+    TIMESTAMP: (VARCHAR,),
+}
+
+def infer_snowflake_type(values: Iterable[Any]) -> str:
+    """
+    Narrowest Snowflake type every non-empty value fits
+
+    Values are classified by result_set.infer_type (INTEGER, FLOAT, BOOLEAN,
+    DATE, TIMESTAMP_NTZ); anything else, and columns without any value, are
+    VARCHAR.
+    """
+    return _DECLARED_TYPES.get(result_set.infer_type(list(values), temporal=True), VARCHAR)
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).strip().rstrip('Z').replace(' ', 'T'))
+
+
+def _parse_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+_CONVERTERS = {
+    INTEGER: lambda v: int(str(v).strip()) if not isinstance(v, int) else v,
+    FLOAT: lambda v: float(v),
+    BOOLEAN: lambda v: v if isinstance(v, bool) else result_set.BOOLEAN_VALUES[str(v).strip().lower()],
+    DATE: _parse_date,
+    TIMESTAMP: _parse_timestamp,
+}
+
+
+def to_arrow_array(values: Sequence[Any], snowflake_type: str) -> pa.Array:
+    """Convert raw values to an Arrow array of the given Snowflake type
+
+    Empty strings become nulls except in VARCHAR columns, where they are kept.
+
+    Raises:
+        ValueError: A value does not fit the type
+    """
+    if snowflake_type not in _CONVERTERS:
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    convert = _CONVERTERS[snowflake_type]
+    return pa.array(
+        [None if result_set.is_empty(v) else convert(v) for v in values],
+        type=SNOWFLAKE_ARROW_TYPES[snowflake_type]
+    )
+
+
+def column_values(rows: Sequence[Any], index: int, name: str) -> List[Any]:
+    """One column out of list rows (CSV) or dict rows"""
+    if rows and isinstance(rows[0], dict):
+        return [row.get(name) for row in rows]
+    return [row[index] if index < len(row) else None for row in rows]
+
+
+def _typed_array(values: Sequence[Any], snowflake_type: Optional[str]) -> pa.Array:
+    """Array of the given type, or of the narrowest wider type the values fit"""
+    snowflake_type = snowflake_type or infer_snowflake_type(values)
+    for candidate in (snowflake_type, *WIDER_TYPES.get(snowflake_type, ())):
+        try:
+            return to_arrow_array(values, candidate)
+        except (ValueError, KeyError, TypeError, pa.ArrowException):
+            continue
+    return to_arrow_array(values, VARCHAR)
+
+
+def build_arrow_table(
+    names: Sequence[str],
+    rows: Sequence[Any],
+    column_types: Optional[Dict[str, str]] = None,
+    constants: Optional[Sequence[Tuple[str, Any]]] = None
+) -> pa.Table:
+    """
+    Typed Arrow table from result rows
+
+    Args:
+        names: Column names in row order
+        rows: Rows as lists (CSV order) or dicts
+        column_types: Known Snowflake types (e.g. of an existing table); other
+            columns are inferred from their values. A known type whose column
+            has values that do not fit it is widened (see WIDER_TYPES)
+        constants: (name, value) metadata columns repeated on every row
+
+    Returns:
+        Arrow table whose schema maps back to Snowflake types via
+        snowflake_type_for()
+    """
+    column_types = column_types or {}
+    arrays, fields = [], []
+    for index, name in enumerate(names):
+        values = column_values(rows, index, name)
+        arrays.append(_typed_array(values, column_types.get(name)))
+        fields.append(pa.field(name, arrays[-1].type))
+
+    for name, value in constants or ():
+        arrays.append(_typed_array([value] * len(rows), column_types.get(name)))
+        fields.append(pa.field(name, arrays[-1].type))
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+# result_columns / result_set types (see result_download.result_column_type)
+_DECLARED_TYPES = {
+    'long': INTEGER,
+    'integer': INTEGER,
+    'double': FLOAT,
+    'float': FLOAT,
+    'boolean': BOOLEAN,
+    'date': DATE,
+    'timestamp': TIMESTAMP,
+}
+
+
+def declared_column_types(columns: Sequence[Dict[str, Any]]) -> Dict[str, str]:
+    """{column: Snowflake type} for result columns with a declared type
+
+    'string' columns are left out: CSV results declare every column a string,
+    so those are still inferred from their values.
+    """
+    return {
+        column['name']: _DECLARED_TYPES[column.get('type')]
+        for column in columns
+        if column.get('type') in _DECLARED_TYPES
+    }
+
+
+def snowflake_type_for(arrow_type: pa.DataType) -> str:
+    """Snowflake column type for an Arrow type produced by build_arrow_table"""
+    if pa.types.is_integer(arrow_type):
+        return INTEGER
+    if pa.types.is_floating(arrow_type):
+        return FLOAT
+    if pa.types.is_boolean(arrow_type):
+        return BOOLEAN
+    if pa.types.is_date(arrow_type):
+        return DATE
+    if pa.types.is_timestamp(arrow_type):
+        return TIMESTAMP
+    return VARCHAR
+
+
+def normalize_snowflake_type(data_type: str, numeric_scale: Optional[int] = None) -> str:
+    """Map an INFORMATION_SCHEMA.COLUMNS data_type to the types used here"""
+    data_type = (data_type or '').upper()
+    if data_type in ('NUMBER', 'DECIMAL', 'NUMERIC', 'INT', 'INTEGER', 'BIGINT'):
+        return INTEGER if not numeric_scale else FLOAT
+    if data_type in ('FLOAT', 'DOUBLE', 'REAL', 'FLOAT4', 'FLOAT8', 'DOUBLE PRECISION'):
+        return FLOAT
+    if data_type == 'BOOLEAN':
+        return BOOLEAN
+    if data_type == 'DATE':
+        return DATE
+    if data_type.startswith('TIMESTAMP') or data_type == 'DATETIME':
+        return TIMESTAMP
+    return VARCHAR
+
+
+@dataclass
+class TableMetadata:
+    """What an upload needs to know about an existing target table"""
+
+    # {column: Snowflake type} as the table currently stands
+    column_types: Dict[str, str] = field(default_factory=dict)
+    # (column names, has time window) -> (detected date column, MERGE template)
+    merge_plans: Dict[Tuple[Tuple[str, ...], bool], Tuple[Optional[str], str]] = field(default_factory=dict)
+
+    def new_columns(self, table: pa.Table) -> List[Tuple[str, str]]:
+        """(column, Snowflake type) of table columns the target does not have yet"""
+        return [
+            (f.name, snowflake_type_for(f.type))
+            for f in table.schema
+            if f.name not in self.column_types
+        ]
+
+    def widened_columns(self, table: pa.Table) -> List[Tuple[str, str]]:
+        """(column, wider Snowflake type) of existing columns whose values no longer fit their type"""
+        return [
+            (f.name, snowflake_type_for(f.type))
+            for f in table.schema
+            if f.name in self.column_types and snowflake_type_for(f.type) != self.column_types[f.name]
+        ]
+
+    def copy(self) -> 'TableMetadata':
+        return TableMetadata(dict(self.column_types), dict(self.merge_plans))
+
+
+class TableMetadataCache:
+    """Known target tables, so repeated uploads skip DDL checks and MERGE generation
+
+    Keyed by (account, fully qualified table). The first upload to a table
+    either creates it or reads its columns from INFORMATION_SCHEMA; later
+    uploads reuse the column types, add only columns that are new and reuse
+    the MERGE statement built for the same column set. Entries are dropped
+    when an upload fails with a schema error.
+    """
+
+    def __init__(self):
+        self._tables: Dict[Tuple[str, str], TableMetadata] = {}
+        self._lock = threading.Lock()
+
+    def get(self, account: str, table: str) -> Optional[TableMetadata]:
+        with self._lock:
+            metadata = self._tables.get((account, table.upper()))
+            return metadata.copy() if metadata is not None else None
+
+    def put(self, account: str, table: str, metadata: TableMetadata) -> None:
+        with self._lock:
+            self._tables[(account, table.upper())] = metadata.copy()
+
+    def invalidate(self, account: str, table: str) -> None:
+        with self._lock:
+            self._tables.pop((account, table.upper()), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+
+# Snowflake error codes meaning the cached table layout is out of date
+# (invalid identifier, object does not exist, object does not exist or not authorized)
+_SCHEMA_ERROR_CODES = {904, 2003, 2043}
+_SCHEMA_ERROR_RE = re.compile(r'invalid identifier|does not exist|not authorized', re.IGNORECASE)
+
+
+def is_schema_error(error: BaseException) -> bool:
+    """Whether a Snowflake error means the table changed underneath the cache"""
+    if getattr(error, 'errno', None) in _SCHEMA_ERROR_CODES:
+        return True
+    return bool(_SCHEMA_ERROR_RE.search(str(error)))
+
+
+# Process-wide cache shared by every SnowflakeService instance
+table_metadata_cache = TableMetadataCache()
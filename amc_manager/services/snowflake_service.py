@@ -3,29 +3,44 @@ Snowflake Integration Service
 
 Handles uploading execution results to Snowflake data warehouse.
 Supports both password and key-pair authentication.
-Uses UPSERT (MERGE INTO) to prevent duplicate data.
+Results are loaded as typed Parquet through a staged COPY, then UPSERTed
+(MERGE INTO) to prevent duplicate data.
+
+snowflake-connector-python (and the pandas it pulls in) is imported on the
+first connection rather than at import time, so processes that never talk to
+Snowflake do not pay for it.
 """
 
 import json
 import os
-import pandas as pd
-import snowflake.connector
-from snowflake.connector import DictCursor
-from snowflake.connector.pandas_tools import write_pandas
-from typing import Optional, Dict, Any, List
+import pyarrow as pa
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple, Union
 from datetime import datetime
 import logging
 import re
+import tempfile
+import time
 import uuid
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import serialization
 
 from ..services.db_service import DatabaseService, with_connection_retry
 from ..core.logger_simple import get_logger
+from ..core.metrics import SNOWFLAKE_UPLOAD_BYTES, SNOWFLAKE_UPLOAD_ROWS, SNOWFLAKE_UPLOAD_SECONDS, traced
 from ..config.settings import settings
+from .snowflake_loader import (
+    DATE, TIMESTAMP, TableMetadata, build_arrow_table, declared_column_types, is_schema_error,
+    normalize_snowflake_type, snowflake_type_for, table_metadata_cache
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from snowflake.connector import SnowflakeConnection
 
 logger = get_logger(__name__)
 
+# Stands in for the per-upload temp table in cached MERGE statements
+_MERGE_SOURCE = '__MERGE_SOURCE__'
+
 
 class SnowflakeService(DatabaseService):
     """Service for managing Snowflake data warehouse integration"""
@@ -54,7 +69,7 @@ class SnowflakeService(DatabaseService):
             logger.error(f"Error initializing Fernet encryption: {e}")
             return None
 
-    def _detect_date_column(self, df: pd.DataFrame) -> Optional[str]:
+    def _detect_date_column(self, df: Union['pd.DataFrame', pa.Table]) -> Optional[str]:
         """
         Detect the primary date column in DataFrame for UPSERT key
 
@@ -63,10 +78,10 @@ class SnowflakeService(DatabaseService):
         2. Columns with 'week' in name (week, week_start, week_ending)
         3. Columns with 'month' in name (month, month_start)
         4. Columns with 'period' or 'time' in name
-        5. Any datetime64 dtype column
+        5. Any datetime/date column
 
         Args:
-            df: DataFrame to analyze
+            df: DataFrame or typed Arrow table to analyze
 
         Returns:
             Column name or None if no date column found
@@ -82,15 +97,15 @@ class SnowflakeService(DatabaseService):
 
         # Check for pattern matches (case-insensitive)
         for pattern in date_patterns:
-            for col in df.columns:
+            for col in self._column_names(df):
                 if re.match(pattern, str(col), re.IGNORECASE):
                     logger.info(f"Detected date column by pattern '{pattern}': {col}")
                     return col
 
         # Check for datetime types
-        for col_name, dtype in df.dtypes.items():
-            if 'datetime' in str(dtype):
-                logger.info(f"Detected date column by dtype: {col_name} ({dtype})")
+        for col_name, snowflake_type in self._snowflake_column_types(df):
+            if snowflake_type in (DATE, TIMESTAMP):
+                logger.info(f"Detected date column by type: {col_name} ({snowflake_type})")
                 return col_name
 
         logger.warning("No date column detected in DataFrame")
@@ -223,7 +238,7 @@ class SnowflakeService(DatabaseService):
 
         return decrypted_data
 
-    def _get_snowflake_connection(self, config: Dict[str, Any]) -> snowflake.connector.SnowflakeConnection:
+    def _get_snowflake_connection(self, config: Dict[str, Any]) -> 'SnowflakeConnection':
         """
         Create Snowflake connection using the provided configuration
         
@@ -254,6 +269,8 @@ class SnowflakeService(DatabaseService):
             
             # Use key-pair authentication if private key is available
             if decrypted_data.get('private_key'):
+                from cryptography.hazmat.primitives import serialization
+
                 # Parse private key
                 private_key = serialization.load_pem_private_key(
                     decrypted_data['private_key'].encode(),
@@ -266,6 +283,8 @@ class SnowflakeService(DatabaseService):
                 conn_params['password'] = decrypted_data['password']
             
             # Create connection
+            import snowflake.connector
+
             connection = snowflake.connector.connect(**conn_params)
             logger.info(f"Successfully connected to Snowflake account: {config['account_identifier']}")
             return connection
@@ -274,6 +293,7 @@ class SnowflakeService(DatabaseService):
             logger.error(f"Error connecting to Snowflake: {e}")
             raise
 
+    @traced('snowflake.sync')
     def upload_execution_results(
         self,
         execution_id: str,
@@ -297,6 +317,7 @@ class SnowflakeService(DatabaseService):
         Returns:
             Upload result with status and details
         """
+        started = time.perf_counter()
         try:
             # Validate user has Snowflake configuration
             config = self.get_user_snowflake_config(user_id)
@@ -327,48 +348,76 @@ class SnowflakeService(DatabaseService):
                 if not columns or not rows:
                     raise Exception("No data to upload")
 
-                # Create DataFrame
-                df = pd.DataFrame(rows, columns=[col['name'] for col in columns])
-
-                # Add metadata columns
-                df['execution_id'] = execution_id
-                df['uploaded_at'] = datetime.utcnow()
-                df['user_id'] = user_id
+                # Typed Arrow table: existing tables keep their column types
+                # unless these values need a wider one, new columns take the
+                # type the result declares (Parquet output) or one inferred
+                # from this result set
+                names = [col['name'] for col in columns]
+                constants = [
+                    ('execution_id', execution_id),
+                    ('uploaded_at', datetime.utcnow()),
+                    ('user_id', user_id),
+                ]
 
                 # Add week_start column if provided (for template executions)
                 if week_start:
-                    df['week_start'] = week_start
+                    constants.append(('week_start', week_start))
                     logger.info(f"Adding week_start column with value: {week_start}")
 
                 # Add date range columns for UPSERT key (from execution parameters)
                 if execution_parameters:
                     if 'timeWindowStart' in execution_parameters:
-                        df['time_window_start'] = execution_parameters['timeWindowStart']
+                        constants.append(('time_window_start', execution_parameters['timeWindowStart']))
                         logger.info(f"Adding time_window_start column: {execution_parameters['timeWindowStart']}")
                     if 'timeWindowEnd' in execution_parameters:
-                        df['time_window_end'] = execution_parameters['timeWindowEnd']
+                        constants.append(('time_window_end', execution_parameters['timeWindowEnd']))
                         logger.info(f"Adding time_window_end column: {execution_parameters['timeWindowEnd']}")
 
-                # Create table if it doesn't exist
                 full_table_name = f"{config['database']}.{config['schema']}.{table_name}"
-                self._create_table_if_not_exists(connection, full_table_name, df, execution_parameters)
+                metadata = self._get_table_metadata(connection, config, full_table_name)
+                column_types = {**declared_column_types(columns), **(metadata.column_types if metadata else {})}
+                table = build_arrow_table(names, rows, column_types, constants)
+
+                if metadata is None:
+                    # Create table if it doesn't exist
+                    self._create_table_if_not_exists(connection, full_table_name, table, execution_parameters)
+                    metadata = TableMetadata(column_types=dict(self._snowflake_column_types(table)))
+                else:
+                    try:
+                        self._widen_columns(connection, full_table_name, table, metadata)
+                        self._add_new_columns(connection, full_table_name, table, metadata)
+                    except Exception:
+                        # Read the columns again rather than trust a half-applied change
+                        table_metadata_cache.invalidate(config['account_identifier'], full_table_name)
+                        raise
 
                 # Upload data with execution parameters for composite key
-                self._upload_dataframe_to_snowflake(connection, df, full_table_name, execution_parameters)
+                try:
+                    self._upload_arrow_to_snowflake(
+                        connection, table, full_table_name, execution_parameters, metadata
+                    )
+                except Exception as upload_error:
+                    if is_schema_error(upload_error):
+                        # The table changed underneath the cached metadata
+                        table_metadata_cache.invalidate(config['account_identifier'], full_table_name)
+                    raise
+                table_metadata_cache.put(config['account_identifier'], full_table_name, metadata)
+                SNOWFLAKE_UPLOAD_SECONDS.labels('success').observe(time.perf_counter() - started)
+                SNOWFLAKE_UPLOAD_ROWS.inc(table.num_rows)
                 
                 # Update execution status to completed
                 self._update_execution_snowflake_status(
                     execution_id, 
                     'completed', 
-                    row_count=len(df)
+                    row_count=table.num_rows
                 )
                 
-                logger.info(f"Successfully uploaded {len(df)} rows to Snowflake table {full_table_name}")
+                logger.info(f"Successfully uploaded {table.num_rows} rows to Snowflake table {full_table_name}")
                 
                 return {
                     'success': True,
                     'table_name': full_table_name,
-                    'row_count': len(df),
+                    'row_count': table.num_rows,
                     'uploaded_at': datetime.utcnow().isoformat()
                 }
                 
@@ -377,6 +426,7 @@ class SnowflakeService(DatabaseService):
                 
         except Exception as e:
             logger.error(f"Error uploading results to Snowflake: {e}")
+            SNOWFLAKE_UPLOAD_SECONDS.labels('failed').observe(time.perf_counter() - started)
             # Update execution status to failed
             self._update_execution_snowflake_status(execution_id, 'failed', error_message=str(e))
             
@@ -401,11 +451,20 @@ class SnowflakeService(DatabaseService):
         else:
             return 'VARCHAR(16777216)'
 
+    def _snowflake_column_types(self, data: Union['pd.DataFrame', pa.Table]) -> List[Tuple[str, str]]:
+        """(column, Snowflake type) pairs for a typed Arrow table or a DataFrame"""
+        if isinstance(data, pa.Table):
+            return [(field.name, snowflake_type_for(field.type)) for field in data.schema]
+        return [(col_name, self._map_dtype_to_snowflake(dtype)) for col_name, dtype in data.dtypes.items()]
+
+    def _column_names(self, data: Union['pd.DataFrame', pa.Table]) -> List[str]:
+        return list(data.column_names) if isinstance(data, pa.Table) else list(data.columns)
+
     def _create_table_if_not_exists(
         self,
-        connection: snowflake.connector.SnowflakeConnection,
+        connection: 'SnowflakeConnection',
         table_name: str,
-        df: pd.DataFrame,
+        df: Union['pd.DataFrame', pa.Table],
         execution_parameters: Optional[Dict[str, Any]] = None
     ):
         """
@@ -416,15 +475,16 @@ class SnowflakeService(DatabaseService):
             cursor = connection.cursor()
 
             # Generate column definitions
-            columns = []
-            for col_name, dtype in df.dtypes.items():
-                snowflake_type = self._map_dtype_to_snowflake(dtype)
-                columns.append(f'"{col_name}" {snowflake_type}')
+            columns = [
+                f'"{col_name}" {snowflake_type}'
+                for col_name, snowflake_type in self._snowflake_column_types(df)
+            ]
+            column_names = self._column_names(df)
 
             # Determine primary key based on execution parameters
             if execution_parameters and 'timeWindowStart' in execution_parameters and 'timeWindowEnd' in execution_parameters:
                 # Use composite date range key for schedules
-                if 'time_window_start' in df.columns and 'time_window_end' in df.columns:
+                if 'time_window_start' in column_names and 'time_window_end' in column_names:
                     pk_clause = 'PRIMARY KEY ("execution_id", "time_window_start", "time_window_end")'
                     logger.info("Creating table with composite date range PK: (execution_id, time_window_start, time_window_end)")
                 else:
@@ -433,7 +493,7 @@ class SnowflakeService(DatabaseService):
             else:
                 # Detect date column for single-date templates
                 date_column = self._detect_date_column(df)
-                if date_column and date_column in df.columns:
+                if date_column and date_column in column_names:
                     pk_clause = f'PRIMARY KEY ("execution_id", "{date_column}")'
                     logger.info(f"Creating table with composite PK: (execution_id, {date_column})")
                 else:
@@ -461,7 +521,7 @@ class SnowflakeService(DatabaseService):
         self,
         target_table: str,
         source_table: str,
-        df: pd.DataFrame,
+        df: Union['pd.DataFrame', pa.Table],
         date_column: Optional[str] = None,
         execution_parameters: Optional[Dict[str, Any]] = None
     ) -> str:
@@ -473,12 +533,13 @@ class SnowflakeService(DatabaseService):
         2. If date_column exists: execution_id + date_column
         3. Fallback: execution_id + uploaded_at
         """
-        columns = [f'"{col}"' for col in df.columns]
+        column_names = self._column_names(df)
+        columns = [f'"{col}"' for col in column_names]
 
         # Build ON clause (join condition)
         if execution_parameters and 'timeWindowStart' in execution_parameters and 'timeWindowEnd' in execution_parameters:
             # Use composite date range key for schedules
-            if 'time_window_start' in df.columns and 'time_window_end' in df.columns:
+            if 'time_window_start' in column_names and 'time_window_end' in column_names:
                 on_clause = '''
                     target."execution_id" = source."execution_id"
                     AND target."time_window_start" = source."time_window_start"
@@ -493,7 +554,7 @@ class SnowflakeService(DatabaseService):
                 '''
                 logger.warning("Date range columns not found, using (execution_id, uploaded_at) as key")
                 exclude_from_update = {'execution_id', 'uploaded_at'}
-        elif date_column and date_column in df.columns:
+        elif date_column and date_column in column_names:
             # Use execution_id + date_column as composite key
             on_clause = f'''
                 target."execution_id" = source."execution_id"
@@ -511,14 +572,14 @@ class SnowflakeService(DatabaseService):
             exclude_from_update = {'execution_id', 'uploaded_at'}
 
         # Build UPDATE SET clause (all columns except keys)
-        update_cols = [col for col in df.columns if col not in exclude_from_update]
+        update_cols = [col for col in column_names if col not in exclude_from_update]
         update_set = ', '.join([
             f'target."{col}" = source."{col}"' for col in update_cols
         ])
 
         # Build INSERT clause
         insert_cols = ', '.join(columns)
-        insert_vals = ', '.join([f'source."{col}"' for col in df.columns])
+        insert_vals = ', '.join([f'source."{col}"' for col in column_names])
 
         merge_sql = f"""
         MERGE INTO {target_table} AS target
@@ -533,26 +594,31 @@ class SnowflakeService(DatabaseService):
 
         return merge_sql
 
-    def _upload_dataframe_to_snowflake(
+    def _upload_arrow_to_snowflake(
         self,
-        connection: snowflake.connector.SnowflakeConnection,
-        df: pd.DataFrame,
+        connection: 'SnowflakeConnection',
+        table: pa.Table,
         table_name: str,
-        execution_parameters: Optional[Dict[str, Any]] = None
+        execution_parameters: Optional[Dict[str, Any]] = None,
+        metadata: Optional[TableMetadata] = None
     ):
         """
-        UPSERT DataFrame to Snowflake using MERGE INTO
+        UPSERT a typed Arrow table to Snowflake using MERGE INTO
 
-        This prevents duplicate data by upserting based on:
+        The table is written as Snappy-compressed Parquet, PUT on the stage of
+        a typed temporary table and loaded with COPY INTO, then merged on:
         - execution_id + time_window_start + time_window_end (for schedules)
         - execution_id + date_column (for templates)
         - execution_id + uploaded_at (fallback)
+
+        With table metadata, the MERGE built for the same column set is
+        reused (and a newly built one is remembered on it).
         """
         try:
             cursor = connection.cursor()
 
-            # Auto-detect date column (for templates without date range params)
-            date_column = self._detect_date_column(df)
+            # Date column and MERGE for this column set (reused per target table)
+            date_column, merge_template = self._merge_plan(table, table_name, execution_parameters, metadata)
             if execution_parameters and 'timeWindowStart' in execution_parameters:
                 logger.info("Using date range from execution parameters for UPSERT key")
             else:
@@ -562,11 +628,10 @@ class SnowflakeService(DatabaseService):
             temp_table = f"TEMP_{uuid.uuid4().hex[:8].upper()}"
 
             try:
-                # Generate CREATE TEMP TABLE statement
-                temp_columns = []
-                for col_name, dtype in df.dtypes.items():
-                    snowflake_type = self._map_dtype_to_snowflake(dtype)
-                    temp_columns.append(f'"{col_name}" {snowflake_type}')
+                temp_columns = [
+                    f'"{col_name}" {snowflake_type}'
+                    for col_name, snowflake_type in self._snowflake_column_types(table)
+                ]
 
                 create_temp_sql = f"""
                 CREATE TEMPORARY TABLE {temp_table} (
@@ -577,25 +642,30 @@ class SnowflakeService(DatabaseService):
                 cursor.execute(create_temp_sql)
                 logger.info(f"Created temporary table: {temp_table}")
 
-                # Insert data into temp table using write_pandas
-                success, nchunks, nrows, _ = write_pandas(
-                    connection,
-                    df,
-                    temp_table,
-                    auto_create_table=False,
-                    quote_identifiers=True
-                )
+                # Stage the Parquet file on the temp table's own stage and COPY it in
+                import pyarrow.parquet as pq
 
-                logger.info(f"Loaded {nrows} rows into temp table {temp_table}")
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    parquet_path = os.path.join(tmp_dir, f"{temp_table}.parquet")
+                    pq.write_table(table, parquet_path, compression='snappy')
+                    staged_bytes = os.path.getsize(parquet_path)
+                    SNOWFLAKE_UPLOAD_BYTES.inc(staged_bytes)
+                    cursor.execute(
+                        f"PUT 'file://{parquet_path.replace(os.sep, '/')}' @%{temp_table} "
+                        f"AUTO_COMPRESS=FALSE OVERWRITE=TRUE"
+                    )
 
-                # Generate and execute MERGE statement
-                merge_sql = self._generate_merge_sql(
-                    target_table=table_name,
-                    source_table=temp_table,
-                    df=df,
-                    date_column=date_column,
-                    execution_parameters=execution_parameters
-                )
+                cursor.execute(f"""
+                COPY INTO {temp_table}
+                FROM @%{temp_table}
+                FILE_FORMAT = (TYPE = PARQUET USE_LOGICAL_TYPE = TRUE)
+                MATCH_BY_COLUMN_NAME = CASE_SENSITIVE
+                PURGE = TRUE
+                """)
+
+                logger.info(f"Loaded {table.num_rows} rows ({staged_bytes} bytes of Parquet) into temp table {temp_table}")
+
+                merge_sql = merge_template.replace(_MERGE_SOURCE, temp_table)
 
                 logger.info(f"Executing UPSERT to {table_name}")
                 cursor.execute(merge_sql)
@@ -605,7 +675,7 @@ class SnowflakeService(DatabaseService):
                 if merge_result:
                     logger.info(f"MERGE completed: {merge_result}")
 
-                logger.info(f"Successfully UPSERTed {len(df)} rows to {table_name}")
+                logger.info(f"Successfully UPSERTed {table.num_rows} rows to {table_name}")
 
             finally:
                 # Clean up temporary table
@@ -618,9 +688,133 @@ class SnowflakeService(DatabaseService):
                 cursor.close()
 
         except Exception as e:
-            logger.error(f"Error upserting DataFrame to Snowflake: {e}")
+            logger.error(f"Error upserting results to Snowflake: {e}")
             raise
 
+    def _merge_plan(
+        self,
+        table: pa.Table,
+        table_name: str,
+        execution_parameters: Optional[Dict[str, Any]] = None,
+        metadata: Optional[TableMetadata] = None
+    ) -> Tuple[Optional[str], str]:
+        """
+        Detected date column and MERGE statement (with _MERGE_SOURCE as the source)
+        for this column set, reused from the table metadata when already built
+        """
+        has_time_window = bool(
+            execution_parameters
+            and 'timeWindowStart' in execution_parameters
+            and 'timeWindowEnd' in execution_parameters
+        )
+        plan_key = (tuple(table.column_names), has_time_window)
+        if metadata is not None and plan_key in metadata.merge_plans:
+            return metadata.merge_plans[plan_key]
+
+        date_column = self._detect_date_column(table)
+        # Generate MERGE statement
+        plan = (date_column, self._generate_merge_sql(
+            target_table=table_name,
+            source_table=_MERGE_SOURCE,
+            df=table,
+            date_column=date_column,
+            execution_parameters=execution_parameters
+        ))
+        if metadata is not None:
+            metadata.merge_plans[plan_key] = plan
+        return plan
+
+    def _add_new_columns(
+        self,
+        connection: 'SnowflakeConnection',
+        table_name: str,
+        table: pa.Table,
+        metadata: TableMetadata
+    ):
+        """ALTER TABLE ADD COLUMN for result columns the existing table does not have yet"""
+        new_columns = metadata.new_columns(table)
+        if not new_columns:
+            return
+
+        cursor = connection.cursor()
+        try:
+            for col_name, snowflake_type in new_columns:
+                cursor.execute(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS "{col_name}" {snowflake_type}')
+                metadata.column_types[col_name] = snowflake_type
+            logger.info(f"Added columns to {table_name}: {[col_name for col_name, _ in new_columns]}")
+        finally:
+            cursor.close()
+
+    def _widen_columns(
+        self,
+        connection: 'SnowflakeConnection',
+        table_name: str,
+        table: pa.Table,
+        metadata: TableMetadata
+    ):
+        """
+        Migrate existing columns whose new values do not fit their type
+
+        Snowflake cannot change a NUMBER or DATE column to FLOAT or VARCHAR in
+        place, so the column is copied into a new column of the wider type,
+        dropped and the copy renamed.
+        """
+        widened = metadata.widened_columns(table)
+        if not widened:
+            return
+
+        cursor = connection.cursor()
+        try:
+            for col_name, snowflake_type in widened:
+                staging = f"{col_name}__widened"
+                cursor.execute(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS "{staging}" {snowflake_type}')
+                cursor.execute(f'UPDATE {table_name} SET "{staging}" = CAST("{col_name}" AS {snowflake_type})')
+                cursor.execute(f'ALTER TABLE {table_name} DROP COLUMN "{col_name}"')
+                cursor.execute(f'ALTER TABLE {table_name} RENAME COLUMN "{staging}" TO "{col_name}"')
+                metadata.column_types[col_name] = snowflake_type
+            logger.info(f"Widened columns of {table_name}: {widened}")
+        finally:
+            cursor.close()
+
+    def _get_table_metadata(
+        self,
+        connection: 'SnowflakeConnection',
+        config: Dict[str, Any],
+        full_table_name: str
+    ) -> Optional[TableMetadata]:
+        """
+        Metadata of an existing target table (cached per account and table)
+
+        Returns:
+            TableMetadata, or None if the table does not exist yet
+        """
+        cached = table_metadata_cache.get(config['account_identifier'], full_table_name)
+        if cached is not None:
+            return cached
+
+        table_name = full_table_name.split('.')[-1]
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT column_name, data_type, numeric_scale
+                FROM {config['database']}.INFORMATION_SCHEMA.COLUMNS
+                WHERE UPPER(table_schema) = UPPER(%s) AND UPPER(table_name) = UPPER(%s)
+                """,
+                (config['schema'], table_name)
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        if not rows:
+            return None
+        metadata = TableMetadata(column_types={
+            name: normalize_snowflake_type(data_type, scale) for name, data_type, scale in rows
+        })
+        table_metadata_cache.put(config['account_identifier'], full_table_name, metadata)
+        return metadata
+
     @with_connection_retry
     def _update_execution_snowflake_status(
         self, 
@@ -712,6 +906,8 @@ class SnowflakeService(DatabaseService):
             connection = self._get_snowflake_connection(config)
             
             try:
+                from snowflake.connector import DictCursor
+
                 cursor = connection.cursor(DictCursor)
                 
                 # Use provided database/schema or config defaults
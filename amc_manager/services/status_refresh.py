@@ -0,0 +1,140 @@
+"""
+Status Refresh Coordinator
+Single-flight, cached and concurrent AMC status polls
+
+User-triggered refreshes (refresh-status, refresh-all, status?refresh=true)
+and the background execution status poller all poll AMC through this
+coordinator:
+
+- single-flight: while a poll of an execution is in flight, further
+  requests for it await the same poll instead of calling AMC again
+- a short-lived status cache: an execution polled in the last
+  settings.status_refresh_cache_seconds is answered without calling AMC
+- fan-out: refresh_many() polls all remaining executions concurrently, each
+  holding a slot of its AMC instance's limiter (adaptive_concurrency), so a
+  bulk refresh takes about as long as its slowest poll
+
+Polls are keyed by execution and user, since a status is only returned to
+the execution's owner.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+from .adaptive_concurrency import get_instance_limiter
+
+logger = get_logger(__name__)
+
+PollFunction = Callable[[str, str], Awaitable[Optional[Dict[str, Any]]]]
+RefreshKey = Tuple[str, str]  # (execution_id, user_id)
+
+# Cached statuses kept before expired ones are swept
+_MAX_CACHED = 10000
+
+
+class StatusRefreshCoordinator:
+    """Deduplicates and parallelizes AMC execution status polls"""
+
+    def __init__(
+        self,
+        poll: Optional[PollFunction] = None,
+        cache_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._poll_function = poll
+        self.cache_seconds = settings.status_refresh_cache_seconds if cache_seconds is None else cache_seconds
+        self._clock = clock
+        self._in_flight: Dict[RefreshKey, asyncio.Task] = {}
+        self._recent: Dict[RefreshKey, Tuple[float, Dict[str, Any]]] = {}
+        self._counts = {'polled': 0, 'cached': 0, 'coalesced': 0}
+
+    @property
+    def _poll(self) -> PollFunction:
+        if self._poll_function is None:
+            from .amc_execution_service import amc_execution_service
+            self._poll_function = amc_execution_service.poll_and_update_execution
+        return self._poll_function
+
+    async def refresh(
+        self,
+        execution_id: str,
+        user_id: str,
+        instance_id: Optional[str] = None,
+        max_age: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Current status of an execution, polling AMC at most once at a time
+
+        Args:
+            instance_id: AMC instance ID; the poll then holds a slot of its limiter
+            max_age: Oldest cached status to accept in seconds (default
+                cache_seconds; 0 always joins or starts a poll)
+
+        Returns:
+            The status as returned by poll_and_update_execution (None if the
+            execution is not found or not the user's)
+        """
+        key = (execution_id, user_id)
+        max_age = self.cache_seconds if max_age is None else max_age
+        cached = self._recent.get(key)
+        if cached and self._clock() - cached[0] < max_age:
+            self._counts['cached'] += 1
+            return cached[1]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, instance_id))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._counts['coalesced'] += 1
+        # A cancelled waiter must not cancel the poll other waiters share
+        return await asyncio.shield(task)
+
+    async def refresh_many(
+        self,
+        executions: Sequence[Tuple[str, Optional[str]]],
+        user_id: str,
+        max_age: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Refresh many executions concurrently
+
+        Args:
+            executions: (execution_id, instance_id) pairs
+
+        Returns:
+            Status (or the exception raised polling it) by execution ID
+        """
+        execution_ids = [execution_id for execution_id, _ in executions]
+        results = await asyncio.gather(
+            *(self.refresh(execution_id, user_id, instance_id, max_age) for execution_id, instance_id in executions),
+            return_exceptions=True
+        )
+        return dict(zip(execution_ids, results))
+
+    async def _run(self, key: RefreshKey, instance_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        execution_id, user_id = key
+        self._counts['polled'] += 1
+        if instance_id:
+            async with get_instance_limiter(instance_id).slot():
+                status = await self._poll(execution_id, user_id)
+        else:
+            status = await self._poll(execution_id, user_id)
+
+        if status is not None:
+            now = self._clock()
+            if len(self._recent) >= _MAX_CACHED:
+                self._recent = {k: v for k, v in self._recent.items() if now - v[0] < self.cache_seconds}
+            self._recent[key] = (now, status)
+        return status
+
+    def get_state(self) -> Dict[str, Any]:
+        """Coordinator state for monitoring"""
+        return {'in_flight': len(self._in_flight), 'cached': len(self._recent), 'counts': dict(self._counts)}
+
+
+status_refresh = StatusRefreshCoordinator()
@@ -1,11 +1,14 @@
 """Template Report Management Service for Dashboard Generation"""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 import json
 from datetime import datetime
 
 from ..core.logger_simple import get_logger
 from .db_service import DatabaseService, with_connection_retry
+from .result_set import ResultSet
+from .chart_downsampling import bucket_series, downsample_points, downsample_series, max_points_for
+from .widget_aggregates import AGGREGATIONS, SharedAggregates
 
 logger = get_logger(__name__)
 
@@ -22,27 +25,29 @@ class TemplateReportService(DatabaseService):
             'line_chart': {
                 'name': 'Line Chart',
                 'required_fields': ['x_field', 'y_field'],
-                'optional_fields': ['series_field', 'title', 'description']
+                'optional_fields': ['series_field', 'title', 'description', 'bucket', 'bucket_agg',
+                                    'max_points', 'width']
             },
             'bar_chart': {
                 'name': 'Bar Chart',
                 'required_fields': ['x_field', 'y_field'],
-                'optional_fields': ['series_field', 'title', 'description', 'horizontal']
+                'optional_fields': ['series_field', 'title', 'description', 'horizontal', 'aggregate']
             },
             'pie_chart': {
                 'name': 'Pie Chart',
                 'required_fields': ['label_field', 'value_field'],
-                'optional_fields': ['title', 'description', 'show_legend']
+                'optional_fields': ['title', 'description', 'show_legend', 'aggregate']
             },
             'area_chart': {
                 'name': 'Area Chart',
                 'required_fields': ['x_field', 'y_field'],
-                'optional_fields': ['series_field', 'title', 'description', 'stacked']
+                'optional_fields': ['series_field', 'title', 'description', 'stacked', 'bucket', 'bucket_agg',
+                                    'max_points', 'width']
             },
             'scatter_plot': {
                 'name': 'Scatter Plot',
                 'required_fields': ['x_field', 'y_field'],
-                'optional_fields': ['size_field', 'color_field', 'title', 'description']
+                'optional_fields': ['size_field', 'color_field', 'title', 'description', 'max_points', 'width']
             },
             'table': {
                 'name': 'Data Table',
@@ -70,6 +75,9 @@ class TemplateReportService(DatabaseService):
                 'optional_fields': ['title', 'description', 'show_percentages']
             }
         }
+        
+        # Points per line/scatter dataset when the widget sets no max_points or width
+        self.MAX_CHART_POINTS = 1000
     
     @with_connection_retry
     def create_report_config(self, report_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -146,11 +154,18 @@ class TemplateReportService(DatabaseService):
     
     def generate_dashboard_from_results(
         self, 
-        query_results: List[Dict[str, Any]], 
+        query_results: Union[ResultSet, List[Dict[str, Any]]], 
         report_config: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Generate a dashboard from query results using report configuration"""
+        """
+        Generate a dashboard from query results using report configuration
+        
+        Field mappings are column renames, and every widget reads the result
+        through one SharedAggregates, so columns, totals and group-bys used by
+        several widgets are computed once.
+        """
         try:
+            query_results = ResultSet.of(query_results)
             dashboard_config = report_config.get('dashboard_config', {})
             field_mappings = report_config.get('field_mappings', {})
             default_filters = report_config.get('default_filters', {})
@@ -159,10 +174,11 @@ class TemplateReportService(DatabaseService):
             # Apply field mappings to results
             mapped_results = self._apply_field_mappings(query_results, field_mappings)
             
-            # Generate widgets
+            # Generate widgets from shared column reads and aggregates
+            shared = SharedAggregates(mapped_results)
             widgets = []
             for widget_config in dashboard_config.get('widgets', []):
-                widget = self._generate_widget(mapped_results, widget_config)
+                widget = self._generate_widget(shared, widget_config)
                 if widget:
                     widgets.append(widget)
             
@@ -193,27 +209,16 @@ class TemplateReportService(DatabaseService):
     
     def _apply_field_mappings(
         self, 
-        results: List[Dict[str, Any]], 
+        results: ResultSet, 
         mappings: Dict[str, str]
-    ) -> List[Dict[str, Any]]:
+    ) -> ResultSet:
         """Apply field mappings to transform result field names"""
-        if not mappings:
-            return results
-        
-        mapped_results = []
-        for row in results:
-            mapped_row = {}
-            for key, value in row.items():
-                # Use mapping if exists, otherwise keep original key
-                mapped_key = mappings.get(key, key)
-                mapped_row[mapped_key] = value
-            mapped_results.append(mapped_row)
-        
-        return mapped_results
+        # Renames columns only; the column data is shared, not copied
+        return results.rename(mappings)
     
     def _generate_widget(
         self, 
-        data: List[Dict[str, Any]], 
+        data: SharedAggregates, 
         widget_config: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
         """Generate a single widget from data and configuration"""
@@ -259,21 +264,24 @@ class TemplateReportService(DatabaseService):
             logger.error(f"Error generating widget: {e}")
             return None
     
-    def _generate_line_chart(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_line_chart(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate line chart widget"""
         x_field = config['x_field']
         y_field = config['y_field']
         series_field = config.get('series_field')
         
         if series_field:
-            # Group by series
-            series_data = {}
-            for row in data:
-                series = row.get(series_field, 'default')
-                if series not in series_data:
-                    series_data[series] = {'x': [], 'y': []}
-                series_data[series]['x'].append(row.get(x_field))
-                series_data[series]['y'].append(row.get(y_field))
+            # Split rows by series (the grouping scan is shared with other widgets)
+            grouping = data.grouping([series_field])
+            series_data = {
+                'default' if label[0] is None else label[0]: {'x': [], 'y': []} for label in grouping.labels
+            }
+            parts = list(series_data.values())
+            for group, x, y in zip(grouping.index, data.values(x_field), data.values(y_field)):
+                parts[group]['x'].append(x)
+                parts[group]['y'].append(y)
+            for values in parts:
+                values['x'], values['y'] = self._reduce_series(values['x'], values['y'], config)
             
             chart_data = {
                 'datasets': [
@@ -286,11 +294,12 @@ class TemplateReportService(DatabaseService):
             }
         else:
             # Single series
+            labels, values = self._reduce_series(data.values(x_field), data.values(y_field), config)
             chart_data = {
-                'labels': [row.get(x_field) for row in data],
+                'labels': labels,
                 'datasets': [{
                     'label': config.get('title', y_field),
-                    'data': [row.get(y_field) for row in data]
+                    'data': values
                 }]
             }
         
@@ -305,17 +314,26 @@ class TemplateReportService(DatabaseService):
             }
         }
     
-    def _generate_bar_chart(self, data: List[Dict], config: Dict) -> Dict:
+    def _reduce_series(self, xs: List[Any], ys: List[Any], config: Dict) -> Tuple[List[Any], List[Any]]:
+        """Bucket a line series by config['bucket'] (day/week/month), then LTTB-reduce it to the widget's width"""
+        series = {'y': ys}
+        if config.get('bucket'):
+            xs, series = bucket_series(xs, series, config['bucket'], config.get('bucket_agg', 'sum'))
+        xs, series = downsample_series(xs, series, max_points_for(config, self.MAX_CHART_POINTS))
+        return xs, series['y']
+    
+    def _generate_bar_chart(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate bar chart widget"""
         x_field = config['x_field']
         y_field = config['y_field']
         horizontal = config.get('horizontal', False)
         
+        labels, values = self._category_values(data, x_field, y_field, config.get('aggregate'))
         chart_data = {
-            'labels': [row.get(x_field) for row in data],
+            'labels': labels,
             'datasets': [{
                 'label': config.get('title', y_field),
-                'data': [row.get(y_field) for row in data]
+                'data': values
             }]
         }
         
@@ -331,15 +349,31 @@ class TemplateReportService(DatabaseService):
             }
         }
     
-    def _generate_pie_chart(self, data: List[Dict], config: Dict) -> Dict:
+    def _category_values(
+        self,
+        data: SharedAggregates,
+        label_field: str,
+        value_field: str,
+        aggregate: Optional[str]
+    ) -> Tuple[List[Any], List[Any]]:
+        """Labels and values of a category chart: one per row, or one per label when `aggregate` is set"""
+        if not aggregate:
+            return data.values(label_field), data.values(value_field)
+        if aggregate not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregate: {aggregate}")
+        labels = [label[0] for label in data.grouping([label_field]).labels]
+        return labels, data.aggregate([label_field], value_field, aggregate)
+    
+    def _generate_pie_chart(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate pie chart widget"""
         label_field = config['label_field']
         value_field = config['value_field']
         
+        labels, values = self._category_values(data, label_field, value_field, config.get('aggregate'))
         chart_data = {
-            'labels': [row.get(label_field) for row in data],
+            'labels': labels,
             'datasets': [{
-                'data': [row.get(value_field) for row in data]
+                'data': values
             }]
         }
         
@@ -359,15 +393,16 @@ class TemplateReportService(DatabaseService):
             }
         }
     
-    def _generate_metric_card(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_metric_card(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate metric card widget"""
         value_field = config['value_field']
         format_type = config.get('format', 'number')
         
         # Calculate metric value
-        if data:
-            values = [row.get(value_field, 0) for row in data]
-            value = sum(values) if len(values) > 1 else values[0]
+        if len(data) > 1:
+            value = data.total(value_field)
+        elif data:
+            value = data.values(value_field, 0)[0]
         else:
             value = 0
         
@@ -382,7 +417,7 @@ class TemplateReportService(DatabaseService):
         # Calculate trend if specified
         trend = None
         if config.get('trend_field') and len(data) > 1:
-            trend_values = [row.get(config['trend_field'], 0) for row in data]
+            trend_values = data.values(config['trend_field'], 0)
             if len(trend_values) >= 2:
                 change = trend_values[-1] - trend_values[-2]
                 trend = {
@@ -400,7 +435,7 @@ class TemplateReportService(DatabaseService):
             'trend': trend
         }
     
-    def _generate_table(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_table(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate table widget"""
         columns = config['columns']
         
@@ -413,7 +448,7 @@ class TemplateReportService(DatabaseService):
             'title': config.get('title', 'Data Table'),
             'description': config.get('description'),
             'columns': columns,
-            'data': data,
+            'data': data.data.records(),
             'options': {
                 'sortable': config.get('sortable', True),
                 'paginated': config.get('paginated', True),
@@ -421,28 +456,23 @@ class TemplateReportService(DatabaseService):
             }
         }
     
-    def _generate_heatmap(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_heatmap(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate heatmap widget"""
         x_field = config['x_field']
         y_field = config['y_field']
         value_field = config['value_field']
         
-        # Create matrix data
-        x_values = list(set(row.get(x_field) for row in data))
-        y_values = list(set(row.get(y_field) for row in data))
-        
-        matrix = []
-        for y in y_values:
-            row_data = []
-            for x in x_values:
-                # Find value for this x,y combination
-                value = 0
-                for row in data:
-                    if row.get(x_field) == x and row.get(y_field) == y:
-                        value = row.get(value_field, 0)
-                        break
-                row_data.append(value)
-            matrix.append(row_data)
+        # Create matrix data: the first value of each (y, x) cell, from one grouping scan
+        cells = data.grouping([y_field, x_field])
+        firsts = data.aggregate([y_field, x_field], value_field, 'first')
+        x_values = list(dict.fromkeys(x for _, x in cells.labels))
+        y_values = list(dict.fromkeys(y for y, _ in cells.labels))
+        x_positions = {x: i for i, x in enumerate(x_values)}
+        y_positions = {y: i for i, y in enumerate(y_values)}
+        
+        matrix = [[0] * len(x_values) for _ in y_values]
+        for (y, x), value in zip(cells.labels, firsts):
+            matrix[y_positions[y]][x_positions[x]] = 0 if value is None else value
         
         return {
             'type': 'heatmap',
@@ -458,7 +488,7 @@ class TemplateReportService(DatabaseService):
             }
         }
     
-    def _generate_area_chart(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_area_chart(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate area chart widget"""
         # Similar to line chart but with area fill
         line_chart = self._generate_line_chart(data, config)
@@ -467,24 +497,21 @@ class TemplateReportService(DatabaseService):
         line_chart['options']['stacked'] = config.get('stacked', False)
         return line_chart
     
-    def _generate_scatter_plot(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_scatter_plot(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate scatter plot widget"""
         x_field = config['x_field']
         y_field = config['y_field']
         size_field = config.get('size_field')
         color_field = config.get('color_field')
         
-        points = []
-        for row in data:
-            point = {
-                'x': row.get(x_field),
-                'y': row.get(y_field)
-            }
-            if size_field:
-                point['r'] = row.get(size_field, 5)
-            if color_field:
-                point['color'] = row.get(color_field)
-            points.append(point)
+        points = [{'x': x, 'y': y} for x, y in zip(data.values(x_field), data.values(y_field))]
+        if size_field:
+            for point, size in zip(points, data.values(size_field, 5)):
+                point['r'] = size
+        if color_field:
+            for point, color in zip(points, data.values(color_field)):
+                point['color'] = color
+        points = downsample_points(points, max_points_for(config, self.MAX_CHART_POINTS))
         
         return {
             'type': 'scatter_plot',
@@ -502,7 +529,7 @@ class TemplateReportService(DatabaseService):
             }
         }
     
-    def _generate_funnel(self, data: List[Dict], config: Dict) -> Dict:
+    def _generate_funnel(self, data: SharedAggregates, config: Dict) -> Dict:
         """Generate funnel chart widget"""
         stages = config['stages']
         
@@ -510,7 +537,7 @@ class TemplateReportService(DatabaseService):
         if isinstance(stages[0], str):
             funnel_data = []
             for stage in stages:
-                value = sum(row.get(stage, 0) for row in data)
+                value = data.total(stage)
                 funnel_data.append({'stage': stage, 'value': value})
         else:
             funnel_data = stages
@@ -600,22 +627,23 @@ class TemplateReportService(DatabaseService):
         """Get available widget types and their configurations"""
         return self.WIDGET_TYPES
     
-    def suggest_widgets_from_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def suggest_widgets_from_data(self, data: Union[ResultSet, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """Suggest appropriate widgets based on data structure"""
         if not data:
             return []
         
+        data = ResultSet.of(data)
         suggestions = []
-        fields = list(data[0].keys())
+        fields = data.names
         
-        # Analyze field types
+        # Analyze field types (typed columns, so numeric strings count as numbers)
         numeric_fields = []
         date_fields = []
         text_fields = []
         
         for field in fields:
             sample_value = data[0][field]
-            if isinstance(sample_value, (int, float)):
+            if data.column(field).is_numeric:
                 numeric_fields.append(field)
             elif isinstance(sample_value, str):
                 if any(date_pattern in field.lower() for date_pattern in ['date', 'time', 'day', 'month', 'year']):
@@ -643,6 +671,7 @@ class TemplateReportService(DatabaseService):
                 'config': {
                     'x_field': text_fields[0],
                     'y_field': numeric_fields[0],
+                    'aggregate': 'sum',
                     'title': f'{numeric_fields[0]} by {text_fields[0]}'
                 }
             })
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple, List
 from cryptography.fernet import Fernet
 
+from ..core.lazy import LazyService
 from ..core.logger_simple import get_logger
 from ..config.settings import settings
 from .db_service import db_service
@@ -356,5 +357,5 @@ class TokenService:
             logger.error(f"Error getting profiles: {e}")
             return None
 
-# Global instance
-token_service = TokenService()
\ No newline at end of file
+# Global instance (built on first use)
+token_service = LazyService(TokenService)
\ No newline at end of file
@@ -8,9 +8,13 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 import logging
 
+from ..core.lazy import LazyService
 from ..core.supabase_client import SupabaseManager
 from ..core.logger_simple import get_logger
-from .snowflake_service import SnowflakeService
+from ..core.metrics import POLL_CYCLE_SECONDS, QUEUE_DEPTH
+from ..config import settings
+from .job_queue import SNOWFLAKE_SYNC_QUEUE, Job, RetryLater, job_runner
+from .worker_coordinator import worker_coordinator
 
 logger = get_logger(__name__)
 
@@ -21,6 +25,7 @@ class UniversalSnowflakeSyncService:
     def __init__(self):
         self.running = False
         self.check_interval = 30  # Check every 30 seconds
+        from .snowflake_service import SnowflakeService
         self.snowflake_service = SnowflakeService()
         self.client = SupabaseManager.get_client(use_service_role=True)
         self.max_concurrent_syncs = 5
@@ -34,11 +39,17 @@ class UniversalSnowflakeSyncService:
         
         while self.running:
             try:
-                await self.process_sync_queue()
+                with POLL_CYCLE_SECONDS.labels('universal_snowflake_sync').time():
+                    if job_runner.active:
+                        # Items run as snowflake_sync jobs (enqueued by the queue trigger);
+                        # only catch up on items that predate it or missed it
+                        await self._enqueue_pending_items()
+                    else:
+                        await self.process_sync_queue()
             except Exception as e:
                 logger.error(f"Universal Snowflake sync error: {e}", exc_info=True)
             
-            await asyncio.sleep(self.check_interval)
+            await asyncio.sleep(settings.job_queue_sweep_seconds if job_runner.active else self.check_interval)
     
     async def stop(self):
         """Stop the sync service"""
@@ -50,6 +61,33 @@ class UniversalSnowflakeSyncService:
             logger.info(f"Waiting for {len(self._sync_tasks)} sync tasks to complete")
             await asyncio.gather(*self._sync_tasks.values(), return_exceptions=True)
     
+    async def _enqueue_pending_items(self):
+        """Make sure every pending sync item has a job"""
+        response = self.client.table('snowflake_sync_queue')\
+            .select('id, execution_id')\
+            .eq('status', 'pending')\
+            .execute()
+        for item in response.data or []:
+            if worker_coordinator.owns(item['id']):
+                await job_runner.enqueue(
+                    SNOWFLAKE_SYNC_QUEUE,
+                    {'sync_id': item['id'], 'execution_id': item['execution_id']},
+                    job_key=str(item['id'])
+                )
+    
+    async def handle_job(self, job: Job):
+        """snowflake_sync job: sync one queue item, snoozing while it has retries left"""
+        response = self.client.table('snowflake_sync_queue')\
+            .select('*, workflow_executions(*), users(id)')\
+            .eq('id', job.payload['sync_id'])\
+            .eq('status', 'pending')\
+            .execute()
+        if not response.data:
+            return
+        
+        if not await self.sync_execution_to_snowflake(response.data[0]):
+            raise RetryLater(self.check_interval, 'Snowflake sync will be retried')
+    
     async def process_sync_queue(self):
         """Process pending sync queue items"""
         try:
@@ -58,8 +96,9 @@ class UniversalSnowflakeSyncService:
                 .select('*, workflow_executions(*), users(id)')\
                 .eq('status', 'pending')\
                 .order('created_at')\
-                .limit(10)\
+                .limit(worker_coordinator.batch_size(10))\
                 .execute()
+            QUEUE_DEPTH.labels('universal_snowflake_sync').set(len(response.data or []))
             
             if not response.data:
                 return
@@ -69,8 +108,8 @@ class UniversalSnowflakeSyncService:
             # Process each item concurrently
             tasks = []
             for item in response.data:
-                # Skip if already processing
-                if item['id'] in self._sync_tasks:
+                # Skip if already processing or owned by another worker
+                if item['id'] in self._sync_tasks or not worker_coordinator.owns(item['id']):
                     continue
                 
                 task = asyncio.create_task(self.sync_execution_to_snowflake(item))
@@ -90,8 +129,8 @@ class UniversalSnowflakeSyncService:
         except Exception as e:
             logger.error(f"Error processing universal sync queue: {e}")
     
-    async def sync_execution_to_snowflake(self, sync_item: Dict[str, Any]):
-        """Sync a single execution to Snowflake"""
+    async def sync_execution_to_snowflake(self, sync_item: Dict[str, Any]) -> bool:
+        """Sync a single execution to Snowflake; False if the item was put back for a retry"""
         async with self._sync_semaphore:
             execution_id = sync_item['execution_id']
             user_id = sync_item['user_id']
@@ -111,7 +150,7 @@ class UniversalSnowflakeSyncService:
                 if not snowflake_config:
                     logger.info(f"No Snowflake config for user {user_id}, marking as completed")
                     self._update_sync_status(sync_id, 'completed')
-                    return
+                    return True
                 
                 # Prepare results data
                 results = {
@@ -124,7 +163,7 @@ class UniversalSnowflakeSyncService:
                     logger.warning(f"No results data for execution {execution_id}")
                     self._update_sync_status(sync_id, 'failed',
                                            error_message="No results data available")
-                    return
+                    return True
                 
                 # Generate table name
                 table_name = self._generate_table_name(execution)
@@ -145,6 +184,7 @@ class UniversalSnowflakeSyncService:
                     
                     # Update execution record with Snowflake info
                     self._update_execution_snowflake_info(execution_id, table_name, upload_result)
+                    return True
                 else:
                     raise Exception(upload_result.get('error', 'Unknown upload error'))
                     
@@ -157,11 +197,13 @@ class UniversalSnowflakeSyncService:
                     logger.info(f"Retrying sync for execution {execution_id} (attempt {retry_count})")
                     self._update_sync_status(sync_id, 'pending', 
                                            retry_count=retry_count)
+                    return False
                 else:
                     # Max retries exceeded
                     logger.error(f"Max retries exceeded for execution {execution_id}")
                     self._update_sync_status(sync_id, 'failed', 
                                            error_message=str(e))
+                    return True
     
     def _generate_table_name(self, execution: Dict[str, Any]) -> str:
         """Generate a meaningful table name for the execution"""
@@ -290,5 +332,5 @@ class UniversalSnowflakeSyncService:
             return False
 
 
-# Singleton instance
-universal_snowflake_sync_service = UniversalSnowflakeSyncService()
+# Singleton instance (built on first use: it creates a Supabase client and a SnowflakeService)
+universal_snowflake_sync_service = LazyService(UniversalSnowflakeSyncService)
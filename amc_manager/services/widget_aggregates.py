@@ -0,0 +1,138 @@
+"""
+Widget Aggregates
+Columns, totals and group-bys of one result, computed once for all the
+widgets of a dashboard
+
+Every dashboard widget reads a few columns of the same result, and several
+read the same ones: a bar and a pie chart over the campaign dimension, metric
+cards and funnel stages summing the same metrics. Widgets ask SharedAggregates
+instead of the ResultSet, and each read is computed on first use and then
+shared:
+
+- values(name): a column as a list, materialized once
+- total(name): the sum of a column, folded from its numeric array
+- grouping(keys): one scan of the key columns assigning each row a group
+- aggregate(keys, field, agg): a measure per group, folded from the grouping
+
+Widgets grouping by the same keys therefore share a single scan, and each
+measure is one pass over typed columns rather than over row dicts.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .result_set import LONG, ResultSet
+
+# Measures per group: (initial state, fold(state, value), finish(state))
+_MEASURES: Dict[str, Tuple[Callable[[], Any], Callable[[Any, Any], Any], Callable[[Any], Any]]] = {
+    'sum': (lambda: 0, lambda state, value: state + value, lambda state: state),
+    'count': (lambda: 0, lambda state, value: state + 1, lambda state: state),
+    'avg': (lambda: (0, 0), lambda state, value: (state[0] + value, state[1] + 1),
+            lambda state: state[0] / state[1] if state[1] else None),
+    'min': (lambda: None, lambda state, value: value if state is None or value < state else state,
+            lambda state: state),
+    'max': (lambda: None, lambda state, value: value if state is None or value > state else state,
+            lambda state: state),
+}
+AGGREGATIONS = tuple(_MEASURES) + ('first',)
+
+
+@dataclass
+class Grouping:
+    """Groups of one set of key columns, in order of first appearance"""
+    keys: Tuple[str, ...]
+    labels: List[Tuple[Any, ...]]  # key values of each group
+    index: List[int]  # group of each row
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class SharedAggregates:
+    """Lazily computed, memoized reads of one result shared by a dashboard's widgets"""
+
+    def __init__(self, data: ResultSet):
+        self.data = data
+        self._values: Dict[Tuple[str, Any], List[Any]] = {}
+        self._totals: Dict[str, Any] = {}
+        self._groupings: Dict[Tuple[str, ...], Grouping] = {}
+        self._aggregates: Dict[Tuple[Tuple[str, ...], str, str], List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __bool__(self) -> bool:
+        return len(self.data) > 0
+
+    def values(self, name: str, default: Any = None) -> List[Any]:
+        """Values of a column (nulls and a missing column read as `default`)"""
+        key = (name, default)
+        if key not in self._values:
+            values = self.data.values(name, default)
+            if default is not None and self.data.has_column(name):
+                values = [default if value is None else value for value in values]
+            self._values[key] = values
+        return self._values[key]
+
+    def total(self, name: str) -> Any:
+        """Sum of a column's numeric values (an int for integer columns, 0 if missing)"""
+        if name not in self._totals:
+            if not self.data.has_column(name):
+                total = 0
+            else:
+                column = self.data.column(name)
+                total = column.sum()
+                if column.type == LONG:
+                    total = int(total)
+            self._totals[name] = total
+        return self._totals[name]
+
+    def grouping(self, keys: Sequence[str]) -> Grouping:
+        """Rows grouped by the values of `keys` (one scan per distinct key list)"""
+        keys = tuple(keys)
+        if keys not in self._groupings:
+            groups: Dict[Tuple[Any, ...], int] = {}
+            index = []
+            for label in zip(*(self.values(key) for key in keys)):
+                group = groups.get(label)
+                if group is None:
+                    group = groups[label] = len(groups)
+                index.append(group)
+            self._groupings[keys] = Grouping(keys, list(groups), index)
+        return self._groupings[keys]
+
+    def aggregate(self, keys: Sequence[str], field: str, agg: str = 'sum') -> List[Any]:
+        """
+        `agg` of `field` per group of `keys`, aligned with grouping(keys).labels
+
+        count counts non-null values; sum/avg/min/max skip nulls and
+        non-numeric values; 'first' takes the value of each group's first row
+        as is.
+        """
+        keys = tuple(keys)
+        memo = (keys, field, agg)
+        if memo in self._aggregates:
+            return self._aggregates[memo]
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregation: {agg}")
+
+        grouping = self.grouping(keys)
+        values = self.values(field)
+        if agg == 'first':
+            result = [None] * len(grouping)
+            seen = [False] * len(grouping)
+            for group, value in zip(grouping.index, values):
+                if not seen[group]:
+                    seen[group] = True
+                    result[group] = value
+        else:
+            initial, fold, finish = _MEASURES[agg]
+            states = [initial() for _ in range(len(grouping))]
+            for group, value in zip(grouping.index, values):
+                if value is None:
+                    continue
+                if agg == 'count' or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+                    states[group] = fold(states[group], value)
+            result = [finish(state) for state in states]
+        self._aggregates[memo] = result
+        return result
@@ -0,0 +1,261 @@
+"""
+Worker Coordinator
+Lease-based leader election and work partitioning for background engines
+
+Every process that runs background engines holds a short-lived member lease
+in worker_leases and renews it on a heartbeat. Singleton engines (schedule
+executors, token refresh) run only in the process holding their
+'leader:<engine>' lease and are stopped if it is lost. Scalable engines run in
+every worker and call owns(key) to take only their share of the work: keys
+hash onto the sorted list of live members.
+
+Ownership is advisory. While membership changes, two workers can briefly
+both own a key, or neither can. The engines keep their atomic claims for
+correctness; partitioning only stops N workers from all racing for the same rows.
+"""
+
+import asyncio
+import hashlib
+import os
+import socket
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+from ..core.logger_simple import get_logger
+from .db_service import DatabaseService, with_connection_retry
+
+logger = get_logger(__name__)
+
+LEADER_PREFIX = 'leader:'
+MEMBER_PREFIX = 'member:'
+
+
+class WorkerLeaseService(DatabaseService):
+    """Lease rows in worker_leases (see migration 20_worker_leases.sql)"""
+
+    @with_connection_retry
+    def try_acquire(self, name: str, holder: str, ttl_seconds: int, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Acquire or renew a lease; True if holder owns it afterwards"""
+        response = self.client.rpc('try_acquire_worker_lease', {
+            'p_name': name,
+            'p_holder': holder,
+            'p_ttl_seconds': ttl_seconds,
+            'p_metadata': metadata or {}
+        }).execute()
+        return bool(response.data)
+
+    @with_connection_retry
+    def release(self, name: str, holder: str) -> None:
+        self.client.rpc('release_worker_lease', {'p_name': name, 'p_holder': holder}).execute()
+
+    @with_connection_retry
+    def live_members(self) -> List[str]:
+        """worker_ids with an unexpired member lease, sorted"""
+        response = self.client.table('worker_leases')\
+            .select('holder')\
+            .like('name', f'{MEMBER_PREFIX}%')\
+            .gt('expires_at', datetime.now(timezone.utc).isoformat())\
+            .execute()
+        return sorted({row['holder'] for row in response.data or []})
+
+    @with_connection_retry
+    def list_leases(self) -> List[Dict[str, Any]]:
+        response = self.client.table('worker_leases').select('*').order('name').execute()
+        return response.data or []
+
+
+@dataclass
+class SingletonEngine:
+    """An engine that must run in exactly one process"""
+    name: str
+    start: Callable[[], Awaitable[Any]]
+    stop: Optional[Callable[[], Awaitable[Any]]] = None
+    running: bool = False
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class WorkerCoordinator:
+    """Heartbeat, leader leases and partition ownership for one process"""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        lease_ttl_seconds: Optional[int] = None,
+        lease_service: Optional[WorkerLeaseService] = None
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_ttl_seconds = lease_ttl_seconds or settings.worker_lease_ttl_seconds
+        self.heartbeat_interval = max(self.lease_ttl_seconds / 3, 1.0)
+        self.leases = lease_service or WorkerLeaseService()
+
+        self._singletons: Dict[str, SingletonEngine] = {}
+        self._members: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._started = False
+        self._last_heartbeat: Optional[datetime] = None
+        self._lease_errors = 0
+        # None until the first heartbeat; False when worker_leases is unreachable
+        self._leases_available: Optional[bool] = None
+
+    # ----- registration -----
+    def register_singleton(
+        self,
+        name: str,
+        start: Callable[[], Awaitable[Any]],
+        stop: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> None:
+        """
+        Run `start` only while this process holds the engine's leader lease
+
+        Args:
+            name: Engine name; the lease is 'leader:<name>'
+            start: Coroutine function starting the engine (may run forever)
+            stop: Optional graceful stop, awaited before the start task is cancelled
+        """
+        self._singletons[name] = SingletonEngine(name=name, start=start, stop=stop)
+
+    # ----- ownership -----
+    def owns(self, key: Any) -> bool:
+        """
+        Whether this worker should process `key` (an execution, collection or queue ID)
+
+        True when coordination is not running (single process) or membership
+        is not yet known.
+        """
+        if not self._started or len(self._members) <= 1:
+            return True
+        if self.worker_id not in self._members:
+            return False
+        digest = int(hashlib.md5(str(key).encode()).hexdigest()[:8], 16)
+        return self._members[digest % len(self._members)] == self.worker_id
+
+    def batch_size(self, per_worker: int) -> int:
+        """Rows to fetch so that, after owns() filtering, each worker still gets ~per_worker"""
+        return per_worker * max(len(self._members), 1) if self._started else per_worker
+
+    def is_leader(self, name: str) -> bool:
+        engine = self._singletons.get(name)
+        return bool(engine and engine.running)
+
+    # ----- lifecycle -----
+    async def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        await self._heartbeat()
+        self._task = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Worker coordinator started as {self.worker_id} (lease TTL {self.lease_ttl_seconds}s)")
+
+    async def stop(self) -> None:
+        """Stop singleton engines and release every lease this worker holds"""
+        if not self._started:
+            return
+        self._started = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        for engine in self._singletons.values():
+            if engine.running:
+                await self._stop_engine(engine)
+                await asyncio.to_thread(self._release, f"{LEADER_PREFIX}{engine.name}")
+        await asyncio.to_thread(self._release, f"{MEMBER_PREFIX}{self.worker_id}")
+        logger.info(f"Worker coordinator {self.worker_id} stopped")
+
+    async def _heartbeat_loop(self) -> None:
+        while self._started:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat()
+            except Exception as e:
+                logger.error(f"Worker heartbeat failed: {e}")
+
+    async def _heartbeat(self) -> None:
+        """Renew membership, refresh the member list and reconcile leader leases"""
+        # Lease calls are blocking HTTP requests; keep them off the event loop
+        member = await asyncio.to_thread(
+            self._acquire, f"{MEMBER_PREFIX}{self.worker_id}", {'role': settings.process_role}
+        )
+        if member is None and self._leases_available is None:
+            # Lease table never reachable (migration 20 not applied): fall back to
+            # running every engine locally, as before worker coordination
+            self._leases_available = False
+            logger.warning("worker_leases unavailable; running singleton engines without leader election")
+        elif member is not None:
+            self._leases_available = True
+        if member:
+            try:
+                self._members = await asyncio.to_thread(self.leases.live_members)
+            except Exception as e:
+                logger.error(f"Could not list live workers: {e}")
+        self._last_heartbeat = datetime.now(timezone.utc)
+
+        for engine in self._singletons.values():
+            if self._leases_available is False:
+                held = True
+            else:
+                # A failed renewal counts as lost: a singleton must never run twice
+                held = bool(await asyncio.to_thread(self._acquire, f"{LEADER_PREFIX}{engine.name}", {}))
+            if held and not engine.running:
+                logger.info(f"{self.worker_id} acquired leadership of {engine.name}")
+                engine.running = True
+                engine.task = asyncio.create_task(engine.start())
+            elif not held and engine.running:
+                # Another worker took over (our lease expired); stop to avoid a double run
+                logger.warning(f"{self.worker_id} lost leadership of {engine.name}; stopping it")
+                await self._stop_engine(engine)
+
+    def _acquire(self, name: str, metadata: Dict[str, Any]) -> Optional[bool]:
+        """True/False from the lease table, None if it could not be reached"""
+        try:
+            return self.leases.try_acquire(name, self.worker_id, self.lease_ttl_seconds, metadata)
+        except Exception as e:
+            self._lease_errors += 1
+            logger.error(f"Lease {name} could not be acquired: {e}")
+            return None
+
+    def _release(self, name: str) -> None:
+        try:
+            self.leases.release(name, self.worker_id)
+        except Exception as e:
+            logger.warning(f"Lease {name} could not be released: {e}")
+
+    async def _stop_engine(self, engine: SingletonEngine) -> None:
+        engine.running = False
+        try:
+            if engine.stop:
+                await engine.stop()
+        except Exception as e:
+            logger.error(f"Error stopping {engine.name}: {e}")
+        if engine.task and not engine.task.done():
+            engine.task.cancel()
+            try:
+                await engine.task
+            except (asyncio.CancelledError, Exception):
+                pass
+        engine.task = None
+
+    def get_state(self) -> Dict[str, Any]:
+        """Coordinator state for monitoring"""
+        return {
+            'worker_id': self.worker_id,
+            'role': settings.process_role,
+            'coordinating': self._started,
+            'leases_available': self._leases_available,
+            'members': list(self._members),
+            'leader_of': sorted(name for name, engine in self._singletons.items() if engine.running),
+            'singletons': sorted(self._singletons),
+            'lease_ttl_seconds': self.lease_ttl_seconds,
+            'last_heartbeat': self._last_heartbeat.isoformat() if self._last_heartbeat else None,
+            'lease_errors': self._lease_errors,
+        }
+
+
+# Process-wide coordinator; engines call worker_coordinator.owns(...)
+worker_coordinator = WorkerCoordinator()
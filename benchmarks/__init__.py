@@ -0,0 +1 @@
+"""Benchmarks for the background execution lifecycle"""
@@ -0,0 +1,480 @@
+"""
+Execution lifecycle benchmark
+
+Runs the background services from main_supabase.py — ExecutionStatusPoller,
+ScheduleExecutorService, CollectionExecutorService and
+UniversalSnowflakeSyncService — in one event loop against a fake AMC API
+(subprocess) and an in-memory Supabase, then reports:
+
+- throughput: executions submitted and completed per second
+- poll lag: AMC SUCCEEDED -> execution marked completed in the database
+- schedule, collection and Snowflake sync latencies
+- event-loop stall time and peak RSS of the service process
+- database calls per table/operation and fake AMC request counters
+
+Usage:
+    python -m benchmarks.lifecycle --executions 50 --schedules 20 \\
+        --collections 5 --weeks 8 --output results.json
+
+The Snowflake upload is replaced with a sink that blocks for
+--sync-latency-ms per upload, like the synchronous connector does; everything
+else is the production code path.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from .probes import LoopStallProbe, RSSProbe, Stopwatch, summarize
+from .stand_ins.fake_amc import FakeAMCConfig, FakeAMCServer
+from .stand_ins.memory_supabase import MemorySupabase
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat()
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class LifecycleBenchmark:
+    """Seeds the stand-ins, runs the services and collects measurements"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.db = MemorySupabase()
+        self.expected_executions = (
+            args.executions + args.schedules + args.collections * args.weeks
+        )
+        # execution_id -> wall-clock time the row first reached a terminal status
+        self.terminal_at: Dict[str, float] = {}
+        self.sync_done_at: Dict[str, float] = {}
+        self.submit_latencies: List[float] = []
+        # MemoryJobQueue when running with --job-queue
+        self.jobs: Any = None
+        self.user_ids: List[str] = []
+        self.workflows: List[Dict[str, Any]] = []
+
+    # ----- database triggers -----
+    def _track_execution(self, db: MemorySupabase, row: Dict[str, Any]) -> None:
+        status = row.get('status')
+        if status in ('completed', 'failed') and row['execution_id'] not in self.terminal_at:
+            self.terminal_at[row['execution_id']] = time.time()
+        # Emulates queue_execution_for_universal_snowflake_sync (migration 13)
+        if (
+            status == 'completed'
+            and row.get('result_rows')
+            and (row.get('result_total_rows') or 0) > 0
+            and not any(q['execution_id'] == row['execution_id'] for q in db.rows('snowflake_sync_queue'))
+        ):
+            workflow = next((w for w in db.rows('workflows') if w['id'] == row['workflow_id']), None)
+            if workflow:
+                item = db.seed('snowflake_sync_queue', [{
+                    'execution_id': row['execution_id'],
+                    'user_id': workflow['user_id'],
+                    'status': 'pending',
+                    'retry_count': 0,
+                    'max_retries': 3,
+                }])[0]
+                # Emulates enqueue_snowflake_sync_job (migration 21)
+                if self.jobs is not None:
+                    self.jobs.enqueue(
+                        'snowflake_sync',
+                        {'sync_id': item['id'], 'execution_id': item['execution_id']},
+                        str(item['id'])
+                    )
+
+    def _track_sync(self, db: MemorySupabase, row: Dict[str, Any]) -> None:
+        if row.get('status') in ('completed', 'failed') and row['id'] not in self.sync_done_at:
+            self.sync_done_at[row['id']] = time.time()
+
+    # ----- seed data -----
+    def seed(self, token_service: Any) -> None:
+        args = self.args
+        now = datetime.now(timezone.utc)
+        auth_tokens = {
+            'access_token': token_service.encrypt_token('bench-access-token'),
+            'refresh_token': token_service.encrypt_token('bench-refresh-token'),
+            # Naive UTC, as stored by token_service
+            'expires_at': (datetime.utcnow() + timedelta(days=1)).isoformat(),
+        }
+
+        for u in range(args.users):
+            user = self.db.seed('users', [{
+                'email': f'bench{u}@example.com',
+                'name': f'Bench User {u}',
+                'is_active': True,
+                'auth_tokens': dict(auth_tokens),
+            }])[0]
+            self.user_ids.append(user['id'])
+            account = self.db.seed('amc_accounts', [{
+                'user_id': user['id'],
+                'account_id': f'ENTITYBENCH{u}',
+                'account_name': f'Bench Account {u}',
+                'marketplace_id': 'ATVPDKIKX0DER',
+            }])[0]
+            for i in range(args.instances_per_user):
+                instance = self.db.seed('amc_instances', [{
+                    'instance_id': f'amcbench{u}x{i}',
+                    'instance_name': f'Bench Instance {u}-{i}',
+                    'account_id': account['id'],
+                    'is_active': True,
+                }])[0]
+                workflow = self.db.seed('workflows', [{
+                    'workflow_id': f'wf_bench_{u}_{i}',
+                    'name': f'Bench Workflow {u}-{i}',
+                    'user_id': user['id'],
+                    'instance_id': instance['id'],
+                    'amc_workflow_id': f'wf_bench_{u}_{i}',
+                    'sql_query': 'SELECT campaign, SUM(impressions) AS impressions FROM sponsored_ads_traffic GROUP BY 1',
+                    'parameters': {},
+                }])[0]
+                workflow['amc_instances'] = instance
+                self.workflows.append(workflow)
+
+        for s in range(args.schedules):
+            workflow = self.workflows[s % len(self.workflows)]
+            self.db.seed('workflow_schedules', [{
+                'schedule_id': f'sched_bench_{s}',
+                'workflow_id': workflow['id'],
+                'user_id': workflow['user_id'],
+                'name': f'Bench Schedule {s}',
+                'schedule_type': 'daily',
+                'cron_expression': '0 2 * * *',
+                'timezone': 'UTC',
+                'lookback_days': 7,
+                'default_parameters': {},
+                'notification_config': {},
+                'is_active': True,
+                'next_run_at': _iso(now),
+                'last_run_at': None,
+            }])
+
+        for c in range(args.collections):
+            workflow = self.workflows[c % len(self.workflows)]
+            collection = self.db.seed('report_data_collections', [{
+                'collection_id': f'coll_bench_{c}',
+                'workflow_id': workflow['id'],
+                'instance_id': workflow['instance_id'],
+                'user_id': workflow['user_id'],
+                'collection_type': 'backfill',
+                'target_weeks': args.weeks,
+                'status': 'pending',
+                'progress_percentage': 0,
+                'weeks_completed': 0,
+                'configuration': {'parameters': {}},
+                'updated_at': _iso(now),
+            }])[0]
+            start = date.today() - timedelta(weeks=args.weeks + 1)
+            self.db.seed('report_data_weeks', [
+                {
+                    'collection_id': collection['id'],
+                    'week_start_date': (start + timedelta(weeks=w)).isoformat(),
+                    'week_end_date': (start + timedelta(weeks=w, days=6)).isoformat(),
+                    'status': 'pending',
+                }
+                for w in range(args.weeks)
+            ])
+
+        self.db.register_trigger('workflow_executions', self._track_execution)
+        self.db.register_trigger('snowflake_sync_queue', self._track_sync)
+
+    # ----- run -----
+    async def submit_adhoc(self, amc_execution_service: Any) -> None:
+        """Fire --executions ad-hoc runs the way the workflows API does"""
+        async def submit(n: int) -> None:
+            workflow = self.workflows[n % len(self.workflows)]
+            clock = Stopwatch()
+            try:
+                await amc_execution_service.execute_workflow(
+                    workflow_id=workflow['id'],
+                    user_id=workflow['user_id'],
+                    execution_parameters={'startDate': '2025-01-01', 'endDate': '2025-01-07'},
+                    triggered_by='manual',
+                    instance_id=workflow['amc_instances']['instance_id'],
+                )
+            finally:
+                self.submit_latencies.append(clock.elapsed)
+
+        await asyncio.gather(*(submit(n) for n in range(self.args.executions)), return_exceptions=True)
+
+    def _all_done(self) -> bool:
+        executions = self.db.rows('workflow_executions')
+        if len(executions) < self.expected_executions:
+            return False
+        if any(e.get('status') not in ('completed', 'failed') for e in executions):
+            return False
+        if any(w.get('status') not in ('completed', 'failed') for w in self.db.rows('report_data_weeks')):
+            return False
+        return all(q['status'] in ('completed', 'failed') for q in self.db.rows('snowflake_sync_queue'))
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        amc = FakeAMCServer(
+            FakeAMCConfig(
+                latency_ms=args.amc_latency_ms,
+                throttle_rate=args.throttle_rate,
+                max_concurrent=args.amc_max_concurrent,
+                run_seconds=args.run_seconds,
+                result_rows=args.result_rows,
+                result_columns=args.result_columns,
+            ),
+            port=args.amc_port,
+        ).start()
+
+        try:
+            os.environ['AMC_API_BASE_URL'] = amc.url
+            os.environ['AMC_USE_REAL_API'] = 'true'
+            os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+            os.environ.setdefault('SUPABASE_ANON_KEY', 'benchmark')
+            os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'benchmark')
+            if not os.environ.get('FERNET_KEY'):
+                from cryptography.fernet import Fernet
+                os.environ['FERNET_KEY'] = Fernet.generate_key().decode()
+
+            # Route every client (including module-level singletons) to the stand-in
+            # before the services are imported
+            from amc_manager.core.supabase_client import SupabaseManager
+            SupabaseManager.use_client(self.db)
+
+            from amc_manager.config import settings
+            settings.amc_api_base_url = amc.url
+            settings.amc_use_real_api = True
+
+            from amc_manager.services.amc_execution_service import amc_execution_service
+            from amc_manager.services.collection_executor_service import CollectionExecutorService
+            from amc_manager.services.execution_status_poller import ExecutionStatusPoller
+            from amc_manager.services.schedule_executor_service import ScheduleExecutorService
+            from amc_manager.services.token_service import token_service
+            from amc_manager.services.universal_snowflake_sync_service import UniversalSnowflakeSyncService
+
+            _set_log_level(args.log_level)
+            self.seed(token_service)
+
+            poller = ExecutionStatusPoller(poll_interval=args.poll_interval)
+            schedules = ScheduleExecutorService()
+            schedules.check_interval = args.check_interval
+            collections = CollectionExecutorService()
+            collections.check_interval = args.check_interval
+            sync = UniversalSnowflakeSyncService()
+            sync.check_interval = args.check_interval
+            sync.snowflake_service.get_user_snowflake_config = lambda user_id: {'user_id': user_id, 'benchmark': True}
+            sync.snowflake_service.upload_execution_results = _upload_sink(args.sync_latency_ms)
+
+            stall_probe = LoopStallProbe()
+            rss_probe = RSSProbe()
+            stall_probe.start()
+            rss_probe.start()
+            clock = Stopwatch()
+
+            runner = None
+            if args.job_queue:
+                runner = self.start_job_queue(poller, collections, sync)
+                await runner.start()
+
+            await poller.start()
+            service_tasks = [
+                asyncio.create_task(schedules.start()),
+                asyncio.create_task(collections.start()),
+                asyncio.create_task(sync.start()),
+            ]
+            await self.submit_adhoc(amc_execution_service)
+            submitted_in = clock.elapsed
+
+            while not self._all_done() and clock.elapsed < args.timeout:
+                await asyncio.sleep(0.5)
+            elapsed = clock.elapsed
+            timed_out = not self._all_done()
+
+            await poller.stop()
+            schedules.running = collections.running = sync.running = False
+            for task in service_tasks:
+                task.cancel()
+            await asyncio.gather(*service_tasks, return_exceptions=True)
+            if runner:
+                await runner.stop()
+            await stall_probe.stop()
+            await rss_probe.stop()
+
+            report = self.report(amc.stats(), elapsed, submitted_in, timed_out, stall_probe, rss_probe)
+            if runner:
+                report['job_queue'] = {
+                    'counts': runner.get_state()['counts'],
+                    'jobs': self.jobs.stats(),
+                }
+            return report
+        finally:
+            amc.stop()
+
+    def start_job_queue(self, poller: Any, collections: Any, sync: Any) -> Any:
+        """Route the job runner to a MemoryJobQueue and register the benchmark's engines"""
+        from amc_manager.services.execution_status_poller import execution_status_poller
+        from amc_manager.services.job_queue import (
+            COLLECTION_QUEUE, EXECUTION_STATUS_QUEUE, SNOWFLAKE_SYNC_QUEUE, MemoryJobQueue, job_runner
+        )
+
+        self.jobs = MemoryJobQueue()
+        job_runner.backend = self.jobs
+        job_runner.poll_seconds = self.args.check_interval
+        # Producers enqueue through the module poller; keep its first-poll delay comparable
+        execution_status_poller.poll_interval = self.args.poll_interval
+        job_runner.register(EXECUTION_STATUS_QUEUE, poller.handle_job, concurrency=5, visibility_timeout=120)
+        job_runner.register(COLLECTION_QUEUE, collections.handle_job,
+                            concurrency=collections._max_concurrent_collections,
+                            key_limit=collections._max_collections_per_instance,
+                            visibility_timeout=1800)
+        job_runner.register(SNOWFLAKE_SYNC_QUEUE, sync.handle_job,
+                            concurrency=sync.max_concurrent_syncs, visibility_timeout=600)
+        return job_runner
+
+    # ----- report -----
+    def report(
+        self,
+        amc_stats: Dict[str, Any],
+        elapsed: float,
+        submitted_in: float,
+        timed_out: bool,
+        stall_probe: LoopStallProbe,
+        rss_probe: RSSProbe
+    ) -> Dict[str, Any]:
+        executions = self.db.rows('workflow_executions')
+        by_status: Dict[str, int] = {}
+        for e in executions:
+            by_status[e.get('status')] = by_status.get(e.get('status'), 0) + 1
+        completed = [e for e in executions if e.get('status') == 'completed']
+
+        poll_lag = []
+        for e in completed:
+            amc_execution = amc_stats['executions'].get(e.get('amc_execution_id') or '')
+            if amc_execution and e['execution_id'] in self.terminal_at:
+                poll_lag.append(max(self.terminal_at[e['execution_id']] - amc_execution['succeeded_at'], 0.0))
+
+        schedule_delay = []
+        for run in self.db.rows('schedule_runs'):
+            started, created = _parse_time(run.get('scheduled_at')), _parse_time(run.get('created_at'))
+            if started and created:
+                schedule_delay.append(max(created - started, 0.0))
+
+        sync_lag = []
+        for item in self.db.rows('snowflake_sync_queue'):
+            created = _parse_time(item.get('created_at'))
+            if item['id'] in self.sync_done_at and created:
+                sync_lag.append(self.sync_done_at[item['id']] - created)
+
+        collections = self.db.rows('report_data_collections')
+        weeks = self.db.rows('report_data_weeks')
+        last_done = max(self.terminal_at.values(), default=None)
+        first_submit = min((_parse_time(e.get('started_at')) or 0 for e in executions), default=None)
+        completion_window = (last_done - first_submit) if last_done and first_submit else elapsed
+
+        return {
+            'config': {k: v for k, v in vars(self.args).items() if k != 'output'},
+            'elapsed_s': round(elapsed, 2),
+            'timed_out': timed_out,
+            'executions': {
+                'expected': self.expected_executions,
+                'created': len(executions),
+                'by_status': by_status,
+                'adhoc_submit_latency': summarize(self.submit_latencies),
+                'adhoc_submitted_in_s': round(submitted_in, 2),
+                'completed_per_s': round(len(completed) / completion_window, 3) if completion_window else None,
+                'poll_lag': summarize(poll_lag),
+            },
+            'schedules': {
+                'runs': len(self.db.rows('schedule_runs')),
+                'runs_by_status': _count_by(self.db.rows('schedule_runs'), 'status'),
+                'claim_delay': summarize(schedule_delay),
+            },
+            'collections': {
+                'by_status': _count_by(collections, 'status'),
+                'weeks_by_status': _count_by(weeks, 'status'),
+            },
+            'snowflake_sync': {
+                'queued': len(self.db.rows('snowflake_sync_queue')),
+                'by_status': _count_by(self.db.rows('snowflake_sync_queue'), 'status'),
+                'queue_to_done': summarize(sync_lag),
+            },
+            'event_loop': stall_probe.report(),
+            'memory': rss_probe.report(),
+            'database_calls': dict(sorted(self.db.calls.items())),
+            'amc': amc_stats['counters'],
+        }
+
+
+def _count_by(rows: List[Dict[str, Any]], column: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[str(row.get(column))] = counts.get(str(row.get(column)), 0) + 1
+    return counts
+
+
+def _upload_sink(latency_ms: float):
+    """Stand-in for SnowflakeService.upload_execution_results (blocking, like the connector)"""
+    def upload(execution_id: str, results: Dict[str, Any], table_name: str, user_id: str, **kwargs: Any):
+        time.sleep(latency_ms / 1000)
+        return {'success': True, 'row_count': len(results.get('rows') or []), 'table_name': table_name}
+    return upload
+
+
+def _set_log_level(level: str) -> None:
+    for name in list(logging.Logger.manager.loggerDict):
+        if name.startswith('amc_manager'):
+            logging.getLogger(name).setLevel(level)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Execution lifecycle benchmark')
+    load = parser.add_argument_group('load')
+    load.add_argument('--executions', type=int, default=20, help='ad-hoc executions submitted at start')
+    load.add_argument('--schedules', type=int, default=5, help='schedules due at start')
+    load.add_argument('--collections', type=int, default=2, help='pending backfill collections')
+    load.add_argument('--weeks', type=int, default=4, help='weeks per collection')
+    load.add_argument('--users', type=int, default=2)
+    load.add_argument('--instances-per-user', type=int, default=2)
+
+    amc = parser.add_argument_group('fake AMC')
+    amc.add_argument('--amc-port', type=int, default=8765)
+    amc.add_argument('--amc-latency-ms', type=float, default=20.0)
+    amc.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of creates answered with 429')
+    amc.add_argument('--amc-max-concurrent', type=int, default=0, help='per-instance running limit (0 = none)')
+    amc.add_argument('--run-seconds', type=float, default=5.0, help='time from create to SUCCEEDED')
+    amc.add_argument('--result-rows', type=int, default=1000)
+    amc.add_argument('--result-columns', type=int, default=8)
+
+    services = parser.add_argument_group('services')
+    services.add_argument('--poll-interval', type=float, default=2.0, help='ExecutionStatusPoller interval')
+    services.add_argument('--check-interval', type=float, default=2.0, help='schedule/collection/sync check interval')
+    services.add_argument('--sync-latency-ms', type=float, default=50.0, help='simulated Snowflake upload time')
+    services.add_argument('--job-queue', action='store_true',
+                          help='run polling, collections and sync as jobs on a MemoryJobQueue')
+
+    parser.add_argument('--timeout', type=float, default=600.0, help='stop waiting for completion after this many seconds')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='write the JSON report here as well as stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    report = asyncio.run(LifecycleBenchmark(args).run())
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Measurement probes for benchmarks: event-loop stalls, RSS and latency samples
+"""
+
+import asyncio
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+
+class LoopStallProbe:
+    """
+    Measures event-loop responsiveness
+
+    A ticker sleeps for `interval` seconds; any extra delay before it wakes is
+    time the loop spent blocked (sync I/O, CPU-bound work) instead of serving
+    other tasks.
+    """
+
+    def __init__(self, interval: float = 0.05, stall_threshold: float = 0.1):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.delays: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.delays.append(max(loop.time() - started - self.interval, 0.0))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> Dict[str, Any]:
+        stalls = [d for d in self.delays if d >= self.stall_threshold]
+        return {
+            'samples': len(self.delays),
+            'max_delay_ms': round(max(self.delays, default=0.0) * 1000, 1),
+            'p99_delay_ms': round(percentile(self.delays, 99) * 1000, 1),
+            'stalls': len(stalls),
+            'stall_time_s': round(sum(stalls), 3),
+        }
+
+
+class RSSProbe:
+    """Samples resident set size; peak also comes from getrusage"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def current_rss_bytes() -> int:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * resource.getpagesize()
+        except OSError:
+            return RSSProbe.peak_rss_bytes()
+
+    @staticmethod
+    def peak_rss_bytes() -> int:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    async def _run(self) -> None:
+        while True:
+            self.samples.append(self.current_rss_bytes())
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'start_rss_mb': round(self.samples[0] / 2**20, 1) if self.samples else None,
+            'end_rss_mb': round(self.samples[-1] / 2**20, 1) if self.samples else None,
+            'peak_rss_mb': round(self.peak_rss_bytes() / 2**20, 1),
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    """Count, mean and percentiles of latency-like samples (seconds)"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_s': round(statistics.fmean(values), 3),
+        'p50_s': round(percentile(values, 50), 3),
+        'p95_s': round(percentile(values, 95), 3),
+        'max_s': round(max(values), 3),
+    }
+
+
+class Stopwatch:
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
@@ -0,0 +1,6 @@
+"""Local stand-ins for external services used by the benchmarks"""
+
+from .fake_amc import FakeAMCConfig, FakeAMCServer
+from .memory_supabase import MemoryAPIError, MemorySupabase
+
+__all__ = ['FakeAMCConfig', 'FakeAMCServer', 'MemoryAPIError', 'MemorySupabase']
@@ -0,0 +1,210 @@
+"""
+Fake AMC reporting API
+
+Serves the endpoints AMCAPIClient talks to: workflow execution create/status/
+list, downloadUrls, the CSV download itself, and workflow CRUD. Behaviour is
+configurable per run:
+
+- latency_ms: added to every response
+- throttle_rate: fraction of execution creates answered with HTTP 429
+- max_concurrent: per-instance running executions before creates are rejected
+  with "Too many concurrent executions"
+- run_seconds: time from create to SUCCEEDED
+- result_rows / result_columns: size of each execution's CSV
+
+Run standalone with `python -m benchmarks.stand_ins.fake_amc --port 8765`, or
+use FakeAMCServer to start it in a subprocess. GET /_bench/stats returns
+per-execution timings for poll-lag calculations.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import multiprocessing
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+import requests
+
+
+@dataclass
+class FakeAMCConfig:
+    latency_ms: float = 20.0
+    throttle_rate: float = 0.0
+    max_concurrent: int = 0  # 0 = unlimited
+    run_seconds: float = 5.0
+    result_rows: int = 100
+    result_columns: int = 5
+    seed: int = 7
+
+
+def create_app(config: FakeAMCConfig, public_url: str):
+    """Build the FastAPI app for the fake AMC API"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, PlainTextResponse
+
+    app = FastAPI()
+    rng = random.Random(config.seed)
+    executions: Dict[str, Dict[str, Any]] = {}
+    counters = {'creates': 0, 'throttled': 0, 'concurrency_rejected': 0, 'status_checks': 0, 'downloads': 0}
+
+    def status_of(execution: Dict[str, Any]) -> str:
+        elapsed = time.time() - execution['created_at']
+        if elapsed >= config.run_seconds:
+            return 'SUCCEEDED'
+        return 'RUNNING' if elapsed >= min(1.0, config.run_seconds / 10) else 'PENDING'
+
+    def running_count(instance_id: str) -> int:
+        return sum(
+            1 for e in executions.values()
+            if e['instance_id'] == instance_id and status_of(e) != 'SUCCEEDED'
+        )
+
+    @app.middleware('http')
+    async def add_latency(request: Request, call_next):
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+        return await call_next(request)
+
+    @app.post('/amc/reporting/{instance_id}/workflowExecutions')
+    async def create_execution(instance_id: str, request: Request):
+        counters['creates'] += 1
+        if config.throttle_rate and rng.random() < config.throttle_rate:
+            counters['throttled'] += 1
+            return JSONResponse({'code': '429', 'message': 'Too Many Requests'}, status_code=429)
+        if config.max_concurrent and running_count(instance_id) >= config.max_concurrent:
+            counters['concurrency_rejected'] += 1
+            return JSONResponse(
+                {'code': '400', 'message': 'Too many concurrent executions for this instance'}, status_code=400
+            )
+        execution_id = str(uuid.uuid4())
+        executions[execution_id] = {'instance_id': instance_id, 'created_at': time.time(), 'status_checks': 0}
+        return JSONResponse({'workflowExecutionId': execution_id, 'status': 'PENDING'})
+
+    @app.get('/amc/reporting/{instance_id}/workflowExecutions')
+    async def list_executions(instance_id: str):
+        return {'executions': [
+            {'workflowExecutionId': eid, 'status': status_of(e)}
+            for eid, e in executions.items() if e['instance_id'] == instance_id
+        ]}
+
+    @app.get('/amc/reporting/{instance_id}/workflowExecutions/{execution_id}')
+    async def execution_status(instance_id: str, execution_id: str):
+        counters['status_checks'] += 1
+        execution = executions.get(execution_id)
+        if not execution:
+            return JSONResponse({'message': f'Execution {execution_id} not found'}, status_code=404)
+        execution['status_checks'] += 1
+        status = status_of(execution)
+        return {
+            'workflowExecutionId': execution_id,
+            'status': status,
+            'startTime': execution['created_at'],
+            'endTime': execution['created_at'] + config.run_seconds if status == 'SUCCEEDED' else None,
+        }
+
+    @app.get('/amc/reporting/{instance_id}/workflowExecutions/{execution_id}/downloadUrls')
+    async def download_urls(instance_id: str, execution_id: str):
+        execution = executions.get(execution_id)
+        if not execution or status_of(execution) != 'SUCCEEDED':
+            return JSONResponse({'message': 'unavailable for download'}, status_code=404)
+        return {'downloadUrls': [f"{public_url}/_download/{execution_id}.csv"]}
+
+    @app.get('/_download/{execution_id}.csv')
+    async def download(execution_id: str):
+        counters['downloads'] += 1
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['dimension'] + [f'metric_{i}' for i in range(1, config.result_columns)])
+        row_rng = random.Random(execution_id)
+        for i in range(config.result_rows):
+            writer.writerow([f'value_{i}'] + [row_rng.randint(0, 100000) for _ in range(1, config.result_columns)])
+        return PlainTextResponse(buffer.getvalue(), media_type='text/csv')
+
+    @app.api_route('/amc/reporting/{instance_id}/workflows', methods=['GET', 'POST'])
+    async def workflows(instance_id: str):
+        return {'workflows': []}
+
+    @app.api_route('/amc/reporting/{instance_id}/workflows/{workflow_id}', methods=['GET', 'PUT', 'DELETE'])
+    async def workflow(instance_id: str, workflow_id: str):
+        return {'workflowId': workflow_id}
+
+    @app.get('/_bench/stats')
+    async def stats():
+        return {
+            'config': asdict(config),
+            'counters': counters,
+            'executions': {
+                eid: {
+                    'created_at': e['created_at'],
+                    'succeeded_at': e['created_at'] + config.run_seconds,
+                    'status_checks': e['status_checks'],
+                }
+                for eid, e in executions.items()
+            },
+        }
+
+    return app
+
+
+def _serve(config: FakeAMCConfig, port: int) -> None:
+    import uvicorn
+
+    uvicorn.run(create_app(config, f"http://127.0.0.1:{port}"), host='127.0.0.1', port=port, log_level='warning')
+
+
+class FakeAMCServer:
+    """Runs the fake AMC API in a subprocess so it does not share the benchmark's loop or RSS"""
+
+    def __init__(self, config: Optional[FakeAMCConfig] = None, port: int = 8765):
+        self.config = config or FakeAMCConfig()
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self._process: Optional[multiprocessing.Process] = None
+
+    def start(self, timeout: float = 15.0) -> 'FakeAMCServer':
+        self._process = multiprocessing.get_context('spawn').Process(
+            target=_serve, args=(self.config, self.port), daemon=True
+        )
+        self._process.start()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                requests.get(f"{self.url}/_bench/stats", timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"Fake AMC server did not start on port {self.port}")
+
+    def stats(self) -> Dict[str, Any]:
+        return requests.get(f"{self.url}/_bench/stats", timeout=30).json()
+
+    def stop(self) -> None:
+        if self._process and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=5)
+
+    def __enter__(self) -> 'FakeAMCServer':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fake AMC reporting API')
+    parser.add_argument('--port', type=int, default=8765)
+    for name, field in FakeAMCConfig.__dataclass_fields__.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(field.default), default=field.default)
+    args = parser.parse_args()
+    config = FakeAMCConfig(**{name: getattr(args, name) for name in FakeAMCConfig.__dataclass_fields__})
+    _serve(config, args.port)
+
+
+if __name__ == '__main__':
+    main()
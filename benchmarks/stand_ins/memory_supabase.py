@@ -0,0 +1,451 @@
+"""
+In-memory Supabase stand-in
+
+Implements the subset of the supabase-py / PostgREST query builder the
+background services use: select with embedded resources (`rel(...)`,
+`rel!inner(...)`, `rel!fk_column(...)`, `rel(count)`), eq/neq/gt/gte/lt/lte/
+in_/is_/like/ilike/or_ filters, order/limit/range/single/maybe_single,
+insert/update/upsert/delete, count='exact' and registered RPC functions.
+
+Relationships are declared as foreign keys (child table, column) -> parent
+table, from which both many-to-one (object) and one-to-many (list) embeds are
+resolved. Database triggers the services rely on can be emulated with
+register_trigger. Every call is counted per table and operation so benchmarks
+can report database load alongside latency.
+"""
+
+import copy
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (child_table, fk_column) -> parent_table, or 'parent_table.column' when the key is not 'id'
+DEFAULT_FOREIGN_KEYS: Dict[Tuple[str, str], str] = {
+    ('amc_accounts', 'user_id'): 'users',
+    ('amc_instances', 'account_id'): 'amc_accounts',
+    ('workflows', 'user_id'): 'users',
+    ('workflows', 'instance_id'): 'amc_instances',
+    ('workflow_executions', 'workflow_id'): 'workflows',
+    ('workflow_schedules', 'workflow_id'): 'workflows',
+    ('workflow_schedules', 'user_id'): 'users',
+    ('schedule_runs', 'schedule_id'): 'workflow_schedules',
+    ('report_data_collections', 'workflow_id'): 'workflows',
+    ('report_data_collections', 'instance_id'): 'amc_instances',
+    ('report_data_collections', 'user_id'): 'users',
+    ('report_data_collections', 'report_id'): 'report_definitions',
+    ('report_data_weeks', 'collection_id'): 'report_data_collections',
+    ('report_data_weeks', 'execution_id'): 'workflow_executions',
+    ('snowflake_sync_queue', 'execution_id'): 'workflow_executions.execution_id',
+    ('snowflake_sync_queue', 'user_id'): 'users',
+    ('instance_brands', 'instance_id'): 'amc_instances',
+}
+
+
+class MemoryAPIError(Exception):
+    """Raised where PostgREST would answer with an error (mirrors postgrest.APIError messages)"""
+
+
+class MemoryResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split a select string on commas outside parentheses"""
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+_EMBED = re.compile(r'^(?:(?P<alias>\w+):)?(?P<table>\w+)(?:!(?P<hint>\w+))?(?:!(?P<hint2>\w+))?\((?P<inner>.*)\)$', re.S)
+
+
+def _coerce(row_value: Any, value: Any) -> Tuple[Any, Any]:
+    """Compare like PostgREST: filter values arrive as text"""
+    if row_value is None or value is None:
+        return row_value, value
+    if isinstance(row_value, bool):
+        return row_value, value if isinstance(value, bool) else str(value).lower() == 'true'
+    if isinstance(row_value, (int, float)):
+        try:
+            return row_value, float(value)
+        except (TypeError, ValueError):
+            return str(row_value), str(value)
+    return str(row_value), str(value)
+
+
+def _like(pattern: str, value: Any, case_insensitive: bool) -> bool:
+    if value is None:
+        return False
+    regex = '^' + re.escape(pattern).replace('%', '.*').replace('\\*', '.*').replace('_', '.') + '$'
+    return re.match(regex, str(value), re.I if case_insensitive else 0) is not None
+
+
+def _get_path(row: Dict[str, Any], column: str) -> Any:
+    value: Any = row
+    for part in column.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+class _Filter:
+    def __init__(self, column: str, op: str, value: Any):
+        self.column, self.op, self.value = column, op, value
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        actual = _get_path(row, self.column)
+        if self.op == 'is':
+            target = None if str(self.value).lower() == 'null' else str(self.value).lower() == 'true'
+            return actual is target if target is None else actual == target
+        if self.op == 'in':
+            return any(_coerce(actual, v)[0] == _coerce(actual, v)[1] for v in self.value)
+        if self.op in ('like', 'ilike'):
+            return _like(str(self.value), actual, self.op == 'ilike')
+        if actual is None:
+            return self.op == 'neq'
+        left, right = _coerce(actual, self.value)
+        try:
+            return {
+                'eq': left == right, 'neq': left != right,
+                'gt': left > right, 'gte': left >= right,
+                'lt': left < right, 'lte': left <= right,
+            }[self.op]
+        except TypeError:
+            return False
+
+
+def _parse_or(expression: str) -> List[_Filter]:
+    filters = []
+    for part in _split_top_level(expression):
+        column, op, value = part.split('.', 2)
+        if op == 'in':
+            value = [v.strip() for v in value.strip('()').split(',')]
+        filters.append(_Filter(column, op, value))
+    return filters
+
+
+class MemoryQuery:
+    """Chainable query against one table"""
+
+    def __init__(self, db: 'MemorySupabase', table: str):
+        self._db = db
+        self._table = table
+        self._op = 'select'
+        self._columns = '*'
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._filters: List[Any] = []
+        self._order: List[Tuple[str, bool, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single: Optional[str] = None
+
+    # ----- operations -----
+    def select(self, *columns: str, count: Optional[str] = None) -> 'MemoryQuery':
+        if self._op == 'select':
+            self._columns = ','.join(columns) if columns else '*'
+        self._count = count
+        return self
+
+    def insert(self, payload: Any, **kwargs: Any) -> 'MemoryQuery':
+        self._op, self._payload = 'insert', payload
+        return self
+
+    def upsert(self, payload: Any, on_conflict: Optional[str] = None, **kwargs: Any) -> 'MemoryQuery':
+        self._op, self._payload, self._on_conflict = 'upsert', payload, on_conflict
+        return self
+
+    def update(self, payload: Dict[str, Any], **kwargs: Any) -> 'MemoryQuery':
+        self._op, self._payload = 'update', payload
+        return self
+
+    def delete(self, **kwargs: Any) -> 'MemoryQuery':
+        self._op = 'delete'
+        return self
+
+    # ----- filters -----
+    def _add(self, column: str, op: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_Filter(column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'eq', value)
+
+    def neq(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'neq', value)
+
+    def gt(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'gt', value)
+
+    def gte(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'gte', value)
+
+    def lt(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'lt', value)
+
+    def lte(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'lte', value)
+
+    def in_(self, column: str, values: List[Any]) -> 'MemoryQuery':
+        return self._add(column, 'in', list(values))
+
+    def is_(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._add(column, 'is', value)
+
+    def like(self, column: str, pattern: str) -> 'MemoryQuery':
+        return self._add(column, 'like', pattern)
+
+    def ilike(self, column: str, pattern: str) -> 'MemoryQuery':
+        return self._add(column, 'ilike', pattern)
+
+    def or_(self, expression: str) -> 'MemoryQuery':
+        self._filters.append(('or', _parse_or(expression)))
+        return self
+
+    # ----- modifiers -----
+    def order(self, column: str, desc: bool = False, nullsfirst: bool = False) -> 'MemoryQuery':
+        self._order.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size: int) -> 'MemoryQuery':
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> 'MemoryQuery':
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self) -> 'MemoryQuery':
+        self._single = 'single'
+        return self
+
+    def maybe_single(self) -> 'MemoryQuery':
+        self._single = 'maybe'
+        return self
+
+    # ----- execution -----
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        for f in self._filters:
+            if isinstance(f, tuple):
+                if not any(inner.matches(row) for inner in f[1]):
+                    return False
+            elif not f.matches(row):
+                return False
+        return True
+
+    def execute(self) -> MemoryResponse:
+        self._db.record_call(self._table, self._op)
+        with self._db.lock:
+            if self._op == 'select':
+                return self._execute_select()
+            if self._op in ('insert', 'upsert'):
+                return self._execute_write()
+            if self._op == 'update':
+                rows = [r for r in self._db.rows(self._table) if self._matches(r)]
+                for row in rows:
+                    row.update(copy.deepcopy(self._payload))
+                self._db.fire_triggers(self._table, rows)
+                return MemoryResponse(copy.deepcopy(rows))
+            if self._op == 'delete':
+                table = self._db.rows(self._table)
+                removed = [r for r in table if self._matches(r)]
+                self._db.tables[self._table] = [r for r in table if not self._matches(r)]
+                return MemoryResponse(copy.deepcopy(removed))
+        raise MemoryAPIError(f"Unsupported operation {self._op}")
+
+    def _execute_write(self) -> MemoryResponse:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        table = self._db.rows(self._table)
+        written = []
+        keys = (self._on_conflict or 'id').split(',')
+        for item in payload:
+            record = copy.deepcopy(item)
+            record.setdefault('id', str(uuid.uuid4()))
+            record.setdefault('created_at', _now())
+            existing = None
+            if self._op == 'upsert':
+                existing = next(
+                    (r for r in table if all(str(r.get(k)) == str(record.get(k)) for k in keys)), None
+                )
+            if existing is not None:
+                record.pop('id', None)
+                record.pop('created_at', None)
+                existing.update(record)
+                written.append(existing)
+            else:
+                table.append(record)
+                written.append(record)
+        self._db.fire_triggers(self._table, written)
+        return MemoryResponse(copy.deepcopy(written))
+
+    def _execute_select(self) -> MemoryResponse:
+        items = _split_top_level(self._columns)
+        # (full row for filtering/ordering, projected row to return)
+        pairs = []
+        for row in self._db.rows(self._table):
+            shaped = self._db.shape(self._table, row, items)
+            if shaped is not None and self._matches({**row, **shaped}):
+                pairs.append(({**row, **shaped}, shaped))
+
+        for column, desc, nullsfirst in reversed(self._order):
+            present = [p for p in pairs if _get_path(p[0], column) is not None]
+            missing = [p for p in pairs if _get_path(p[0], column) is None]
+            present.sort(key=lambda p: _get_path(p[0], column), reverse=desc)
+            pairs = missing + present if nullsfirst else present + missing
+        rows = [shaped for _, shaped in pairs]
+
+        total = len(rows)
+        end = None if self._limit is None else self._offset + self._limit
+        rows = rows[self._offset:end]
+
+        if self._single:
+            if len(rows) != 1:
+                if self._single == 'maybe' and not rows:
+                    return MemoryResponse(None)
+                raise MemoryAPIError(
+                    "JSON object requested, multiple (or no) rows returned "
+                    f"(code PGRST116, {len(rows)} rows)"
+                )
+            return MemoryResponse(copy.deepcopy(rows[0]), count=total if self._count else None)
+        return MemoryResponse(copy.deepcopy(rows), count=total if self._count else None)
+
+
+class _RPCCall:
+    def __init__(self, db: 'MemorySupabase', name: str, params: Dict[str, Any]):
+        self._db, self._name, self._params = db, name, params
+
+    def execute(self) -> MemoryResponse:
+        self._db.record_call(f"rpc:{self._name}", 'rpc')
+        function = self._db.functions.get(self._name)
+        if function is None:
+            raise MemoryAPIError(f"Could not find the function public.{self._name} (code PGRST202)")
+        with self._db.lock:
+            return MemoryResponse(function(self._db, **self._params))
+
+
+class MemorySupabase:
+    """Drop-in for supabase.Client backed by Python lists"""
+
+    def __init__(self, foreign_keys: Optional[Dict[Tuple[str, str], str]] = None):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.foreign_keys = dict(DEFAULT_FOREIGN_KEYS if foreign_keys is None else foreign_keys)
+        self.functions: Dict[str, Callable[..., Any]] = {}
+        self.triggers: Dict[str, List[Callable[..., Any]]] = {}
+        self.calls: Dict[str, int] = {}
+        self.lock = threading.RLock()
+
+    # ----- client API -----
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _RPCCall:
+        return _RPCCall(self, name, params or {})
+
+    # ----- stand-in helpers -----
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(table, [])
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert rows directly (no call accounting)"""
+        for row in rows:
+            row.setdefault('id', str(uuid.uuid4()))
+            row.setdefault('created_at', _now())
+            self.rows(table).append(row)
+        return rows
+
+    def register_function(self, name: str, function: Callable[..., Any]) -> None:
+        """Register an RPC: function(db, **params) -> data"""
+        self.functions[name] = function
+
+    def register_trigger(self, table: str, trigger: Callable[..., Any]) -> None:
+        """Register an AFTER INSERT/UPDATE trigger: trigger(db, row) per written row"""
+        self.triggers.setdefault(table, []).append(trigger)
+
+    def fire_triggers(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        for trigger in self.triggers.get(table, []):
+            for row in rows:
+                trigger(self, row)
+
+    def record_call(self, table: str, op: str) -> None:
+        key = f"{table}.{op}"
+        self.calls[key] = self.calls.get(key, 0) + 1
+
+    def _relation(self, table: str, target: str, hint: Optional[str]) -> Optional[Tuple[str, str, str]]:
+        """('one' | 'many', fk_column, parent_key) for many-to-one / one-to-many embeds"""
+        for (child, column), parent in self.foreign_keys.items():
+            parent_table, _, key = parent.partition('.')
+            if child == table and parent_table == target and hint in (None, column):
+                return 'one', column, key or 'id'
+        for (child, column), parent in self.foreign_keys.items():
+            parent_table, _, key = parent.partition('.')
+            if child == target and parent_table == table and hint in (None, column):
+                return 'many', column, key or 'id'
+        return None
+
+    def shape(self, table: str, row: Dict[str, Any], items: List[str]) -> Optional[Dict[str, Any]]:
+        """Project a row for a select list; None when an !inner embed has no match"""
+        result: Dict[str, Any] = {}
+        for item in items:
+            item = item.strip()
+            if item == '*':
+                result.update(row)
+                continue
+            match = _EMBED.match(item)
+            if not match:
+                if item == 'count':
+                    continue
+                name = item.split(':')[-1]
+                result[item.split(':')[0]] = row.get(name)
+                continue
+
+            target = match.group('table')
+            hints = [h for h in (match.group('hint'), match.group('hint2')) if h]
+            inner = 'inner' in hints
+            fk_hint = next((h for h in hints if h != 'inner'), None)
+            relation = self._relation(table, target, fk_hint)
+            if relation is None:
+                raise MemoryAPIError(f"Could not find a relationship between '{table}' and '{target}'")
+            kind, column, key_column = relation
+            inner_items = _split_top_level(match.group('inner'))
+            key = match.group('alias') or target
+
+            if kind == 'one':
+                parent = next((p for p in self.rows(target) if p.get(key_column) == row.get(column)), None)
+                embedded = self.shape(target, parent, inner_items) if parent else None
+                if embedded is None and inner:
+                    return None
+                result[key] = embedded
+            else:
+                children = [c for c in self.rows(target) if c.get(column) == row.get(key_column)]
+                if inner_items == ['count']:
+                    result[key] = [{'count': len(children)}]
+                    continue
+                shaped = [s for s in (self.shape(target, c, inner_items) for c in children) if s is not None]
+                if inner and not shaped:
+                    return None
+                result[key] = shaped
+        return result
@@ -0,0 +1,37 @@
+-- Migration: AMC data-source catalog version stamp
+-- Purpose: Let API processes hold the AMC schema catalog in memory and only
+--          reload it when scripts/import_amc_schemas.py has changed it
+-- Date: 2025-10-24
+
+-- Single-row table holding the current catalog version
+CREATE TABLE IF NOT EXISTS amc_catalog_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO amc_catalog_version (id, version)
+VALUES (1, 1)
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE amc_catalog_version ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Catalog version is viewable by all users" ON amc_catalog_version
+    FOR SELECT USING (true);
+
+-- Bump the catalog version; called by the schema importer after a run
+CREATE OR REPLACE FUNCTION bump_amc_catalog_version()
+RETURNS BIGINT AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO amc_catalog_version (id, version, updated_at)
+    VALUES (1, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE
+        SET version = amc_catalog_version.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+    RETURNING version INTO new_version;
+
+    RETURN new_version;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
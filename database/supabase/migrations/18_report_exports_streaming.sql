@@ -0,0 +1,19 @@
+-- Migration: Streaming report export engine
+-- Purpose: Parquet exports, export de-duplication by content hash, and the
+--          'cancelled' status already used by ReportExportService.cancel_export
+-- Date: 2025-10-24
+
+ALTER TABLE report_exports
+ADD COLUMN IF NOT EXISTS parameters_hash VARCHAR(64);
+
+-- check_duplicate_export looks up recent exports by config/user/format/hash
+CREATE INDEX IF NOT EXISTS idx_report_exports_dedup
+    ON report_exports(report_configuration_id, user_id, export_format, parameters_hash, created_at DESC);
+
+ALTER TABLE report_exports DROP CONSTRAINT IF EXISTS report_exports_export_format_check;
+ALTER TABLE report_exports ADD CONSTRAINT report_exports_export_format_check
+    CHECK (export_format IN ('pdf', 'png', 'csv', 'excel', 'parquet'));
+
+ALTER TABLE report_exports DROP CONSTRAINT IF EXISTS report_exports_status_check;
+ALTER TABLE report_exports ADD CONSTRAINT report_exports_status_check
+    CHECK (status IN ('pending', 'processing', 'completed', 'failed', 'cancelled'));
@@ -0,0 +1,19 @@
+-- Migration: Paged execution results
+-- Purpose: Slice workflow_executions.result_rows inside Postgres so the results
+--          API transfers one page instead of the whole JSONB array
+-- Date: 2025-10-25
+
+-- Return rows [p_offset, p_offset + p_limit) of an execution's stored results
+CREATE OR REPLACE FUNCTION get_execution_result_page(
+    p_execution_id TEXT,
+    p_offset INTEGER DEFAULT 0,
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(r.value ORDER BY r.ordinality), '[]'::jsonb)
+    FROM workflow_executions we,
+         LATERAL jsonb_array_elements(COALESCE(we.result_rows, '[]'::jsonb)) WITH ORDINALITY AS r(value, ordinality)
+    WHERE we.execution_id = p_execution_id
+      AND r.ordinality > GREATEST(p_offset, 0)
+      AND r.ordinality <= GREATEST(p_offset, 0) + LEAST(GREATEST(p_limit, 0), 10000);
+$$ LANGUAGE sql STABLE;
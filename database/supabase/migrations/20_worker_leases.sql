@@ -0,0 +1,70 @@
+-- Migration: Worker leases
+-- Purpose: Lease rows for background-worker coordination. Singleton loops
+--          (schedule executors, token refresh) run only in the process holding
+--          their leader lease; every live worker holds a member lease, and the
+--          scalable loops partition work across the live members.
+-- Date: 2025-10-26
+--
+-- Leases instead of pg_advisory_lock: workers talk to Postgres through
+-- PostgREST, which gives no session to hold an advisory lock across calls.
+
+CREATE TABLE IF NOT EXISTS worker_leases (
+    name TEXT PRIMARY KEY,                 -- 'leader:<engine>' or 'member:<worker_id>'
+    holder TEXT NOT NULL,                  -- worker_id of the owning process
+    expires_at TIMESTAMPTZ NOT NULL,
+    acquired_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    renewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    metadata JSONB DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS idx_worker_leases_expires_at ON worker_leases(expires_at);
+
+-- Acquire or renew a lease. Succeeds when the lease is free, expired, or
+-- already held by p_holder; returns TRUE if p_holder holds it afterwards.
+CREATE OR REPLACE FUNCTION try_acquire_worker_lease(
+    p_name TEXT,
+    p_holder TEXT,
+    p_ttl_seconds INTEGER DEFAULT 30,
+    p_metadata JSONB DEFAULT '{}'::jsonb
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_holder TEXT;
+BEGIN
+    INSERT INTO worker_leases (name, holder, expires_at, metadata)
+    VALUES (p_name, p_holder, NOW() + make_interval(secs => p_ttl_seconds), p_metadata)
+    ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder,
+            expires_at = EXCLUDED.expires_at,
+            renewed_at = NOW(),
+            metadata = EXCLUDED.metadata,
+            acquired_at = CASE
+                WHEN worker_leases.holder = EXCLUDED.holder THEN worker_leases.acquired_at
+                ELSE NOW()
+            END
+        WHERE worker_leases.holder = EXCLUDED.holder
+           OR worker_leases.expires_at < NOW()
+    RETURNING holder INTO v_holder;
+
+    RETURN v_holder IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Release a lease early (graceful shutdown) so another worker can take over
+CREATE OR REPLACE FUNCTION release_worker_lease(p_name TEXT, p_holder TEXT)
+RETURNS BOOLEAN AS $$
+    WITH released AS (
+        DELETE FROM worker_leases
+        WHERE name = p_name AND holder = p_holder
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM released);
+$$ LANGUAGE sql;
+
+ALTER TABLE worker_leases ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage worker leases" ON worker_leases
+FOR ALL USING (auth.jwt() ->> 'role' = 'service_role');
+
+COMMENT ON TABLE worker_leases IS 'Leader and membership leases for background worker processes';
+COMMENT ON COLUMN worker_leases.name IS 'leader:<engine> for singleton loops, member:<worker_id> for live workers';
@@ -0,0 +1,266 @@
+-- Migration: Durable background job queue
+-- Purpose: One leased work queue for the background engines (execution status
+--          polling, data collections, Snowflake sync) instead of each engine
+--          scanning its own table on a timer
+-- Date: 2025-10-27
+--
+-- Jobs are claimed with FOR UPDATE SKIP LOCKED and leased for a visibility
+-- timeout; a worker that dies simply lets the lease expire and the job is
+-- claimed again. Failures retry with backoff until max_attempts, then the job
+-- is dead-lettered (status 'dead'). Every enqueue sends NOTIFY background_jobs
+-- with the queue name so idle workers wake immediately. Finished jobs are
+-- deleted by prune_background_jobs once they are past their retention.
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    queue TEXT NOT NULL,                      -- handler name, e.g. 'execution_status'
+    job_key TEXT,                             -- dedupe key: one live job per (queue, job_key)
+    concurrency_key TEXT,                     -- jobs sharing it obey p_key_limit (e.g. AMC instance)
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    priority INTEGER NOT NULL DEFAULT 0,      -- higher runs first
+    status TEXT NOT NULL DEFAULT 'queued',    -- queued, running, succeeded, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ,
+    CONSTRAINT check_background_job_status CHECK (status IN ('queued', 'running', 'succeeded', 'dead'))
+);
+
+-- Claim path: next due jobs per queue by priority
+CREATE INDEX IF NOT EXISTS idx_background_jobs_claim
+ON background_jobs(queue, priority DESC, run_at)
+WHERE status = 'queued';
+
+-- Expired leases are reclaimed
+CREATE INDEX IF NOT EXISTS idx_background_jobs_locked_until
+ON background_jobs(locked_until)
+WHERE status = 'running';
+
+-- Retention: finished jobs by age
+CREATE INDEX IF NOT EXISTS idx_background_jobs_finished
+ON background_jobs(status, updated_at)
+WHERE status IN ('succeeded', 'dead');
+
+-- At most one live job per key
+CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_live_key
+ON background_jobs(queue, job_key)
+WHERE job_key IS NOT NULL AND status IN ('queued', 'running');
+
+-- Enqueue a job (no-op returning the live job when job_key is already queued/running)
+CREATE OR REPLACE FUNCTION enqueue_background_job(
+    p_queue TEXT,
+    p_payload JSONB DEFAULT '{}'::jsonb,
+    p_job_key TEXT DEFAULT NULL,
+    p_concurrency_key TEXT DEFAULT NULL,
+    p_priority INTEGER DEFAULT 0,
+    p_delay_seconds INTEGER DEFAULT 0,
+    p_max_attempts INTEGER DEFAULT 5
+)
+RETURNS background_jobs AS $$
+DECLARE
+    v_job background_jobs;
+BEGIN
+    INSERT INTO background_jobs (queue, payload, job_key, concurrency_key, priority, run_at, max_attempts)
+    VALUES (p_queue, p_payload, p_job_key, p_concurrency_key, p_priority,
+            NOW() + make_interval(secs => GREATEST(p_delay_seconds, 0)), p_max_attempts)
+    ON CONFLICT (queue, job_key) WHERE job_key IS NOT NULL AND status IN ('queued', 'running')
+    DO NOTHING
+    RETURNING * INTO v_job;
+
+    IF v_job.id IS NULL THEN
+        SELECT * INTO v_job FROM background_jobs
+        WHERE queue = p_queue AND job_key = p_job_key AND status IN ('queued', 'running');
+    ELSE
+        PERFORM pg_notify('background_jobs', p_queue);
+    END IF;
+
+    RETURN v_job;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Lease up to p_limit due jobs from p_queues to p_worker.
+-- Jobs whose lease expired (worker died) are due again. With p_key_limit, no
+-- concurrency_key ends up with more than p_key_limit running jobs: keyed claims
+-- take a transaction advisory lock first, so a concurrent claimer counts the
+-- jobs this one leased instead of the same snapshot.
+CREATE OR REPLACE FUNCTION claim_background_jobs(
+    p_queues TEXT[],
+    p_worker TEXT,
+    p_limit INTEGER DEFAULT 10,
+    p_visibility_seconds INTEGER DEFAULT 300,
+    p_key_limit INTEGER DEFAULT NULL
+)
+RETURNS SETOF background_jobs AS $$
+BEGIN
+    IF p_key_limit IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext('claim_background_jobs'));
+    END IF;
+
+    RETURN QUERY
+    WITH running_keys AS (
+        SELECT concurrency_key, COUNT(*) AS running
+        FROM background_jobs
+        WHERE status = 'running' AND locked_until > NOW() AND concurrency_key IS NOT NULL
+        GROUP BY concurrency_key
+    ),
+    locked AS (
+        -- Over-fetch so capped keys do not starve the rest of the batch
+        SELECT j.id, j.concurrency_key, j.priority, j.run_at
+        FROM background_jobs j
+        WHERE j.queue = ANY(p_queues)
+          AND (
+              (j.status = 'queued' AND j.run_at <= NOW())
+              OR (j.status = 'running' AND j.locked_until < NOW())
+          )
+        ORDER BY j.priority DESC, j.run_at
+        LIMIT GREATEST(p_limit, 1) * 10
+        FOR UPDATE SKIP LOCKED
+    ),
+    ranked AS (
+        SELECT l.*,
+               ROW_NUMBER() OVER (PARTITION BY l.concurrency_key ORDER BY l.priority DESC, l.run_at) AS key_rank
+        FROM locked l
+    ),
+    chosen AS (
+        SELECT r.id
+        FROM ranked r
+        LEFT JOIN running_keys rk ON rk.concurrency_key = r.concurrency_key
+        WHERE p_key_limit IS NULL
+           OR r.concurrency_key IS NULL
+           OR COALESCE(rk.running, 0) + r.key_rank <= p_key_limit
+        ORDER BY r.priority DESC, r.run_at
+        LIMIT p_limit
+    )
+    UPDATE background_jobs j
+    SET status = 'running',
+        locked_by = p_worker,
+        locked_until = NOW() + make_interval(secs => p_visibility_seconds),
+        attempts = j.attempts + 1,
+        updated_at = NOW()
+    FROM chosen c
+    WHERE j.id = c.id
+    RETURNING j.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Extend the lease on jobs still being worked on; returns the IDs still held
+CREATE OR REPLACE FUNCTION heartbeat_background_jobs(
+    p_ids UUID[],
+    p_worker TEXT,
+    p_visibility_seconds INTEGER DEFAULT 300
+)
+RETURNS SETOF UUID AS $$
+    UPDATE background_jobs
+    SET locked_until = NOW() + make_interval(secs => p_visibility_seconds),
+        updated_at = NOW()
+    WHERE id = ANY(p_ids) AND locked_by = p_worker AND status = 'running'
+    RETURNING id;
+$$ LANGUAGE sql;
+
+-- Finish a job:
+--   p_outcome 'succeeded' - done
+--   p_outcome 'retry'     - failed; queued again after p_delay_seconds, or dead-lettered
+--                           once attempts reach max_attempts
+--   p_outcome 'snooze'    - not finished yet (e.g. AMC still running); queued again
+--                           after p_delay_seconds without using up an attempt
+CREATE OR REPLACE FUNCTION finish_background_job(
+    p_id UUID,
+    p_worker TEXT,
+    p_outcome TEXT,
+    p_error TEXT DEFAULT NULL,
+    p_delay_seconds INTEGER DEFAULT 0
+)
+RETURNS background_jobs AS $$
+DECLARE
+    v_job background_jobs;
+BEGIN
+    UPDATE background_jobs
+    SET status = CASE
+            WHEN p_outcome = 'succeeded' THEN 'succeeded'
+            WHEN p_outcome = 'retry' AND attempts >= max_attempts THEN 'dead'
+            ELSE 'queued'
+        END,
+        attempts = CASE WHEN p_outcome = 'snooze' THEN GREATEST(attempts - 1, 0) ELSE attempts END,
+        run_at = NOW() + make_interval(secs => GREATEST(p_delay_seconds, 0)),
+        locked_by = NULL,
+        locked_until = NULL,
+        last_error = COALESCE(p_error, last_error),
+        completed_at = CASE WHEN p_outcome = 'succeeded' THEN NOW() ELSE completed_at END,
+        updated_at = NOW()
+    WHERE id = p_id AND locked_by = p_worker AND status = 'running'
+    RETURNING * INTO v_job;
+
+    RETURN v_job;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Delete succeeded jobs older than p_succeeded_retention and dead-lettered jobs
+-- older than p_dead_retention (kept longer for inspection), at most p_limit rows
+-- per call; returns the number deleted
+CREATE OR REPLACE FUNCTION prune_background_jobs(
+    p_succeeded_retention INTERVAL DEFAULT INTERVAL '7 days',
+    p_dead_retention INTERVAL DEFAULT INTERVAL '30 days',
+    p_limit INTEGER DEFAULT 10000
+)
+RETURNS INTEGER AS $$
+    WITH expired AS (
+        SELECT id
+        FROM background_jobs
+        WHERE (status = 'succeeded' AND updated_at < NOW() - p_succeeded_retention)
+           OR (status = 'dead' AND updated_at < NOW() - p_dead_retention)
+        LIMIT p_limit
+    ),
+    deleted AS (
+        DELETE FROM background_jobs j
+        USING expired e
+        WHERE j.id = e.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM deleted;
+$$ LANGUAGE sql;
+
+-- Snowflake sync items are produced by a trigger (migration 13); hand each new
+-- item to the queue as well so it is picked up immediately
+CREATE OR REPLACE FUNCTION enqueue_snowflake_sync_job()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM enqueue_background_job(
+        'snowflake_sync',
+        jsonb_build_object('sync_id', NEW.id, 'execution_id', NEW.execution_id),
+        NEW.id::text
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_enqueue_snowflake_sync_job ON snowflake_sync_queue;
+CREATE TRIGGER trigger_enqueue_snowflake_sync_job
+    AFTER INSERT ON snowflake_sync_queue
+    FOR EACH ROW
+    EXECUTE FUNCTION enqueue_snowflake_sync_job();
+
+-- Monitoring
+CREATE OR REPLACE VIEW background_jobs_summary AS
+SELECT
+    queue,
+    status,
+    COUNT(*) AS count,
+    MIN(run_at) AS oldest_run_at,
+    MAX(attempts) AS max_attempts_used
+FROM background_jobs
+GROUP BY queue, status;
+
+ALTER TABLE background_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage background jobs" ON background_jobs
+FOR ALL USING (auth.jwt() ->> 'role' = 'service_role');
+
+COMMENT ON TABLE background_jobs IS 'Durable leased job queue for background engines';
+COMMENT ON COLUMN background_jobs.job_key IS 'Deduplication key: at most one queued/running job per (queue, job_key)';
+COMMENT ON COLUMN background_jobs.concurrency_key IS 'Jobs sharing this key are capped by the claim''s p_key_limit';
+COMMENT ON COLUMN background_jobs.locked_until IS 'Visibility timeout; an expired lease makes the job claimable again';
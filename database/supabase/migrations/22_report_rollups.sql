@@ -0,0 +1,122 @@
+-- Migration: Rollup cube for report metrics
+-- Purpose: Pre-aggregated metrics per workflow, instance and dimension at day,
+--          ISO week, month and quarter level, so any date range (and its
+--          previous period) is answered from a few nodes instead of raw
+--          results or ad-hoc sums of aggregates
+-- Date: 2025-10-29
+--
+-- Day nodes are written by the application when an execution completes;
+-- refresh_report_rollups() then recomputes the weeks and months over those
+-- days from their day nodes, and the quarters from their months. Only
+-- additive metrics are stored. dimension is '' for totals, otherwise
+-- '<column>:<value>' (e.g. 'campaign_id:123').
+
+CREATE TABLE IF NOT EXISTS report_rollups (
+    workflow_id UUID NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    instance_id UUID NOT NULL REFERENCES amc_instances(id) ON DELETE CASCADE,
+    dimension TEXT NOT NULL DEFAULT '',
+    level TEXT NOT NULL,
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+    metrics JSONB NOT NULL DEFAULT '{}'::jsonb,   -- additive metrics only: {metric: sum}
+    row_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (workflow_id, instance_id, dimension, level, period_start),
+    CONSTRAINT check_report_rollup_level CHECK (level IN ('day', 'week', 'month', 'quarter'))
+);
+
+-- Parent refresh scans one level of child nodes over a date span
+CREATE INDEX IF NOT EXISTS idx_report_rollups_level_period
+ON report_rollups(workflow_id, instance_id, level, period_start);
+
+-- Recompute week/month nodes from days and quarter nodes from months for the
+-- periods touching [p_start, p_end]. Returns the number of nodes written.
+CREATE OR REPLACE FUNCTION refresh_report_rollups(
+    p_workflow_id UUID,
+    p_instance_id UUID,
+    p_start DATE,
+    p_end DATE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_level TEXT;
+    v_child TEXT;
+    v_span INTERVAL;
+    v_first DATE;
+    v_after DATE;
+    v_rows INTEGER;
+    v_total INTEGER := 0;
+BEGIN
+    FOREACH v_level IN ARRAY ARRAY['week', 'month', 'quarter'] LOOP
+        v_child := CASE v_level WHEN 'quarter' THEN 'month' ELSE 'day' END;
+        v_span := CASE v_level WHEN 'week' THEN INTERVAL '7 days'
+                               WHEN 'month' THEN INTERVAL '1 month'
+                               ELSE INTERVAL '3 months' END;
+        v_first := date_trunc(v_level, p_start::timestamp)::date;
+        v_after := (date_trunc(v_level, p_end::timestamp) + v_span)::date;
+
+        INSERT INTO report_rollups (
+            workflow_id, instance_id, dimension, level, period_start, period_end, metrics, row_count, updated_at
+        )
+        SELECT
+            p_workflow_id,
+            p_instance_id,
+            n.dimension,
+            v_level,
+            n.period_start,
+            (n.period_start + v_span - INTERVAL '1 day')::date,
+            COALESCE(t.metrics, '{}'::jsonb),
+            n.row_count,
+            NOW()
+        FROM (
+            SELECT c.dimension,
+                   date_trunc(v_level, c.period_start::timestamp)::date AS period_start,
+                   SUM(c.row_count) AS row_count
+            FROM report_rollups c
+            WHERE c.workflow_id = p_workflow_id
+              AND c.instance_id = p_instance_id
+              AND c.level = v_child
+              AND c.period_start >= v_first
+              AND c.period_start < v_after
+            GROUP BY 1, 2
+        ) n
+        LEFT JOIN (
+            SELECT s.dimension, s.period_start, jsonb_object_agg(s.key, s.total) AS metrics
+            FROM (
+                SELECT c.dimension,
+                       date_trunc(v_level, c.period_start::timestamp)::date AS period_start,
+                       m.key,
+                       SUM((m.value #>> '{}')::numeric) AS total
+                FROM report_rollups c
+                CROSS JOIN LATERAL jsonb_each(c.metrics) m
+                WHERE c.workflow_id = p_workflow_id
+                  AND c.instance_id = p_instance_id
+                  AND c.level = v_child
+                  AND c.period_start >= v_first
+                  AND c.period_start < v_after
+                  AND jsonb_typeof(m.value) = 'number'
+                GROUP BY 1, 2, 3
+            ) s
+            GROUP BY 1, 2
+        ) t ON t.dimension = n.dimension AND t.period_start = n.period_start
+        ON CONFLICT (workflow_id, instance_id, dimension, level, period_start) DO UPDATE SET
+            period_end = EXCLUDED.period_end,
+            metrics = EXCLUDED.metrics,
+            row_count = EXCLUDED.row_count,
+            updated_at = NOW();
+
+        GET DIAGNOSTICS v_rows = ROW_COUNT;
+        v_total := v_total + v_rows;
+    END LOOP;
+
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE report_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage report rollups" ON report_rollups
+FOR ALL USING (auth.jwt() ->> 'role' = 'service_role');
+
+COMMENT ON TABLE report_rollups IS 'Day/week/month/quarter pre-aggregates of additive report metrics';
+COMMENT ON COLUMN report_rollups.dimension IS 'Empty for totals, otherwise <result column>:<value>';
@@ -0,0 +1,196 @@
+-- Migration: Daily schedule run counters
+-- Purpose: Per-schedule, per-day run counts by status, runtimes, rows and cost,
+--          kept current by a trigger on schedule_runs so schedule metrics and
+--          period comparisons read a few counter rows instead of every run
+-- Date: 2025-10-30
+--
+-- Days are UTC days of scheduled_at. Every insert, update and delete of a run
+-- backs out the old row's contribution and adds the new one, so status moves
+-- (pending -> running -> completed) and the cleanup of stale pending runs keep
+-- the counters exact. Runtimes of completed runs are also kept in a log-bucket
+-- sketch ({bucket: count}, bucket = ceil(ln(seconds) / ln(1.02))): buckets of
+-- different days add up, and any percentile read from them is within 1% of
+-- the true runtime. The Python side (services/schedule_run_stats.py) uses the
+-- same bucket width.
+
+CREATE TABLE IF NOT EXISTS schedule_run_daily_stats (
+    schedule_id UUID NOT NULL REFERENCES workflow_schedules(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    total_runs INTEGER NOT NULL DEFAULT 0,
+    pending_runs INTEGER NOT NULL DEFAULT 0,
+    running_runs INTEGER NOT NULL DEFAULT 0,
+    completed_runs INTEGER NOT NULL DEFAULT 0,
+    failed_runs INTEGER NOT NULL DEFAULT 0,
+    cancelled_runs INTEGER NOT NULL DEFAULT 0,
+    runtime_count INTEGER NOT NULL DEFAULT 0,        -- completed runs with start and end times
+    runtime_sum DOUBLE PRECISION NOT NULL DEFAULT 0,  -- seconds
+    runtime_sketch JSONB NOT NULL DEFAULT '{}'::jsonb,
+    total_rows BIGINT NOT NULL DEFAULT 0,
+    total_cost NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    first_scheduled_at TIMESTAMPTZ,
+    last_scheduled_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (schedule_id, day)
+);
+
+-- Add (p_sign = 1) or back out (p_sign = -1) one run's contribution to its day
+CREATE OR REPLACE FUNCTION apply_schedule_run_stats(p_run schedule_runs, p_sign INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_day DATE;
+    v_runtime DOUBLE PRECISION;
+    v_bucket TEXT;
+BEGIN
+    IF p_run.schedule_id IS NULL OR p_run.scheduled_at IS NULL THEN
+        RETURN;
+    END IF;
+
+    v_day := (p_run.scheduled_at AT TIME ZONE 'UTC')::date;
+    IF p_run.status = 'completed' AND p_run.started_at IS NOT NULL AND p_run.completed_at IS NOT NULL THEN
+        v_runtime := GREATEST(EXTRACT(EPOCH FROM p_run.completed_at - p_run.started_at), 0);
+        v_bucket := CEIL(LN(GREATEST(v_runtime, 0.001)) / LN(1.02))::INTEGER::TEXT;
+    END IF;
+
+    -- Only adding creates a day; backing out never re-creates one (e.g. while
+    -- the schedule and its counters are being cascade-deleted)
+    IF p_sign > 0 THEN
+        INSERT INTO schedule_run_daily_stats (schedule_id, day)
+        VALUES (p_run.schedule_id, v_day)
+        ON CONFLICT (schedule_id, day) DO NOTHING;
+    END IF;
+
+    UPDATE schedule_run_daily_stats s
+    SET total_runs = s.total_runs + p_sign,
+        pending_runs = s.pending_runs + CASE WHEN p_run.status = 'pending' THEN p_sign ELSE 0 END,
+        running_runs = s.running_runs + CASE WHEN p_run.status = 'running' THEN p_sign ELSE 0 END,
+        completed_runs = s.completed_runs + CASE WHEN p_run.status = 'completed' THEN p_sign ELSE 0 END,
+        failed_runs = s.failed_runs + CASE WHEN p_run.status = 'failed' THEN p_sign ELSE 0 END,
+        cancelled_runs = s.cancelled_runs + CASE WHEN p_run.status = 'cancelled' THEN p_sign ELSE 0 END,
+        runtime_count = s.runtime_count + CASE WHEN v_runtime IS NULL THEN 0 ELSE p_sign END,
+        runtime_sum = s.runtime_sum + COALESCE(v_runtime, 0) * p_sign,
+        runtime_sketch = CASE
+            WHEN v_bucket IS NULL THEN s.runtime_sketch
+            WHEN COALESCE((s.runtime_sketch ->> v_bucket)::INTEGER, 0) + p_sign <= 0 THEN s.runtime_sketch - v_bucket
+            ELSE jsonb_set(s.runtime_sketch, ARRAY[v_bucket],
+                           to_jsonb(COALESCE((s.runtime_sketch ->> v_bucket)::INTEGER, 0) + p_sign))
+        END,
+        total_rows = s.total_rows + COALESCE(p_run.total_rows, 0) * p_sign,
+        total_cost = s.total_cost + COALESCE(p_run.total_cost, 0) * p_sign,
+        first_scheduled_at = CASE WHEN p_sign > 0 THEN LEAST(s.first_scheduled_at, p_run.scheduled_at)
+                                  ELSE s.first_scheduled_at END,
+        last_scheduled_at = CASE WHEN p_sign > 0 THEN GREATEST(s.last_scheduled_at, p_run.scheduled_at)
+                                 ELSE s.last_scheduled_at END,
+        updated_at = NOW()
+    WHERE s.schedule_id = p_run.schedule_id AND s.day = v_day;
+
+    -- Backing out the day's first or last run: re-read the bounds of that day
+    IF p_sign < 0 THEN
+        UPDATE schedule_run_daily_stats s
+        SET first_scheduled_at = b.first_scheduled_at,
+            last_scheduled_at = b.last_scheduled_at
+        FROM (
+            SELECT MIN(r.scheduled_at) AS first_scheduled_at, MAX(r.scheduled_at) AS last_scheduled_at
+            FROM schedule_runs r
+            WHERE r.schedule_id = p_run.schedule_id
+              AND r.scheduled_at >= v_day::timestamp AT TIME ZONE 'UTC'
+              AND r.scheduled_at < (v_day + 1)::timestamp AT TIME ZONE 'UTC'
+        ) b
+        WHERE s.schedule_id = p_run.schedule_id
+          AND s.day = v_day
+          AND p_run.scheduled_at IN (s.first_scheduled_at, s.last_scheduled_at);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION track_schedule_run_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Updates that touch none of the counted columns (e.g. error_summary) are free
+    IF TG_OP = 'UPDATE'
+       AND NEW.schedule_id IS NOT DISTINCT FROM OLD.schedule_id
+       AND NEW.scheduled_at IS NOT DISTINCT FROM OLD.scheduled_at
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.started_at IS NOT DISTINCT FROM OLD.started_at
+       AND NEW.completed_at IS NOT DISTINCT FROM OLD.completed_at
+       AND NEW.total_rows IS NOT DISTINCT FROM OLD.total_rows
+       AND NEW.total_cost IS NOT DISTINCT FROM OLD.total_cost THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_schedule_run_stats(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_schedule_run_stats(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_track_schedule_run_stats ON schedule_runs;
+CREATE TRIGGER trigger_track_schedule_run_stats
+    AFTER INSERT OR UPDATE OR DELETE ON schedule_runs
+    FOR EACH ROW
+    EXECUTE FUNCTION track_schedule_run_stats();
+
+-- Backfill the counters from existing runs
+WITH runs AS (
+    SELECT r.schedule_id,
+           (r.scheduled_at AT TIME ZONE 'UTC')::date AS day,
+           r.scheduled_at,
+           r.status,
+           COALESCE(r.total_rows, 0) AS total_rows,
+           COALESCE(r.total_cost, 0) AS total_cost,
+           CASE WHEN r.status = 'completed' AND r.started_at IS NOT NULL AND r.completed_at IS NOT NULL
+                THEN GREATEST(EXTRACT(EPOCH FROM r.completed_at - r.started_at), 0)
+           END AS runtime
+    FROM schedule_runs r
+    WHERE r.schedule_id IS NOT NULL
+),
+sketches AS (
+    SELECT b.schedule_id, b.day, jsonb_object_agg(b.bucket, b.runs) AS runtime_sketch
+    FROM (
+        SELECT schedule_id, day, CEIL(LN(GREATEST(runtime, 0.001)) / LN(1.02))::INTEGER::TEXT AS bucket,
+               COUNT(*) AS runs
+        FROM runs
+        WHERE runtime IS NOT NULL
+        GROUP BY 1, 2, 3
+    ) b
+    GROUP BY 1, 2
+)
+INSERT INTO schedule_run_daily_stats (
+    schedule_id, day, total_runs, pending_runs, running_runs, completed_runs, failed_runs, cancelled_runs,
+    runtime_count, runtime_sum, runtime_sketch, total_rows, total_cost, first_scheduled_at, last_scheduled_at
+)
+SELECT r.schedule_id,
+       r.day,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE r.status = 'pending'),
+       COUNT(*) FILTER (WHERE r.status = 'running'),
+       COUNT(*) FILTER (WHERE r.status = 'completed'),
+       COUNT(*) FILTER (WHERE r.status = 'failed'),
+       COUNT(*) FILTER (WHERE r.status = 'cancelled'),
+       COUNT(r.runtime),
+       COALESCE(SUM(r.runtime), 0),
+       COALESCE(k.runtime_sketch, '{}'::jsonb),
+       SUM(r.total_rows),
+       SUM(r.total_cost),
+       MIN(r.scheduled_at),
+       MAX(r.scheduled_at)
+FROM runs r
+LEFT JOIN sketches k ON k.schedule_id = r.schedule_id AND k.day = r.day
+GROUP BY r.schedule_id, r.day, k.runtime_sketch
+ON CONFLICT (schedule_id, day) DO NOTHING;
+
+ALTER TABLE schedule_run_daily_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view stats of their own schedules" ON schedule_run_daily_stats
+FOR SELECT USING (
+    schedule_id IN (SELECT id FROM workflow_schedules WHERE user_id = auth.uid())
+);
+
+CREATE POLICY "Service role can manage schedule run stats" ON schedule_run_daily_stats
+FOR ALL USING (auth.jwt() ->> 'role' = 'service_role');
+
+COMMENT ON TABLE schedule_run_daily_stats IS 'Per-schedule, per-UTC-day run counters maintained by trigger on schedule_runs';
+COMMENT ON COLUMN schedule_run_daily_stats.runtime_sketch IS 'Completed-run runtimes as {ceil(ln(seconds)/ln(1.02)): count}';
@@ -0,0 +1,46 @@
+-- Migration: Precomputed metric anomalies
+-- Purpose: Findings of the background anomaly engine, so dashboards and the
+--          insights panel read anomalies instead of scoring series per request
+-- Date: 2025-10-31
+--
+-- The engine periodically scores every workflow/instance weekly aggregate
+-- series with a rolling median/MAD baseline plus last season's deviation and
+-- upserts the points whose robust z-score passes the threshold. Findings of a
+-- scan that are not confirmed by the next one are deleted by it.
+
+CREATE TABLE IF NOT EXISTS report_anomalies (
+    workflow_id UUID NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    instance_id UUID NOT NULL REFERENCES amc_instances(id) ON DELETE CASCADE,
+    aggregation_type TEXT NOT NULL DEFAULT 'weekly',
+    metric TEXT NOT NULL,
+    period_start DATE NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    expected DOUBLE PRECISION NOT NULL,
+    score DOUBLE PRECISION NOT NULL,      -- robust z-score, signed
+    severity DOUBLE PRECISION NOT NULL,   -- |score|, for ordering
+    direction TEXT NOT NULL,
+    detected_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (workflow_id, instance_id, aggregation_type, metric, period_start),
+    CONSTRAINT check_report_anomaly_direction CHECK (direction IN ('high', 'low'))
+);
+
+-- Readers: one series over a date range, most severe first
+CREATE INDEX IF NOT EXISTS idx_report_anomalies_series
+ON report_anomalies(workflow_id, instance_id, period_start);
+
+-- Scans delete the findings they did not confirm
+CREATE INDEX IF NOT EXISTS idx_report_anomalies_detected_at
+ON report_anomalies(detected_at);
+
+ALTER TABLE report_anomalies ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view anomalies of their own workflows" ON report_anomalies
+FOR SELECT USING (
+    workflow_id IN (SELECT id FROM workflows WHERE user_id = auth.uid())
+);
+
+CREATE POLICY "Service role can manage report anomalies" ON report_anomalies
+FOR ALL USING (auth.jwt() ->> 'role' = 'service_role');
+
+COMMENT ON TABLE report_anomalies IS 'Anomalous aggregate points found by the background anomaly engine';
+COMMENT ON COLUMN report_anomalies.expected IS 'Rolling median of the preceding points plus the deviation one season earlier';
@@ -0,0 +1,55 @@
+-- Migration: Execution status notifications
+-- Purpose: NOTIFY execution_status on every execution status or progress
+--          change, so API processes push transitions to subscribed clients
+--          (GET /api/amc-executions/events) instead of clients polling AMC
+-- Date: 2025-11-02
+--
+-- The payload is the event the hub in services/execution_events.py forwards:
+-- the execution's status fields plus the user and instance that route it.
+-- NOTIFY payloads are limited to 8000 bytes, so error messages are truncated.
+-- Notifications are sent on commit and dropped when nobody is listening.
+
+CREATE OR REPLACE FUNCTION notify_execution_status()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID;
+    v_instance_uuid UUID;
+    v_instance_id TEXT;
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.progress IS NOT DISTINCT FROM OLD.progress THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT w.user_id, w.instance_id, i.instance_id
+    INTO v_user_id, v_instance_uuid, v_instance_id
+    FROM workflows w
+    LEFT JOIN amc_instances i ON i.id = w.instance_id
+    WHERE w.id = NEW.workflow_id;
+
+    PERFORM pg_notify('execution_status', json_build_object(
+        'execution_id', NEW.execution_id,
+        'workflow_id', NEW.workflow_id,
+        'user_id', v_user_id,
+        'instance_id', v_instance_id,
+        'instance_uuid', v_instance_uuid,
+        'status', NEW.status,
+        'progress', NEW.progress,
+        'row_count', NEW.row_count,
+        'error_message', LEFT(NEW.error_message, 1000),
+        'started_at', NEW.started_at,
+        'completed_at', NEW.completed_at,
+        'updated_at', NOW()
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_execution_status ON workflow_executions;
+CREATE TRIGGER trigger_notify_execution_status
+    AFTER INSERT OR UPDATE OF status, progress ON workflow_executions
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_execution_status();
+
+COMMENT ON FUNCTION notify_execution_status() IS 'Sends NOTIFY execution_status with the routed status event of a changed execution';
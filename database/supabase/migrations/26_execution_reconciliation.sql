@@ -0,0 +1,44 @@
+-- Migration: Incremental AMC execution reconciliation
+-- Purpose: Per-instance watermark and last findings of the background
+--          reconciler that compares AMC's execution list with workflow_executions
+-- Date: 2025-11-03
+--
+-- Each pass lists only the AMC executions created since the instance's
+-- watermark (minCreationTime, paged with nextToken) and matches them to local
+-- rows by amc_execution_id (idx_workflow_executions_amc_execution_id). The
+-- watermark then moves to the creation time of the oldest execution AMC still
+-- reports as pending or running, or past the newest one when all are
+-- finished, so a pass costs one short page when nothing changed. A pass that
+-- stops at its page limit stores nextToken in sweep_cursor and the next pass
+-- resumes from it.
+
+CREATE TABLE IF NOT EXISTS amc_reconciliation_state (
+    instance_id UUID PRIMARY KEY REFERENCES amc_instances(id) ON DELETE CASCADE,
+    watermark TIMESTAMPTZ NOT NULL,         -- AMC executions created before are settled
+    last_run_at TIMESTAMPTZ,
+    last_error TEXT,
+    scanned INTEGER NOT NULL DEFAULT 0,     -- AMC executions read by the last pass
+    drift JSONB NOT NULL DEFAULT '{}'::jsonb,  -- counts and samples found by the last pass
+    fixed_total BIGINT NOT NULL DEFAULT 0,
+    sweep_cursor JSONB,                     -- next_token and bounds seen of a sweep still in progress
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE amc_reconciliation_state ADD COLUMN IF NOT EXISTS sweep_cursor JSONB;
+
+ALTER TABLE amc_reconciliation_state ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view reconciliation of their own instances" ON amc_reconciliation_state
+FOR SELECT USING (
+    instance_id IN (
+        SELECT i.id FROM amc_instances i
+        JOIN amc_accounts a ON a.id = i.account_id
+        WHERE a.user_id = auth.uid()
+    )
+);
+
+CREATE POLICY "Service role can manage reconciliation state" ON amc_reconciliation_state
+FOR ALL USING (auth.jwt() ->> 'role' = 'service_role');
+
+COMMENT ON TABLE amc_reconciliation_state IS 'Watermark and last findings of the incremental AMC execution reconciler';
+COMMENT ON COLUMN amc_reconciliation_state.watermark IS 'minCreationTime of the next pass: oldest unfinished AMC execution, or newest seen';
@@ -21,6 +21,7 @@ import { amcExecutionService } from '../../services/amcExecutionService';
 import type { AMCExecution } from '../../types/amcExecution';
 import AMCExecutionDetail from './AMCExecutionDetail';
 import api from '../../services/api';
+import { useExecutionEvents } from '../../hooks/useExecutionEvents';
 
 interface Props {
   instanceId?: string;  // Optional - if not provided, shows all executions
@@ -89,12 +90,21 @@ export default function AMCExecutionList({ instanceId, workflowId, showInstanceB
     );
   }, [data?.executions]);
 
+  // Finished executions are pushed; refetch the list when one arrives
+  const { connected } = useExecutionEvents({
+    instanceId,
+    enabled: hasPendingExecutions,
+    onEvent: (event) => {
+      if (['completed', 'failed', 'cancelled'].includes(event.status)) refetch();
+    },
+  });
+
   // Use a separate query for polling to avoid re-running the main query logic
   useQuery({
     queryKey: ['amc-executions-poll', instanceId, workflowId],
     queryFn: () => refetch(),
-    refetchInterval: hasPendingExecutions ? 15000 : false, // Poll every 15s only when needed
-    enabled: hasPendingExecutions,
+    refetchInterval: hasPendingExecutions && !connected ? 15000 : false, // Poll every 15s only while the stream is down
+    enabled: hasPendingExecutions && !connected,
   });
 
   const getStatusIcon = (status: AMCExecution['status']) => {
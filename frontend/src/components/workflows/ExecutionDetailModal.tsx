@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useState, type UIEvent } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { X, CheckCircle, XCircle, Loader, Clock, AlertCircle, Download, Eye, BarChart, Table, TrendingUp, Database, RefreshCw, Play } from 'lucide-react';
 import api from '../../services/api';
@@ -6,6 +6,8 @@ import toast from 'react-hot-toast';
 import EnhancedResultsTable from '../executions/EnhancedResultsTable';
 import DataVisualization from '../executions/DataVisualization';
 import ExecutionErrorDetails from '../executions/ExecutionErrorDetails';
+import { useAllExecutionResults, useExecutionResults, ResultsPage } from '../../hooks/useExecutionData';
+import { useDebouncedValue } from '../../hooks/useDebouncedValue';
 // AI analysis will be integrated later
 // import { DataAnalysisService } from '../../services/dataAnalysisService';
 
@@ -44,22 +46,15 @@ interface ExecutionDetails {
   size_bytes?: number;
 }
 
-interface Results {
-  columns: Array<{ name: string; type: string }>;
-  rows: any[][];
-  total_rows: number;
-  sample_size: number;
-  execution_details?: {
-    query_runtime_seconds?: number;
-    data_scanned_gb?: number;
-    cost_estimate_usd?: number;
-  };
-}
+type Results = ResultsPage;
 
 export default function ExecutionDetailModal({ isOpen, onClose, executionId }: ExecutionDetailModalProps) {
   const [showResults, setShowResults] = useState(false);
-  const [viewMode, setViewMode] = useState<'table' | 'enhanced' | 'charts' | 'ai'>('enhanced');
+  const [viewMode, setViewMode] = useState<'table' | 'enhanced' | 'charts' | 'ai'>('table');
   const [isRerunning, setIsRerunning] = useState(false);
+  const [sort, setSort] = useState('');
+  const [filterColumn, setFilterColumn] = useState('');
+  const [filterValue, setFilterValue] = useState('');
   const queryClient = useQueryClient();
   // const analysisService = useMemo(() => new DataAnalysisService(), []);
 
@@ -86,16 +81,42 @@ export default function ExecutionDetailModal({ isOpen, onClose, executionId }: E
     },
   });
 
-  // Get results when completed
-  const { data: results, isLoading: loadingResults } = useQuery<Results>({
-    queryKey: ['execution-results', executionId],
-    queryFn: async () => {
-      const response = await api.get(`/workflows/executions/${executionId}/results`);
-      return response.data;
-    },
+  // Get results when completed, a page at a time; sort and filter run on the server
+  const debouncedFilterValue = useDebouncedValue(filterValue);
+  const filters = filterColumn && debouncedFilterValue ? [`${filterColumn}:contains:${debouncedFilterValue}`] : [];
+  const {
+    data: results,
+    isLoading: loadingResults,
+    hasMore,
+    loadMore,
+    isLoadingMore,
+  } = useExecutionResults({
+    executionId,
     enabled: showResults && status?.status === 'completed',
+    sort,
+    filters,
   });
 
+  // Charts and the enhanced table summarise the whole result, so they load every row
+  const summaryView = viewMode === 'enhanced' || viewMode === 'charts';
+  const { data: allResults, isLoading: loadingAllResults } = useAllExecutionResults({
+    executionId,
+    enabled: showResults && status?.status === 'completed' && summaryView,
+    sort,
+    filters,
+  });
+
+  const toggleSort = (column: string) => {
+    setSort(sort === column ? `-${column}` : sort === `-${column}` ? '' : column);
+  };
+
+  const handleResultsScroll = (event: UIEvent<HTMLDivElement>) => {
+    const el = event.currentTarget;
+    if (hasMore && !isLoadingMore && el.scrollTop + el.clientHeight >= el.scrollHeight - 200) {
+      loadMore();
+    }
+  };
+
   // Rerun mutation
   const rerunMutation = useMutation({
     mutationFn: async () => {
@@ -148,9 +169,19 @@ export default function ExecutionDetailModal({ isOpen, onClose, executionId }: E
   const handleDownloadResults = async () => {
     if (!results) return;
 
+    // The download holds every row, not just the pages loaded for viewing
+    let all: Results = allResults ?? results;
+    if (all.has_more) {
+      const response = await api.get(`/workflows/executions/${executionId}/results`, {
+        params: { sort: sort || undefined, filter: filters.length ? filters : undefined },
+        paramsSerializer: { indexes: null },
+      });
+      all = response.data;
+    }
+
     // Convert results to CSV
-    const headers = results.columns.map(col => col.name).join(',');
-    const rows = results.rows.map(row => row.map(cell => 
+    const headers = all.columns.map(col => col.name).join(',');
+    const rows = all.rows.map(row => row.map(cell => 
       typeof cell === 'string' && cell.includes(',') ? `"${cell}"` : cell
     ).join(',')).join('\n');
     
@@ -432,8 +463,35 @@ export default function ExecutionDetailModal({ isOpen, onClose, executionId }: E
                         </div>
                       )}
 
+                      {/* Server-side filter and paging status */}
+                      <div className="flex items-center justify-between mb-3 text-sm">
+                        <div className="flex items-center space-x-2">
+                          <select
+                            value={filterColumn}
+                            onChange={(e) => setFilterColumn(e.target.value)}
+                            className="border border-gray-300 rounded-md px-2 py-1 text-sm"
+                          >
+                            <option value="">Filter column...</option>
+                            {results.columns.map((col) => (
+                              <option key={col.name} value={col.name}>{col.name}</option>
+                            ))}
+                          </select>
+                          <input
+                            type="text"
+                            value={filterValue}
+                            onChange={(e) => setFilterValue(e.target.value)}
+                            placeholder="contains..."
+                            disabled={!filterColumn}
+                            className="border border-gray-300 rounded-md px-2 py-1 text-sm disabled:bg-gray-100"
+                          />
+                        </div>
+                        <span className="text-gray-500">
+                          Showing {(summaryView && allResults ? allResults.rows.length : results.rows.length).toLocaleString()} of {results.total_rows.toLocaleString()} rows
+                        </span>
+                      </div>
+
                       {/* Check if query returned empty results */}
-                      {results.total_rows === 0 ? (
+                      {results.total_rows === 0 && !filters.length ? (
                         <div className="bg-yellow-50 border border-yellow-200 rounded-lg p-6 text-center">
                           <AlertCircle className="h-12 w-12 mx-auto mb-3 text-yellow-600" />
                           <h3 className="text-lg font-medium text-yellow-900 mb-2">Query Returned No Results</h3>
@@ -453,8 +511,23 @@ export default function ExecutionDetailModal({ isOpen, onClose, executionId }: E
                       ) : (
                         <>
                           {(() => {
+                            if (summaryView && !allResults) {
+                              return loadingAllResults ? (
+                                <div className="text-center py-8">
+                                  <Loader className="h-8 w-8 animate-spin mx-auto text-gray-400" />
+                                  <p className="mt-2 text-sm text-gray-500">
+                                    Loading all {results.total_rows.toLocaleString()} rows...
+                                  </p>
+                                </div>
+                              ) : (
+                                <div className="text-center py-8 text-sm text-gray-500">
+                                  Could not load the full result; use the raw table view
+                                </div>
+                              );
+                            }
+
                             // Transform data for visualization
-                            const transformedData = results.rows.map(row => {
+                            const transformedData = (allResults ?? results).rows.map(row => {
                               const obj: any = {};
                               results.columns.forEach((col, idx) => {
                                 obj[col.name] = row[idx];
@@ -507,16 +580,18 @@ export default function ExecutionDetailModal({ isOpen, onClose, executionId }: E
                           case 'table':
                           default:
                             return (
-                              <div className="overflow-x-auto">
+                              <div className="overflow-x-auto max-h-[32rem] overflow-y-auto" onScroll={handleResultsScroll}>
                                 <table className="min-w-full divide-y divide-gray-200">
                                   <thead className="bg-gray-50">
                                     <tr>
                                       {results.columns.map((col) => (
                                         <th
                                           key={col.name}
-                                          className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider"
+                                          onClick={() => toggleSort(col.name)}
+                                          className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider cursor-pointer select-none"
                                         >
                                           {col.name}
+                                          {sort === col.name ? ' ▲' : sort === `-${col.name}` ? ' ▼' : ''}
                                         </th>
                                       ))}
                                     </tr>
@@ -537,6 +612,18 @@ export default function ExecutionDetailModal({ isOpen, onClose, executionId }: E
                             );
                         }
                       })()}
+                          {hasMore && !summaryView && (
+                            <div className="text-center mt-3">
+                              <button
+                                onClick={() => loadMore()}
+                                disabled={isLoadingMore}
+                                className="inline-flex items-center px-3 py-1 border border-gray-300 text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:bg-gray-100 disabled:text-gray-400"
+                              >
+                                {isLoadingMore && <Loader className="h-4 w-4 mr-2 animate-spin" />}
+                                Load more rows
+                              </button>
+                            </div>
+                          )}
                         </>
                       )}
                     </div>
@@ -0,0 +1,14 @@
+import { useEffect, useState } from 'react';
+
+// `value` once it has stopped changing for `delayMs`, e.g. a filter input
+// that should only query the server after the user pauses typing
+export function useDebouncedValue<T>(value: T, delayMs = 400): T {
+  const [debounced, setDebounced] = useState(value);
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebounced(value), delayMs);
+    return () => clearTimeout(timer);
+  }, [value, delayMs]);
+
+  return debounced;
+}
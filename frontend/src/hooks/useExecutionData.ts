@@ -1,6 +1,113 @@
-import { useQuery, useQueries } from '@tanstack/react-query';
+import { useInfiniteQuery, useQuery, useQueries } from '@tanstack/react-query';
 import { useMemo } from 'react';
 import api from '../services/api';
+import { useExecutionEvents } from './useExecutionEvents';
+
+export const RESULTS_PAGE_SIZE = 500;
+
+export interface ResultsPage {
+  columns: Array<{ name: string; type: string }>;
+  rows: any[][];
+  total_rows: number;
+  has_more: boolean;
+  next_cursor: string | null;
+  sample_size?: number;
+  execution_details?: {
+    query_runtime_seconds?: number;
+    data_scanned_gb?: number;
+    cost_estimate_usd?: number;
+  };
+}
+
+interface ExecutionResultsOptions {
+  executionId: string;
+  enabled?: boolean;
+  pageSize?: number;
+  sort?: string;           // comma-separated columns, '-' prefix for descending
+  filters?: string[];      // column:operator:value
+}
+
+// Execution results fetched page by page from the server; sorting and
+// filtering are applied by the API across all rows, not just loaded ones
+export function useExecutionResults({
+  executionId,
+  enabled = true,
+  pageSize = RESULTS_PAGE_SIZE,
+  sort,
+  filters = []
+}: ExecutionResultsOptions) {
+  const query = useInfiniteQuery({
+    queryKey: ['execution-results', executionId, pageSize, sort ?? '', filters],
+    queryFn: async ({ pageParam }) => {
+      const response = await api.get(`/workflows/executions/${executionId}/results`, {
+        params: {
+          limit: pageSize,
+          cursor: pageParam || undefined,
+          sort: sort || undefined,
+          filter: filters.length ? filters : undefined,
+        },
+        paramsSerializer: { indexes: null },
+      });
+      return response.data as ResultsPage;
+    },
+    initialPageParam: '',
+    getNextPageParam: (lastPage: ResultsPage) => lastPage.next_cursor ?? undefined,
+    enabled: enabled && !!executionId,
+    staleTime: 10 * 60 * 1000, // Results don't change, cache for 10 minutes
+    gcTime: 30 * 60 * 1000, // Keep in cache for 30 minutes
+  });
+
+  // Loaded pages merged into one results object
+  const data = useMemo<ResultsPage | undefined>(() => {
+    const pages = query.data?.pages;
+    if (!pages?.length) return undefined;
+    const last = pages[pages.length - 1];
+    return {
+      ...pages[0],
+      rows: pages.flatMap(page => page.rows),
+      total_rows: last.total_rows,
+      has_more: last.has_more,
+      next_cursor: last.next_cursor,
+    };
+  }, [query.data]);
+
+  return {
+    data,
+    isLoading: query.isLoading,
+    isError: query.isError,
+    error: query.error,
+    hasMore: !!query.hasNextPage,
+    loadMore: query.fetchNextPage,
+    isLoadingMore: query.isFetchingNextPage,
+    refetch: query.refetch,
+  };
+}
+
+// Every matching row in one request, for views that summarise the whole
+// result (charts, the enhanced table) instead of scrolling through pages
+export function useAllExecutionResults({
+  executionId,
+  enabled = true,
+  sort,
+  filters = []
+}: Omit<ExecutionResultsOptions, 'pageSize'>) {
+  return useQuery({
+    queryKey: ['execution-results', executionId, 'all', sort ?? '', filters],
+    queryFn: async () => {
+      const response = await api.get(`/workflows/executions/${executionId}/results`, {
+        params: {
+          sort: sort || undefined,
+          filter: filters.length ? filters : undefined,
+        },
+        paramsSerializer: { indexes: null },
+      });
+      return response.data as ResultsPage;
+    },
+    enabled: enabled && !!executionId,
+    staleTime: 10 * 60 * 1000,
+    gcTime: 30 * 60 * 1000,
+  });
+}
 
 interface ExecutionDataOptions {
   executionId: string;
@@ -29,6 +136,12 @@ export function useExecutionData({
     gcTime: 10 * 60 * 1000, // Keep in cache for 10 minutes
   });
 
+  // Status transitions are pushed; poll only while the stream is down
+  const { connected } = useExecutionEvents({
+    executionId,
+    enabled: includeStatus && !!executionId,
+  });
+
   // Fetch execution status with polling
   const statusQuery = useQuery({
     queryKey: ['execution-status', executionId],
@@ -39,21 +152,15 @@ export function useExecutionData({
     enabled: includeStatus && !!executionId,
     refetchInterval: (query) => {
       const status = query.state.data?.status;
-      return status === 'running' || status === 'pending' ? pollInterval : false;
+      return !connected && (status === 'running' || status === 'pending') ? pollInterval : false;
     },
     staleTime: 0, // Always consider stale for polling
   });
 
-  // Fetch results only when completed
-  const resultsQuery = useQuery({
-    queryKey: ['execution-results', executionId],
-    queryFn: async () => {
-      const response = await api.get(`/workflows/executions/${executionId}/results`);
-      return response.data;
-    },
+  // Fetch results only when completed, one page at a time
+  const resultsQuery = useExecutionResults({
+    executionId,
     enabled: includeResults && statusQuery.data?.status === 'completed',
-    staleTime: 10 * 60 * 1000, // Results don't change, cache for 10 minutes
-    gcTime: 30 * 60 * 1000, // Keep in cache for 30 minutes
   });
 
   // Memoize processed data
@@ -92,6 +199,9 @@ export function useExecutionData({
     status: statusQuery.data,
     results: resultsQuery.data,
     processedData,
+    hasMoreResults: resultsQuery.hasMore,
+    loadMoreResults: resultsQuery.loadMore,
+    isLoadingMoreResults: resultsQuery.isLoadingMore,
     isLoading: detailQuery.isLoading || statusQuery.isLoading || resultsQuery.isLoading,
     isError: detailQuery.isError || statusQuery.isError || resultsQuery.isError,
     error: detailQuery.error || statusQuery.error || resultsQuery.error,
@@ -0,0 +1,126 @@
+import { useEffect, useRef, useState } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+
+export interface ExecutionStatusEvent {
+  execution_id: string;
+  workflow_id?: string;
+  instance_id?: string;
+  instance_uuid?: string;
+  status: string;
+  progress?: number;
+  row_count?: number | null;
+  error_message?: string | null;
+  started_at?: string | null;
+  completed_at?: string | null;
+  updated_at?: string;
+}
+
+interface ExecutionEventsOptions {
+  instanceId?: string;
+  executionId?: string;
+  enabled?: boolean;
+  onEvent?: (event: ExecutionStatusEvent) => void;
+}
+
+const TERMINAL_STATUSES = ['completed', 'failed', 'cancelled'];
+const MAX_RETRY_DELAY = 30000;
+
+/**
+ * Subscribe to pushed execution status transitions (server-sent events)
+ *
+ * Each event is merged into the ['execution-status', id] query; finished
+ * executions also invalidate their detail and the execution lists. Uses
+ * fetch rather than EventSource so the Authorization header can be sent,
+ * and reconnects with backoff.
+ *
+ * @returns connected - while true, status polling can be switched off
+ */
+export function useExecutionEvents({ instanceId, executionId, enabled = true, onEvent }: ExecutionEventsOptions = {}) {
+  const queryClient = useQueryClient();
+  const [connected, setConnected] = useState(false);
+  // Latest callback, without reconnecting when it changes
+  const onEventRef = useRef(onEvent);
+  onEventRef.current = onEvent;
+
+  useEffect(() => {
+    if (!enabled) return;
+
+    const controller = new AbortController();
+    let retryDelay = 1000;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+
+    const handleEvent = (event: ExecutionStatusEvent) => {
+      queryClient.setQueryData(['execution-status', event.execution_id], (old: any) => ({ ...old, ...event }));
+      if (TERMINAL_STATUSES.includes(event.status)) {
+        queryClient.invalidateQueries({ queryKey: ['execution-detail', event.execution_id] });
+        queryClient.invalidateQueries({ queryKey: ['executions'] });
+        queryClient.invalidateQueries({ queryKey: ['amc-executions'] });
+      }
+      onEventRef.current?.(event);
+    };
+
+    const connect = async () => {
+      const params = new URLSearchParams();
+      if (instanceId) params.set('instance_id', instanceId);
+      if (executionId) params.set('execution_id', executionId);
+
+      try {
+        const token = localStorage.getItem('access_token');
+        const response = await fetch(`/api/amc-executions/events?${params}`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+          signal: controller.signal,
+        });
+        if (!response.ok || !response.body) {
+          throw new Error(`Execution events unavailable (${response.status})`);
+        }
+
+        setConnected(true);
+        retryDelay = 1000;
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        for (;;) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          // Events are separated by a blank line; keep-alives are ': ' comments
+          let boundary = buffer.indexOf('\n\n');
+          while (boundary !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const data = block
+              .split('\n')
+              .filter((line) => line.startsWith('data: '))
+              .map((line) => line.slice(6))
+              .join('\n');
+            if (data) {
+              handleEvent(JSON.parse(data));
+            }
+            boundary = buffer.indexOf('\n\n');
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.warn('[useExecutionEvents] Stream interrupted, falling back to polling:', error);
+      }
+
+      setConnected(false);
+      if (!controller.signal.aborted) {
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+      }
+    };
+
+    connect();
+
+    return () => {
+      controller.abort();
+      if (retryTimer) clearTimeout(retryTimer);
+      setConnected(false);
+    };
+  }, [enabled, instanceId, executionId, queryClient]);
+
+  return { connected };
+}
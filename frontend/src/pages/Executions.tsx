@@ -1,5 +1,6 @@
 import { useState, useMemo } from 'react';
 import { useQuery } from '@tanstack/react-query';
+import { useExecutionEvents } from '../hooks/useExecutionEvents';
 import {
   CheckCircle,
   XCircle,
@@ -61,12 +62,20 @@ export default function Executions() {
     );
   }, [data?.executions]);
 
-  // Use a separate query for polling
+  // Finished executions are pushed; refetch the list when one arrives
+  const { connected } = useExecutionEvents({
+    enabled: hasPendingExecutions,
+    onEvent: (event) => {
+      if (['completed', 'failed', 'cancelled'].includes(event.status)) refetch();
+    },
+  });
+
+  // Use a separate query for polling while the event stream is down
   useQuery({
     queryKey: ['amc-executions-poll'],
     queryFn: () => refetch(),
-    refetchInterval: hasPendingExecutions ? 15000 : false,
-    enabled: hasPendingExecutions,
+    refetchInterval: hasPendingExecutions && !connected ? 15000 : false,
+    enabled: hasPendingExecutions && !connected,
   });
 
   // Extract unique instances for tabs
@@ -142,9 +142,20 @@ class WorkflowService {
 
   /**
    * Get execution results for a single execution
+   * Omit params for all rows, or pass limit/cursor etc. to fetch one page
    */
-  async getExecutionResults(executionId: string) {
-    const response = await api.get(`/workflows/executions/${executionId}/results`);
+  async getExecutionResults(executionId: string, params?: {
+    offset?: number;
+    limit?: number;
+    cursor?: string;
+    columns?: string;
+    sort?: string;
+    filter?: string[];
+  }) {
+    const response = await api.get(`/workflows/executions/${executionId}/results`, {
+      params,
+      paramsSerializer: { indexes: null },
+    });
     return response.data;
   }
 
@@ -111,6 +111,8 @@ export interface ScheduleMetrics {
   running_runs: number;
   success_rate: number;
   avg_runtime_seconds?: number;
+  p50_runtime_seconds?: number;
+  p95_runtime_seconds?: number;
   total_rows_processed: number;
   total_cost: number;
   next_run?: string;
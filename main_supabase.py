@@ -1,10 +1,15 @@
 """Minimal FastAPI application with Supabase integration"""
 
+from amc_manager.core.startup_profile import ImportProfiler
+
+# Time the startup imports (logged once the routers are included)
+import_profiler = ImportProfiler().start()
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from contextlib import asynccontextmanager
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -12,6 +17,8 @@ from slowapi.errors import RateLimitExceeded
 import uvicorn
 import os
 import asyncio
+import secrets
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -20,14 +27,15 @@ load_dotenv()
 
 from amc_manager.config import settings
 from amc_manager.core.logger_simple import get_logger
+from amc_manager.core.loop_monitor import loop_lag_monitor
+from amc_manager.core.metrics import HTTP_REQUEST_SECONDS, render_metrics, start_metrics_server
 from amc_manager.core.supabase_client import SupabaseManager
-from amc_manager.services.token_refresh_service import token_refresh_service
-from amc_manager.services.execution_status_poller import execution_status_poller
-from amc_manager.services.schedule_executor_service import get_schedule_executor
-from amc_manager.services.collection_executor_service import get_collection_executor
-from amc_manager.services.report_scheduler_executor_service import report_scheduler_executor
-from amc_manager.services.report_backfill_executor_service import report_backfill_executor
-from amc_manager.services.universal_snowflake_sync_service import universal_snowflake_sync_service
+from amc_manager.services.background_engines import (
+    runs_background_engines,
+    start_background_engines,
+    stop_background_engines
+)
+from amc_manager.services.execution_events import execution_event_hub
 
 logger = get_logger(__name__)
 
@@ -51,69 +59,34 @@ async def initialize_services():
         logger.error(f"Failed to connect to Supabase: {e}")
         return
 
-    # Start token refresh service
-    await token_refresh_service.start()
-    logger.info("✓ Token refresh service started")
-
-    # Start execution status poller
-    await execution_status_poller.start()
-    logger.info("✓ Execution status poller started")
-
-    # Start schedule executor service
-    schedule_executor = get_schedule_executor()
-    asyncio.create_task(schedule_executor.start())
-    logger.info("✓ Schedule executor service started")
-
-    # Start collection executor service
-    collection_executor = get_collection_executor()
-    asyncio.create_task(collection_executor.start())
-    logger.info("✓ Collection executor service started")
-
-    # Start report scheduler executor service
-    asyncio.create_task(report_scheduler_executor.run())
-    logger.info("✓ Report scheduler executor service started")
-
-    # Start report backfill executor service
-    asyncio.create_task(report_backfill_executor.run())
-    logger.info("✓ Report backfill executor service started")
-
-    # Start universal Snowflake sync service
-    asyncio.create_task(universal_snowflake_sync_service.start())
-    logger.info("✓ Universal Snowflake sync service started")
-
-    # Load only users with valid tokens for token refresh tracking
-    try:
-        users_response = client.table('users').select('id, auth_tokens').execute()
-        if users_response.data:
-            users_with_tokens = 0
-            for user in users_response.data:
-                # Only track users who have auth tokens
-                if user.get('auth_tokens'):
-                    token_refresh_service.add_user(user['id'])
-                    users_with_tokens += 1
-            logger.info(f"✓ Added {users_with_tokens} users with tokens to refresh tracking (out of {len(users_response.data)} total)")
-    except Exception as e:
-        logger.warning(f"Could not load users for token refresh: {e}")
+    # Singleton loops run under a leader lease and scalable loops are
+    # partitioned, so several API workers no longer duplicate each other
+    await start_background_engines()
+    logger.info("✓ Background engines started")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup - minimal initialization
-    logger.info("Starting Recom AMP application with Supabase...")
+    logger.info(f"Starting Recom AMP application with Supabase (role: {settings.process_role})...")
+    start_metrics_server(settings.metrics_port)
+    await loop_lag_monitor.start()
 
-    # Initialize services in background to avoid blocking startup
-    asyncio.create_task(initialize_services())
-    logger.info("Background service initialization started")
+    if runs_background_engines():
+        # Initialize services in background to avoid blocking startup
+        asyncio.create_task(initialize_services())
+        logger.info("Background service initialization started")
+    else:
+        logger.info("API-only process; background engines run in worker_supabase.py")
 
     yield
     
     # Shutdown
     logger.info("Shutting down Recom AMP application...")
-    await token_refresh_service.stop()
-    await execution_status_poller.stop()
-    await schedule_executor.stop()
-    await collection_executor.stop()
-    await universal_snowflake_sync_service.stop()
+    if runs_background_engines():
+        await stop_background_engines()
+    await execution_event_hub.stop()
+    await loop_lag_monitor.stop()
 
 
 # Create FastAPI app
@@ -168,6 +141,37 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
+# Request latency by route template (not raw path, to keep label cardinality low)
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            str(status)
+        ).observe(time.perf_counter() - started)
+
+
+# Prometheus scrape endpoint: on METRICS_PORT when set, otherwise here for
+# scrapers sending METRICS_TOKEN as a bearer token (hidden without one)
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if settings.metrics_port or not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.metrics_token}"
+    if not secrets.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
@@ -266,6 +270,8 @@ for route in app.routes:
             route.endpoint = limiter.limit("10 per minute")(route.endpoint)
 
 logger.info("All API routers loaded successfully with rate limiting")
+import_profiler.stop()
+import_profiler.log_summary(logger, top=15 if settings.profile_imports else 0)
 
 # Serve static files if built frontend exists
 frontend_dist = Path("frontend/dist")
@@ -424,6 +424,14 @@ class AMCSchemaImporter:
         except Exception as e:
             logger.error(f"Error creating relationships: {str(e)}")
     
+    def bump_catalog_version(self):
+        """Bump the catalog version stamp read by DataSourceService"""
+        try:
+            result = self.supabase.rpc('bump_amc_catalog_version', {}).execute()
+            logger.info(f"Catalog version bumped to {result.data}")
+        except Exception as e:
+            logger.warning(f"Could not bump catalog version (is migration 17 applied?): {str(e)}")
+    
     def run(self):
         """Run the full import process"""
         logger.info("Starting AMC schema import...")
@@ -441,6 +449,9 @@ class AMCSchemaImporter:
         # Create relationships after all imports
         self.create_relationships()
         
+        # Bump the catalog version so API processes reload their cached snapshot
+        self.bump_catalog_version()
+        
         logger.info(f"Import complete: {success_count}/{len(schema_files)} schemas imported successfully")
         
         # Print summary
@@ -0,0 +1,174 @@
+"""
+Unit Tests for Adaptive AMC Concurrency
+
+Tests the AIMD limiter without AMC:
+- Throttle classification of AMC errors
+- Additive increase / multiplicative decrease
+- Slot accounting under concurrent submissions
+- Admission against running executions, and submission spacing
+- Work paused while waiting for admission is skipped, not submitted
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from amc_manager.services.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    SubmissionSkipped,
+    classify_throttle
+)
+
+
+class TestClassifyThrottle:
+    """AMC error classification"""
+
+    def test_throttle_signals(self):
+        assert classify_throttle('Too Many Requests (HTTP 429)') == 'rate_limited'
+        assert classify_throttle(Exception('Too many concurrent executions for instance')) == 'concurrency_limit'
+        assert classify_throttle('SQL Query Compilation Failed') is None
+        assert classify_throttle(None) is None
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """AIMD behaviour"""
+
+    def test_additive_increase_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=2, max_limit=3)
+
+        limiter.record_success()
+        limiter.record_success()
+        assert limiter.limit == 3
+
+        for _ in range(10):
+            limiter.record_success()
+        assert limiter.limit == 3
+
+    def test_multiplicative_decrease_once_per_burst(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=8, decrease_cooldown_seconds=60)
+
+        assert limiter.record_failure('HTTP 429') == 'rate_limited'
+        assert limiter.limit == 4
+        # Further throttles inside the cooldown are counted but do not cut again
+        limiter.record_failure('too many concurrent executions')
+        assert limiter.limit == 4
+        assert limiter.get_state()['throttles'] == {'rate_limited': 1, 'concurrency_limit': 1}
+
+        # Ordinary failures leave the limit alone
+        assert limiter.record_failure('Workflow not found') is None
+        assert limiter.limit == 4
+
+    def test_decrease_respects_floor(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=1, min_limit=1, decrease_cooldown_seconds=0)
+
+        limiter.record_failure('429')
+        assert limiter.limit == 1
+
+    def test_queue_time_spike_counts_as_congestion(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=4, latency_tolerance=3.0)
+
+        for _ in range(5):
+            limiter.record_success(latency_seconds=1.0)
+        before = limiter.limit
+        limiter.record_success(latency_seconds=10.0)
+
+        assert limiter.limit < before
+        assert limiter.get_state()['throttles'] == {'queue_time': 1}
+
+    @pytest.mark.asyncio
+    async def test_in_flight_never_exceeds_limit(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=2, max_limit=2)
+        running = {'now': 0, 'peak': 0}
+
+        async def submit():
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+            await asyncio.sleep(0.01)
+            running['now'] -= 1
+            return {'status': 'pending'}
+
+        results = await asyncio.gather(*(limiter.submit(submit) for _ in range(6)))
+
+        assert running['peak'] == 2
+        assert len(results) == 6
+        assert limiter.in_flight == 0
+        assert limiter.successes == 6
+
+    @pytest.mark.asyncio
+    async def test_failed_result_is_fed_back(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=4)
+
+        async def throttled():
+            return {'status': 'failed', 'error_message': 'Rate limit exceeded'}
+
+        async def raising():
+            raise RuntimeError('HTTP 429')
+
+        await limiter.submit(throttled)
+        assert limiter.limit == 2
+
+        with pytest.raises(RuntimeError):
+            await limiter.submit(raising)
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_running_executions_hold_the_limit(self):
+        # Executions stay running on AMC after their submission returns
+        running = []
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=2, max_limit=2,
+                                             active_executions=lambda key: len(running), recheck_seconds=0.01)
+
+        async def submit(n):
+            async def start():
+                running.append(n)
+                return {'status': 'pending'}
+            return await limiter.submit(start)
+
+        first = asyncio.gather(*(submit(n) for n in range(3)))
+        await asyncio.sleep(0.05)
+        # Two started; the third waits although no submission is in flight
+        assert running == [0, 1] and limiter.in_flight == 0
+
+        running.remove(0)
+        await asyncio.wait_for(first, 1)
+        assert running == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_work_paused_while_waiting_is_skipped(self):
+        running = []
+        paused = {'value': False}
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=1, max_limit=1,
+                                             active_executions=lambda key: len(running), recheck_seconds=0.01)
+
+        async def submit(n):
+            async def start():
+                if paused['value']:
+                    raise SubmissionSkipped()
+                running.append(n)
+                return {'status': 'pending'}
+            return await limiter.submit(start)
+
+        waves = asyncio.gather(*(submit(n) for n in range(3)), return_exceptions=True)
+        await asyncio.sleep(0.05)
+        # Queued behind the first execution when the work is paused
+        paused['value'] = True
+        running.clear()
+        results = await asyncio.wait_for(waves, 1)
+
+        assert results[0] == {'status': 'pending'}
+        assert all(isinstance(result, SubmissionSkipped) for result in results[1:])
+        assert limiter.successes == 1 and limiter.throttles == {} and limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_submissions_are_spaced(self):
+        limiter = AdaptiveConcurrencyLimiter('i1', initial_limit=5, spacing_seconds=0.05)
+        started = []
+
+        async def submit():
+            started.append(time.monotonic())
+            return {'status': 'pending'}
+
+        await asyncio.gather(*(limiter.submit(submit) for _ in range(3)))
+
+        assert all(b - a >= 0.045 for a, b in zip(started, started[1:]))
@@ -0,0 +1,120 @@
+"""
+Unit Tests for the anomaly engine
+
+- Robust scores flag spikes and drops without being thrown off by them
+- Seasonal baselines do not flag peaks that recur every season
+- A scan scores every series in one read and replaces the stored findings
+"""
+
+import asyncio
+import math
+from datetime import date, timedelta
+
+import numpy as np
+
+from amc_manager.services.ai_insights_service import AIInsightsService
+from amc_manager.services.anomaly_engine import AnomalyEngine, find_anomalies, score_matrix
+
+START = date(2024, 1, 1)  # a Monday
+
+
+def _rows(workflow_id, values, metric='clicks', start=START):
+    return [
+        {'workflow_id': workflow_id, 'instance_id': 'inst', 'data_date': (start + timedelta(weeks=n)).isoformat(),
+         'metrics': {} if value is None else {metric: value}}
+        for n, value in enumerate(values)
+    ]
+
+
+class TestScoreMatrix:
+
+    def test_spike_and_drop_are_scored_per_series(self):
+        noise = [100, 104, 97, 101, 99, 103, 98, 102, 100, 101, 99, 103]
+        values = np.array([
+            noise[:8] + [400] + noise[9:],
+            noise[:10] + [20] + noise[11:],
+            [5.0] * 12,
+        ])
+
+        expected, score = score_matrix(values, season=0)
+
+        assert score[0, 8] > 10 and score[1, 10] < -10
+        # The spike does not make the points after it anomalous
+        assert np.nanmax(np.abs(score[0, 9:])) < 3.5
+        assert np.nanmax(np.abs(score[2])) == 0
+        assert expected[0, 8] == 100.5
+        # Too little history to score the first points
+        assert np.isnan(score[:, :4]).all()
+
+    def test_seasonal_peak_is_expected(self):
+        weeks = 52 * 2 + 10
+        season = [100.0 + (n % 3) for n in range(weeks)]
+        season[20] = season[72] = 300.0  # the same week each year
+
+        _, seasonal = score_matrix(np.array([season]))
+        _, plain = score_matrix(np.array([season]), season=0)
+
+        assert plain[0, 72] > 10
+        assert abs(seasonal[0, 72]) < 3.5
+
+    def test_gaps_are_skipped(self):
+        values = np.array([[10, math.nan, 11, 9, 10, math.nan, 10, 11, 50]], dtype=float)
+
+        _, score = score_matrix(values, season=0)
+
+        assert np.isnan(score[0, 5]) and score[0, 8] > 3.5
+
+
+class TestFindAnomalies:
+
+    def test_many_series_in_one_pass(self):
+        steady = [100, 102, 98, 101, 99, 100, 103, 97]
+        rows = (_rows('wf1', steady + [500]) + _rows('wf2', steady + [101])
+                + _rows('wf3', steady + [None, 10], metric='spend'))
+
+        findings = find_anomalies(rows, START, threshold=3.5)
+
+        assert [(f['workflow_id'], f['metric'], f['period_start'], f['direction']) for f in findings] == [
+            ('wf1', 'clicks', (START + timedelta(weeks=8)).isoformat(), 'high'),
+            ('wf3', 'spend', (START + timedelta(weeks=9)).isoformat(), 'low'),
+        ]
+        assert findings[0]['severity'] >= findings[1]['severity'] > 3.5
+        assert findings[0]['aggregation_type'] == 'weekly'
+
+
+class _FakeReportingDb:
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = []
+        self.stored = None
+
+    def get_all_aggregate_series(self, aggregation_type, start_date, metrics):
+        self.reads.append((aggregation_type, start_date))
+        return self.rows
+
+    def replace_anomalies(self, rows, scanned_from, scanned_at):
+        self.stored = (rows, scanned_from)
+        return len(rows)
+
+    def get_anomalies(self, workflow_id, instance_id, start_date=None, end_date=None, metrics=None,
+                      min_severity=None, limit=None):
+        return [row for row in self.stored[0]
+                if row['workflow_id'] == workflow_id and (min_severity is None or row['severity'] >= min_severity)]
+
+
+def test_scan_stores_findings_read_by_insights():
+    rows = _rows('wf1', [100, 102, 98, 101, 99, 100, 103, 97, 500])
+    db = _FakeReportingDb(rows)
+    engine = AnomalyEngine(reporting_db=db)
+
+    summary = engine.scan_once(today=START + timedelta(weeks=9))
+
+    assert len(db.reads) == 1 and db.reads[0][1].weekday() == 0
+    assert summary['anomalies'] == len(db.stored[0]) == 1
+
+    insights = AIInsightsService()
+    insights.reporting_db = db
+    anomalies = asyncio.run(insights.analyze_anomalies('wf1', 'inst', (START, START + timedelta(weeks=9))))
+
+    assert anomalies[0]['metric'] == 'clicks' and anomalies[0]['type'] == 'high'
+    assert anomalies[0]['expected'] == 100.0 and anomalies[0]['deviation'] > 3.5
@@ -0,0 +1,165 @@
+"""
+Unit Tests for chart downsampling
+
+- Calendar bucketing to days, ISO weeks and months
+- LTTB keeps the first, last and extreme points within the point budget
+- Chart generators enforce their point budgets
+"""
+
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from amc_manager.services.chart_downsampling import (
+    bucket_series,
+    downsample_points,
+    downsample_series,
+    lttb_indices,
+    max_points_for,
+)
+from amc_manager.services.dashboard_data_service import DashboardDataService
+from amc_manager.services.report_dashboard_service import ReportDashboardService
+from amc_manager.services.result_set import ResultSet
+from amc_manager.services.template_report_service import TemplateReportService
+from amc_manager.services.widget_aggregates import SharedAggregates
+
+START = date(2025, 1, 1)  # a Wednesday
+
+
+def _days(count):
+    return [(START + timedelta(days=n)).isoformat() for n in range(count)]
+
+
+class TestBucketing:
+
+    def test_week_and_month_buckets(self):
+        labels = _days(40)
+        values = list(range(40))
+
+        weeks, weekly = bucket_series(labels, {'v': values}, 'week')
+        months, monthly = bucket_series(labels, {'v': values}, 'monthly')
+
+        assert weeks[:2] == ['2024-12-30', '2025-01-06']
+        assert weekly['v'][:2] == [sum(range(5)), sum(range(5, 12))]
+        assert months == ['2025-01-01', '2025-02-01']
+        assert monthly['v'] == [sum(range(31)), sum(range(31, 40))]
+
+    def test_aggregation_and_gaps(self):
+        labels, series = bucket_series(
+            ['2025-01-01', '2025-01-01T12:00:00', '2025-01-02', 'n/a'],
+            {'ctr': [0.1, 0.3, None, 5]},
+            'day', agg='avg'
+        )
+
+        assert labels == ['2025-01-01', '2025-01-02']
+        assert series['ctr'] == [pytest.approx(0.2), None]
+
+    def test_unknown_unit(self):
+        with pytest.raises(ValueError):
+            bucket_series(_days(3), {'v': [1, 2, 3]}, 'fortnight')
+
+
+class TestLttb:
+
+    def test_keeps_endpoints_and_peaks(self):
+        xs = list(range(1000))
+        ys = [math.sin(x / 50) for x in xs]
+        ys[377] = 25.0
+        ys[700] = -25.0
+
+        kept = lttb_indices(xs, ys, 100)
+
+        assert len(kept) == 100
+        assert kept == sorted(kept)
+        assert kept[0] == 0 and kept[-1] == 999
+        assert 377 in kept and 700 in kept
+
+    def test_short_series_are_unchanged(self):
+        assert lttb_indices([0, 1, 2], [1, 2, 3], 2) == [0, 1, 2]
+        labels, series = downsample_series(_days(10), {'v': list(range(10))}, 365)
+        assert labels == _days(10) and series['v'] == list(range(10))
+
+    def test_series_stay_aligned(self):
+        labels = _days(500)
+        series = {'a': [n % 7 for n in range(500)], 'b': [0] * 500}
+        series['b'][123] = 99
+
+        reduced_labels, reduced = downsample_series(labels, series, 60)
+
+        assert len(reduced_labels) <= 60
+        assert len(reduced['a']) == len(reduced['b']) == len(reduced_labels)
+        assert labels[123] in reduced_labels
+        assert reduced['b'][reduced_labels.index(labels[123])] == 99
+
+    def test_many_series_still_span_the_chart(self):
+        """More series than the budget allows 3 points each: the later peaks are not cut off"""
+        labels = _days(1000)
+        series = {}
+        for n in range(40):
+            values = [0] * 1000
+            values[10 + n * 24] = 50
+            series[f"s{n}"] = values
+
+        reduced_labels, reduced = downsample_series(labels, series, 20)
+
+        assert len(reduced_labels) == 20
+        assert reduced_labels[0] == labels[0] and reduced_labels[-1] == labels[-1]
+        assert labels[946] in reduced_labels
+        assert all(len(values) == 20 for values in reduced.values())
+
+    def test_scatter_points_keep_original_order(self):
+        points = [{'x': (n * 37) % 400, 'y': n % 11} for n in range(400)]
+
+        reduced = downsample_points(points, 50)
+
+        assert len(reduced) == 50
+        positions = [points.index(point) for point in reduced]
+        assert positions == sorted(positions)
+
+    def test_point_budget_from_config(self):
+        assert max_points_for({'width': 640}) == 640
+        assert max_points_for({'max_points': 2}) == 3
+        assert max_points_for({}, 365) == 365
+
+
+class TestChartGenerators:
+
+    def test_dashboard_line_chart_enforces_max_data_points(self):
+        service = DashboardDataService()
+        aggregates = [{'data_date': day, 'metrics': {'clicks': n}} for n, day in enumerate(_days(1000))]
+
+        chart = service._format_line_chart(aggregates, ['clicks'])
+        monthly = service._format_area_chart(aggregates, ['clicks'], bucket='month')
+
+        assert len(chart['labels']) == service.MAX_DATA_POINTS
+        assert chart['labels'][0] == '2025-01-01' and chart['datasets'][0]['data'][-1] == 999
+        assert monthly['labels'][:2] == ['2025-01-01', '2025-02-01']
+        assert monthly['datasets'][0]['data'][0] == sum(range(31))
+
+    def test_template_line_and_scatter_use_widget_width(self):
+        service = TemplateReportService()
+        data = SharedAggregates(ResultSet.of([{'day': day, 'spend': n, 'channel': 'a' if n % 2 else 'b'}
+                                              for n, day in enumerate(_days(600))]))
+
+        single = service._generate_line_chart(data, {'x_field': 'day', 'y_field': 'spend', 'width': 200})
+        series = service._generate_line_chart(
+            data, {'x_field': 'day', 'y_field': 'spend', 'series_field': 'channel', 'max_points': 50}
+        )
+        scatter = service._generate_scatter_plot(data, {'x_field': 'spend', 'y_field': 'spend', 'width': 100})
+
+        assert len(single['data']['labels']) == len(single['data']['datasets'][0]['data']) == 200
+        assert all(len(ds['data']) == 50 for ds in series['data']['datasets'])
+        assert len(scatter['data']['datasets'][0]['data']) == 100
+
+    def test_report_dashboard_chart_buckets_and_reduces(self):
+        service = ReportDashboardService()
+        weeks = [{'week_start': (START + timedelta(weeks=n)).isoformat(), 'metrics': {'clicks': 1}}
+                 for n in range(104)]
+
+        monthly = service.transform_for_chart(weeks, 'line', ['clicks'], bucket='month')
+        reduced = service.transform_for_chart(weeks, 'line', ['clicks'], max_points=20)
+
+        assert monthly['labels'][0] == '2025-01-01' and len(monthly['labels']) == 24
+        assert monthly['datasets'][0]['data'][0] == 5
+        assert len(reduced['labels']) == 20
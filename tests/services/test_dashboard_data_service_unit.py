@@ -0,0 +1,160 @@
+"""
+Unit Tests for batched dashboard widget data
+
+- Widgets reading the same aggregate series share one fetch
+- Each fetch projects the union of the metric keys its widgets need
+- get_aggregate_series selects metric keys out of the metrics JSON
+- Line and area charts carry the stored anomalies of their metrics
+"""
+
+import asyncio
+from datetime import date, datetime
+
+from amc_manager.services.dashboard_data_service import DashboardDataService
+from amc_manager.services.reporting_database_service import ReportingDatabaseService
+
+DATE_RANGE = (date(2025, 1, 1), date(2025, 1, 28))
+AGGREGATES = [
+    {'data_date': '2025-01-07', 'metrics': {'impressions': 100, 'clicks': 10, 'spend': 5.0},
+     'dimensions': {'campaigns': ['A', 'B']}},
+    {'data_date': '2025-01-14', 'metrics': {'impressions': 300, 'clicks': 20, 'spend': 7.5},
+     'dimensions': {'campaigns': ['A']}},
+]
+
+
+class _FakeReportingDb:
+    def __init__(self):
+        self.calls = []
+        self.anomaly_calls = []
+
+    def get_anomalies(self, workflow_id, instance_id, start_date=None, end_date=None, metrics=None):
+        self.anomaly_calls.append((start_date, end_date, tuple(metrics)))
+        return [
+            {'metric': 'impressions', 'period_start': '2025-01-14', 'value': 300, 'expected': 100,
+             'score': 6.2, 'severity': 6.2, 'direction': 'high'},
+            {'metric': 'spend', 'period_start': '2025-01-07', 'value': 5.0, 'expected': 9.0,
+             'score': -4.1, 'severity': 4.1, 'direction': 'low'},
+        ]
+
+    def get_aggregate_series(self, workflow_id, instance_id, aggregation_type, start_date, end_date,
+                             metrics=None, include_dimensions=False):
+        self.calls.append((aggregation_type, start_date, end_date, tuple(metrics), include_dimensions))
+        return [
+            {
+                'data_date': agg['data_date'],
+                'metrics': {k: v for k, v in agg['metrics'].items() if k in metrics},
+                **({'dimensions': agg['dimensions']} if include_dimensions else {}),
+            }
+            for agg in AGGREGATES
+        ]
+
+
+class _FakeRollups:
+    def __init__(self):
+        self.calls = []
+
+    def get_range_metrics(self, workflow_id, instance_id, start_date, end_date, metrics=None):
+        self.calls.append((start_date, end_date, tuple(metrics)))
+        value = 30 if start_date == DATE_RANGE[0] else 20
+        return {'metrics': {metric: value for metric in metrics}, 'row_count': 2, 'nodes': 3}
+
+
+def _widget(widget_id, widget_type, chart_type=None, **data_source):
+    return {
+        'widget_id': widget_id,
+        'widget_type': widget_type,
+        'chart_type': chart_type,
+        'data_source': {'workflow_id': 'wf', 'instance_id': 'inst', **data_source},
+    }
+
+
+def test_widgets_share_aggregate_fetches():
+    service = DashboardDataService()
+    service.reporting_db = _FakeReportingDb()
+    service.aggregation_service = _FakeRollups()
+    widgets = [
+        _widget('w1', 'chart', 'line', metrics=['impressions']),
+        _widget('w2', 'chart', 'area', metrics=['clicks']),
+        _widget('w3', 'chart', 'bar', metrics=['spend'], dimensions=['campaigns']),
+        _widget('w4', 'metric_card', metrics=['clicks']),
+        _widget('w5', 'chart', 'line', metrics=['impressions'], aggregation_level='monthly'),
+        {'widget_id': 'w6', 'widget_type': 'chart', 'data_source': {}},
+    ]
+
+    line, area, bar, card, monthly, invalid = asyncio.run(
+        service.get_dashboard_widget_data(widgets, DATE_RANGE)
+    )
+
+    # Weekly series (3 charts) and monthly series; the metric card reads both periods from the rollup cube
+    calls = sorted(service.reporting_db.calls, key=str)
+    assert len(calls) == 2
+    current = next(c for c in calls if c[0] == 'weekly')
+    assert current == ('weekly', *DATE_RANGE, ('clicks', 'impressions', 'spend'), True)
+    assert len(service.aggregation_service.calls) == 2
+    # One anomaly read for every line and area chart over the range
+    assert service.reporting_db.anomaly_calls == [(*DATE_RANGE, ('clicks', 'impressions'))]
+
+    assert line['labels'] == ['2025-01-07', '2025-01-14']
+    assert line['datasets'][0]['data'] == [100, 300]
+    assert line['anomalies'] == [{'metric': 'impressions', 'date': '2025-01-14', 'value': 300,
+                                  'expected': 100, 'score': 6.2, 'type': 'high'}]
+    assert area['anomalies'] == []
+    assert area['type'] == 'area_chart' and area['datasets'][0]['fill'] is True
+    assert bar['labels'] == ['A', 'B'] and bar['datasets'][0]['data'] == [12.5, 5.0]
+    assert card['current_value'] == 30 and card['previous_value'] == 20
+    assert monthly['type'] == 'line_chart'
+    assert invalid == {'error': 'Invalid data source configuration'}
+
+
+def test_cached_widgets_are_not_refetched():
+    service = DashboardDataService()
+    service.reporting_db = _FakeReportingDb()
+    service.aggregation_service = _FakeRollups()
+    widgets = [_widget('w1', 'chart', 'line', metrics=['impressions'])]
+
+    first = asyncio.run(service.get_dashboard_widget_data(widgets, DATE_RANGE))
+    second = asyncio.run(service.get_widget_data(widgets[0], DATE_RANGE))
+
+    assert second == first[0]
+    assert len(service.reporting_db.calls) == 1
+
+
+class _FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.selected = None
+        self.filters = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        self.selected = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(('eq', column, value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(('gte', column, value))
+        return self
+
+    lte = gte
+
+    def order(self, column, desc=False):
+        return self
+
+    def execute(self):
+        return type('Response', (), {'data': self.rows})()
+
+
+def test_aggregate_series_projects_metric_keys():
+    service = ReportingDatabaseService()
+    query = _FakeQuery([{'data_date': '2025-01-07', 'metric_0': 10, 'metric_1': None}])
+    service._client, service._last_connection_time = query, datetime.now()
+
+    rows = service.get_aggregate_series('wf', 'inst', 'weekly', *DATE_RANGE, metrics=['clicks', 'sales'])
+
+    assert query.selected == 'data_date,metric_0:metrics->clicks,metric_1:metrics->sales'
+    assert rows == [{'data_date': '2025-01-07', 'metrics': {'clicks': 10}}]
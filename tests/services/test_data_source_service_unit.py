@@ -0,0 +1,165 @@
+"""
+Unit Tests for Data Source Service catalog snapshot
+
+Tests the in-memory AMC catalog without a database:
+- Snapshot loading and precomputed metadata
+- Version-stamp based invalidation
+- Field search index
+- Returned rows are copies of the shared snapshot
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from amc_manager.services import data_source_service as ds_module
+from amc_manager.services.data_source_service import DataSourceService
+
+
+CATALOG = {
+    'amc_catalog_version': [{'version': 1}],
+    'amc_data_sources': [
+        {'id': 'ds1', 'schema_id': 'dsp-impressions', 'name': 'DSP Impressions', 'category': 'DSP Tables',
+         'description': 'Impression events', 'data_sources': '["dsp_impressions"]', 'tags': '["dsp", "impressions"]',
+         'availability': None},
+        {'id': 'ds2', 'schema_id': 'conversions', 'name': 'Conversions', 'category': 'Conversion Tables',
+         'description': 'Conversion events', 'data_sources': '["conversions"]', 'tags': '["conversion", "dsp"]',
+         'availability': '{"regions": ["US"]}'},
+    ],
+    'amc_schema_fields': [
+        {'id': 'f1', 'data_source_id': 'ds1', 'field_name': 'impressions', 'data_type': 'LONG',
+         'dimension_or_metric': 'Metric', 'description': 'Impression count', 'field_order': 2},
+        {'id': 'f2', 'data_source_id': 'ds1', 'field_name': 'campaign_id', 'data_type': 'STRING',
+         'dimension_or_metric': 'Dimension', 'description': 'Campaign', 'field_order': 1},
+        {'id': 'f3', 'data_source_id': 'ds2', 'field_name': 'purchases', 'data_type': 'LONG',
+         'dimension_or_metric': 'Metric', 'description': 'Purchase conversions', 'field_order': 1},
+    ],
+    'amc_query_examples': [
+        {'id': 'e1', 'data_source_id': 'ds1', 'title': 'Basic', 'sql_query': 'SELECT 1', 'example_order': 0},
+    ],
+    'amc_schema_sections': [],
+    'amc_schema_relationships': [
+        {'id': 'r1', 'source_schema_id': 'ds1', 'target_schema_id': 'ds2', 'relationship_type': 'joins_with'},
+    ],
+}
+
+
+def make_client(catalog):
+    """Fake Supabase client that serves catalog tables and counts table reads"""
+    client = MagicMock()
+    client.reads = {}
+
+    def table(name):
+        client.reads[name] = client.reads.get(name, 0) + 1
+        query = MagicMock()
+        bounds = {'start': 0, 'end': None}
+
+        def do_range(start, end):
+            bounds['start'], bounds['end'] = start, end
+            return query
+
+        def execute():
+            rows = catalog.get(name, [])
+            end = bounds['end'] + 1 if bounds['end'] is not None else None
+            return MagicMock(data=rows[bounds['start']:end])
+
+        for method in ('select', 'eq', 'limit'):
+            getattr(query, method).return_value = query
+        query.range.side_effect = do_range
+        query.execute.side_effect = execute
+        return query
+
+    client.table.side_effect = table
+    return client
+
+
+class TestDataSourceCatalogSnapshot:
+    """Unit tests for the DataSourceService catalog snapshot"""
+
+    @pytest.fixture
+    def catalog(self):
+        return {name: [dict(row) for row in rows] for name, rows in CATALOG.items()}
+
+    @pytest.fixture
+    def service(self, catalog):
+        """DataSourceService with a fake client and a clean snapshot"""
+        DataSourceService.invalidate_cache()
+        with patch('amc_manager.services.data_source_service.SupabaseService.__init__', return_value=None):
+            service = DataSourceService()
+        client = make_client(catalog)
+        type(service).client = property(lambda self: client)
+        yield service
+        del type(service).client
+        DataSourceService.invalidate_cache()
+
+    def test_list_precomputes_metadata(self, service):
+        """Counts, capabilities and joinable sources are attached from the snapshot"""
+        sources = service.list_data_sources()
+
+        assert [s['schema_id'] for s in sources] == ['conversions', 'dsp-impressions']
+        dsp = sources[1]
+        assert dsp['dimension_count'] == 1
+        assert dsp['metric_count'] == 1
+        assert dsp['field_count'] == 2
+        assert dsp['tags'] == ['dsp', 'impressions']
+        assert 'Ad Engagement' in dsp['audience_capabilities']
+        assert 'Campaign Targeting' in dsp['audience_capabilities']
+        assert dsp['joinable_sources'] == [{'schema_id': 'conversions', 'name': 'Conversions'}]
+        assert dsp['example_count'] == 1
+        assert '_search_text' not in dsp
+
+    def test_filters_are_served_in_memory(self, service):
+        """Category, tag and search filters do not re-read the catalog"""
+        service.list_data_sources()
+        reads = dict(service.client.reads)
+
+        assert [s['schema_id'] for s in service.list_data_sources(category='DSP Tables')] == ['dsp-impressions']
+        assert len(service.list_data_sources(tags=['dsp'])) == 2
+        assert [s['schema_id'] for s in service.list_data_sources(search='conversion')] == ['conversions']
+        assert service.get_categories() == ['Conversion Tables', 'DSP Tables']
+        assert service.get_popular_tags(limit=1) == [{'tag': 'dsp', 'count': 2}]
+
+        assert service.client.reads == reads
+
+    def test_search_fields_exact_name_first(self, service):
+        """Exact field-name hits rank ahead of description matches"""
+        results = service.search_fields('purchases')
+
+        assert results[0]['field_name'] == 'purchases'
+        assert results[0]['data_source']['schema_id'] == 'conversions'
+        assert [f['field_name'] for f in service.search_fields('impression')] == ['impressions']
+
+    def test_complete_schema_orders_fields(self, service):
+        """Complete schema is assembled from the snapshot with fields in field_order"""
+        complete = service.get_complete_schema('dsp-impressions')
+
+        assert [f['field_name'] for f in complete['fields']] == ['campaign_id', 'impressions']
+        assert complete['relationships']['from'][0]['target']['schema_id'] == 'conversions'
+        assert service.get_complete_schema('missing') is None
+
+    def test_results_do_not_share_snapshot_rows(self, service):
+        """Changing a returned row or list leaves the cached snapshot intact"""
+        fields = service.get_schema_fields('dsp-impressions')
+        fields[0]['field_name'] = 'changed'
+        fields.clear()
+        complete = service.get_complete_schema('dsp-impressions')
+        complete['schema']['tags'].append('changed')
+        complete['fields'][0]['field_name'] = 'changed'
+
+        assert [f['field_name'] for f in service.get_schema_fields('dsp-impressions')] == ['campaign_id', 'impressions']
+        assert service.get_data_source('dsp-impressions')['tags'] == ['dsp', 'impressions']
+
+    def test_version_bump_reloads_snapshot(self, service, catalog):
+        """A new version stamp replaces the snapshot and changes the ETag"""
+        etag = service.get_catalog_etag()
+        assert len(service.list_data_sources()) == 2
+
+        catalog['amc_data_sources'].append(
+            {'id': 'ds3', 'schema_id': 'new', 'name': 'New', 'category': 'DSP Tables', 'tags': []}
+        )
+        # Unchanged version: still served from the cached snapshot
+        with patch.object(ds_module, 'VERSION_CHECK_INTERVAL_SECONDS', 0):
+            assert len(service.list_data_sources()) == 2
+
+            catalog['amc_catalog_version'] = [{'version': 2}]
+            assert len(service.list_data_sources()) == 3
+            assert service.get_catalog_etag() != etag
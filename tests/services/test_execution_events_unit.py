@@ -0,0 +1,171 @@
+"""
+Unit Tests for the execution event hub
+
+- Events reach only the subscriptions of their user, instance and execution
+- A transition published by several sources is delivered once
+- Slow subscribers lose their oldest events instead of blocking publishers
+- Subscriptions stream server-sent events with keep-alives
+- The events endpoint streams through the app's middleware (gzip) unbuffered
+"""
+
+import asyncio
+import json
+
+from amc_manager.services.execution_events import ExecutionEventHub, status_event
+
+
+def _event(execution_id='exec_1', status='running', progress=50, user_id='u1', instance_id='amc1'):
+    return {'execution_id': execution_id, 'status': status, 'progress': progress, 'user_id': user_id,
+            'instance_id': instance_id, 'instance_uuid': f"uuid-{instance_id}"}
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_events_are_routed_by_subscription():
+    async def scenario():
+        hub = ExecutionEventHub()
+        everything = hub.subscribe('u1')
+        by_instance_uuid = hub.subscribe('u1', instance_id='uuid-amc2')
+        by_execution = hub.subscribe('u1', execution_id='exec_2')
+        other_user = hub.subscribe('u2')
+
+        hub.publish(_event('exec_1', instance_id='amc1'))
+        hub.publish(_event('exec_2', instance_id='amc2'))
+        await asyncio.sleep(0)
+        return [[e['execution_id'] for e in _drain(s)]
+                for s in (everything, by_instance_uuid, by_execution, other_user)]
+
+    assert asyncio.run(scenario()) == [['exec_1', 'exec_2'], ['exec_2'], ['exec_2'], []]
+
+
+def test_repeated_transitions_are_delivered_once():
+    async def scenario():
+        hub = ExecutionEventHub()
+        subscription = hub.subscribe('u1')
+
+        # The poller and the NOTIFY of the same write both publish
+        delivered = [hub.publish(_event(progress=50)), hub.publish(_event(progress=50)),
+                     hub.publish(_event(status='completed', progress=100))]
+        await asyncio.sleep(0)
+        return delivered, [e['status'] for e in _drain(subscription)], hub.get_state()
+
+    delivered, statuses, state = asyncio.run(scenario())
+
+    assert delivered == [1, 0, 1]
+    assert statuses == ['running', 'completed']
+    assert state['duplicates'] == 1 and state['published'] == 2
+
+
+def test_slow_subscriber_drops_oldest(monkeypatch):
+    from amc_manager.config import settings
+    monkeypatch.setattr(settings, 'execution_events_queue_size', 2)
+
+    async def scenario():
+        hub = ExecutionEventHub()
+        subscription = hub.subscribe('u1')
+        for progress in (10, 20, 30):
+            hub.publish(_event(progress=progress))
+        await asyncio.sleep(0)
+        return [e['progress'] for e in _drain(subscription)], subscription.dropped
+
+    assert asyncio.run(scenario()) == ([20, 30], 1)
+
+
+def test_stream_formats_events_and_keeps_alive():
+    async def scenario():
+        hub = ExecutionEventHub()
+        subscription = hub.subscribe('u1')
+        stream = hub.stream(subscription, heartbeat_seconds=0.01)
+
+        chunks = [await stream.__anext__()]
+        hub.publish(status_event({'execution_id': 'exec_1', 'status': 'completed', 'progress': 100,
+                                  'row_count': 42}, 'u1', instance_id='amc1'))
+        chunks.append(await stream.__anext__())
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return chunks, hub.get_state()['subscriptions']
+
+    chunks, subscriptions = asyncio.run(scenario())
+
+    assert chunks[0].startswith('retry:')
+    lines = chunks[1].splitlines()
+    assert lines[0] == 'id: exec_1:completed:100' and lines[1] == 'event: status'
+    data = json.loads(lines[2][len('data: '):])
+    assert data['row_count'] == 42 and data['instance_id'] == 'amc1' and 'user_id' not in data
+    assert chunks[2] == ': keep-alive\n\n'
+    assert subscriptions == 0
+
+
+def test_events_subscribe_only_while_iterated():
+    async def scenario():
+        hub = ExecutionEventHub()
+        never_sent = hub.events('u1')
+        before = hub.get_state()['subscriptions']
+
+        stream = hub.events('u1', heartbeat_seconds=0.01)
+        await stream.__anext__()
+        during = hub.get_state()['subscriptions']
+        await stream.aclose()
+        del never_sent
+        return before, during, hub.get_state()['subscriptions']
+
+    assert asyncio.run(scenario()) == (0, 1, 0)
+
+
+def test_events_endpoint_streams_through_app_middleware():
+    from main_supabase import app
+    from amc_manager.api.supabase.auth import get_current_user
+    from amc_manager.services.execution_events import execution_event_hub
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': '/api/amc-executions/events', 'raw_path': b'/api/amc-executions/events',
+             'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 1234), 'server': ('test', 80),
+             'headers': [(b'host', b'test'), (b'accept-encoding', b'gzip'), (b'authorization', b'Bearer x')]}
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def receive():
+            if not disconnect.is_set():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def next_body():
+            while True:
+                message = await asyncio.wait_for(messages.get(), 5)
+                if message['type'] == 'http.response.body':
+                    return message
+
+        app.dependency_overrides[get_current_user] = lambda: {'id': 'stream-user'}
+        task = asyncio.create_task(app(scope, receive, messages.put))
+        try:
+            start = await asyncio.wait_for(messages.get(), 5)
+            first = await next_body()
+            for _ in range(50):
+                if execution_event_hub.get_state()['subscriptions']:
+                    break
+                await asyncio.sleep(0.01)
+            execution_event_hub.publish(status_event({'execution_id': 'exec_stream', 'status': 'running',
+                                                      'progress': 10}, 'stream-user'))
+            event = await next_body()
+        finally:
+            disconnect.set()
+            await asyncio.wait_for(task, 5)
+            app.dependency_overrides.pop(get_current_user, None)
+        return start, first, event
+
+    start, first, event = asyncio.run(scenario())
+
+    headers = dict(start['headers'])
+    assert headers[b'content-type'].startswith(b'text/event-stream')
+    assert headers[b'content-encoding'] == b'identity'
+    # Delivered while the stream is open, not held back by the gzip middleware
+    assert first['body'].startswith(b'retry:') and first['more_body']
+    assert b'event: status' in event['body'] and b'exec_stream' in event['body']
@@ -0,0 +1,176 @@
+"""
+Unit Tests for the incremental execution reconciler
+
+- AMC executions are classified against local rows matched by amc_execution_id
+- The watermark is held by unfinished or unsettled executions
+- A pass pages from the watermark, matches each page in one query and
+  applies its fixes in batches
+- A pass that stops before the last page keeps the watermark, and the next
+  pass resumes from its nextToken
+- Executions unfinished for too long stop holding the watermark
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from benchmarks.stand_ins.memory_supabase import MemorySupabase
+from amc_manager.services import execution_reconciler as reconciler_module
+from amc_manager.services.execution_reconciler import ExecutionReconciler, diff_page, next_watermark
+
+WATERMARK = datetime(2025, 11, 1, tzinfo=timezone.utc)
+
+
+def _amc(execution_id, status, created='2025-11-01T10:00:00Z'):
+    return {'workflowExecutionId': execution_id, 'status': status, 'createdTime': created}
+
+
+class _FakeAPI:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def list_executions(self, instance_id, access_token, entity_id, marketplace_id, limit=50,
+                        next_token=None, workflow_id=None, min_creation_time=None):
+        self.calls.append({'next_token': next_token, 'min_creation_time': min_creation_time})
+        index = int(next_token or 0)
+        has_more = index + 1 < len(self.pages)
+        return {'success': True, 'executions': self.pages[index], 'nextToken': str(index + 1) if has_more else None}
+
+
+class _FakeRefresher:
+    def __init__(self, final_status='completed'):
+        self.final_status = final_status
+        self.calls = []
+
+    async def refresh_many(self, executions, user_id, max_age=None):
+        self.calls.append((list(executions), user_id, max_age))
+        return {execution_id: {'execution_id': execution_id, 'status': self.final_status}
+                for execution_id, _ in executions}
+
+
+def _reconciler(db, pages, refresher, monkeypatch):
+    from amc_manager.config import settings
+
+    async def get_valid_token(user_id):
+        return 'token'
+    monkeypatch.setattr(reconciler_module.token_service, 'get_valid_token', get_valid_token)
+    # The fixtures' executions are dated 2025; keep them young enough to hold the watermark
+    monkeypatch.setattr(settings, 'reconcile_max_hold_hours', 24 * 365 * 100)
+
+    reconciler = ExecutionReconciler(api_client=_FakeAPI(pages), refresher=refresher)
+    reconciler._client = db
+    reconciler._last_connection_time = datetime.now()
+    return reconciler
+
+
+def _seed(db):
+    db.seed('amc_accounts', [{'id': 'acc-1', 'account_id': 'ENTITY1', 'marketplace_id': 'MP', 'user_id': 'owner'}])
+    db.seed('amc_instances', [{'id': 'inst-1', 'instance_id': 'amc1', 'account_id': 'acc-1', 'status': 'active'}])
+    db.seed('workflows', [{'id': 'wf-1', 'user_id': 'u1', 'instance_id': 'inst-1'}])
+    db.seed('workflow_executions', [
+        {'id': f"row-{n}", 'execution_id': f"exec_{n}", 'amc_execution_id': f"amc_{n}", 'status': status,
+         'workflow_id': 'wf-1', 'started_at': '2025-11-01T10:00:00+00:00'}
+        for n, status in enumerate(['running', 'pending', 'completed', 'completed'])
+    ])
+    db.seed('amc_reconciliation_state', [{'instance_id': 'inst-1', 'watermark': WATERMARK.isoformat(),
+                                         'fixed_total': 3}])
+    return db.rows('amc_instances')[0] | {'amc_accounts': db.rows('amc_accounts')[0]}
+
+
+def test_diff_page_classifies_by_amc_execution_id():
+    local = {f"amc_{n}": {'id': f"row-{n}", 'execution_id': f"exec_{n}", 'amc_execution_id': f"amc_{n}",
+                          'status': status}
+             for n, status in enumerate(['running', 'pending', 'completed', 'failed', 'pending'])}
+    page = [_amc('amc_0', 'SUCCEEDED'), _amc('amc_1', 'RUNNING'), _amc('amc_2', 'FAILED'),
+            _amc('amc_3', 'FAILED'), _amc('amc_4', 'PENDING'), _amc('amc_new', 'RUNNING')]
+
+    drift = diff_page(page, local)
+
+    assert [row['execution_id'] for row in drift['finished']] == ['exec_0']
+    assert drift['finished'][0]['amc_status'] == 'completed'
+    assert [row['execution_id'] for row in drift['started']] == ['exec_1']
+    assert drift['conflicts'] == [{'execution_id': 'exec_2', 'amc_execution_id': 'amc_2',
+                                   'status': 'completed', 'amc_status': 'failed'}]
+    assert [row['amc_execution_id'] for row in drift['amc_only']] == ['amc_new']
+
+
+def test_watermark_is_held_by_unfinished_executions():
+    settled = [_amc('a', 'SUCCEEDED', '2025-11-01T09:00:00Z'), _amc('b', 'FAILED', '2025-11-01T11:00:00Z')]
+    running = settled + [_amc('c', 'RUNNING', '2025-11-01T10:00:00Z')]
+
+    assert next_watermark(settled, WATERMARK) == datetime(2025, 11, 1, 11, tzinfo=timezone.utc)
+    assert next_watermark(running, WATERMARK) == datetime(2025, 11, 1, 10, tzinfo=timezone.utc)
+    assert next_watermark(settled, WATERMARK, unsettled={'a'}) == datetime(2025, 11, 1, 9, tzinfo=timezone.utc)
+    assert next_watermark([], WATERMARK) == WATERMARK
+    # Unfinished since before hold_after: stuck, no longer holding everything after it
+    assert next_watermark(running, WATERMARK, hold_after=datetime(2025, 11, 1, 10, 30, tzinfo=timezone.utc)) \
+        == datetime(2025, 11, 1, 11, tzinfo=timezone.utc)
+
+
+def test_pass_pages_from_watermark_and_batches_fixes(monkeypatch):
+    db = MemorySupabase()
+    instance = _seed(db)
+    pages = [
+        [_amc('amc_0', 'SUCCEEDED', '2025-11-01T10:00:00Z'), _amc('amc_1', 'RUNNING', '2025-11-01T11:00:00Z')],
+        [_amc('amc_2', 'CANCELLED', '2025-11-01T12:00:00Z'), _amc('amc_9', 'SUCCEEDED', '2025-11-01T13:00:00Z')],
+    ]
+    refresher = _FakeRefresher()
+    reconciler = _reconciler(db, pages, refresher, monkeypatch)
+
+    result = asyncio.run(reconciler.reconcile_instance(instance))
+
+    assert reconciler.api_client.calls == [{'next_token': None, 'min_creation_time': '2025-11-01T00:00:00'},
+                                           {'next_token': '1', 'min_creation_time': '2025-11-01T00:00:00'}]
+    # One lookup per page plus one for local executions AMC did not list
+    assert db.calls['workflow_executions.select'] == 3
+    assert db.calls['workflow_executions.update'] == 1
+    assert refresher.calls == [([('exec_0', 'amc1')], 'u1', 0)]
+    assert {row['execution_id']: row['status'] for row in db.rows('workflow_executions')}['exec_1'] == 'running'
+
+    assert result['scanned'] == 4 and result['fixed'] == 2
+    drift = result['drift']
+    assert (drift['finished'], drift['started'], drift['conflicts'], drift['amc_only']) == (1, 1, 1, 1)
+    state = db.rows('amc_reconciliation_state')[0]
+    # amc_1 is still running on AMC
+    assert state['watermark'] == '2025-11-01T11:00:00+00:00'
+    assert state['fixed_total'] == 5 and state['last_error'] is None
+
+
+def test_truncated_pass_keeps_watermark(monkeypatch):
+    from amc_manager.config import settings
+    monkeypatch.setattr(settings, 'reconcile_max_pages', 1)
+    db = MemorySupabase()
+    instance = _seed(db)
+    pages = [[_amc('amc_3', 'SUCCEEDED', '2025-11-01T10:00:00Z')], [_amc('amc_9', 'SUCCEEDED')]]
+    reconciler = _reconciler(db, pages, _FakeRefresher(), monkeypatch)
+
+    result = asyncio.run(reconciler.reconcile_instance(instance))
+
+    assert len(reconciler.api_client.calls) == 1
+    assert result['drift']['truncated'] is True
+    assert db.rows('amc_reconciliation_state')[0]['watermark'] == WATERMARK.isoformat()
+
+
+def test_truncated_sweep_resumes_and_then_advances(monkeypatch):
+    from amc_manager.config import settings
+    db = MemorySupabase()
+    instance = _seed(db)
+    pages = [
+        [_amc('amc_3', 'SUCCEEDED', '2025-11-01T10:00:00Z')],
+        [_amc('amc_4', 'RUNNING', '2025-11-01T12:00:00Z')],
+        [_amc('amc_5', 'SUCCEEDED', '2025-11-01T14:00:00Z')],
+    ]
+    reconciler = _reconciler(db, pages, _FakeRefresher(), monkeypatch)
+    monkeypatch.setattr(settings, 'reconcile_max_pages', 2)
+
+    first = asyncio.run(reconciler.reconcile_instance(instance))
+    cursor = db.rows('amc_reconciliation_state')[0]['sweep_cursor']
+    second = asyncio.run(reconciler.reconcile_instance(instance))
+
+    assert first['drift']['truncated'] is True and cursor['next_token'] == '2'
+    assert [call['next_token'] for call in reconciler.api_client.calls] == [None, '1', '2']
+    assert second['drift']['resumed'] is True and second['drift']['truncated'] is False
+    state = db.rows('amc_reconciliation_state')[0]
+    # amc_4, seen on the first pass, is still running
+    assert state['watermark'] == '2025-11-01T12:00:00+00:00'
+    assert state['sweep_cursor'] is None
@@ -0,0 +1,186 @@
+"""
+Unit Tests for the Execution Results Service
+
+Tests paged result access without a database:
+- Query parsing and cursors
+- In-memory filter, sort, projection and pagination
+- Server-side page slicing and stored totals
+- NDJSON / Arrow encodings
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+from unittest.mock import MagicMock
+
+from amc_manager.services.execution_results_service import (
+    ExecutionResultsService,
+    ResultQuery,
+    apply_result_query,
+    decode_cursor,
+    iter_ndjson,
+    to_arrow_ipc
+)
+
+
+COLUMNS = [{'name': 'campaign', 'type': 'string'}, {'name': 'impressions', 'type': 'long'}]
+ROWS = [['c1', '100'], ['c2', '30'], ['c3', '200'], ['c4', '']]
+
+
+def make_client(execution, rpc_error=None):
+    """Fake Supabase client serving one execution and recording selected columns"""
+    client = MagicMock()
+    client.selects = []
+
+    def table(name):
+        query = MagicMock()
+
+        def select(columns):
+            client.selects.append(columns)
+            return query
+
+        query.select.side_effect = select
+        query.eq.return_value = query
+        query.limit.return_value = query
+        query.execute.side_effect = lambda: MagicMock(
+            data=[execution if 'result_rows' in client.selects[-1] else
+                  {k: v for k, v in execution.items() if k != 'result_rows'}]
+        )
+        return query
+
+    def rpc(name, params):
+        call = MagicMock()
+        if rpc_error:
+            call.execute.side_effect = rpc_error
+        else:
+            start = params['p_offset']
+            call.execute.return_value = MagicMock(data=execution['result_rows'][start:start + params['p_limit']])
+        return call
+
+    client.table.side_effect = table
+    client.rpc.side_effect = rpc
+    return client
+
+
+def make_service(client):
+    service = ExecutionResultsService()
+    service._client = client
+    service._last_connection_time = datetime.now()
+    return service
+
+
+EXECUTION = {
+    'execution_id': 'exec_1',
+    'status': 'completed',
+    'result_columns': COLUMNS,
+    'result_rows': ROWS,
+    'result_total_rows': 4,
+    'result_sample_size': 4,
+    'workflows': {'user_id': 'u1'},
+}
+
+
+class TestResultQuery:
+    """Query parameter parsing"""
+
+    def test_parses_sort_filter_and_projection(self):
+        query = ResultQuery.from_params(columns='campaign, impressions', sort='-impressions,campaign',
+                                        filters=['impressions:gt:50'])
+
+        assert query.columns == ['campaign', 'impressions']
+        assert query.sort == [('impressions', True), ('campaign', False)]
+        assert query.filters == [('impressions', 'gt', '50')]
+        assert not query.is_simple
+
+    def test_rejects_bad_filter_and_cursor(self):
+        with pytest.raises(ValueError):
+            ResultQuery.from_params(filters=['impressions:like:1'])
+        with pytest.raises(ValueError):
+            ResultQuery.from_params(cursor='not-a-cursor')
+
+
+class TestApplyResultQuery:
+    """In-memory query application"""
+
+    def test_numeric_sort_filter_and_cursor(self):
+        query = ResultQuery.from_params(limit=1, sort='-impressions', filters=['impressions:gte:30'])
+
+        page = apply_result_query(COLUMNS, ROWS, query, total_rows=4)
+
+        assert page['rows'] == [['c3', '200']]
+        # Filtered totals count matches, not the stored total
+        assert page['total_rows'] == 3
+        assert page['has_more'] is True
+        assert decode_cursor(page['next_cursor']) == 1
+
+        second = apply_result_query(COLUMNS, ROWS, ResultQuery.from_params(
+            limit=5, cursor=page['next_cursor'], sort='-impressions', filters=['impressions:gte:30']
+        ))
+        assert [r[0] for r in second['rows']] == ['c1', 'c2']
+        assert second['next_cursor'] is None
+
+    def test_projection_on_dict_rows(self):
+        rows = [{'campaign': 'c1', 'impressions': '1'}, {'campaign': 'c2', 'impressions': '2'}]
+
+        page = apply_result_query(['campaign', 'impressions'], rows,
+                                  ResultQuery.from_params(columns='impressions', filters=['campaign:in:c2|c9']))
+
+        assert page['rows'] == [{'impressions': '2'}]
+
+    def test_unknown_column(self):
+        with pytest.raises(ValueError):
+            apply_result_query(COLUMNS, ROWS, ResultQuery.from_params(sort='clicks'))
+
+
+class TestExecutionResultsService:
+    """Stored result access"""
+
+    def test_simple_page_is_sliced_server_side(self):
+        client = make_client(EXECUTION)
+        service = make_service(client)
+
+        page = service.get_results_page('exec_1', 'u1', ResultQuery.from_params(limit=2))
+
+        assert page['rows'] == [['c1', '100'], ['c2', '30']]
+        assert page['total_rows'] == 4
+        assert page['has_more'] is True
+        # Neither the metadata lookup nor the page fetch read the full result_rows column
+        assert not any('result_rows' in columns for columns in client.selects)
+
+    def test_falls_back_when_rpc_is_unavailable(self):
+        service = make_service(make_client(EXECUTION, rpc_error=Exception('function does not exist')))
+
+        page = service.get_results_page('exec_1', 'u1', ResultQuery.from_params(offset=3, limit=2))
+
+        assert page['rows'] == [['c4', '']]
+        assert page['has_more'] is False
+
+    def test_access_and_status_checks(self):
+        service = make_service(make_client(EXECUTION))
+        assert service.get_results_page('exec_1', 'other', ResultQuery()) is None
+
+        running = dict(EXECUTION, status='running')
+        assert make_service(make_client(running)).get_results_page('exec_1', 'u1', ResultQuery()) is None
+
+
+class TestEncodings:
+    """Streaming response encodings"""
+
+    def test_ndjson(self):
+        page = apply_result_query(COLUMNS, ROWS[:2], ResultQuery.from_params(limit=2))
+
+        lines = [json.loads(line) for line in b''.join(iter_ndjson(page)).splitlines()]
+
+        assert lines[0]['meta']['total_rows'] == 2
+        assert lines[1] == {'campaign': 'c1', 'impressions': '100'}
+
+    def test_arrow_ipc(self):
+        pa = pytest.importorskip('pyarrow')
+        page = apply_result_query(COLUMNS, ROWS, ResultQuery.from_params(columns='campaign'))
+
+        table = pa.ipc.open_stream(to_arrow_ipc(page)).read_all()
+
+        assert table.column_names == ['campaign']
+        assert table.num_rows == 4
+        assert table.schema.metadata[b'total_rows'] == b'4'
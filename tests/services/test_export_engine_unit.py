@@ -0,0 +1,195 @@
+"""
+Unit Tests for the Report Export Engine
+
+Tests streaming export logic without a database:
+- Chunked sources over list and dict result rows
+- CSV / XLSX / Parquet writers
+- In-flight de-duplication and per-user caps in ExportEngine
+"""
+
+import asyncio
+import csv
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from amc_manager.services.export_engine import (
+    ExecutionResultSource,
+    ExportEngine,
+    export_parameters_hash,
+    write_export
+)
+
+
+def make_client(executions):
+    """Fake Supabase client returning stored execution results by id"""
+    client = MagicMock()
+
+    def table(name):
+        query = MagicMock()
+        selected = {}
+
+        def eq(column, value):
+            selected['id'] = value
+            return query
+
+        query.select.return_value = query
+        query.eq.side_effect = eq
+        query.limit.return_value = query
+        query.execute.side_effect = lambda: MagicMock(
+            data=[executions[selected['id']]] if selected.get('id') in executions else []
+        )
+        return query
+
+    client.table.side_effect = table
+    return client
+
+
+EXECUTIONS = {
+    'e1': {
+        'id': 'e1',
+        'result_columns': [{'name': 'campaign', 'type': 'string'}, {'name': 'impressions', 'type': 'long'}],
+        'result_rows': [['c1', '100'], ['c2', '200'], ['c3', '300']],
+    },
+    'e2': {
+        'id': 'e2',
+        'result_columns': [],
+        'result_rows': [{'impressions': '400', 'campaign': 'c4'}],
+    },
+}
+
+
+class TestExecutionResultSource:
+    """Streaming source over stored execution results"""
+
+    def test_batches_are_chunked_and_labelled(self):
+        """Rows arrive in fixed-size chunks with label columns prepended"""
+        source = ExecutionResultSource(
+            make_client(EXECUTIONS),
+            [{'id': 'e1', 'labels': {'week_start': '2025-01-06'}}, {'id': 'e2', 'labels': {'week_start': '2025-01-13'}}],
+            chunk_rows=2
+        )
+
+        batches = list(source.batches())
+
+        assert [len(rows) for _, rows in batches] == [2, 1, 1]
+        assert batches[0][0] == ['week_start', 'campaign', 'impressions']
+        assert batches[0][1][0] == ['2025-01-06', 'c1', '100']
+        # Dict rows are projected onto the first execution's column order
+        assert batches[2][1][0] == ['2025-01-13', 'c4', '400']
+
+    def test_missing_execution_is_skipped(self):
+        """Executions without stored results contribute no rows"""
+        source = ExecutionResultSource(make_client(EXECUTIONS), [{'id': 'missing'}, {'id': 'e1'}])
+
+        assert sum(len(rows) for _, rows in source.batches()) == 3
+
+
+class TestExportWriters:
+    """File writers for each streamable format"""
+
+    def test_csv_export(self, tmp_path):
+        source = ExecutionResultSource(make_client(EXECUTIONS), [{'id': 'e1'}], chunk_rows=1)
+        path = tmp_path / 'out.csv'
+
+        result = write_export(source, 'csv', path)
+
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ['campaign', 'impressions']
+        assert len(rows) == 4
+        assert result['row_count'] == 3
+        assert result['file_size'] == path.stat().st_size
+
+    def test_parquet_export_is_typed(self, tmp_path):
+        pq = pytest.importorskip('pyarrow.parquet')
+        source = ExecutionResultSource(make_client(EXECUTIONS), [{'id': 'e1'}], chunk_rows=2)
+        path = tmp_path / 'out.parquet'
+
+        write_export(source, 'parquet', path)
+
+        table = pq.read_table(path)
+        assert table.column('impressions').to_pylist() == [100, 200, 300]
+        assert str(table.schema.field('impressions').type) == 'int64'
+
+    def test_excel_export(self, tmp_path):
+        openpyxl = pytest.importorskip('openpyxl')
+        source = ExecutionResultSource(make_client(EXECUTIONS), [{'id': 'e1'}])
+        path = tmp_path / 'out.xlsx'
+
+        write_export(source, 'excel', path)
+
+        sheet = openpyxl.load_workbook(path, read_only=True)['Results']
+        assert [list(r) for r in sheet.iter_rows(values_only=True)][1] == ['c1', '100']
+
+    def test_unsupported_format(self, tmp_path):
+        source = ExecutionResultSource(make_client(EXECUTIONS), [{'id': 'e1'}])
+
+        with pytest.raises(ValueError):
+            write_export(source, 'pdf', tmp_path / 'out.pdf')
+
+
+class TestExportEngine:
+    """Worker pool behaviour"""
+
+    def test_parameters_hash_is_stable(self):
+        assert export_parameters_hash('c', 'csv', {'start': 'a', 'end': 'b'}) == \
+            export_parameters_hash('c', 'csv', {'end': 'b', 'start': 'a'})
+        assert export_parameters_hash('c', 'csv') != export_parameters_hash('c', 'excel')
+
+    @pytest.mark.asyncio
+    async def test_identical_exports_share_one_build(self):
+        """Concurrent exports with the same key run the build once"""
+        engine = ExportEngine(max_workers=2, per_user_limit=2)
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'file_url': 'u', 'file_size': 1}
+
+        results = await asyncio.gather(
+            engine.run('same', 'user', build),
+            engine.run('same', 'user', build)
+        )
+
+        assert len(calls) == 1
+        assert results[0] == results[1]
+
+    @pytest.mark.asyncio
+    async def test_users_do_not_share_builds(self):
+        """The same export for two users builds twice, and idle users hold no semaphore"""
+        engine = ExportEngine(max_workers=2, per_user_limit=2)
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'file_url': 'u', 'file_size': 1}
+
+        await asyncio.gather(engine.run('same', 'alice', build), engine.run('same', 'bob', build))
+
+        assert len(calls) == 2
+        assert engine._user_semaphores == {}
+
+    @pytest.mark.asyncio
+    async def test_per_user_cap(self):
+        """A user never has more builds running than the per-user limit"""
+        engine = ExportEngine(max_workers=4, per_user_limit=1)
+        lock = threading.Lock()
+        running = {'now': 0, 'peak': 0}
+
+        def build():
+            with lock:
+                running['now'] += 1
+                running['peak'] = max(running['peak'], running['now'])
+            time.sleep(0.02)
+            with lock:
+                running['now'] -= 1
+            return {}
+
+        await asyncio.gather(*(engine.run(f'k{i}', 'user', build) for i in range(3)))
+
+        assert running['peak'] == 1
@@ -0,0 +1,169 @@
+"""
+Unit Tests for AI insight caching
+
+- The LRU store evicts the least recently used entries and expires old ones
+- Repeated questions about unchanged data skip the LLM; new data does not
+- Data contexts are summarized from precomputed rollups and anomalies
+"""
+
+import asyncio
+from datetime import date
+
+from amc_manager.services.ai_insights_service import AIInsightsService
+from amc_manager.services.insight_cache import LRUCache, insight_cache_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert 'a' in cache and 'c' in cache and 'b' not in cache
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        clock = _Clock()
+        cache = LRUCache(max_entries=10, ttl_seconds=60, clock=clock)
+        cache.set('a', 1)
+
+        clock.now = 59
+        assert cache.get('a') == 1
+        clock.now = 60
+        assert cache.get('a') is None and len(cache) == 0
+
+
+def test_key_ignores_question_formatting():
+    key = insight_cache_key('summary', 'How did ROAS  change?', 'fp')
+
+    assert insight_cache_key('summary', ' how did roas change ', 'fp') == key
+    assert insight_cache_key('trend_analysis', 'How did ROAS change?', 'fp') != key
+    assert insight_cache_key('summary', 'How did ROAS change?', 'other') != key
+
+
+def test_follow_up_keys_depend_on_user_and_history():
+    history = [('How is ROAS?', 'ROAS fell 3%')]
+    key = insight_cache_key('summary', 'Why did that drop?', 'fp', 'u1', history)
+
+    # Without earlier exchanges the answer depends on question and data only
+    assert insight_cache_key('summary', 'Why did that drop?', 'fp', 'u1') == \
+        insight_cache_key('summary', 'Why did that drop?', 'fp', 'u2')
+    assert insight_cache_key('summary', 'Why did that drop?', 'fp', 'u1') != key
+    assert insight_cache_key('summary', 'Why did that drop?', 'fp', 'u2', history) != key
+    assert insight_cache_key('summary', 'Why did that drop?', 'fp', 'u1', [('How are clicks?', '+8%')]) != key
+
+
+class _FakeReportingDb:
+    def __init__(self):
+        self.version = '2025-01-01T00:00:00+00:00'
+        self.insights = []
+
+    def get_aggregates_version(self, workflow_id, instance_id):
+        return self.version
+
+    def create_insight(self, insight_data):
+        self.insights.append(insight_data)
+        return {'insight_id': f"insight_{len(self.insights)}"}
+
+    def get_anomalies(self, workflow_id, instance_id, start_date=None, end_date=None, metrics=None,
+                      min_severity=None, limit=None):
+        return [{'metric': 'clicks', 'direction': 'high', 'period_start': '2025-01-06',
+                 'value': 5400.0, 'expected': 1200.0}]
+
+
+class _FakeAggregationService:
+    def __init__(self):
+        self.calls = 0
+
+    def compare_ranges(self, workflow_id, instance_id, current, previous=None, metrics=None):
+        self.calls += 1
+        return {
+            'current': {'impressions': 1250000.0, 'clicks': 5400.0, 'roas': 3.25},
+            'delta': {'impressions': {'value': 0, 'percent': 0}, 'clicks': {'value': 400, 'percent': 8.0},
+                      'roas': {'value': -0.1, 'percent': -3.0}}
+        }
+
+
+def _service():
+    service = AIInsightsService()
+    service.reporting_db = _FakeReportingDb()
+    service.aggregation_service = _FakeAggregationService()
+    service.prompts = []
+
+    async def call_ai_api(prompt, user_id):
+        service.prompts.append(prompt)
+        return f"answer {len(service.prompts)}", 0.9
+
+    service._call_ai_api = call_ai_api
+    return service
+
+
+CONTEXT = {'workflow_id': 'wf1', 'instance_id': 'inst', 'date_range': ['2025-01-01', '2025-01-31']}
+
+
+class TestGenerateInsight:
+
+    def test_repeated_question_is_cached_until_data_changes(self):
+        service = _service()
+
+        first = asyncio.run(service.generate_insight('u1', None, 'How is ROAS?', dict(CONTEXT)))
+        second = asyncio.run(service.generate_insight('u2', None, 'how is roas', dict(CONTEXT)))
+
+        assert len(service.prompts) == 1
+        assert second['response'] == first['response'] and second['cached'] and not first['cached']
+        # Cached answers are still stored and remembered per user
+        assert len(service.reporting_db.insights) == 2
+        assert service._get_conversation_context('u2')[0]['response'] == 'answer 1'
+
+        service.reporting_db.version = '2025-02-01T00:00:00+00:00'
+        third = asyncio.run(service.generate_insight('u1', None, 'How is ROAS?', dict(CONTEXT)))
+
+        assert third['response'] == 'answer 2' and not third['cached']
+
+    def test_follow_ups_are_not_shared_between_conversations(self):
+        service = _service()
+        service._update_conversation_context('u1', 'Show my campaign_alpha query', 'secret answer')
+        service._update_conversation_context('u2', 'How are clicks?', 'clicks rose')
+
+        first = asyncio.run(service.generate_insight('u1', None, 'Why did that drop?', dict(CONTEXT)))
+        second = asyncio.run(service.generate_insight('u2', None, 'Why did that drop?', dict(CONTEXT)))
+
+        assert len(service.prompts) == 2 and not second['cached']
+        assert 'campaign_alpha' not in service.prompts[1] and second['response'] != first['response']
+
+    def test_errors_are_not_cached(self):
+        service = _service()
+
+        async def failing_api(prompt, user_id):
+            service.prompts.append(prompt)
+            return "error", 0.0
+
+        service._call_ai_api = failing_api
+        for _ in range(2):
+            asyncio.run(service.generate_insight('u1', None, 'How is ROAS?', dict(CONTEXT)))
+
+        assert len(service.prompts) == 2
+
+
+def test_context_summarized_from_precomputed_data():
+    service = _service()
+
+    summary = service._prepare_data_context(CONTEXT, 'fp')
+
+    assert '  - impressions: 1.2M' in summary and '  - roas: 3.25' in summary
+    assert '  - clicks: +8.0%' in summary and 'impressions: +' not in summary
+    assert 'clicks high in week of 2025-01-06: 5.4K vs 1.2K expected' in summary
+    assert service._prepare_data_context(CONTEXT, 'fp') == summary
+    assert service.aggregation_service.calls == 1
+    assert service._parse_date_range([date(2025, 1, 1), '2025-01-31']) == (date(2025, 1, 1), date(2025, 1, 31))
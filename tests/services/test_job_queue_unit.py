@@ -0,0 +1,189 @@
+"""
+Unit Tests for the Background Job Queue
+
+Exercises the claim semantics on MemoryJobQueue (which mirrors the SQL
+functions in 21_background_jobs.sql) and the JobRunner on top of it:
+- Priority ordering, deduplication and per-key concurrency caps
+- Visibility timeout: an expired lease is claimed again
+- Retry with backoff, then dead-lettering after max_attempts
+- RetryLater snoozes without consuming an attempt
+"""
+
+import asyncio
+
+import pytest
+
+from amc_manager.services.job_queue import JobRunner, MemoryJobQueue, RetryLater
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def queue(clock):
+    return MemoryJobQueue(clock=clock)
+
+
+class TestClaims:
+    """Leasing jobs"""
+
+    def test_priority_order_and_dedupe(self, queue):
+        queue.enqueue('q', {'n': 1})
+        urgent = queue.enqueue('q', {'n': 2}, job_key='exec-1', priority=10)
+        # A live job with the same key is returned instead of a duplicate
+        assert queue.enqueue('q', {'n': 3}, job_key='exec-1').id == urgent.id
+
+        claimed = queue.claim(['q'], 'w1', limit=10, visibility_seconds=60)
+
+        assert [job.payload['n'] for job in claimed] == [2, 1]
+        assert all(job.attempts == 1 for job in claimed)
+        assert queue.claim(['q'], 'w2', limit=10, visibility_seconds=60) == []
+
+    def test_delayed_jobs_wait_for_run_at(self, queue, clock):
+        queue.enqueue('q', delay_seconds=30)
+
+        assert queue.claim(['q'], 'w1', 10, 60) == []
+        clock.now += 30
+        assert len(queue.claim(['q'], 'w1', 10, 60)) == 1
+
+    def test_key_limit_caps_running_jobs_per_key(self, queue):
+        for n in range(4):
+            queue.enqueue('collection', {'n': n}, concurrency_key='instance-a')
+        queue.enqueue('collection', {'n': 9}, concurrency_key='instance-b')
+
+        first = queue.claim(['collection'], 'w1', 10, 60, key_limit=2)
+        second = queue.claim(['collection'], 'w2', 10, 60, key_limit=2)
+
+        assert sorted(job.concurrency_key for job in first) == ['instance-a', 'instance-a', 'instance-b']
+        assert second == []
+
+    def test_expired_lease_is_reclaimed(self, queue, clock):
+        job = queue.enqueue('q')
+        queue.claim(['q'], 'w1', 10, visibility_seconds=60)
+
+        clock.now += 30
+        assert queue.heartbeat([job.id], 'w1', 60) == [job.id]
+        clock.now += 61
+
+        reclaimed = queue.claim(['q'], 'w2', 10, 60)
+        assert [j.id for j in reclaimed] == [job.id]
+        assert reclaimed[0].attempts == 2
+        # The first worker no longer holds it
+        assert queue.heartbeat([job.id], 'w1', 60) == []
+        assert queue.finish(job.id, 'w1', 'succeeded') is None
+
+    def test_retry_then_dead_letter(self, queue, clock):
+        job = queue.enqueue('q', max_attempts=2)
+
+        queue.claim(['q'], 'w1', 10, 60)
+        assert queue.finish(job.id, 'w1', 'retry', error='boom', delay_seconds=30).status == 'queued'
+        assert queue.claim(['q'], 'w1', 10, 60) == []
+
+        clock.now += 30
+        queue.claim(['q'], 'w1', 10, 60)
+        dead = queue.finish(job.id, 'w1', 'retry', error='boom again')
+        assert dead.status == 'dead'
+        assert dead.last_error == 'boom again'
+        clock.now += 3600
+        assert queue.claim(['q'], 'w1', 10, 60) == []
+
+    def test_prune_keeps_live_and_recent_jobs(self, queue, clock):
+        done = queue.enqueue('q', job_key='done')
+        dead = queue.enqueue('q', job_key='dead', max_attempts=1)
+        queue.claim(['q'], 'w1', 10, 60)
+        queue.finish(done.id, 'w1', 'succeeded')
+        queue.finish(dead.id, 'w1', 'retry', error='boom')
+        live = queue.enqueue('q', job_key='live')
+
+        clock.now += 2 * 86400
+        assert queue.prune(succeeded_days=1, dead_days=3) == 1
+        clock.now += 2 * 86400
+        assert queue.prune(succeeded_days=1, dead_days=3) == 1
+        assert list(queue.jobs) == [live.id]
+
+
+class TestJobRunner:
+    """Running handlers"""
+
+    @pytest.mark.asyncio
+    async def test_runs_handlers_and_records_outcomes(self, queue, clock):
+        seen = []
+        attempts = {'flaky': 0}
+
+        async def handle(job):
+            seen.append(job.payload['name'])
+            if job.payload['name'] == 'flaky':
+                attempts['flaky'] += 1
+                raise RuntimeError('AMC 500')
+            if job.payload['name'] == 'running':
+                raise RetryLater(15)
+
+        runner = JobRunner(backend=queue, worker_id='w1', poll_seconds=60)
+        runner.register('q', handle, concurrency=5, backoff_seconds=10)
+        for name in ('ok', 'flaky', 'running'):
+            await runner.enqueue('q', {'name': name}, job_key=name, max_attempts=3)
+
+        assert await runner.claim_once() == 3
+        await asyncio.sleep(0.05)
+
+        rows = {row['job_key']: row for row in queue.jobs.values()}
+        assert rows['ok']['status'] == 'succeeded'
+        assert rows['flaky']['status'] == 'queued'
+        assert rows['flaky']['run_at'] == clock.now + 10
+        assert rows['flaky']['last_error'] == 'AMC 500'
+        # Snoozed without using up an attempt
+        assert rows['running']['status'] == 'queued'
+        assert rows['running']['attempts'] == 0
+        assert rows['running']['run_at'] == clock.now + 15
+
+        # Second failure doubles the backoff
+        clock.now += 15
+        assert await runner.claim_once() == 2
+        await asyncio.sleep(0.05)
+        assert rows['flaky']['run_at'] == clock.now + 20
+        assert runner.get_state()['counts']['retried'] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_and_handback_on_stop(self, queue):
+        release = asyncio.Event()
+
+        async def slow(job):
+            await release.wait()
+
+        runner = JobRunner(backend=queue, worker_id='w1', poll_seconds=60)
+        runner.register('q', slow, concurrency=2)
+        for n in range(3):
+            await runner.enqueue('q', {'n': n})
+
+        await runner.start()
+        await asyncio.sleep(0.05)
+        assert runner.active
+        assert runner.get_state()['queues']['q']['in_flight'] == 2
+
+        await runner.stop()
+        # Cancelled jobs are queued again for another worker
+        assert sorted(row['status'] for row in queue.jobs.values()) == ['queued'] * 3
+        assert all(row['attempts'] == 0 for row in queue.jobs.values())
+
+    @pytest.mark.asyncio
+    async def test_inactive_without_queue_table(self):
+        class MissingTable(MemoryJobQueue):
+            def stats(self):
+                raise RuntimeError('relation "background_jobs_summary" does not exist')
+
+        runner = JobRunner(backend=MissingTable(), worker_id='w1')
+        runner.register('q', lambda job: asyncio.sleep(0))
+        await runner.start()
+
+        assert runner.available is False
+        assert not runner.active
@@ -0,0 +1,83 @@
+"""
+Unit Tests for the Event-Loop Stall Detector
+
+- A blocking call is attributed to the innermost application frame
+- Stalls are aggregated per culprit
+- Strict mode (no_blocking_calls) fails on blocking calls only
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from amc_manager.core import loop_monitor
+from amc_manager.core.loop_monitor import BlockingCallError, LoopLagMonitor, no_blocking_calls
+
+
+@pytest.fixture
+def tests_are_app_code(monkeypatch):
+    """Attribute stalls to frames in this file as if it were application code"""
+    monkeypatch.setattr(loop_monitor, '_APP_ROOTS', (os.path.dirname(os.path.abspath(__file__)),))
+
+
+def fetch_status_synchronously(seconds):
+    time.sleep(seconds)
+
+
+class TestStallDetection:
+    """Watchdog sampling and attribution"""
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_is_attributed(self, tests_are_app_code):
+        monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05)
+        await monitor.start()
+        await asyncio.sleep(0.02)
+        fetch_status_synchronously(0.3)
+        await asyncio.sleep(0.05)
+        fetch_status_synchronously(0.3)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        reports = monitor.get_stall_reports()
+        assert len(reports) == 1
+        report = reports[0]
+        assert report['culprit'].startswith('fetch_status_synchronously (test_loop_monitor_unit.py:')
+        assert report['count'] == 2
+        assert report['blocked_in'].startswith('fetch_status_synchronously')
+        assert report['max_seconds'] >= 0.1
+        assert any('fetch_status_synchronously' in line for line in report['stack'])
+        assert monitor.get_state()['stalls'] == 2
+
+        monitor.reset_stalls()
+        assert monitor.get_stall_reports() == []
+
+    @pytest.mark.asyncio
+    async def test_short_pauses_are_not_stalls(self):
+        monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.2)
+        await monitor.start()
+        time.sleep(0.02)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        assert monitor.get_stall_reports() == []
+
+
+class TestStrictMode:
+    """no_blocking_calls()"""
+
+    @pytest.mark.asyncio
+    async def test_raises_on_blocking_call(self):
+        with pytest.raises(BlockingCallError, match='sleep|test_raises_on_blocking_call'):
+            async with no_blocking_calls(threshold=0.05):
+                await asyncio.sleep(0.03)
+                time.sleep(0.3)
+
+    @pytest.mark.asyncio
+    async def test_passes_when_loop_keeps_yielding(self):
+        async with no_blocking_calls(threshold=0.05) as monitor:
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+
+        assert monitor.samples > 0
@@ -0,0 +1,90 @@
+"""
+Unit Tests for the In-Memory Supabase Stand-in
+
+Tests the query-builder subset the benchmarks rely on:
+- Embedded resources (many-to-one, one-to-many, !inner, counts, FK hints)
+- Filters, ordering and paging
+- single() errors, optimistic updates and triggers
+"""
+
+import pytest
+
+from benchmarks.stand_ins.memory_supabase import MemoryAPIError, MemorySupabase
+
+
+@pytest.fixture
+def db():
+    db = MemorySupabase()
+    user = db.seed('users', [{'id': 'u1', 'email': 'a@example.com'}])[0]
+    account = db.seed('amc_accounts', [{'id': 'a1', 'user_id': user['id'], 'account_id': 'ENT1'}])[0]
+    db.seed('amc_instances', [
+        {'id': 'i1', 'instance_id': 'amc1', 'account_id': account['id']},
+        {'id': 'i2', 'instance_id': 'amc2', 'account_id': None},
+    ])
+    db.seed('workflows', [
+        {'id': 'w1', 'user_id': 'u1', 'instance_id': 'i1'},
+        {'id': 'w2', 'user_id': 'u1', 'instance_id': 'i2'},
+    ])
+    db.seed('workflow_executions', [
+        {'id': f'e{n}', 'execution_id': f'exec_{n}', 'workflow_id': 'w1', 'status': s, 'progress': n}
+        for n, s in enumerate(['pending', 'running', 'completed'])
+    ])
+    return db
+
+
+class TestSelect:
+    """Select shapes and filters"""
+
+    def test_nested_inner_embed(self, db):
+        rows = db.table('workflows')\
+            .select('id, amc_instances!inner(instance_id, amc_accounts!inner(account_id))')\
+            .execute().data
+
+        # w2's instance has no account, so !inner drops it
+        assert rows == [{'id': 'w1', 'amc_instances': {'instance_id': 'amc1', 'amc_accounts': {'account_id': 'ENT1'}}}]
+
+    def test_one_to_many_count_and_hint(self, db):
+        row = db.table('workflows').select('id, workflow_executions(count), amc_instances!instance_id(instance_id)')\
+            .eq('id', 'w1').single().execute().data
+
+        assert row['workflow_executions'] == [{'count': 3}]
+        assert row['amc_instances'] == {'instance_id': 'amc1'}
+
+    def test_filters_order_and_range(self, db):
+        response = db.table('workflow_executions').select('execution_id', count='exact')\
+            .in_('status', ['pending', 'running'])\
+            .order('progress', desc=True)\
+            .range(0, 0)\
+            .execute()
+
+        assert response.data == [{'execution_id': 'exec_1'}]
+        assert response.count == 2
+        assert len(db.table('workflow_executions').select('*').or_('status.eq.completed,progress.lt.1').execute().data) == 2
+
+    def test_single_without_match_raises(self, db):
+        with pytest.raises(MemoryAPIError, match='PGRST116'):
+            db.table('workflows').select('*').eq('id', 'missing').single().execute()
+        assert db.table('workflows').select('*').eq('id', 'missing').maybe_single().execute().data is None
+
+
+class TestWrites:
+    """Updates, upserts and triggers"""
+
+    def test_conditional_update_claims_once(self, db):
+        def claim():
+            return db.table('workflow_executions').update({'status': 'running'})\
+                .eq('id', 'e0').in_('status', ['pending']).execute().data
+
+        assert len(claim()) == 1
+        assert claim() == []
+        assert db.calls['workflow_executions.update'] == 2
+
+    def test_upsert_and_trigger(self, db):
+        seen = []
+        db.register_trigger('schedule_runs', lambda _db, row: seen.append(row['status']))
+
+        db.table('schedule_runs').upsert({'schedule_id': 's1', 'status': 'running'}, on_conflict='schedule_id').execute()
+        db.table('schedule_runs').upsert({'schedule_id': 's1', 'status': 'completed'}, on_conflict='schedule_id').execute()
+
+        assert len(db.rows('schedule_runs')) == 1
+        assert seen == ['running', 'completed']
@@ -0,0 +1,102 @@
+"""
+Unit Tests for Metrics Instrumentation
+
+Tests the recording helpers without a running app:
+- Low-cardinality labels for AMC endpoints and Supabase tables
+- AMC request latency recorded by status, including failed requests
+- Supabase query latency from the PostgREST session hooks
+- Scrape-time gauges and event-loop lag samples
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+import requests
+from prometheus_client import REGISTRY
+
+from amc_manager.core import metrics
+from amc_manager.core.loop_monitor import LoopLagMonitor
+from amc_manager.services.amc_api_client import _amc_request
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestLabels:
+    """Label normalization"""
+
+    @pytest.mark.parametrize('url,expected', [
+        ('https://advertising-api.amazon.com/amc/reporting/amc1x2/workflowExecutions',
+         '/amc/reporting/{id}/workflowExecutions'),
+        ('https://advertising-api.amazon.com/amc/reporting/amc1x2/workflowExecutions/e-9/downloadUrls',
+         '/amc/reporting/{id}/workflowExecutions/{id}/downloadUrls'),
+        ('https://advertising-api.amazon.com/amc/reporting/amc1x2/workflows/weekly_report',
+         '/amc/reporting/{id}/workflows/{id}'),
+        ('https://bucket.s3.amazonaws.com/results/part-0.csv?X-Amz-Signature=abc', 'results_download'),
+    ])
+    def test_amc_endpoint(self, url, expected):
+        assert metrics.amc_endpoint(url) == expected
+
+    def test_supabase_table(self):
+        assert metrics.supabase_table('/rest/v1/workflow_executions') == 'workflow_executions'
+        assert metrics.supabase_table('/rest/v1/rpc/claim_background_jobs') == 'rpc/claim_background_jobs'
+
+
+class TestRecording:
+    """Hot-path observations"""
+
+    def test_amc_request_latency_by_status(self):
+        url = 'https://advertising-api.amazon.com/amc/reporting/i1/workflowExecutions/e1'
+        labels = {'method': 'GET', 'endpoint': '/amc/reporting/{id}/workflowExecutions/{id}'}
+        before_ok = sample('amc_api_request_seconds_count', status='200', **labels)
+        before_error = sample('amc_api_request_seconds_count', status='error', **labels)
+
+        with patch('amc_manager.services.amc_api_client.requests.request', return_value=MagicMock(status_code=200)):
+            _amc_request('GET', url, timeout=5)
+        with patch('amc_manager.services.amc_api_client.requests.request', side_effect=requests.ConnectionError()):
+            with pytest.raises(requests.ConnectionError):
+                _amc_request('GET', url, timeout=5)
+
+        assert sample('amc_api_request_seconds_count', status='200', **labels) == before_ok + 1
+        assert sample('amc_api_request_seconds_count', status='error', **labels) == before_error + 1
+
+    def test_supabase_session_hooks(self):
+        session = httpx.Client(
+            base_url='http://supabase.local/rest/v1',
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        )
+        client = MagicMock()
+        client.postgrest.session = session
+        labels = {'table': 'report_data_weeks', 'method': 'GET', 'status': '200'}
+        before = sample('supabase_query_seconds_count', **labels)
+
+        metrics.instrument_supabase_client(client)
+        metrics.instrument_supabase_client(client)  # idempotent
+        session.get('/report_data_weeks', params={'select': 'id'})
+
+        assert sample('supabase_query_seconds_count', **labels) == before + 1
+
+    def test_scrape_time_gauge(self):
+        state = {'a': 3}
+        metrics.register_gauge('test_scrape_gauge', 'test', ['key'], lambda: [((k,), v) for k, v in state.items()])
+
+        assert sample('test_scrape_gauge', key='a') == 3
+        state['a'] = 5
+        assert sample('test_scrape_gauge', key='a') == 5
+
+    @pytest.mark.asyncio
+    async def test_loop_lag_monitor_sees_blocking_call(self):
+        monitor = LoopLagMonitor(interval=0.01)
+        await monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # blocks the loop
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        assert monitor.samples >= 2
+        assert monitor.max_lag >= 0.05
+        assert not monitor.running
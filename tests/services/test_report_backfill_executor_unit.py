@@ -0,0 +1,75 @@
+"""
+Unit Tests for the report backfill executor's job handler
+
+- A report_backfill job runs a batch of pending segments and snoozes while
+  more remain
+- The last batch completes the collection and the job
+- Finished collections are skipped
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from benchmarks.stand_ins.memory_supabase import MemorySupabase
+from amc_manager.services.job_queue import Job, RetryLater
+from amc_manager.services.report_backfill_executor_service import ReportBackfillExecutorService
+
+
+def _executor(db, monkeypatch):
+    executor = ReportBackfillExecutorService()
+    executor._client = db
+    executor._last_connection_time = datetime.now()
+    executed = []
+
+    async def execute_segment_with_retry(segment, report, instance, should_submit=None):
+        executed.append(segment['week_number'])
+        db.table('report_data_weeks').update({'status': 'completed'}).eq('id', segment['id']).execute()
+        return {'id': f"exec-{segment['week_number']}"}
+
+    async def get_instance_with_entity(instance_id):
+        return {'instance_id': 'amc1', 'entity_id': 'ENTITY1'}
+
+    monkeypatch.setattr(executor, 'execute_segment_with_retry', execute_segment_with_retry)
+    monkeypatch.setattr(executor, 'get_instance_with_entity', get_instance_with_entity)
+    return executor, executed
+
+
+def _seed(db, weeks=12, status='pending'):
+    db.seed('report_definitions', [{'id': 'rep-1', 'instance_id': 'inst-1', 'sql_query': 'SELECT 1'}])
+    db.seed('report_data_collections', [{'id': 'col-1', 'collection_id': 'col_1', 'report_id': 'rep-1',
+                                         'instance_id': 'inst-1', 'status': status, 'total_weeks': weeks,
+                                         'completed_weeks': 0}])
+    db.seed('report_data_weeks', [{'id': f"week-{n}", 'collection_id': 'col-1', 'week_number': n,
+                                   'status': 'pending'} for n in range(weeks)])
+
+
+def _job():
+    return Job(id='job-1', queue='report_backfill', payload={'collection_uuid': 'col-1'})
+
+
+def test_job_runs_batches_until_the_collection_completes(monkeypatch):
+    db = MemorySupabase()
+    _seed(db)
+    executor, executed = _executor(db, monkeypatch)
+
+    with pytest.raises(RetryLater) as snooze:
+        asyncio.run(executor.handle_job(_job()))
+    assert snooze.value.delay_seconds == 0
+    assert executed == list(range(10))
+
+    asyncio.run(executor.handle_job(_job()))
+    assert executed == list(range(12))
+    collection = db.rows('report_data_collections')[0]
+    assert collection['status'] == 'completed' and collection['completed_weeks'] == 12
+
+
+def test_job_skips_finished_collections(monkeypatch):
+    db = MemorySupabase()
+    _seed(db, status='completed')
+    executor, executed = _executor(db, monkeypatch)
+
+    asyncio.run(executor.handle_job(_job()))
+
+    assert executed == []
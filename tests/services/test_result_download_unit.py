@@ -0,0 +1,166 @@
+"""
+Unit Tests for Multi-Part Result Download
+
+Runs against a local HTTP server that honours Range requests:
+- Every part is downloaded and stitched in URL order, gzip parts included
+- A connection dropped mid-part resumes from the last byte with Range
+- Non-retryable statuses fail the download
+- Parquet parts keep their column types and are concatenated as Arrow
+- AMCAPIClient.get_execution_results returns the rows of every part
+"""
+
+import datetime
+import gzip
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from amc_manager.services.amc_api_client import AMCAPIClient, _amc_request
+from amc_manager.services.result_download import ResultDownloadError, download_part, fetch_result
+from amc_manager.services.snowflake_loader import INTEGER, TIMESTAMP, declared_column_types
+
+BIG_ROWS = [f"{n},{'v' * 40}" for n in range(5000)]
+
+
+def _parquet(table):
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    return buffer.getvalue()
+
+
+FILES = {
+    '/part-1.csv': b'id,value\r\n1,a\r\n2,b\r\n',
+    '/part-2.csv.gz': gzip.compress(b'id,value\r\n3,c\r\n'),
+    '/part-3.csv': b'id,value\r\n4,"d,e"\r\n',
+    '/big.csv': ('id,value\r\n' + '\r\n'.join(BIG_ROWS) + '\r\n').encode(),
+    '/part-1.parquet': _parquet(pa.table({
+        'id': pa.array([1, 2], pa.int64()),
+        'spend': [1.5, float('nan')],
+        'day': [datetime.date(2025, 1, 6), None],
+    })),
+    '/part-2.parquet': _parquet(pa.table({
+        'id': pa.array([3], pa.int64()),
+        'spend': [2.0],
+        'day': pa.array([None], pa.null()),
+    })),
+}
+CSV_FILES = ('/part-1.csv', '/part-2.csv.gz', '/part-3.csv')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    ranges = []
+    drop_once = set()
+
+    def do_GET(self):
+        body = FILES.get(self.path)
+        if body is None:
+            self.send_response(403)
+            self.end_headers()
+            return
+        start = 0
+        range_header = self.headers.get('Range')
+        _Handler.ranges.append((self.path, range_header))
+        if range_header:
+            start = int(range_header.split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+        payload = body[start:]
+        if self.path in _Handler.drop_once:
+            # Send half, then drop the connection
+            _Handler.drop_once.discard(self.path)
+            self.wfile.write(payload[:len(payload) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_handler():
+    _Handler.ranges = []
+    _Handler.drop_once = set()
+
+
+def test_parts_are_stitched_in_order(server):
+    urls = [f"{server}/part-1.csv", {'url': f"{server}/part-2.csv.gz"}, f"{server}/part-3.csv"]
+
+    result = fetch_result(urls, _amc_request, concurrency=3)
+
+    assert result.format == 'csv'
+    assert result.columns == [{'name': 'id', 'type': 'string'}, {'name': 'value', 'type': 'string'}]
+    assert result.rows == [['1', 'a'], ['2', 'b'], ['3', 'c'], ['4', 'd,e']]
+    assert result.data_bytes == len(FILES['/part-1.csv']) + len(b'id,value\r\n3,c\r\n') + len(FILES['/part-3.csv'])
+    assert result.downloaded_bytes == sum(len(FILES[path]) for path in CSV_FILES)
+
+
+def test_parquet_parts_keep_their_types(server):
+    urls = [f"{server}/part-1.parquet", f"{server}/part-2.parquet"]
+
+    result = fetch_result(urls, _amc_request)
+
+    assert result.format == 'parquet'
+    assert result.columns == [
+        {'name': 'id', 'type': 'long'},
+        {'name': 'spend', 'type': 'double'},
+        {'name': 'day', 'type': 'date'},
+    ]
+    assert result.rows == [[1, 1.5, '2025-01-06'], [2, None, None], [3, 2.0, None]]
+    # Declared types reach the Snowflake load without re-inference
+    assert declared_column_types(result.columns)['id'] == INTEGER
+    assert declared_column_types([{'name': 'at', 'type': 'timestamp'}, {'name': 'x', 'type': 'string'}]) == {
+        'at': TIMESTAMP
+    }
+
+
+def test_dropped_connection_resumes_with_range(server, tmp_path):
+    _Handler.drop_once = {'/big.csv'}
+    path = tmp_path / 'big'
+
+    with patch('amc_manager.services.result_download.time.sleep'):
+        written = download_part(f"{server}/big.csv", str(path), _amc_request, retries=2)
+
+    assert written == len(FILES['/big.csv'])
+    assert path.read_bytes() == FILES['/big.csv']
+    first, resumed = _Handler.ranges
+    assert first == ('/big.csv', None)
+    assert resumed[1].startswith('bytes=') and int(resumed[1][6:-1]) > 0
+
+
+def test_forbidden_part_fails(server, tmp_path):
+    with pytest.raises(ResultDownloadError, match='403'):
+        download_part(f"{server}/expired.csv", str(tmp_path / 'x'), _amc_request)
+
+
+def test_execution_results_include_every_part(server):
+    client = AMCAPIClient()
+    urls = [f"{server}/part-1.csv", f"{server}/part-2.csv.gz", f"{server}/part-3.csv"]
+
+    with patch.object(client, 'get_execution_status', return_value={'success': True, 'status': 'completed'}), \
+            patch.object(client, 'get_download_urls', return_value={'success': True, 'downloadUrls': urls}):
+        result = client.get_execution_results('exec-1', 'token', 'entity', instance_id='amc1')
+
+    assert result['success'] is True
+    assert result['rowCount'] == 4
+    assert [c['name'] for c in result['columns']] == ['id', 'value']
+    assert result['metadata']['partCount'] == 3
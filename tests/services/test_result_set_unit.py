@@ -0,0 +1,145 @@
+"""
+Unit Tests for ResultSet
+
+- Column types are inferred once; numeric strings become numbers, codes stay strings
+- Snowflake column types are mapped from the same inference
+- Declared types (Parquet output) are used as given
+- Low-cardinality strings are dictionary-encoded and a typical result is far
+  smaller than the same rows as dicts
+- Row views, renames and the services that consume results
+"""
+
+import sys
+
+import pytest
+
+from amc_manager.services.data_aggregation_service import DataAggregationService
+from amc_manager.services.data_analysis_service import DataAnalysisService
+from amc_manager.services.result_set import ResultSet, infer_type
+from amc_manager.services.snowflake_loader import infer_snowflake_type
+from amc_manager.services.template_report_service import TemplateReportService
+
+
+def _records(count):
+    return [
+        {
+            'campaign': f"Campaign {n % 25}",
+            'date': f"2025-01-{n % 28 + 1:02d}",
+            'impressions': str(n * 10),
+            'clicks': str(n % 97),
+            'spend': f"{n * 0.37:.2f}",
+        }
+        for n in range(count)
+    ]
+
+
+def _dict_rows_bytes(records):
+    return sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in records)
+
+
+class TestResultSet:
+    """Columnar storage"""
+
+    def test_types_are_inferred_once(self):
+        result = ResultSet.from_rows(
+            ['id', 'spend', 'zip', 'active', 'name'],
+            [['1', '2.5', '007', 'true', 'a'], ['', '3', '010', 'false', ''], ['3', '', '123', '', 'c']]
+        )
+
+        assert [c['type'] for c in result.columns] == ['long', 'double', 'string', 'boolean', 'string']
+        assert result.values('id') == [1, None, 3]
+        assert result.values('spend') == [2.5, 3.0, None]
+        assert result.values('zip') == ['007', '010', '123']
+        assert result.values('active') == [True, False, None]
+        assert result.values('name') == ['a', '', 'c']
+        assert result.column('spend').sum() == 5.5
+
+    @pytest.mark.parametrize('values,temporal,snowflake', [
+        (['1', '-3', 7], 'long', 'INTEGER'),
+        (['1', '2.5', ''], 'double', 'FLOAT'),
+        (['TRUE', 'false'], 'boolean', 'BOOLEAN'),
+        (['2025-01-05', '2025-01-12 10:30:00'], 'timestamp', 'TIMESTAMP_NTZ'),
+        (['007', '1'], 'string', 'VARCHAR(16777216)'),
+        (['true', '1'], 'string', 'VARCHAR(16777216)'),
+    ])
+    def test_snowflake_types_follow_inference(self, values, temporal, snowflake):
+        assert infer_type(values, temporal=True) == temporal
+        assert infer_snowflake_type(values) == snowflake
+        # Dates and timestamps stay strings in results
+        assert infer_type(values) == (temporal if temporal != 'timestamp' else 'string')
+
+    def test_declared_types_are_used(self):
+        result = ResultSet.from_rows(
+            [{'name': 'day', 'type': 'date'}, {'name': 'count', 'type': 'long'}],
+            [['2025-01-06', 4], ['2025-01-07', None]]
+        )
+
+        assert result.columns == [{'name': 'day', 'type': 'date'}, {'name': 'count', 'type': 'long'}]
+        assert result.rows() == [['2025-01-06', 4], ['2025-01-07', None]]
+
+    def test_compact_storage(self):
+        records = _records(5000)
+
+        result = ResultSet.of(records)
+
+        assert result.column('campaign').is_dictionary_encoded
+        assert result.column('date').distinct()[:2] == ['2025-01-01', '2025-01-02']
+        assert result.nbytes * 10 < _dict_rows_bytes(records)
+
+    def test_row_views_and_renames(self):
+        result = ResultSet.of(_records(3))
+
+        row = result[1]
+        assert dict(row) == {'campaign': 'Campaign 1', 'date': '2025-01-02', 'impressions': 10, 'clicks': 1,
+                             'spend': 0.37}
+        assert row.get('missing') is None and 'spend' in row
+        renamed = result.rename({'spend': 'cost'})
+        assert renamed.names == ['campaign', 'date', 'impressions', 'clicks', 'cost']
+        assert renamed.values('cost') == result.values('spend')
+        assert ResultSet.of({'columns': result.columns, 'rows': result.rows()}).records() == result.records()
+
+    def test_ragged_columns_are_rejected(self):
+        with pytest.raises(ValueError):
+            ResultSet.of([[1, 2]])
+
+
+class TestConsumers:
+    """Services reading typed columns"""
+
+    def test_aggregation_sums_string_metrics(self):
+        service = DataAggregationService()
+        records = [{'impressions': '100', 'clicks': '5', 'campaign_id': '11'},
+                   {'impressions': '300', 'clicks': '', 'campaign_id': '11'}]
+
+        metrics = service._compute_base_metrics(ResultSet.of(records))
+        dimensions = service._extract_dimensions(ResultSet.of(records))
+
+        assert metrics['impressions'] == 400
+        assert metrics['clicks'] == 5
+        assert metrics['spend'] == 0
+        assert dimensions['campaigns'] == ['11']
+
+    def test_analysis_of_typed_columns(self):
+        analysis = DataAnalysisService().analyze_data(_records(200))
+
+        spend = analysis['column_stats']['spend']
+        assert spend['type'] == 'numeric'
+        assert spend['max'] == pytest.approx(199 * 0.37)
+        assert analysis['column_stats']['campaign']['unique_count'] == 25
+
+    def test_dashboard_field_mappings_share_columns(self):
+        service = TemplateReportService()
+        report = {
+            'field_mappings': {'spend': 'cost'},
+            'dashboard_config': {'widgets': [
+                {'type': 'bar_chart', 'x_field': 'campaign', 'y_field': 'cost'},
+                {'type': 'metric_card', 'value_field': 'cost', 'format': 'currency'},
+            ]},
+        }
+
+        dashboard = service.generate_dashboard_from_results(_records(4), report)
+
+        bar, card = dashboard['widgets']
+        assert bar['data']['datasets'][0]['data'] == [0.0, 0.37, 0.74, 1.11]
+        assert card['value'] == '$2.22'
+        assert dashboard['row_count'] == 4
@@ -0,0 +1,137 @@
+"""
+Unit Tests for the rollup cube
+
+- Any date range is covered by the fewest whole day/week/month/quarter nodes
+- Day nodes are built from execution results per date and dimension
+- Re-aggregating a window replaces its day nodes, dimension nodes included
+- Range metrics and period comparisons read only covering nodes
+"""
+
+from datetime import date, timedelta
+
+from amc_manager.services import rollup_cube
+from amc_manager.services.data_aggregation_service import DataAggregationService
+from amc_manager.services.result_set import ResultSet
+
+
+def _days_in(nodes):
+    return sum((rollup_cube.period_end(start, level) - start).days + 1 for level, start in nodes)
+
+
+class TestCover:
+
+    def test_long_range_uses_few_nodes(self):
+        start, end = date(2023, 2, 15), date(2025, 11, 3)
+
+        nodes = rollup_cube.cover(start, end)
+
+        assert _days_in(nodes) == (end - start).days + 1
+        assert nodes[0] == ('day', start) and nodes[-1] == ('day', end)
+        assert [start for level, start in nodes if level == 'quarter'][:2] == [date(2023, 4, 1), date(2023, 7, 1)]
+        assert len(nodes) < 40
+        # Nodes tile the range without gaps or overlaps
+        for (level, first), (_, following) in zip(nodes, nodes[1:]):
+            assert rollup_cube.period_end(first, level) + timedelta(days=1) == following
+
+    def test_aligned_ranges_are_single_nodes(self):
+        assert rollup_cube.cover(date(2025, 1, 1), date(2025, 3, 31)) == [('quarter', date(2025, 1, 1))]
+        assert rollup_cube.cover(date(2025, 2, 1), date(2025, 2, 28)) == [('month', date(2025, 2, 1))]
+        assert rollup_cube.cover(date(2025, 1, 6), date(2025, 1, 12)) == [('week', date(2025, 1, 6))]
+        assert rollup_cube.cover(date(2025, 1, 7), date(2025, 1, 7)) == [('day', date(2025, 1, 7))]
+
+    def test_period_bounds(self):
+        assert rollup_cube.period_start(date(2025, 5, 17), 'quarter') == date(2025, 4, 1)
+        assert rollup_cube.period_end(date(2024, 11, 20), 'quarter') == date(2024, 12, 31)
+        assert rollup_cube.period_end(date(2024, 2, 10), 'month') == date(2024, 2, 29)
+        assert rollup_cube.period_start(date(2025, 1, 1), 'week') == date(2024, 12, 30)
+
+
+class TestDayLeaves:
+
+    def test_rows_split_by_date_and_dimension(self):
+        results = ResultSet.of([
+            {'date': '2025-01-06', 'campaign_id': '1', 'impressions': '100', 'clicks': '4'},
+            {'date': '2025-01-06', 'campaign_id': '2', 'impressions': '50', 'clicks': ''},
+            {'date': '2025-01-07', 'campaign_id': '1', 'impressions': '10', 'clicks': '1'},
+        ])
+
+        leaves = rollup_cube.day_leaves(results, ['impressions', 'clicks', 'spend'], ['campaign_id'], date(2025, 1, 7))
+
+        assert leaves[('', date(2025, 1, 6))] == {'metrics': {'impressions': 150, 'clicks': 4}, 'row_count': 2}
+        assert leaves[('campaign_id:1', date(2025, 1, 7))]['metrics'] == {'impressions': 10, 'clicks': 1}
+        assert len(leaves) == 5
+
+    def test_results_without_dates_count_on_the_window_end(self):
+        results = ResultSet.of([{'impressions': 5}, {'impressions': 7}])
+
+        leaves = rollup_cube.day_leaves(results, ['impressions'], [], date(2025, 1, 12))
+
+        assert leaves == {('', date(2025, 1, 12)): {'metrics': {'impressions': 12}, 'row_count': 2}}
+
+
+class _RollupWriter:
+    def __init__(self, stored_dimensions):
+        self.stored_dimensions = stored_dimensions  # [(dimension, day)]
+        self.written = []
+
+    def get_rollup_day_dimensions(self, workflow_id, instance_id, start_date, end_date):
+        return [(dimension, day) for dimension, day in self.stored_dimensions if start_date <= day <= end_date]
+
+    def upsert_rollups(self, rows):
+        self.written.extend(rows)
+        return len(rows)
+
+    def refresh_rollups(self, workflow_id, instance_id, start_date, end_date):
+        return 0
+
+
+class TestUpdateRollups:
+
+    def test_rerun_zeroes_dimension_nodes_it_no_longer_has(self):
+        service = DataAggregationService()
+        service.reporting_db = _RollupWriter([('campaign_id:1', date(2025, 1, 6)), ('campaign_id:2', date(2025, 1, 6))])
+        results = ResultSet.of([{'date': '2025-01-06', 'campaign_id': '1', 'impressions': '100'}])
+
+        service.update_rollups('wf', 'inst', results, date(2025, 1, 6), date(2025, 1, 7))
+
+        nodes = {(row['dimension'], row['period_start']): row for row in service.reporting_db.written}
+        assert nodes[('campaign_id:1', '2025-01-06')]['metrics'] == {'impressions': 100}
+        assert nodes[('campaign_id:2', '2025-01-06')]['row_count'] == 0
+        assert nodes[('', '2025-01-07')]['metrics'] == {}
+        assert len(nodes) == 4
+
+
+class _FakeReportingDb:
+    def __init__(self, days):
+        self.days = days  # {date: impressions}
+        self.requested = []
+
+    def get_rollup_nodes(self, workflow_id, instance_id, nodes, dimension=''):
+        self.requested.append(list(nodes))
+        rows = []
+        for level, start in nodes:
+            end = rollup_cube.period_end(start, level)
+            values = [v for day, v in self.days.items() if start <= day <= end]
+            if values:
+                rows.append({'level': level, 'metrics': {'impressions': sum(values), 'clicks': len(values)},
+                             'row_count': len(values)})
+        return rows
+
+
+class TestRangeMetrics:
+
+    def test_range_and_previous_period(self):
+        service = DataAggregationService()
+        start = date(2024, 1, 1)
+        service.reporting_db = _FakeReportingDb({start + timedelta(days=n): 10 for n in range(700)})
+
+        total = service.get_range_metrics('wf', 'inst', date(2024, 3, 10), date(2025, 2, 20))
+        comparison = service.compare_ranges('wf', 'inst', (date(2024, 7, 1), date(2024, 7, 31)),
+                                            metrics=['impressions', 'ctr'])
+
+        assert total['metrics']['impressions'] == 10 * ((date(2025, 2, 20) - date(2024, 3, 10)).days + 1)
+        assert total['metrics']['ctr'] == 10.0
+        assert total['nodes'] == len(service.reporting_db.requested[0]) < 30
+        assert comparison['periods']['previous'] == ['2024-05-31', '2024-06-30']
+        assert comparison['current'] == {'impressions': 310, 'ctr': 10.0}
+        assert comparison['delta']['impressions']['value'] == 0
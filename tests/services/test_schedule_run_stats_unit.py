@@ -0,0 +1,119 @@
+"""
+Unit Tests for schedule run counters
+
+- Runtime sketches merge across days and give percentiles within 1%
+- Daily counters combine into schedule health metrics
+- Metrics for many schedules are read with one counter query
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from amc_manager.services import schedule_run_stats
+from amc_manager.services.schedule_history_service import ScheduleHistoryService
+from benchmarks.stand_ins.memory_supabase import MemorySupabase
+
+
+def _sketch(runtimes):
+    sketch = {}
+    for seconds in runtimes:
+        bucket = str(schedule_run_stats.sketch_bucket(seconds))
+        sketch[bucket] = sketch.get(bucket, 0) + 1
+    return sketch
+
+
+class TestSketch:
+
+    def test_merged_percentiles_within_relative_error(self):
+        rng = random.Random(7)
+        days = [[rng.lognormvariate(5, 1) for _ in range(200)] for _ in range(10)]
+        runtimes = sorted(seconds for day in days for seconds in day)
+
+        merged = schedule_run_stats.merge_sketches(_sketch(day) for day in days)
+
+        for q in (0.5, 0.95):
+            exact = runtimes[int(q * (len(runtimes) - 1))]
+            assert schedule_run_stats.sketch_quantile(merged, q) == pytest.approx(exact, rel=0.01)
+
+    def test_empty_and_zero_runtimes(self):
+        assert schedule_run_stats.sketch_quantile({}, 0.5) is None
+        zero = schedule_run_stats.merge_sketches([_sketch([0, 0])])
+        assert schedule_run_stats.sketch_quantile(zero, 0.5) < 0.01
+
+
+class TestHealthMetrics:
+
+    def test_days_combine(self):
+        totals = schedule_run_stats.combine_days([
+            {'total_runs': 3, 'completed_runs': 2, 'failed_runs': 1, 'runtime_count': 2, 'runtime_sum': 100.0,
+             'runtime_sketch': _sketch([40, 60]), 'total_rows': 10, 'total_cost': '1.25',
+             'first_scheduled_at': '2025-01-02T02:00:00+00:00', 'last_scheduled_at': '2025-01-02T20:00:00+00:00'},
+            {'total_runs': 1, 'pending_runs': 1, 'runtime_sketch': {},
+             'first_scheduled_at': '2025-01-03T02:00:00+00:00', 'last_scheduled_at': '2025-01-03T02:00:00+00:00'},
+        ])
+
+        metrics = schedule_run_stats.health_metrics(totals)
+
+        assert metrics['total_runs'] == 4 and metrics['pending_runs'] == 1
+        assert metrics['success_rate'] == 50.0
+        assert metrics['avg_runtime_seconds'] == 50.0
+        assert metrics['p50_runtime_seconds'] == pytest.approx(40, rel=0.01)
+        assert metrics['total_cost'] == 1.25
+        assert metrics['first_run_in_period'] == '2025-01-02T02:00:00+00:00'
+        assert metrics['last_run_in_period'] == '2025-01-03T02:00:00+00:00'
+
+    def test_no_runs(self):
+        metrics = schedule_run_stats.health_metrics(schedule_run_stats.combine_days([]))
+
+        assert metrics['total_runs'] == 0 and metrics['success_rate'] == 0.0
+        assert metrics['avg_runtime_seconds'] is None and metrics['p95_runtime_seconds'] is None
+
+
+class TestScheduleHistoryService:
+
+    @pytest.fixture
+    def service(self):
+        db = MemorySupabase()
+        db.seed('workflow_schedules', [
+            {'id': 's1', 'schedule_id': 'sched_one', 'next_run_at': '2030-01-01T00:00:00'},
+            {'id': 's2', 'schedule_id': 'sched_two'},
+        ])
+        today = datetime.utcnow().date()
+        db.seed('schedule_run_daily_stats', [
+            {'schedule_id': 's1', 'day': (today - timedelta(days=n)).isoformat(), 'total_runs': 2,
+             'completed_runs': 1, 'failed_runs': 1, 'runtime_count': 1, 'runtime_sum': 30.0,
+             'runtime_sketch': _sketch([30]), 'total_rows': 5, 'total_cost': 0.5}
+            for n in (0, 3, 40)
+        ] + [
+            {'schedule_id': 's2', 'day': today.isoformat(), 'total_runs': 1, 'completed_runs': 1}
+        ])
+        service = ScheduleHistoryService()
+        service._client = db
+        service._last_connection_time = datetime.now()
+        return service
+
+    def test_batch_metrics_read_counters_once(self, service):
+        db = service._client
+
+        metrics = service.get_batch_schedule_metrics(['sched_one', 's2', 'missing'], period_days=30)
+
+        assert set(metrics) == {'sched_one', 's2'}
+        assert metrics['sched_one']['total_runs'] == 4
+        assert metrics['sched_one']['success_rate'] == 50.0
+        assert metrics['sched_one']['total_rows_processed'] == 10
+        assert metrics['sched_one']['next_run'] == '2030-01-01T00:00:00'
+        assert metrics['s2']['success_rate'] == 100.0
+        assert db.calls['schedule_run_daily_stats.select'] == 1
+        assert 'schedule_runs.select' not in db.calls
+
+    def test_compare_periods(self, service):
+        now = datetime.utcnow()
+
+        comparison = service.compare_periods('s1', now - timedelta(days=60), now - timedelta(days=30),
+                                             now - timedelta(days=7), now)
+
+        assert comparison['period1']['total_runs'] == 2
+        assert comparison['period2']['total_runs'] == 4
+        assert comparison['changes']['total_runs_change'] == 2
@@ -0,0 +1,146 @@
+"""
+Unit Tests for Typed Snowflake Loading
+
+Tests the Arrow tables built for Snowflake uploads:
+- Column type inference from CSV strings
+- Zero-padded codes stay VARCHAR; empty cells become NULL in typed columns
+- Known column types of an existing table take precedence over inference
+- Table metadata cache and schema error detection
+"""
+
+from datetime import date, datetime
+
+import pyarrow as pa
+import pytest
+
+from amc_manager.services.snowflake_loader import (
+    BOOLEAN, DATE, FLOAT, INTEGER, TIMESTAMP, VARCHAR,
+    TableMetadata, TableMetadataCache, build_arrow_table, is_schema_error, infer_snowflake_type, normalize_snowflake_type, snowflake_type_for
+)
+
+
+class TestInference:
+    """Column type inference"""
+
+    @pytest.mark.parametrize('values,expected', [
+        (['1', '2', '-3'], INTEGER),
+        (['1', '2.5', ''], FLOAT),
+        (['1e3', '0.25'], FLOAT),
+        (['true', 'FALSE'], BOOLEAN),
+        (['2025-01-05', '2025-01-12'], DATE),
+        (['2025-01-05', '2025-01-12 10:30:00'], TIMESTAMP),
+        (['2025-01-05T10:30:00.123Z'], TIMESTAMP),
+        (['007', '123'], VARCHAR),
+        (['1', 'abc'], VARCHAR),
+        (['', None], VARCHAR),
+        (['99999999999999999999'], FLOAT),
+    ])
+    def test_infer_type(self, values, expected):
+        assert infer_snowflake_type(values) == expected
+
+    def test_native_python_values(self):
+        assert infer_snowflake_type([1, 2]) == INTEGER
+        assert infer_snowflake_type([1, 2.5]) == FLOAT
+        assert infer_snowflake_type([datetime(2025, 1, 5, 10)]) == TIMESTAMP
+        assert infer_snowflake_type([date(2025, 1, 5)]) == DATE
+
+
+class TestBuildArrowTable:
+    """Typed tables from result rows"""
+
+    def test_typed_columns_and_constants(self):
+        rows = [
+            ['2025-01-05', '00123', '10', '0.5', ''],
+            ['2025-01-12', '00456', '', '1.5', 'x'],
+        ]
+        uploaded_at = datetime(2025, 1, 20, 8, 0)
+
+        table = build_arrow_table(
+            ['week', 'campaign_code', 'impressions', 'ctr', 'note'],
+            rows,
+            constants=[('execution_id', 'exec-1'), ('uploaded_at', uploaded_at)]
+        )
+
+        types = {field.name: snowflake_type_for(field.type) for field in table.schema}
+        assert types == {
+            'week': DATE, 'campaign_code': VARCHAR, 'impressions': INTEGER, 'ctr': FLOAT,
+            'note': VARCHAR, 'execution_id': VARCHAR, 'uploaded_at': TIMESTAMP,
+        }
+        assert table.column('campaign_code').to_pylist() == ['00123', '00456']
+        # Empty cells are NULL in typed columns but kept in VARCHAR ones
+        assert table.column('impressions').to_pylist() == [10, None]
+        assert table.column('note').to_pylist() == ['', 'x']
+        assert table.column('uploaded_at').to_pylist() == [uploaded_at, uploaded_at]
+
+    def test_dict_rows(self):
+        table = build_arrow_table(['a', 'b'], [{'a': '1', 'b': 'x'}, {'a': '2'}])
+
+        assert table.column('a').type == pa.int64()
+        assert table.column('b').to_pylist() == ['x', None]
+
+    def test_known_types_override_inference(self):
+        # The existing table stored this column as VARCHAR; keep loading it that way
+        table = build_arrow_table(['id', 'spend'], [['1', '2']], column_types={'id': VARCHAR, 'spend': FLOAT})
+
+        assert table.column('id').to_pylist() == ['1']
+        assert table.column('spend').type == pa.float64()
+
+    def test_values_that_do_not_fit_known_type_widen(self):
+        table = build_arrow_table(
+            ['spend', 'label', 'day'],
+            [['1.5', 'n/a', '2025-01-05T10:30:00']],
+            column_types={'spend': INTEGER, 'label': INTEGER, 'day': DATE}
+        )
+
+        assert table.column('spend').to_pylist() == [1.5]
+        assert table.column('label').to_pylist() == ['n/a']
+        assert table.column('day').type == pa.timestamp('us')
+
+
+class TestSnowflakeTypes:
+    """Existing table metadata"""
+
+    @pytest.mark.parametrize('data_type,scale,expected', [
+        ('NUMBER', 0, INTEGER),
+        ('NUMBER', 2, FLOAT),
+        ('FLOAT', None, FLOAT),
+        ('TEXT', None, VARCHAR),
+        ('TIMESTAMP_NTZ', None, TIMESTAMP),
+        ('DATE', None, DATE),
+        ('BOOLEAN', None, BOOLEAN),
+    ])
+    def test_normalize(self, data_type, scale, expected):
+        assert normalize_snowflake_type(data_type, scale) == expected
+
+    def test_new_columns(self):
+        metadata = TableMetadata(column_types={'week': DATE})
+        table = build_arrow_table(['week', 'clicks'], [['2025-01-05', '3']])
+
+        assert metadata.new_columns(table) == [('clicks', INTEGER)]
+
+    def test_widened_columns(self):
+        metadata = TableMetadata(column_types={'week': DATE, 'clicks': INTEGER})
+        table = build_arrow_table(['week', 'clicks'], [['2025-01-05', '2.5']], column_types=metadata.column_types)
+
+        assert metadata.widened_columns(table) == [('clicks', FLOAT)]
+
+    def test_cache_is_case_insensitive_and_invalidates(self):
+        cache = TableMetadataCache()
+        cache.put('acct', 'db.schema.results', TableMetadata(column_types={'a': INTEGER}))
+
+        cached = cache.get('acct', 'DB.SCHEMA.RESULTS')
+        assert cached.column_types == {'a': INTEGER}
+        # Callers get a copy; only put() changes the cache
+        cached.column_types['b'] = FLOAT
+        assert cache.get('acct', 'db.schema.results').column_types == {'a': INTEGER}
+        assert cache.get('other', 'db.schema.results') is None
+        cache.invalidate('acct', 'DB.schema.results')
+        assert cache.get('acct', 'db.schema.results') is None
+
+    def test_schema_errors(self):
+        class ProgrammingError(Exception):
+            errno = 2003
+
+        assert is_schema_error(ProgrammingError('Object does not exist'))
+        assert is_schema_error(Exception("invalid identifier 'CLICKS'"))
+        assert not is_schema_error(Exception('Numeric value abc is not recognized'))
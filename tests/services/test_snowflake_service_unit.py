@@ -5,6 +5,7 @@ Tests Snowflake integration features in isolation:
 - Composite UPSERT key generation (execution_id + date range)
 - Date range column detection
 - MERGE SQL generation logic
+- Table metadata cache: DDL, schema evolution and MERGE reuse across uploads
 """
 
 import pytest
@@ -12,9 +13,38 @@ from unittest.mock import MagicMock, patch
 import pandas as pd
 from datetime import datetime
 
+from amc_manager.services.snowflake_loader import table_metadata_cache
 from amc_manager.services.snowflake_service import SnowflakeService
 
 
+class FakeSnowflakeConnection:
+    """Records executed SQL; INFORMATION_SCHEMA lookups return `existing_columns`"""
+
+    def __init__(self, existing_columns=None, fail_merge=None):
+        self.existing_columns = existing_columns or []
+        self.fail_merge = fail_merge
+        self.statements = []
+
+    def cursor(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = self._execute
+        cursor.fetchall.return_value = list(self.existing_columns)
+        cursor.fetchone.return_value = (1, 0)
+        return cursor
+
+    def _execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if sql.startswith('MERGE') and self.fail_merge:
+            raise self.fail_merge
+
+    def close(self):
+        pass
+
+    def executed(self, prefix):
+        return [sql for sql in self.statements if sql.startswith(prefix)]
+
+
 class TestSnowflakeServiceUnit:
     """Unit tests for SnowflakeService (isolated logic testing)"""
 
@@ -321,3 +351,88 @@ class TestSnowflakeServiceUnit:
         # Assert
         assert 'private_key' in decrypted
         assert decrypted['private_key'] == original_key
+
+    # ========== Table Metadata Cache Tests ==========
+
+    @pytest.fixture
+    def uploader(self, snowflake_service):
+        """SnowflakeService wired to a fake connection per upload"""
+        table_metadata_cache.clear()
+        config = {'account_identifier': 'acct', 'database': 'DB', 'schema': 'AMC'}
+        snowflake_service.get_user_snowflake_config = MagicMock(return_value=config)
+        snowflake_service._update_execution_snowflake_status = MagicMock()
+
+        def upload(connection, columns, rows, execution_id='exec-1'):
+            snowflake_service._get_snowflake_connection = MagicMock(return_value=connection)
+            return snowflake_service.upload_execution_results(
+                execution_id=execution_id,
+                results={'columns': [{'name': name} for name in columns], 'rows': rows},
+                table_name='WEEKLY',
+                user_id='user-1'
+            )
+
+        yield upload
+        table_metadata_cache.clear()
+
+    def test_repeated_uploads_reuse_table_metadata(self, uploader):
+        """Second upload skips the table lookup, DDL and MERGE generation"""
+        first = FakeSnowflakeConnection()
+        assert uploader(first, ['week', 'impressions'], [['2025-01-05', '10']])['success']
+        assert len(first.executed('CREATE TABLE IF NOT EXISTS')) == 1
+
+        second = FakeSnowflakeConnection()
+        with patch.object(SnowflakeService, '_generate_merge_sql') as generate:
+            assert uploader(second, ['week', 'impressions'], [['2025-01-12', '20']], 'exec-2')['success']
+
+        generate.assert_not_called()
+        assert not second.executed('SELECT column_name')
+        assert not second.executed('CREATE TABLE')
+        assert len(second.executed('MERGE INTO DB.AMC.WEEKLY')) == 1
+        assert '__MERGE_SOURCE__' not in second.executed('MERGE')[0]
+
+    def test_new_columns_are_added_once(self, uploader):
+        """Existing tables get ALTER TABLE ADD COLUMN only for new columns"""
+        existing = [(name, 'TEXT', None) for name in ('week', 'execution_id', 'uploaded_at', 'user_id')]
+        existing.append(('impressions', 'NUMBER', 0))
+        connection = FakeSnowflakeConnection(existing_columns=existing)
+
+        uploader(connection, ['week', 'impressions', 'clicks'], [['2025-01-05', '10', '2']])
+
+        assert not connection.executed('CREATE TABLE')
+        assert connection.executed('ALTER TABLE') == [
+            'ALTER TABLE DB.AMC.WEEKLY ADD COLUMN IF NOT EXISTS "clicks" INTEGER'
+        ]
+
+        again = FakeSnowflakeConnection()
+        uploader(again, ['week', 'impressions', 'clicks'], [['2025-01-12', '11', '3']], 'exec-2')
+        assert not again.executed('ALTER TABLE')
+
+    def test_values_that_no_longer_fit_widen_the_column(self, uploader):
+        """A decimal arriving in an INTEGER column migrates it to FLOAT"""
+        uploader(FakeSnowflakeConnection(), ['week', 'impressions'], [['2025-01-05', '10']])
+
+        connection = FakeSnowflakeConnection()
+        assert uploader(connection, ['week', 'impressions'], [['2025-01-12', '10.5']], 'exec-2')['success']
+        assert connection.executed('ALTER TABLE') == [
+            'ALTER TABLE DB.AMC.WEEKLY ADD COLUMN IF NOT EXISTS "impressions__widened" FLOAT',
+            'ALTER TABLE DB.AMC.WEEKLY DROP COLUMN "impressions"',
+            'ALTER TABLE DB.AMC.WEEKLY RENAME COLUMN "impressions__widened" TO "impressions"',
+        ]
+        assert connection.executed('UPDATE') == [
+            'UPDATE DB.AMC.WEEKLY SET "impressions__widened" = CAST("impressions" AS FLOAT)'
+        ]
+
+        again = FakeSnowflakeConnection()
+        assert uploader(again, ['week', 'impressions'], [['2025-01-19', '3']], 'exec-3')['success']
+        assert not again.executed('ALTER TABLE')
+
+    def test_schema_error_invalidates_cache(self, uploader):
+        """A table changed outside the app is looked up again on the next upload"""
+        uploader(FakeSnowflakeConnection(), ['week', 'impressions'], [['2025-01-05', '10']])
+
+        broken = FakeSnowflakeConnection(fail_merge=Exception("SQL compilation error: invalid identifier '\"impressions\"'"))
+        assert not uploader(broken, ['week', 'impressions'], [['2025-01-12', '20']], 'exec-2')['success']
+
+        retry = FakeSnowflakeConnection()
+        assert uploader(retry, ['week', 'impressions'], [['2025-01-12', '20']], 'exec-2')['success']
+        assert len(retry.executed('SELECT column_name')) == 1
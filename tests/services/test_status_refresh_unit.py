@@ -0,0 +1,106 @@
+"""
+Unit Tests for the status refresh coordinator
+
+- Concurrent refreshes of one execution share one AMC poll
+- Recently polled statuses are served from the cache
+- Bulk refreshes poll concurrently within the instance limits
+"""
+
+import asyncio
+import time
+
+from amc_manager.services.adaptive_concurrency import get_instance_limiter
+from amc_manager.services.status_refresh import StatusRefreshCoordinator
+
+
+class _FakeAMC:
+    def __init__(self, latency=0.05, fail=()):
+        self.latency = latency
+        self.fail = set(fail)
+        self.polls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def poll(self, execution_id, user_id):
+        self.polls.append(execution_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if execution_id in self.fail:
+                raise RuntimeError('AMC unavailable')
+            return {'execution_id': execution_id, 'status': 'running', 'polls': len(self.polls)}
+        finally:
+            self.in_flight -= 1
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_refreshes_share_one_poll():
+    amc = _FakeAMC()
+    coordinator = StatusRefreshCoordinator(poll=amc.poll, cache_seconds=0)
+
+    async def scenario():
+        return await asyncio.gather(*(coordinator.refresh('exec_1', 'u1') for _ in range(5)),
+                                    coordinator.refresh('exec_1', 'u2'))
+
+    results = asyncio.run(scenario())
+
+    # One poll per user: a status is only shared with the execution's owner
+    assert amc.polls == ['exec_1', 'exec_1']
+    assert all(result is results[0] for result in results[:5])
+    assert coordinator.get_state()['counts']['coalesced'] == 4
+
+
+def test_recent_status_is_cached():
+    amc = _FakeAMC(latency=0)
+    clock = _Clock()
+    coordinator = StatusRefreshCoordinator(poll=amc.poll, cache_seconds=10, clock=clock)
+
+    async def scenario():
+        await coordinator.refresh('exec_1', 'u1')
+        clock.now = 9
+        await coordinator.refresh('exec_1', 'u1')
+        await coordinator.refresh('exec_1', 'u1', max_age=5)
+        clock.now = 30
+        await coordinator.refresh('exec_1', 'u1')
+
+    asyncio.run(scenario())
+
+    assert len(amc.polls) == 3
+    assert coordinator.get_state()['counts']['cached'] == 1
+
+
+def test_bulk_refresh_is_concurrent_within_instance_limit():
+    amc = _FakeAMC(latency=0.05, fail={'exec_3'})
+    coordinator = StatusRefreshCoordinator(poll=amc.poll, cache_seconds=0)
+    limit = get_instance_limiter('status-refresh-test').limit
+    executions = [(f"exec_{n}", 'status-refresh-test') for n in range(limit)] + [('exec_other', None)]
+
+    started = time.monotonic()
+    results = asyncio.run(coordinator.refresh_many(executions, 'u1'))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.05 * 3
+    assert amc.max_in_flight == limit + 1
+    assert isinstance(results['exec_3'], RuntimeError)
+    assert results['exec_0']['status'] == 'running' and results['exec_other']['status'] == 'running'
+
+
+def test_bulk_refresh_waits_for_instance_slots():
+    amc = _FakeAMC(latency=0.01)
+    coordinator = StatusRefreshCoordinator(poll=amc.poll, cache_seconds=0)
+    limit = get_instance_limiter('status-refresh-limit').limit
+
+    asyncio.run(coordinator.refresh_many(
+        [(f"exec_{n}", 'status-refresh-limit') for n in range(limit * 3)], 'u1'
+    ))
+
+    assert len(amc.polls) == limit * 3
+    assert amc.max_in_flight == limit
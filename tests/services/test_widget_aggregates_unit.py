@@ -0,0 +1,90 @@
+"""
+Unit Tests for shared widget aggregates
+
+- Column reads, totals and groupings are computed once per dashboard
+- Group measures skip nulls and non-numeric values
+- Template widgets built from shared aggregates
+"""
+
+import pytest
+
+from amc_manager.services.result_set import ResultSet
+from amc_manager.services.template_report_service import TemplateReportService
+from amc_manager.services.widget_aggregates import SharedAggregates
+
+RECORDS = [
+    {'campaign': 'A', 'device': 'mobile', 'impressions': 100, 'spend': 1.5},
+    {'campaign': 'B', 'device': 'mobile', 'impressions': 200, 'spend': None},
+    {'campaign': 'A', 'device': 'desktop', 'impressions': 300, 'spend': 2.5},
+    {'campaign': 'A', 'device': 'mobile', 'impressions': 400, 'spend': 4.0},
+]
+
+
+class _CountingResultSet(ResultSet):
+    def __init__(self, columns):
+        super().__init__(columns)
+        self.reads = []
+
+    def values(self, name, default=None):
+        self.reads.append(name)
+        return super().values(name, default)
+
+
+def _counting(records):
+    result = ResultSet.of(records)
+    return _CountingResultSet([result.column(name) for name in result.names])
+
+
+class TestSharedAggregates:
+
+    def test_groupings_and_measures(self):
+        shared = SharedAggregates(ResultSet.of(RECORDS))
+
+        grouping = shared.grouping(['campaign'])
+        assert grouping.labels == [('A',), ('B',)]
+        assert shared.aggregate(['campaign'], 'impressions') == [800, 200]
+        assert shared.aggregate(['campaign'], 'spend', 'avg') == [pytest.approx(8 / 3), None]
+        assert shared.aggregate(['campaign'], 'spend', 'count') == [3, 0]
+        assert shared.aggregate(['campaign', 'device'], 'impressions', 'first') == [100, 200, 300]
+        assert shared.total('impressions') == 1000 and isinstance(shared.total('impressions'), int)
+        assert shared.total('missing') == 0
+        with pytest.raises(ValueError):
+            shared.aggregate(['campaign'], 'spend', 'median')
+
+    def test_reads_are_shared(self):
+        data = _counting(RECORDS)
+        shared = SharedAggregates(data)
+
+        for _ in range(3):
+            shared.grouping(['campaign'])
+            shared.aggregate(['campaign'], 'impressions')
+            shared.values('spend')
+
+        assert sorted(data.reads) == ['campaign', 'impressions', 'spend']
+
+
+class TestTemplateDashboard:
+
+    def test_widgets_share_one_scan_per_column(self):
+        service = TemplateReportService()
+        data = _counting(RECORDS)
+        widgets = [
+            {'type': 'bar_chart', 'x_field': 'campaign', 'y_field': 'impressions', 'aggregate': 'sum'},
+            {'type': 'pie_chart', 'label_field': 'campaign', 'value_field': 'impressions', 'aggregate': 'sum'},
+            {'type': 'metric_card', 'value_field': 'impressions'},
+            {'type': 'funnel', 'stages': ['impressions', 'spend']},
+            {'type': 'heatmap', 'x_field': 'device', 'y_field': 'campaign', 'value_field': 'impressions'},
+            {'type': 'line_chart', 'x_field': 'impressions', 'y_field': 'spend', 'series_field': 'campaign'},
+        ]
+
+        dashboard = service.generate_dashboard_from_results(data, {'dashboard_config': {'widgets': widgets}})
+
+        bar, pie, card, funnel, heatmap, line = dashboard['widgets']
+        assert bar['data']['labels'] == ['A', 'B'] and bar['data']['datasets'][0]['data'] == [800, 200]
+        assert pie['data']['datasets'][0]['data'] == [800, 200]
+        assert card['raw_value'] == 1000
+        assert funnel['data'][1]['value'] == 8.0
+        assert heatmap['data']['x_labels'] == ['mobile', 'desktop']
+        assert heatmap['data']['values'] == [[100, 300], [200, 0]]
+        assert [ds['label'] for ds in line['data']['datasets']] == ['A', 'B']
+        assert sorted(set(data.reads)) == sorted(data.reads)
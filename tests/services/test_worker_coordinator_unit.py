@@ -0,0 +1,148 @@
+"""
+Unit Tests for Worker Coordination
+
+Tests leader election and partitioning without Supabase:
+- Only one coordinator runs a singleton engine; a successor takes over on release
+- Partition ownership assigns every key to exactly one live worker
+- Fallback to local execution when worker_leases is unavailable
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from amc_manager.services.worker_coordinator import WorkerCoordinator
+
+
+class FakeLeaseService:
+    """In-memory worker_leases with the semantics of try_acquire_worker_lease"""
+
+    def __init__(self):
+        self.leases = {}
+
+    def try_acquire(self, name, holder, ttl_seconds, metadata=None):
+        current = self.leases.get(name)
+        if current and current['holder'] != holder and current['expires_at'] > time.time():
+            return False
+        self.leases[name] = {'holder': holder, 'expires_at': time.time() + ttl_seconds}
+        return True
+
+    def release(self, name, holder):
+        if self.leases.get(name, {}).get('holder') == holder:
+            del self.leases[name]
+
+    def live_members(self):
+        return sorted(
+            lease['holder'] for name, lease in self.leases.items()
+            if name.startswith('member:') and lease['expires_at'] > time.time()
+        )
+
+    def list_leases(self):
+        return [{'name': name, **lease} for name, lease in self.leases.items()]
+
+
+class BrokenLeaseService(FakeLeaseService):
+    def try_acquire(self, *args, **kwargs):
+        raise RuntimeError('Could not find the function public.try_acquire_worker_lease')
+
+
+def make_engine(log, name):
+    async def start():
+        log.append(f'{name}:start')
+        await asyncio.Event().wait()
+
+    async def stop():
+        log.append(f'{name}:stop')
+
+    return start, stop
+
+
+class TestLeaderElection:
+    """Singleton engines"""
+
+    @pytest.mark.asyncio
+    async def test_single_leader_and_failover(self):
+        leases = FakeLeaseService()
+        log = []
+        first = WorkerCoordinator('w1', lease_ttl_seconds=30, lease_service=leases)
+        second = WorkerCoordinator('w2', lease_ttl_seconds=30, lease_service=leases)
+        first.register_singleton('schedule_executor', *make_engine(log, 'w1'))
+        second.register_singleton('schedule_executor', *make_engine(log, 'w2'))
+
+        await first.start()
+        await second.start()
+        await asyncio.sleep(0)
+
+        assert first.is_leader('schedule_executor')
+        assert not second.is_leader('schedule_executor')
+        assert log == ['w1:start']
+
+        # Graceful shutdown releases the lease; the next heartbeat takes over
+        await first.stop()
+        await second._heartbeat()
+        await asyncio.sleep(0)
+
+        assert second.is_leader('schedule_executor')
+        assert log == ['w1:start', 'w1:stop', 'w2:start']
+        await second.stop()
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_stops_engine(self):
+        leases = FakeLeaseService()
+        log = []
+        coordinator = WorkerCoordinator('w1', lease_ttl_seconds=30, lease_service=leases)
+        coordinator.register_singleton('token_refresh', *make_engine(log, 'w1'))
+        await coordinator.start()
+
+        # Our lease expired and another worker grabbed it
+        leases.leases['leader:token_refresh'] = {'holder': 'w2', 'expires_at': time.time() + 30}
+        await coordinator._heartbeat()
+
+        assert not coordinator.is_leader('token_refresh')
+        assert 'w1:stop' in log
+        await coordinator.stop()
+
+    @pytest.mark.asyncio
+    async def test_runs_locally_without_lease_table(self):
+        log = []
+        coordinator = WorkerCoordinator('w1', lease_service=BrokenLeaseService())
+        coordinator.register_singleton('schedule_executor', *make_engine(log, 'w1'))
+
+        await coordinator.start()
+        await asyncio.sleep(0)
+
+        assert coordinator.is_leader('schedule_executor')
+        assert coordinator.owns('anything')
+        assert coordinator.get_state()['leases_available'] is False
+        await coordinator.stop()
+
+
+class TestPartitioning:
+    """Ownership of scalable work"""
+
+    @pytest.mark.asyncio
+    async def test_each_key_has_exactly_one_owner(self):
+        leases = FakeLeaseService()
+        workers = [WorkerCoordinator(f'w{i}', lease_service=leases) for i in range(3)]
+        for worker in workers:
+            await worker.start()
+        for worker in workers:
+            await worker._heartbeat()
+
+        keys = [f'exec-{n}' for n in range(300)]
+        owners = [[w.worker_id for w in workers if w.owns(key)] for key in keys]
+
+        assert all(len(o) == 1 for o in owners)
+        # Roughly even split
+        assert min(sum(1 for o in owners if o == [w.worker_id]) for w in workers) > 50
+        assert workers[0].batch_size(10) == 30
+
+        for worker in workers:
+            await worker.stop()
+
+    def test_owns_everything_when_not_coordinating(self):
+        coordinator = WorkerCoordinator('w1', lease_service=FakeLeaseService())
+
+        assert coordinator.owns('exec-1')
+        assert coordinator.batch_size(10) == 10
@@ -0,0 +1,112 @@
+"""
+Startup Budget Tests
+
+Importing the API must stay within the time and memory budget in
+amc_manager/core/startup_profile.py and must leave the heavy dependencies
+(pandas, pyarrow, snowflake-connector, ...) to be imported on first use.
+Measured in a fresh interpreter, since this test process has imported them.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from amc_manager.core.lazy import LazyService
+from amc_manager.core.startup_profile import (
+    DEFERRED_MODULES, IMPORT_BUDGET_RSS_MB, IMPORT_BUDGET_SECONDS, ImportProfiler
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+_MEASURE = f"""
+import json, sys, time
+started = time.perf_counter()
+import main_supabase
+from amc_manager.core.startup_profile import rss_mb
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'rss_mb': rss_mb(),
+    'loaded': [m for m in {DEFERRED_MODULES!r} if m in sys.modules],
+    'services_built': [
+        name for name in ('token_service', 'amc_execution_service', 'universal_snowflake_sync_service')
+        if getattr(sys.modules.get('amc_manager.services.' + name), name, None) is not None
+        and getattr(sys.modules['amc_manager.services.' + name], name)._initialized
+    ],
+}}))
+"""
+
+
+def _measure_startup():
+    env = {
+        'SUPABASE_URL': 'http://localhost:54321',
+        'SUPABASE_ANON_KEY': 'test-anon-key',
+        'SUPABASE_SERVICE_ROLE_KEY': 'test-service-role-key',
+        **os.environ,
+        'PROCESS_ROLE': 'api',
+    }
+    result = subprocess.run(
+        [sys.executable, '-c', _MEASURE], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_stays_within_budget():
+    startup = _measure_startup()
+
+    assert startup['loaded'] == []
+    assert startup['services_built'] == []
+    assert startup['seconds'] < IMPORT_BUDGET_SECONDS
+    if startup['rss_mb'] is not None:
+        assert startup['rss_mb'] < IMPORT_BUDGET_RSS_MB
+
+
+class TestLazyService:
+    """Deferred singletons"""
+
+    def test_builds_once_on_first_use(self):
+        built = []
+
+        class Service:
+            def __init__(self):
+                built.append(self)
+                self.value = 1
+
+            def ping(self):
+                return 'pong'
+
+        service = LazyService(Service)
+        assert built == [] and not service._initialized
+
+        assert service.ping() == 'pong'
+        service.value = 2
+        assert service.value == 2
+        assert len(built) == 1 and built[0].value == 2
+
+    def test_patch_object_reaches_the_instance(self):
+        class Service:
+            def ping(self):
+                return 'pong'
+
+        service = LazyService(Service)
+        with patch.object(service, 'ping', return_value='patched'):
+            assert service.ping() == 'patched'
+        assert service.ping() == 'pong'
+
+
+def test_import_profiler_times_new_imports_only():
+    sys.modules.pop('colorsys', None)
+    profiler = ImportProfiler().start()
+    try:
+        import colorsys  # noqa: F401
+        import json as json_again  # noqa: F401  (already imported)
+    finally:
+        seconds = profiler.stop()
+
+    assert 'colorsys' in profiler.timings
+    assert 'json' not in profiler.timings
+    assert seconds >= profiler.timings['colorsys']
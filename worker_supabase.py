@@ -0,0 +1,66 @@
+"""Background worker: runs the polling and execution engines without serving HTTP
+
+Run one or more of these next to API processes started with PROCESS_ROLE=api.
+Singleton engines are spread across workers by leader leases and scalable
+engines partition their work, so adding workers adds capacity without
+duplicating schedules.
+"""
+
+import asyncio
+import os
+import signal
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+os.environ.setdefault('PROCESS_ROLE', 'worker')
+
+from amc_manager.config import settings
+from amc_manager.core.logger_simple import get_logger
+from amc_manager.core.loop_monitor import loop_lag_monitor
+from amc_manager.core.metrics import start_metrics_server
+from amc_manager.core.supabase_client import SupabaseManager
+from amc_manager.services.background_engines import start_background_engines, stop_background_engines
+from amc_manager.services.worker_coordinator import worker_coordinator
+
+logger = get_logger(__name__)
+
+
+async def run_worker():
+    """Start the engines and run until SIGINT/SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+
+    logger.info(f"Starting Recom AMP background worker (role: {settings.process_role})...")
+    try:
+        SupabaseManager.get_client().table('users').select('count', count='exact').limit(1).execute()
+        logger.info("✓ Supabase connection successful")
+    except Exception as e:
+        logger.error(f"Failed to connect to Supabase: {e}")
+        raise SystemExit(1)
+
+    start_metrics_server(settings.metrics_port)
+    await loop_lag_monitor.start()
+    await start_background_engines()
+    logger.info(f"✓ Worker {worker_coordinator.worker_id} running")
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Shutting down background worker...")
+        await stop_background_engines()
+        await loop_lag_monitor.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass